@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Benchmark source-document and chunk-reference writes on a synthetic corpus.
+
+Compares the bulk Arrow upsert / UPDATE ... FROM join used by
+`create_source_documents_table` and `add_document_references` with the
+previous one-statement-per-row approach.
+
+Row-by-row updates are timed on a sample (`--legacy-sample`) and extrapolated
+linearly to the full corpus; running them on 100k chunks takes far too long.
+
+Usage:
+    uv run python scripts/benchmark_bulk_inserts.py
+    uv run python scripts/benchmark_bulk_inserts.py --chunks 20000 --chunks-per-doc 5
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import duckdb
+
+from sqlrooms_rag.prepare.database import (
+    add_document_references,
+    create_source_documents_table,
+)
+
+DOC_TEXT = "# Title\n\n" + "Some markdown text about DuckDB. " * 60
+
+
+def make_corpus(num_chunks: int, chunks_per_doc: int):
+    """Synthetic llama-index-like documents and nodes."""
+    num_docs = max(1, num_chunks // chunks_per_doc)
+    documents = [
+        SimpleNamespace(
+            doc_id=f"doc-{i}",
+            text=DOC_TEXT,
+            metadata={"file_path": f"docs/file_{i}.md", "file_name": f"file_{i}.md"},
+        )
+        for i in range(num_docs)
+    ]
+    nodes = [
+        SimpleNamespace(node_id=f"node-{i}", ref_doc_id=f"doc-{i % num_docs}")
+        for i in range(num_chunks)
+    ]
+    return documents, nodes
+
+
+def create_documents_table(db_path: Path, num_chunks: int, embed_dim: int) -> None:
+    """A `documents` table shaped like the one DuckDBVectorStore creates."""
+    conn = duckdb.connect(str(db_path))
+    try:
+        conn.execute(f"""
+            CREATE OR REPLACE TABLE documents AS
+            SELECT
+                'node-' || i AS node_id,
+                'chunk ' || i || ' ' || repeat('lorem ipsum ', 40) AS text,
+                list_transform(range({embed_dim}), x -> random())::FLOAT[{embed_dim}]
+                    AS embedding,
+                '{{}}'::JSON AS metadata_
+            FROM range({num_chunks}) t(i)
+        """)
+    finally:
+        conn.close()
+
+
+def legacy_source_documents(db_path: Path, documents: list) -> None:
+    conn = duckdb.connect(str(db_path))
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS source_documents (
+                doc_id VARCHAR PRIMARY KEY,
+                file_path VARCHAR,
+                file_name VARCHAR,
+                text TEXT,
+                metadata_ JSON,
+                content_hash VARCHAR,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        for doc in documents:
+            conn.execute(
+                """
+                INSERT INTO source_documents (doc_id, file_path, file_name, text, metadata_)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (doc_id) DO UPDATE SET
+                    text = EXCLUDED.text,
+                    metadata_ = EXCLUDED.metadata_
+            """,
+                [
+                    doc.doc_id,
+                    doc.metadata["file_path"],
+                    doc.metadata["file_name"],
+                    doc.text,
+                    json.dumps(doc.metadata),
+                ],
+            )
+    finally:
+        conn.close()
+
+
+def legacy_document_references(db_path: Path, nodes: list) -> None:
+    conn = duckdb.connect(str(db_path))
+    try:
+        conn.execute("ALTER TABLE documents ADD COLUMN IF NOT EXISTS doc_id VARCHAR")
+        for node in nodes:
+            conn.execute(
+                "UPDATE documents SET doc_id = ? WHERE node_id = ?",
+                [node.ref_doc_id, node.node_id],
+            )
+    finally:
+        conn.close()
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--chunks-per-doc", type=int, default=10)
+    parser.add_argument("--embed-dim", type=int, default=384)
+    parser.add_argument(
+        "--legacy-sample",
+        type=int,
+        default=2_000,
+        help="Rows timed for the row-by-row baseline (default: %(default)s)",
+    )
+    args = parser.parse_args()
+
+    documents, nodes = make_corpus(args.chunks, args.chunks_per_doc)
+    print(f"Corpus: {len(documents)} documents, {len(nodes)} chunks")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bulk_db = Path(tmp) / "bulk.duckdb"
+        legacy_db = Path(tmp) / "legacy.duckdb"
+        for db_path in (bulk_db, legacy_db):
+            create_documents_table(db_path, args.chunks, args.embed_dim)
+
+        results = []
+        for name, bulk_fn, legacy_fn, items in (
+            (
+                "source documents",
+                lambda: create_source_documents_table(
+                    bulk_db, documents, verbose=False
+                ),
+                legacy_source_documents,
+                documents,
+            ),
+            (
+                "chunk references",
+                lambda: add_document_references(bulk_db, nodes, verbose=False),
+                legacy_document_references,
+                nodes,
+            ),
+        ):
+            bulk_s = timed(bulk_fn)
+            sample = items[: args.legacy_sample]
+            legacy_s = timed(legacy_fn, legacy_db, sample) * len(items) / len(sample)
+            results.append((name, len(items), legacy_s, bulk_s))
+
+    print()
+    print(f"{'step':<18} {'rows':>8} {'row-by-row':>12} {'bulk':>10} {'speedup':>9}")
+    for name, rows, legacy_s, bulk_s in results:
+        print(
+            f"{name:<18} {rows:>8} {legacy_s:>11.2f}s {bulk_s:>9.2f}s "
+            f"{legacy_s / bulk_s:>8.0f}x"
+        )
+    print(f"\n(row-by-row extrapolated from {args.legacy_sample} rows)")
+
+
+if __name__ == "__main__":
+    main()
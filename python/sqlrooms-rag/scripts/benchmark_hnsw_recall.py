@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Benchmark HNSW vector search against the exact scan: recall and latency.
+
+Builds a synthetic embeddings database (clustered unit vectors, like real
+text embeddings) or copies an existing one, then measures `HybridRetriever`
+vector search with the exact scan and with HNSW indexes for each M and
+ef_search: recall@k against the exact results, and per-query latency.
+
+Usage:
+    uv run python scripts/benchmark_hnsw_recall.py --chunks 200000
+    uv run python scripts/benchmark_hnsw_recall.py --m 16 32 --ef-search 16 64 256
+    uv run python scripts/benchmark_hnsw_recall.py --db generated-embeddings/kb.duckdb
+"""
+
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+
+from sqlrooms_rag.prepare.database import create_hnsw_index
+from sqlrooms_rag.query import HybridRetriever
+
+
+class QueryVectorsOnly:
+    """Stand-in model: the benchmark passes query embeddings directly."""
+
+    def encode(self, *args, **kwargs):
+        raise RuntimeError("The benchmark searches with precomputed embeddings")
+
+
+def unit_rows(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def create_synthetic_db(db_path: Path, args, rng: np.random.Generator) -> None:
+    """Write embeddings clustered around random centers to a new database."""
+    centers = unit_rows(rng.standard_normal((args.clusters, args.dim)))
+    conn = duckdb.connect(str(db_path))
+    try:
+        conn.execute(f"""
+            CREATE TABLE documents (
+                node_id VARCHAR,
+                text VARCHAR,
+                embedding FLOAT[{args.dim}],
+                metadata_ JSON
+            )
+        """)
+        for start in range(0, args.chunks, 50_000):
+            count = min(50_000, args.chunks - start)
+            vectors = centers[rng.integers(0, args.clusters, count)]
+            vectors = unit_rows(
+                vectors + args.spread * rng.standard_normal(vectors.shape)
+            ).astype(np.float32)
+            batch = pa.table(
+                {
+                    "node_id": [f"chunk-{i}" for i in range(start, start + count)],
+                    "embedding": pa.FixedSizeListArray.from_arrays(
+                        pa.array(vectors.ravel()), args.dim
+                    ),
+                }
+            )
+            conn.register("batch", batch)
+            conn.execute(
+                "INSERT INTO documents SELECT node_id, '', embedding, '{}' FROM batch"
+            )
+            conn.unregister("batch")
+    finally:
+        conn.close()
+
+
+def sample_queries(db_path: Path, args, rng: np.random.Generator) -> np.ndarray:
+    """Queries near stored embeddings (random chunks plus noise)."""
+    conn = duckdb.connect(str(db_path), read_only=True)
+    try:
+        stored = conn.execute(
+            f"SELECT embedding FROM documents USING SAMPLE {args.queries} ROWS"
+        ).fetchnumpy()["embedding"]
+    finally:
+        conn.close()
+    vectors = np.stack(stored).astype(np.float64)
+    return unit_rows(vectors + args.spread * rng.standard_normal(vectors.shape))
+
+
+def search(retriever: HybridRetriever, queries: np.ndarray, top_k: int):
+    """Run each query; return result node_ids and latencies in milliseconds."""
+    results, latencies = [], []
+    for query in queries:
+        embedding = query.tolist()
+        start = time.perf_counter()
+        rows = retriever.vector_search(embedding, top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append({row[0] for row in rows})
+    return results, latencies
+
+
+def report(label: str, latencies, recall=None) -> None:
+    p95 = statistics.quantiles(latencies, n=20)[-1]
+    recall_text = f"{recall:>8.3f}" if recall is not None else f"{'exact':>8}"
+    print(
+        f"{label:<28} {recall_text} {statistics.mean(latencies):>9.2f} "
+        f"{statistics.median(latencies):>9.2f} {p95:>9.2f}"
+    )
+
+
+def run(args) -> None:
+    rng = np.random.default_rng(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "benchmark.duckdb"
+        if args.db:
+            # Index builds write to the database; work on a copy
+            shutil.copy(args.db, db_path)
+        else:
+            print(f"Creating {args.chunks} synthetic {args.dim}-d embeddings...")
+            create_synthetic_db(db_path, args, rng)
+        queries = sample_queries(db_path, args, rng)
+
+        model = QueryVectorsOnly()
+        with HybridRetriever(
+            str(db_path), model=model, use_vector_index=False
+        ) as retriever:
+            exact, exact_latencies = search(retriever, queries, args.top_k)
+
+        print(f"\n{len(queries)} queries, top {args.top_k}")
+        print(
+            f"{'search':<28} {'recall':>8} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}"
+        )
+        report("exact scan", exact_latencies)
+
+        for m in args.m:
+            start = time.perf_counter()
+            create_hnsw_index(
+                db_path, m=m, ef_construction=args.ef_construction, verbose=False
+            )
+            build_seconds = time.perf_counter() - start
+
+            for ef_search in args.ef_search:
+                with HybridRetriever(
+                    str(db_path), model=model, ef_search=ef_search
+                ) as retriever:
+                    assert retriever.uses_vector_index
+                    found, latencies = search(retriever, queries, args.top_k)
+                recall = statistics.mean(
+                    len(a & b) / max(len(b), 1) for a, b in zip(found, exact)
+                )
+                report(f"hnsw M={m} ef_search={ef_search}", latencies, recall)
+            print(f"{'':<28} (index built in {build_seconds:.1f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--db", help="Benchmark a copy of this database instead of synthetic data"
+    )
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument(
+        "--spread", type=float, default=0.05, help="Noise around cluster centers"
+    )
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--m", type=int, nargs="+", default=[16])
+    parser.add_argument("--ef-construction", type=int, default=128)
+    parser.add_argument(
+        "--ef-search", type=int, nargs="+", default=[16, 32, 64, 128, 256]
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent OpenAI embedding requests against the local mock server.
+
+Starts `mock_openai_embeddings_server` in-process and embeds a synthetic
+corpus with `OpenAIEmbeddingClient` at several concurrency levels, reporting
+throughput, requests, retries and rate-limited responses. Use
+`--server-tokens-per-minute` / `--rate-limit-probability` to exercise the 429
+handling and `--tokens-per-minute` to pace the client under that limit.
+
+Usage:
+    uv run python scripts/benchmark_openai_concurrency.py
+    uv run python scripts/benchmark_openai_concurrency.py --server-tokens-per-minute 400000 --tokens-per-minute 380000
+"""
+
+import argparse
+import asyncio
+import time
+
+from aiohttp import web
+
+from mock_openai_embeddings_server import create_app
+from sqlrooms_rag.prepare.openai_embeddings import OpenAIEmbeddingClient
+
+
+async def run(args) -> None:
+    app = create_app(
+        dim=args.dim,
+        tokens_per_minute=args.server_tokens_per_minute,
+        latency=args.latency,
+        rate_limit_probability=args.rate_limit_probability,
+    )
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}/v1"
+
+    texts = [
+        f"Chunk {i}: DuckDB is an in-process analytical database. " * 8
+        for i in range(args.chunks)
+    ]
+    print(f"Embedding {len(texts)} chunks, {args.latency * 1000:.0f} ms per request")
+    print()
+    print(
+        f"{'concurrency':>11} {'seconds':>9} {'chunks/s':>9} {'requests':>9} "
+        f"{'retries':>8} {'429s':>6}"
+    )
+
+    try:
+        for concurrency in args.concurrency:
+            client = OpenAIEmbeddingClient(
+                model="text-embedding-3-small",
+                api_key="test",
+                base_url=base_url,
+                dimensions=args.dim,
+                max_concurrency=concurrency,
+                tokens_per_minute=args.tokens_per_minute,
+                batch_size=args.request_batch_size,
+            )
+            start = time.perf_counter()
+            vectors = await client.embed(texts)
+            elapsed = time.perf_counter() - start
+            assert len(vectors) == len(texts) and all(
+                len(v) == args.dim for v in vectors
+            )
+            stats = client.stats
+            print(
+                f"{concurrency:>11} {elapsed:>9.2f} {len(texts) / elapsed:>9.0f} "
+                f"{stats['requests']:>9} {stats['retries']:>8} "
+                f"{stats['rate_limited']:>6}"
+            )
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--chunks", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 4, 8, 16]
+    )
+    parser.add_argument("--request-batch-size", type=int, default=256)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--tokens-per-minute", type=int, default=None)
+    parser.add_argument("--server-tokens-per-minute", type=int, default=0)
+    parser.add_argument("--rate-limit-probability", type=float, default=0.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Local mock of the OpenAI embeddings endpoint for testing without an API key.
+
+Serves `POST /v1/embeddings` with deterministic pseudo-random embeddings
+(derived from the SHA-256 of each input), simulates request latency, and
+enforces a tokens-per-minute limit by answering 429 with a Retry-After header,
+like the real API. Inputs longer than 8192 tokens get the API's 400 error.
+
+Usage:
+    uv run python scripts/mock_openai_embeddings_server.py --port 8765 --tokens-per-minute 200000
+
+    OPENAI_API_KEY=test uv run prepare-embeddings docs -o generated-embeddings/mock.duckdb \\
+        --provider openai --api-base-url http://localhost:8765/v1
+"""
+
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+from collections import deque
+
+import numpy as np
+from aiohttp import web
+
+MAX_INPUT_TOKENS = 8192
+
+
+def approx_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for English text)."""
+    return max(1, len(text) // 4)
+
+
+def fake_embedding(text: str, dim: int) -> list:
+    """Deterministic unit-length embedding for `text`."""
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim, dtype=np.float32)
+    return (vector / np.linalg.norm(vector)).round(6).tolist()
+
+
+def create_app(
+    dim: int = 1536,
+    tokens_per_minute: int = 0,
+    latency: float = 0.05,
+    rate_limit_probability: float = 0.0,
+) -> web.Application:
+    """
+    Create the mock server application.
+
+    Args:
+        dim: Embedding dimension when the request has no `dimensions`
+        tokens_per_minute: Tokens accepted per rolling minute (0 = unlimited)
+        latency: Seconds each request takes
+        rate_limit_probability: Probability of a spurious 429 per request
+
+    Returns:
+        aiohttp application; request counters are in `app["stats"]`
+    """
+    window: deque = deque()
+    stats = {"requests": 0, "rate_limited": 0, "inputs": 0, "max_in_flight": 0}
+    in_flight = 0
+
+    def rate_limited(retry_after: float) -> web.Response:
+        stats["rate_limited"] += 1
+        return web.json_response(
+            {"error": {"message": "Rate limit reached", "type": "requests"}},
+            status=429,
+            headers={"retry-after-ms": str(int(retry_after * 1000))},
+        )
+
+    async def embeddings(request: web.Request) -> web.Response:
+        nonlocal in_flight
+        body = await request.json()
+        inputs = body["input"]
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        stats["requests"] += 1
+
+        tokens = [approx_tokens(text) for text in inputs]
+        if max(tokens) > MAX_INPUT_TOKENS:
+            return web.json_response(
+                {
+                    "error": {
+                        "message": (
+                            f"This model's maximum context length is "
+                            f"{MAX_INPUT_TOKENS} tokens, however you requested "
+                            f"{max(tokens)} tokens"
+                        ),
+                        "type": "invalid_request_error",
+                    }
+                },
+                status=400,
+            )
+
+        now = time.monotonic()
+        while window and now - window[0][0] >= 60.0:
+            window.popleft()
+        used = sum(n for _, n in window)
+        if tokens_per_minute and window and used + sum(tokens) > tokens_per_minute:
+            return rate_limited(60.0 - (now - window[0][0]))
+        if random.random() < rate_limit_probability:
+            return rate_limited(0.5)
+        window.append((now, sum(tokens)))
+
+        in_flight += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], in_flight)
+        try:
+            await asyncio.sleep(latency)
+        finally:
+            in_flight -= 1
+
+        stats["inputs"] += len(inputs)
+        size = body.get("dimensions") or dim
+        return web.json_response(
+            {
+                "object": "list",
+                "model": body.get("model"),
+                "data": [
+                    {
+                        "object": "embedding",
+                        "index": i,
+                        "embedding": fake_embedding(text, size),
+                    }
+                    for i, text in enumerate(inputs)
+                ],
+                "usage": {"prompt_tokens": sum(tokens), "total_tokens": sum(tokens)},
+            }
+        )
+
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app["stats"] = stats
+    app.router.add_post("/v1/embeddings", embeddings)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument(
+        "--tokens-per-minute",
+        type=int,
+        default=0,
+        help="Answer 429 above this many tokens per minute (default: unlimited)",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="Seconds per request"
+    )
+    parser.add_argument(
+        "--rate-limit-probability",
+        type=float,
+        default=0.0,
+        help="Probability of a spurious 429 per request",
+    )
+    args = parser.parse_args()
+
+    web.run_app(
+        create_app(
+            dim=args.dim,
+            tokens_per_minute=args.tokens_per_minute,
+            latency=args.latency,
+            rate_limit_probability=args.rate_limit_probability,
+        ),
+        host=args.host,
+        port=args.port,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,9 @@ __version__ = "0.1.0"
 
 from .prepare import prepare_embeddings
 from .query import (
+    HybridRetriever,
     hybrid_query,
+    hybrid_query_batch,
     reciprocal_rank_fusion,
     get_source_documents,
     get_embedding_metadata,
@@ -37,7 +39,9 @@ from .generate_umap import (
 
 __all__ = [
     "prepare_embeddings",
+    "HybridRetriever",
     "hybrid_query",
+    "hybrid_query_batch",
     "reciprocal_rank_fusion",
     "get_source_documents",
     "get_embedding_metadata",
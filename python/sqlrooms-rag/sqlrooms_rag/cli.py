@@ -6,7 +6,9 @@ Command-line interface for SQLRooms RAG embedding tools.
 import argparse
 import sys
 
-from .prepare import prepare_embeddings
+from .prepare import default_embedding_cache_path, prepare_embeddings
+from .prepare.database import HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH, HNSW_M
+from .prepare.pipeline import BATCH_SIZE
 
 
 def main():
@@ -22,6 +24,12 @@ Examples:
   # Use custom chunk size
   %(prog)s docs -o generated-embeddings/kb.duckdb --chunk-size 256
   
+  # Parse and chunk files in 8 processes while embedding
+  %(prog)s docs -o generated-embeddings/kb.duckdb --workers 8
+  
+  # Re-embed only what changed since the last run
+  %(prog)s docs -o generated-embeddings/kb.duckdb --incremental
+  
   # Increase header weight for better header-based retrieval
   %(prog)s docs -o generated-embeddings/kb.duckdb --header-weight 5
   
@@ -34,6 +42,12 @@ Examples:
   # Use OpenAI with environment variable OPENAI_API_KEY
   export OPENAI_API_KEY=your_key_here
   %(prog)s docs -o generated-embeddings/kb.duckdb --provider openai
+  
+  # Stay under an OpenAI tokens-per-minute limit with 8 concurrent requests
+  %(prog)s docs -o generated-embeddings/kb.duckdb --provider openai --max-concurrency 8 --tokens-per-minute 1000000
+
+  # Build an HNSW vector index for large corpora (approximate vector search)
+  %(prog)s docs -o generated-embeddings/kb.duckdb --hnsw-index --hnsw-m 32
         """,
     )
 
@@ -86,6 +100,58 @@ Examples:
         help="API key for external providers (e.g., OpenAI). Can also use OPENAI_API_KEY environment variable.",
     )
 
+    parser.add_argument(
+        "--api-base-url",
+        default=None,
+        help="OpenAI-compatible API base URL, e.g. a local mock server. "
+        "Can also use OPENAI_BASE_URL environment variable.",
+    )
+
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=4,
+        help="Maximum concurrent OpenAI embedding requests (default: %(default)s)",
+    )
+
+    parser.add_argument(
+        "--tokens-per-minute",
+        type=int,
+        default=None,
+        help="Tokens-per-minute budget for OpenAI embedding requests; requests are "
+        "paced to stay under it (default: no budget, rely on 429 retries)",
+    )
+
+    parser.add_argument(
+        "--hnsw-index",
+        action="store_true",
+        help="Build a persistent HNSW vector index (DuckDB vss extension); "
+        "retrieval uses it instead of scanning every chunk",
+    )
+
+    parser.add_argument(
+        "--hnsw-m",
+        type=int,
+        default=HNSW_M,
+        help=f"Maximum neighbors per node in the HNSW graph (default: {HNSW_M})",
+    )
+
+    parser.add_argument(
+        "--hnsw-ef-construction",
+        type=int,
+        default=HNSW_EF_CONSTRUCTION,
+        help="HNSW candidate list size while building "
+        f"(default: {HNSW_EF_CONSTRUCTION})",
+    )
+
+    parser.add_argument(
+        "--hnsw-ef-search",
+        type=int,
+        default=HNSW_EF_SEARCH,
+        help="Default HNSW candidate list size while searching; higher means "
+        f"better recall, slower queries (default: {HNSW_EF_SEARCH})",
+    )
+
     parser.add_argument(
         "-q",
         "--quiet",
@@ -118,6 +184,42 @@ Examples:
         help="Overwrite existing database if it exists",
     )
 
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Update an existing database in place: only new or changed files are "
+        "re-chunked and only chunks with new text are embedded",
+    )
+
+    parser.add_argument(
+        "--embedding-cache",
+        default=str(default_embedding_cache_path()),
+        help="Embedding cache file reused across runs, so only novel chunk text is "
+        "embedded (default: %(default)s)",
+    )
+
+    parser.add_argument(
+        "--no-embedding-cache",
+        action="store_true",
+        help="Do not read or write the embedding cache",
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes used to load and chunk files; with more than 1, chunks are "
+        "embedded while parsing continues (default: 1)",
+    )
+
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BATCH_SIZE,
+        help="Chunks embedded and written to the database per batch; finished "
+        "batches survive a crash and rerunning resumes the build (default: %(default)s)",
+    )
+
     args = parser.parse_args()
 
     try:
@@ -134,6 +236,17 @@ Examples:
             include_headers_in_chunks=not args.no_header_weighting,
             header_weight=args.header_weight,
             overwrite=args.overwrite,
+            incremental=args.incremental,
+            embedding_cache=None if args.no_embedding_cache else args.embedding_cache,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            api_base_url=args.api_base_url,
+            max_concurrency=args.max_concurrency,
+            tokens_per_minute=args.tokens_per_minute,
+            hnsw_index=args.hnsw_index,
+            hnsw_m=args.hnsw_m,
+            hnsw_ef_construction=args.hnsw_ef_construction,
+            hnsw_ef_search=args.hnsw_ef_search,
         )
     except KeyboardInterrupt:
         print("\n\nInterrupted by user.", file=sys.stderr)
@@ -5,21 +5,33 @@ This module provides functionality for:
 - Loading and parsing markdown documents
 - Creating text chunks using markdown-aware or size-based strategies
 - Generating embeddings using HuggingFace or OpenAI models
-- Storing embeddings in DuckDB for efficient retrieval
-- Creating full-text search indexes for hybrid retrieval
+- Caching embeddings on disk across runs
+- Streaming embeddings into DuckDB in resumable batches
+- Creating full-text search and HNSW vector indexes for retrieval
 - Storing metadata for reproducibility and validation
 """
 
 from .core import prepare_embeddings
-from .chunking import count_tokens, validate_and_split_chunks
+from .chunking import chunk_documents, count_tokens, validate_and_split_chunks
 from .embeddings import get_embedding_model
+from .tokenization import Tokenizer, get_tokenizer
+from .openai_embeddings import ConcurrentOpenAIEmbedding, OpenAIEmbeddingClient
+from .embedding_cache import (
+    CachedEmbedding,
+    EmbeddingCache,
+    default_embedding_cache_path,
+)
 from .database import (
     create_source_documents_table,
     add_document_references,
     create_fts_index,
+    create_hnsw_index,
 )
+from .parallel import iter_chunked_files
+from .pipeline import embed_and_write
 from .metadata import (
     calculate_chunk_stats,
+    calculate_db_stats,
     create_metadata,
     store_metadata_in_db,
     save_metadata_yaml,
@@ -29,16 +41,28 @@ __all__ = [
     # Main function
     "prepare_embeddings",
     # Chunking utilities
+    "chunk_documents",
     "count_tokens",
     "validate_and_split_chunks",
+    "iter_chunked_files",
+    "Tokenizer",
+    "get_tokenizer",
     # Embedding utilities
     "get_embedding_model",
+    "CachedEmbedding",
+    "EmbeddingCache",
+    "default_embedding_cache_path",
+    "ConcurrentOpenAIEmbedding",
+    "OpenAIEmbeddingClient",
     # Database utilities
     "create_source_documents_table",
     "add_document_references",
     "create_fts_index",
+    "create_hnsw_index",
+    "embed_and_write",
     # Metadata utilities
     "calculate_chunk_stats",
+    "calculate_db_stats",
     "create_metadata",
     "store_metadata_in_db",
     "save_metadata_yaml",
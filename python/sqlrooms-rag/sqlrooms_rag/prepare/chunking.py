@@ -1,44 +1,64 @@
 """
-Chunk validation and splitting for token limit compliance.
+Document chunking, and chunk validation and splitting for token limit compliance.
 """
 
 import uuid
 from copy import deepcopy
+from typing import List, Optional
 
+from llama_index.core.node_parser import MarkdownNodeParser, SentenceSplitter
 
-def count_tokens(text: str) -> int:
-    """
-    Estimate token count for text.
+from .tokenization import Tokenizer, get_tokenizer, split_text
+
+# OpenAI embedding models accept at most 8191 tokens per input
+OPENAI_MAX_INPUT_TOKENS = 8191
+# Chunk limit when tokens are counted with the model's tokenizer (small margin)
+# or estimated (large margin for estimation errors)
+OPENAI_MAX_CHUNK_TOKENS = 8000
+OPENAI_MAX_CHUNK_TOKENS_ESTIMATED = 5000
+
+_ESTIMATE = Tokenizer()
 
-    Uses a conservative approximation: ~3 characters per token.
-    This overestimates slightly to ensure we stay well under API limits.
 
-    For technical text with code, markdown, and special characters,
-    the actual token count can be higher than the 4 char/token rule.
+def count_tokens(text: str, tokenizer: Optional[Tokenizer] = None) -> int:
+    """
+    Count tokens in text.
+
+    Without a tokenizer this is a conservative approximation of ~3 characters
+    per token, which overestimates slightly to stay under API limits. For
+    technical text with code, markdown, and special characters, the actual
+    token count can be higher than the 4 char/token rule. Use `Tokenizer.count`
+    to count many texts at once.
 
     Args:
         text: Text to count tokens for
+        tokenizer: Tokenizer of the embedding model (see `get_tokenizer`)
 
     Returns:
-        Estimated token count (conservative/higher estimate)
+        Token count (estimated if no tokenizer is given)
     """
-    # Use 3 chars per token for conservative estimate
-    # Technical text often has more tokens per character
-    return len(text) // 3
+    return (tokenizer or _ESTIMATE).count([text])[0]
+
+
+def _node_text(node) -> str:
+    return node.text if hasattr(node, "text") else str(node)
 
 
 def validate_and_split_chunks(
-    nodes: list, max_tokens: int = 5000, verbose: bool = True
+    nodes: list,
+    max_tokens: int = 5000,
+    verbose: bool = True,
+    tokenizer: Optional[Tokenizer] = None,
+    reserved_tokens: Optional[List[int]] = None,
 ) -> list:
     """
     Validate chunk sizes and split any that exceed token limits.
 
     This is important for external APIs (like OpenAI) that have strict
-    token limits per request (8192 tokens). We use 5000 for safety:
-    - Conservative token estimation (3 chars/token, not perfect)
-    - Header weighting already applied to text
+    token limits per input (8191 tokens). With the model's tokenizer chunks
+    can be packed close to the limit; with the 3 chars/token estimate use a
+    large margin (the default of 5000):
     - Technical content (code, tables) has higher token density
-    - Better safe than sorry - splitting works fine
     - Large margin accounts for estimation errors
 
     Why chunks can be large:
@@ -46,106 +66,68 @@ def validate_and_split_chunks(
     - Some documents have huge sections (tables, code)
     - Header weighting multiplies the text (2x-3x)
 
+    Oversized chunks are split into sentence-aligned pieces packed up to the
+    limit; sentences longer than the limit are cut at token boundaries.
+
     Args:
         nodes: List of llama-index Node objects
-        max_tokens: Maximum tokens per chunk (default: 5000, well under OpenAI's 8192 limit)
+        max_tokens: Maximum tokens per chunk
         verbose: Whether to print progress messages
+        tokenizer: Tokenizer to count with (default: 3 chars/token estimate)
+        reserved_tokens: Tokens that will be added to each node later (e.g. a
+            header prefix), subtracted from its limit
 
     Returns:
         List of validated nodes (may include split chunks)
     """
+    tokenizer = tokenizer or _ESTIMATE
+    if reserved_tokens is None:
+        reserved_tokens = [0] * len(nodes)
+
     validated_nodes = []
+    validated_limits = []
     oversized_count = 0
     split_count = 0
 
-    for node in nodes:
-        text = node.text if hasattr(node, "text") else str(node)
-        token_count = count_tokens(text)
-
-        if token_count <= max_tokens:
+    token_counts = tokenizer.count([_node_text(node) for node in nodes])
+    for node, tokens, reserved in zip(
+        nodes, token_counts, reserved_tokens, strict=True
+    ):
+        limit = max(1, max_tokens - reserved)
+        if tokens <= limit:
             # Chunk is fine, keep as-is
             validated_nodes.append(node)
-        else:
-            # Chunk is too large, need to split
-            oversized_count += 1
-
-            # Split by sentences to try to maintain coherence
-            sentences = text.split(". ")
-            current_chunk = []
-            current_tokens = 0
-
-            for sentence in sentences:
-                sentence_tokens = count_tokens(sentence)
-
-                # If single sentence is too large, split it by character count
-                if sentence_tokens > max_tokens:
-                    # Split this sentence into smaller pieces
-                    # Use very conservative char count (2 chars/token for safety)
-                    chunk_size_chars = max_tokens * 2
-                    for i in range(0, len(sentence), chunk_size_chars):
-                        piece = sentence[i : i + chunk_size_chars]
-
-                        # Double-check the piece isn't still too large
-                        if count_tokens(piece) > max_tokens:
-                            # If still too large, split even smaller (1 char/token!)
-                            smaller_chunk_size = max_tokens
-                            for j in range(0, len(piece), smaller_chunk_size):
-                                tiny_piece = piece[j : j + smaller_chunk_size]
-                                new_node = deepcopy(node)
-                                new_node.text = tiny_piece
-                                # Generate new unique ID for split chunk
-                                new_node.node_id = str(uuid.uuid4())
-                                validated_nodes.append(new_node)
-                                split_count += 1
-                        else:
-                            # Create new node with same metadata
-                            new_node = deepcopy(node)
-                            new_node.text = piece
-                            # Generate new unique ID for split chunk
-                            new_node.node_id = str(uuid.uuid4())
-                            validated_nodes.append(new_node)
-                            split_count += 1
-                    continue
-
-                # Check if adding this sentence would exceed limit
-                if current_tokens + sentence_tokens > max_tokens and current_chunk:
-                    # Save current chunk
-                    new_node = deepcopy(node)
-                    new_node.text = ". ".join(current_chunk) + "."
-                    # Generate new unique ID for split chunk
-                    new_node.node_id = str(uuid.uuid4())
-                    validated_nodes.append(new_node)
-                    split_count += 1
-
-                    # Start new chunk
-                    current_chunk = [sentence]
-                    current_tokens = sentence_tokens
-                else:
-                    # Add sentence to current chunk
-                    current_chunk.append(sentence)
-                    current_tokens += sentence_tokens
-
-            # Don't forget the last chunk
-            if current_chunk:
-                new_node = deepcopy(node)
-                new_node.text = ". ".join(current_chunk)
-                if not current_chunk[-1].endswith("."):
-                    new_node.text += "."
-                # Generate new unique ID for split chunk
-                new_node.node_id = str(uuid.uuid4())
-                validated_nodes.append(new_node)
-                split_count += 1
+            validated_limits.append(limit)
+            continue
+
+        # Chunk is too large: split into pieces with the same metadata
+        oversized_count += 1
+        for piece in split_text(_node_text(node), limit, tokenizer):
+            new_node = deepcopy(node)
+            new_node.text = piece
+            # Generate new unique ID for split chunk
+            new_node.node_id = str(uuid.uuid4())
+            validated_nodes.append(new_node)
+            validated_limits.append(limit)
+            split_count += 1
 
     if verbose and oversized_count > 0:
         print(f"⚠ Found {oversized_count} oversized chunks (>{max_tokens} tokens)")
         print(f"✓ Split into {split_count} smaller chunks")
         print(f"✓ Total chunks: {len(validated_nodes)} (was {len(nodes)})")
 
-    # Final safety check: verify no chunks exceed limit
+    # Final safety check: verify no chunks exceed limit (counted once, in a batch)
+    final_counts = (
+        tokenizer.count([_node_text(node) for node in validated_nodes])
+        if oversized_count
+        else token_counts
+    )
     final_oversized = [
-        (i, node, count_tokens(node.text if hasattr(node, "text") else str(node)))
-        for i, node in enumerate(validated_nodes)
-        if count_tokens(node.text if hasattr(node, "text") else str(node)) > max_tokens
+        (i, node, tokens)
+        for i, (node, tokens, limit) in enumerate(
+            zip(validated_nodes, final_counts, validated_limits, strict=True)
+        )
+        if tokens > limit
     ]
 
     if final_oversized:
@@ -154,7 +136,7 @@ def validate_and_split_chunks(
                 f"⚠ WARNING: {len(final_oversized)} chunks still exceed {max_tokens} tokens after splitting!"
             )
             for i, node, tokens in final_oversized[:3]:  # Show first 3
-                text_preview = (node.text if hasattr(node, "text") else str(node))[:100]
+                text_preview = _node_text(node)[:100]
                 print(f"  Chunk {i}: {tokens} tokens - '{text_preview}...'")
             if len(final_oversized) > 3:
                 print(f"  ... and {len(final_oversized) - 3} more")
@@ -164,3 +146,145 @@ def validate_and_split_chunks(
             print("  3. Preprocessing very large markdown sections")
 
     return validated_nodes
+
+
+def _header_text(node) -> str:
+    """Header path of a markdown node, if its metadata has one."""
+    if hasattr(node, "metadata") and node.metadata:
+        # Common metadata fields that might contain headers
+        if "header_path" in node.metadata:
+            return node.metadata["header_path"]
+        if "section_header" in node.metadata:
+            return node.metadata["section_header"]
+    return ""
+
+
+def _header_prefix(header_text: str, weight: int) -> str:
+    """Header repeated `weight` times, separated by newlines."""
+    return "\n".join([header_text] * weight) + "\n\n"
+
+
+def chunk_documents(
+    documents: list,
+    chunk_size: int,
+    embedding_provider: str,
+    use_markdown_chunking: bool,
+    include_headers_in_chunks: bool,
+    header_weight: int,
+    verbose: bool,
+    embed_model_name: Optional[str] = None,
+) -> list:
+    """
+    Split documents into chunk nodes.
+
+    Markdown-aware chunking splits by headers, validates chunk sizes for
+    OpenAI and optionally prepends the header path to each chunk; size-based
+    chunking uses a SentenceSplitter with `chunk_size`. Tokens are counted
+    with the embedding model's tokenizer (see `get_tokenizer`).
+
+    Args:
+        documents: List of llama-index Document objects
+        chunk_size: Size of text chunks in tokens (size-based chunking)
+        embedding_provider: "huggingface" or "openai"
+        use_markdown_chunking: Use markdown-aware chunking by headers
+        include_headers_in_chunks: Prepend headers to chunk text
+        header_weight: Number of times to repeat headers in chunks (min: 1)
+        verbose: Whether to print progress messages
+        embed_model_name: Embedding model whose tokenizer measures chunks
+            (provider default if None)
+
+    Returns:
+        List of chunk nodes
+    """
+    tokenizer = get_tokenizer(embedding_provider, embed_model_name)
+
+    # Parse documents into nodes using markdown-aware chunking
+    if use_markdown_chunking:
+        if verbose:
+            print("Using markdown-aware chunking (splits by headers and sections)...")
+
+        # Create markdown parser that respects document structure
+        # include_metadata=True stores headers in metadata
+        # include_prev_next_rel=True adds context about surrounding chunks
+        markdown_parser = MarkdownNodeParser(
+            include_metadata=True,
+            include_prev_next_rel=True,
+        )
+        nodes = markdown_parser.get_nodes_from_documents(documents)
+
+        # Ensure header_weight is at least 1
+        weight = max(1, header_weight)
+
+        # For external APIs: validate and split oversized chunks
+        if embedding_provider == "openai":
+            max_tokens = (
+                OPENAI_MAX_CHUNK_TOKENS
+                if tokenizer.exact
+                else OPENAI_MAX_CHUNK_TOKENS_ESTIMATED
+            )
+            if verbose:
+                print(
+                    f"Validating chunk sizes for OpenAI (API limit: "
+                    f"{OPENAI_MAX_INPUT_TOKENS} tokens, chunk limit: {max_tokens}, "
+                    f"tokenizer: {tokenizer.name})..."
+                )
+
+            # Leave room for the header prefix added below
+            reserved_tokens = [0] * len(nodes)
+            if include_headers_in_chunks:
+                prefixes = {
+                    i: _header_prefix(_header_text(node), weight)
+                    for i, node in enumerate(nodes)
+                    if _header_text(node)
+                    and not node.text.startswith(_header_text(node))
+                }
+                unique = sorted(set(prefixes.values()))
+                prefix_tokens = dict(zip(unique, tokenizer.count(unique), strict=True))
+                for i, prefix in prefixes.items():
+                    reserved_tokens[i] = prefix_tokens[prefix]
+
+            nodes = validate_and_split_chunks(
+                nodes,
+                max_tokens=max_tokens,
+                verbose=verbose,
+                tokenizer=tokenizer,
+                reserved_tokens=reserved_tokens,
+            )
+
+        # Prepend header hierarchy to each chunk to give headers more weight
+        if include_headers_in_chunks:
+            # Warn about high header weights with external APIs
+            if embedding_provider == "openai" and weight > 2 and verbose:
+                print(f"Warning: header_weight={weight} may create large chunks")
+                print(
+                    "         (chunks are split to leave room for the repeated headers)"
+                )
+
+            headers_added = 0
+
+            for node in nodes:
+                header_text = _header_text(node)
+
+                # Repeat header multiple times to increase its weight in embeddings
+                if header_text and not node.text.startswith(header_text):
+                    node.text = _header_prefix(header_text, weight) + node.text
+                    headers_added += 1
+
+            if verbose and headers_added > 0:
+                weight_msg = f" (weight: {weight}x)" if weight > 1 else ""
+                print(
+                    f"Enhanced {headers_added} chunks with header context{weight_msg} for better retrieval"
+                )
+
+        if verbose:
+            print(f"Created {len(nodes)} chunks from markdown sections")
+    else:
+        if verbose:
+            print(f"Using default size-based chunking (tokenizer: {tokenizer.name})...")
+        # Measure chunk_size in the embedding model's tokens when available
+        nodes = SentenceSplitter(
+            chunk_size=chunk_size,
+            tokenizer=tokenizer.encode if tokenizer.exact else None,
+        ).get_nodes_from_documents(documents)
+
+    return nodes
@@ -5,23 +5,202 @@ Core orchestration logic for preparing embeddings from markdown files.
 from pathlib import Path
 from typing import Optional, Literal
 
-from llama_index.core import (
-    StorageContext,
-    VectorStoreIndex,
-    SimpleDirectoryReader,
-    Settings,
-)
-from llama_index.core.node_parser import MarkdownNodeParser
+from llama_index.core import VectorStoreIndex, Settings
 from llama_index.vector_stores.duckdb import DuckDBVectorStore
 
-from .chunking import count_tokens, validate_and_split_chunks
+from .chunking import count_tokens
+from .embedding_cache import CachedEmbedding
 from .embeddings import get_embedding_model
 from .database import (
-    create_source_documents_table,
-    add_document_references,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH,
+    HNSW_M,
+    compact_hnsw_index,
     create_fts_index,
+    create_hnsw_index,
+)
+from .incremental import (
+    BUILD_STATE_TABLE,
+    finish_build,
+    has_build_state,
+    start_build,
+    update_embeddings_incrementally,
+)
+from .parallel import visible_files
+from .pipeline import BATCH_SIZE
+from .metadata import (
+    calculate_db_stats,
+    create_metadata,
+    flatten_metadata,
+    read_vector_index_metadata,
+    store_metadata_in_db,
+    save_metadata_yaml,
 )
-from .metadata import create_metadata, store_metadata_in_db, save_metadata_yaml
+
+
+def _resolve_model_name(
+    embedding_provider: str, embed_model_name: Optional[str]
+) -> str:
+    if embed_model_name:
+        return embed_model_name
+    if embedding_provider == "huggingface":
+        return "BAAI/bge-small-en-v1.5"
+    return "text-embedding-3-small"
+
+
+def _close_embedding_cache(embed_model, verbose: bool) -> None:
+    """Report cache hits and release the cache file (it reopens on next use)."""
+    if not isinstance(embed_model, CachedEmbedding):
+        return
+    if verbose:
+        stats = embed_model.cache_stats
+        print(
+            f"Embedding cache: {stats['hits']} chunk(s) reused, "
+            f"{stats['misses']} embedded"
+        )
+    embed_model.close()
+
+
+def _load_index(full_db_path: Path, embed_model, embed_dim: int) -> VectorStoreIndex:
+    """Open the finished database as a llama-index vector store index."""
+    vector_store = DuckDBVectorStore.from_local(str(full_db_path), embed_dim=embed_dim)
+    return VectorStoreIndex.from_vector_store(vector_store, embed_model=embed_model)
+
+
+def _finalize_database(
+    full_db_path: Path,
+    metadata_kwargs: dict,
+    verbose: bool,
+    hnsw_options: Optional[dict] = None,
+) -> dict:
+    """Rebuild the search indexes and store metadata computed from the database."""
+    # FTS indexes are not maintained by DuckDB on writes; rebuild it
+    create_fts_index(db_path=full_db_path, verbose=verbose)
+
+    # An existing HNSW index was updated with the rows; requested settings
+    # (re)build it
+    if hnsw_options is not None:
+        vector_index = create_hnsw_index(
+            db_path=full_db_path, verbose=verbose, **hnsw_options
+        )
+    elif compact_hnsw_index(db_path=full_db_path, verbose=verbose):
+        vector_index = read_vector_index_metadata(full_db_path)
+    else:
+        vector_index = None
+
+    # Statistics are computed in SQL so chunk texts are never loaded
+    source_stats, chunk_stats = calculate_db_stats(full_db_path)
+    metadata = create_metadata(
+        documents=[],
+        nodes=[],
+        source_stats=source_stats,
+        chunk_stats=chunk_stats,
+        vector_index=vector_index,
+        **metadata_kwargs,
+    )
+    store_metadata_in_db(db_path=full_db_path, metadata=metadata, verbose=verbose)
+    save_metadata_yaml(db_path=full_db_path, metadata=metadata, verbose=verbose)
+    return metadata
+
+
+def _report_embedding_error(error: Exception, nodes: list, full_db_path: Path) -> None:
+    """Explain token limit errors and save the oversized chunks of the batch."""
+    error_msg = str(error)
+
+    # Check if this is a token limit error
+    if "maximum context length" in error_msg.lower() and "tokens" in error_msg.lower():
+        print("\n" + "=" * 80)
+        print("ERROR: OpenAI Token Limit Exceeded")
+        print("=" * 80)
+        print(f"\n{error_msg}\n")
+
+        # Try to find the problematic chunk(s)
+        print("Analyzing chunks to find the problematic one(s)...\n")
+
+        if nodes:
+            oversized = []
+            for i, node in enumerate(nodes):
+                text = node.text if hasattr(node, "text") else str(node)
+                tokens = count_tokens(text)
+                # Check against a conservative threshold
+                if tokens > 5000:
+                    oversized.append((i, node, text, tokens))
+
+            if oversized:
+                print(f"Found {len(oversized)} chunk(s) that may be too large:\n")
+                for idx, (i, node, text, tokens) in enumerate(
+                    oversized[:5], 1
+                ):  # Show first 5
+                    print(f"\nProblematic Chunk #{idx}:")
+                    print(f"  Index: {i}")
+                    print(f"  Estimated tokens: {tokens}")
+                    print(f"  Character length: {len(text)}")
+
+                    # Show metadata
+                    if hasattr(node, "metadata") and node.metadata:
+                        print(f"  Metadata: {node.metadata}")
+
+                    # Show text preview
+                    print("  Text preview (first 500 chars):")
+                    print(f"  {'-' * 76}")
+                    print(f"  {text[:500]}")
+                    print(f"  {'-' * 76}")
+
+                    # Show text end
+                    if len(text) > 500:
+                        print(f"  ... ({len(text) - 1000} chars omitted) ...")
+                        print("  Text preview (last 500 chars):")
+                        print(f"  {'-' * 76}")
+                        print(f"  {text[-500:]}")
+                        print(f"  {'-' * 76}")
+
+                    # Save full chunk to file for inspection
+                    problem_file = full_db_path.parent / f"problem_chunk_{i}.txt"
+                    try:
+                        with open(problem_file, "w") as f:
+                            f.write(f"Chunk Index: {i}\n")
+                            f.write(f"Estimated Tokens: {tokens}\n")
+                            f.write(f"Character Length: {len(text)}\n")
+                            f.write(
+                                f"Metadata: {node.metadata if hasattr(node, 'metadata') else 'None'}\n"
+                            )
+                            f.write(f"\n{'=' * 80}\n")
+                            f.write("FULL TEXT:\n")
+                            f.write(f"{'=' * 80}\n\n")
+                            f.write(text)
+                        print(f"\n  ✓ Full chunk saved to: {problem_file}")
+                    except Exception as save_error:
+                        print(f"\n  ✗ Could not save chunk: {save_error}")
+
+                if len(oversized) > 5:
+                    print(f"\n... and {len(oversized) - 5} more oversized chunks")
+
+                print("\n" + "=" * 80)
+                print("SOLUTIONS:")
+                print("=" * 80)
+                print("\nThe splitting logic couldn't break these chunks down enough.")
+                print("This usually happens with:")
+                print("  - Very long tables")
+                print("  - Large code blocks")
+                print("  - Continuous text without sentence breaks")
+                print("\nTry these solutions:")
+                print("\n1. Use even smaller chunk size:")
+                print("   --chunk-size 64")
+                print("\n2. Disable markdown chunking (use size-based):")
+                print("   --chunk-size 256 --no-markdown-chunking")
+                print("\n3. Preprocess the source markdown files:")
+                print("   - Break up very long tables")
+                print("   - Split large code blocks")
+                print("   - Add section breaks in continuous text")
+                print("\n4. Manual inspection:")
+                print("   - Check the saved problem_chunk_*.txt files")
+                print("   - Identify the source document")
+                print("   - Edit or exclude that document")
+                print()
+            else:
+                print(
+                    "Could not identify oversized chunks (they may have been missed by validation)"
+                )
 
 
 def prepare_embeddings(
@@ -37,6 +216,17 @@ def prepare_embeddings(
     include_headers_in_chunks: bool = True,
     header_weight: int = 3,
     overwrite: bool = False,
+    incremental: bool = False,
+    embedding_cache: Optional[str] = None,
+    workers: int = 1,
+    batch_size: int = BATCH_SIZE,
+    api_base_url: Optional[str] = None,
+    max_concurrency: int = 4,
+    tokens_per_minute: Optional[int] = None,
+    hnsw_index: bool = False,
+    hnsw_m: int = HNSW_M,
+    hnsw_ef_construction: int = HNSW_EF_CONSTRUCTION,
+    hnsw_ef_search: int = HNSW_EF_SEARCH,
 ):
     """
     Prepare embeddings from markdown files and store in DuckDB.
@@ -60,16 +250,47 @@ def prepare_embeddings(
         use_markdown_chunking: Use markdown-aware chunking by headers (default: True)
         include_headers_in_chunks: Prepend headers to chunk text for higher weight (default: True)
         header_weight: Number of times to repeat headers in chunks (default: 3, min: 1)
-        overwrite: If True, overwrite existing database. If False, exit with error if database exists. (default: False)
+        overwrite: If True, overwrite existing database. If False, exit with error if database exists,
+            unless it is an interrupted build, which is then resumed. (default: False)
+        incremental: If True and the database exists, update it in place: only new or
+            changed files are re-chunked, only chunks with new text are embedded, and
+            chunks of deleted files are removed. Requires the same model and chunking
+            settings as the existing database. (default: False)
+        embedding_cache: Path of a persistent embedding cache (DuckDB file) shared
+            across runs. Chunks whose text was embedded before with the same model
+            and dimension are served from it instead of being re-embedded.
+            (default: None, no cache)
+        workers: Number of processes that load and chunk files. With more than one,
+            files are parsed in a process pool while earlier chunks are embedded,
+            so parsing overlaps with embedding. (default: 1)
+        batch_size: Number of chunks embedded and appended to the database per
+            transaction. Chunks are streamed to the database batch by batch, so
+            memory use does not grow with the corpus, and each committed file is
+            a checkpoint: rerunning after a crash resumes the build. (default: 2048)
+        api_base_url: OpenAI-compatible API base URL, e.g. a local mock server
+            (default: OPENAI_BASE_URL environment variable, else the OpenAI API)
+        max_concurrency: Maximum concurrent OpenAI embedding requests (default: 4)
+        tokens_per_minute: Tokens-per-minute budget for OpenAI embedding requests.
+            Requests are paced to stay under it; 429 responses are retried with
+            backoff and smaller batches either way. (default: None, no budget)
+        hnsw_index: If True, build a persistent HNSW index (DuckDB vss extension)
+            on the embeddings, so vector search no longer scans every chunk.
+            Retrieval uses it automatically; results become approximate. An
+            index built earlier is kept up to date by incremental updates.
+            (default: False, exact search)
+        hnsw_m: Maximum neighbors per node in the HNSW graph (default: 16)
+        hnsw_ef_construction: HNSW candidate list size while building (default: 128)
+        hnsw_ef_search: Default HNSW candidate list size while searching; higher
+            means better recall and slower queries (default: 64)
 
     Returns:
         VectorStoreIndex: The created knowledge base index
 
     Raises:
         FileNotFoundError: If input directory doesn't exist
-        FileExistsError: If database exists and overwrite=False
-        ValueError: If no markdown files found in input directory or API key missing
-        ImportError: If required package for provider is not installed
+        FileExistsError: If database exists and neither overwrite nor incremental is set
+        ValueError: If no markdown files found in input directory or API key missing,
+            or if an incremental update uses different settings than the database
     """
     input_path = Path(input_dir)
 
@@ -95,11 +316,18 @@ def prepare_embeddings(
     else:
         full_db_path = Path(str(output_path) + ".duckdb")
 
-    if full_db_path.exists():
+    if overwrite and incremental:
+        raise ValueError("overwrite and incremental cannot be used together.")
+
+    # A database left behind by an interrupted build is picked up where it stopped
+    resume = full_db_path.exists() and not overwrite and has_build_state(full_db_path)
+    update_existing = incremental and full_db_path.exists() and not resume
+    if full_db_path.exists() and not (resume or update_existing):
         if not overwrite:
             raise FileExistsError(
                 f"Database already exists: {full_db_path}\n"
-                f"Use --overwrite flag to replace it, or choose a different output path."
+                f"Use --overwrite flag to replace it, --incremental to update it, "
+                f"or choose a different output path."
             )
         if verbose:
             print(f"⚠ Will overwrite existing database: {full_db_path}")
@@ -111,20 +339,12 @@ def prepare_embeddings(
         api_key=api_key,
         embed_dim=embed_dim,
         verbose=verbose,
+        cache_path=embedding_cache,
+        base_url=api_base_url,
+        max_concurrency=max_concurrency,
+        tokens_per_minute=tokens_per_minute,
     )
 
-    # Load documents from the input directory
-    if verbose:
-        print(f"Loading documents from '{input_dir}'...")
-    documents = SimpleDirectoryReader(
-        input_dir=str(input_path),
-        required_exts=[".md"],
-        recursive=True,
-    ).load_data()
-
-    if verbose:
-        print(f"Loaded {len(documents)} document(s)")
-
     # Configure global settings
     Settings.embed_model = embed_model
     Settings.chunk_size = chunk_size
@@ -134,300 +354,131 @@ def prepare_embeddings(
         print(f"Using chunk_size={chunk_size} (OpenAI limit: 8192 tokens per request)")
         print("Oversized chunks will be automatically split if needed")
 
-    # Parse documents into nodes using markdown-aware chunking
-    if use_markdown_chunking:
+    metadata_kwargs = {
+        "embedding_provider": embedding_provider,
+        "embed_model_name": _resolve_model_name(embedding_provider, embed_model_name),
+        "embed_dim": embed_dim,
+        "chunk_size": chunk_size,
+        "use_markdown_chunking": use_markdown_chunking,
+        "include_headers_in_chunks": include_headers_in_chunks,
+        "header_weight": header_weight,
+    }
+    expected_config = flatten_metadata(
+        create_metadata(documents=[], nodes=[], **metadata_kwargs)
+    )
+    chunk_options = {
+        "chunk_size": chunk_size,
+        "embedding_provider": embedding_provider,
+        "embed_model_name": metadata_kwargs["embed_model_name"],
+        "use_markdown_chunking": use_markdown_chunking,
+        "include_headers_in_chunks": include_headers_in_chunks,
+        "header_weight": header_weight,
+    }
+
+    hnsw_options = (
+        {
+            "m": hnsw_m,
+            "ef_construction": hnsw_ef_construction,
+            "ef_search": hnsw_ef_search,
+        }
+        if hnsw_index
+        else None
+    )
+
+    # SimpleDirectoryReader skips hidden files and directories; do the same
+    files = visible_files(md_files, input_path)
+
+    if update_existing:
         if verbose:
-            print("Using markdown-aware chunking (splits by headers and sections)...")
-
-        # Create markdown parser that respects document structure
-        # include_metadata=True stores headers in metadata
-        # include_prev_next_rel=True adds context about surrounding chunks
-        markdown_parser = MarkdownNodeParser(
-            include_metadata=True,
-            include_prev_next_rel=True,
+            print(f"Updating existing database: {full_db_path}")
+        stats = update_embeddings_incrementally(
+            db_path=full_db_path,
+            files=files,
+            embed_model=embed_model,
+            chunk_options=chunk_options,
+            expected_config=expected_config,
+            workers=workers,
+            batch_size=batch_size,
+            verbose=verbose,
+            on_embed_error=lambda e, nodes: _report_embedding_error(
+                e, nodes, full_db_path
+            ),
         )
-        nodes = markdown_parser.get_nodes_from_documents(documents)
 
-        # For external APIs: validate and split oversized chunks
-        # OpenAI has 8192 token limit, we use 5000 for extra safety
-        # (token estimation isn't perfect, better safe than sorry)
-        if embedding_provider == "openai":
+        unchanged = stats["files_changed"] == 0 and stats["files_removed"] == 0
+        if unchanged and hnsw_options is None:
             if verbose:
-                print("Validating chunk sizes for OpenAI (API limit: 8192 tokens)...")
-            nodes = validate_and_split_chunks(nodes, max_tokens=5000, verbose=verbose)
-
-        # Prepend header hierarchy to each chunk to give headers more weight
-        if include_headers_in_chunks:
-            # Ensure header_weight is at least 1
-            weight = max(1, header_weight)
-
-            # Warn about high header weights with external APIs
-            if embedding_provider == "openai" and weight > 2 and verbose:
-                print(f"Warning: header_weight={weight} may create large chunks")
+                print("✓ Knowledge base is up to date, nothing to embed")
+        else:
+            metadata = _finalize_database(
+                full_db_path, metadata_kwargs, verbose, hnsw_options
+            )
+            if verbose:
+                print(f"\n{'=' * 80}")
+                print("✓ Knowledge base updated successfully!")
+                print(f"{'=' * 80}")
+                print(f"Database: {full_db_path}")
                 print(
-                    "         (chunks will be auto-split if they exceed OpenAI's 8192 token limit)"
+                    f"Files: {stats['files_changed']} new or changed, "
+                    f"{stats['files_removed']} deleted, "
+                    f"{stats['files_unchanged']} unchanged"
                 )
-
-            headers_added = 0
-
-            for node in nodes:
-                # Get header from metadata if available
-                header_text = ""
-                if hasattr(node, "metadata") and node.metadata:
-                    # Common metadata fields that might contain headers
-                    if "header_path" in node.metadata:
-                        header_text = node.metadata["header_path"]
-                    elif "section_header" in node.metadata:
-                        header_text = node.metadata["section_header"]
-
-                # Repeat header multiple times to increase its weight in embeddings
-                if header_text and not node.text.startswith(header_text):
-                    # Repeat the header 'weight' times, separated by newlines
-                    repeated_header = "\n".join([header_text] * weight) + "\n\n"
-                    node.text = repeated_header + node.text
-                    headers_added += 1
-
-            if verbose and headers_added > 0:
-                weight_msg = f" (weight: {weight}x)" if weight > 1 else ""
                 print(
-                    f"Enhanced {headers_added} chunks with header context{weight_msg} for better retrieval"
+                    f"Chunks: {stats['chunks_embedded']} embedded, "
+                    f"{stats['chunks_reused']} reused, {stats['chunks_deleted']} removed"
                 )
+                print(f"Total chunks: {metadata['chunks']['total_chunks']}")
+                print(f"{'=' * 80}")
 
-        if verbose:
-            print(f"Created {len(nodes)} chunks from markdown sections")
-    else:
-        if verbose:
-            print("Using default size-based chunking...")
-        nodes = None  # Let VectorStoreIndex do default chunking
-
-    # Set up DuckDB vector store
-    output_path = Path(output_db)
-
-    # Handle directory and database name
-    # DuckDB doesn't automatically add .duckdb extension, so we handle it explicitly
-    if output_path.suffix == ".duckdb":
-        # User provided full path with .duckdb extension
-        persist_dir = (
-            output_path.parent if output_path.parent != Path(".") else Path(".")
-        )
-        database_name = output_path.name  # Keep full name with .duckdb
-    else:
-        # User provided path without extension - add .duckdb
-        persist_dir = (
-            output_path.parent if output_path.parent != Path(".") else Path(".")
-        )
-        database_name = output_path.name + ".duckdb"
+        _close_embedding_cache(embed_model, verbose)
+        return _load_index(full_db_path, embed_model, embed_dim)
 
-    # Ensure persist_dir exists
-    if persist_dir != Path("."):
-        persist_dir.mkdir(parents=True, exist_ok=True)
+    # Ensure the output directory exists
+    full_db_path.parent.mkdir(parents=True, exist_ok=True)
 
     # Delete existing database if overwrite=True (we already checked existence earlier)
-    full_db_path = (
-        persist_dir / database_name if persist_dir != Path(".") else Path(database_name)
-    )
     if overwrite and full_db_path.exists():
         if verbose:
             print(f"Removing existing database: {full_db_path}")
         full_db_path.unlink()
 
-    if verbose:
-        print(f"Creating DuckDB vector store: {persist_dir}/{database_name}")
-
-    vector_store = DuckDBVectorStore(
-        database_name=database_name,
-        persist_dir=str(persist_dir),
-        embed_dim=embed_dim,
-    )
-
-    storage_context = StorageContext.from_defaults(vector_store=vector_store)
+    if resume:
+        if verbose:
+            print(f"Resuming interrupted build: {full_db_path}")
+    else:
+        if verbose:
+            print(f"Creating DuckDB vector store: {full_db_path}")
+        start_build(full_db_path, embed_dim, expected_config)
 
-    # Create the knowledge base by generating and storing embeddings
     if verbose:
         print("Generating embeddings and building knowledge base...")
-        if nodes:
-            num_chunks = len(nodes)
-            num_batches = (
-                num_chunks + 2047
-            ) // 2048  # Calculate number of 2048-sized batches
-            print(
-                f"Processing {num_chunks} chunks in {num_batches} batch(es) of up to 2048 chunks each"
-            )
-            if num_batches > 1:
-                print("(Progress bar will reset for each batch)")
         print("(This may take a while depending on the number and size of documents)")
 
-    try:
-        if nodes:
-            # Use pre-parsed nodes
-            knowledge_base = VectorStoreIndex(
-                nodes,
-                storage_context=storage_context,
-                show_progress=verbose,
-            )
-        else:
-            # Use default document parsing
-            knowledge_base = VectorStoreIndex.from_documents(
-                documents,
-                storage_context=storage_context,
-                show_progress=verbose,
-            )
-    except Exception as e:
-        error_msg = str(e)
-
-        # Check if this is a token limit error
-        if (
-            "maximum context length" in error_msg.lower()
-            and "tokens" in error_msg.lower()
-        ):
-            print("\n" + "=" * 80)
-            print("ERROR: OpenAI Token Limit Exceeded")
-            print("=" * 80)
-            print(f"\n{error_msg}\n")
-
-            # Try to find the problematic chunk(s)
-            print("Analyzing chunks to find the problematic one(s)...\n")
-
-            if nodes:
-                oversized = []
-                for i, node in enumerate(nodes):
-                    text = node.text if hasattr(node, "text") else str(node)
-                    tokens = count_tokens(text)
-                    # Check against a conservative threshold
-                    if tokens > 5000:
-                        oversized.append((i, node, text, tokens))
-
-                if oversized:
-                    print(f"Found {len(oversized)} chunk(s) that may be too large:\n")
-                    for idx, (i, node, text, tokens) in enumerate(
-                        oversized[:5], 1
-                    ):  # Show first 5
-                        print(f"\nProblematic Chunk #{idx}:")
-                        print(f"  Index: {i}")
-                        print(f"  Estimated tokens: {tokens}")
-                        print(f"  Character length: {len(text)}")
-
-                        # Show metadata
-                        if hasattr(node, "metadata") and node.metadata:
-                            print(f"  Metadata: {node.metadata}")
-
-                        # Show text preview
-                        print("  Text preview (first 500 chars):")
-                        print(f"  {'-' * 76}")
-                        print(f"  {text[:500]}")
-                        print(f"  {'-' * 76}")
-
-                        # Show text end
-                        if len(text) > 500:
-                            print(f"  ... ({len(text) - 1000} chars omitted) ...")
-                            print("  Text preview (last 500 chars):")
-                            print(f"  {'-' * 76}")
-                            print(f"  {text[-500:]}")
-                            print(f"  {'-' * 76}")
-
-                        # Save full chunk to file for inspection
-                        problem_file = full_db_path.parent / f"problem_chunk_{i}.txt"
-                        try:
-                            with open(problem_file, "w") as f:
-                                f.write(f"Chunk Index: {i}\n")
-                                f.write(f"Estimated Tokens: {tokens}\n")
-                                f.write(f"Character Length: {len(text)}\n")
-                                f.write(
-                                    f"Metadata: {node.metadata if hasattr(node, 'metadata') else 'None'}\n"
-                                )
-                                f.write(f"\n{'=' * 80}\n")
-                                f.write("FULL TEXT:\n")
-                                f.write(f"{'=' * 80}\n\n")
-                                f.write(text)
-                            print(f"\n  ✓ Full chunk saved to: {problem_file}")
-                        except Exception as save_error:
-                            print(f"\n  ✗ Could not save chunk: {save_error}")
-
-                    if len(oversized) > 5:
-                        print(f"\n... and {len(oversized) - 5} more oversized chunks")
-
-                    print("\n" + "=" * 80)
-                    print("SOLUTIONS:")
-                    print("=" * 80)
-                    print(
-                        "\nThe splitting logic couldn't break these chunks down enough."
-                    )
-                    print("This usually happens with:")
-                    print("  - Very long tables")
-                    print("  - Large code blocks")
-                    print("  - Continuous text without sentence breaks")
-                    print("\nTry these solutions:")
-                    print("\n1. Use even smaller chunk size:")
-                    print("   --chunk-size 64")
-                    print("\n2. Disable markdown chunking (use size-based):")
-                    print("   --chunk-size 256 --no-markdown-chunking")
-                    print("\n3. Preprocess the source markdown files:")
-                    print("   - Break up very long tables")
-                    print("   - Split large code blocks")
-                    print("   - Add section breaks in continuous text")
-                    print("\n4. Manual inspection:")
-                    print("   - Check the saved problem_chunk_*.txt files")
-                    print("   - Identify the source document")
-                    print("   - Edit or exclude that document")
-                    print()
-                else:
-                    print(
-                        "Could not identify oversized chunks (they may have been missed by validation)"
-                    )
-
-            raise
-        else:
-            # Different error, re-raise with original traceback
-            raise
-
-    # Get the full database path
-    full_db_path = (
-        persist_dir / database_name if persist_dir != Path(".") else Path(database_name)
-    )
-
-    # Store original source documents
-    create_source_documents_table(
-        db_path=full_db_path, documents=documents, verbose=verbose
-    )
-
-    # Link chunks to source documents
-    if nodes:
-        add_document_references(db_path=full_db_path, nodes=nodes, verbose=verbose)
-
-    # Create full-text search index for hybrid retrieval
-    create_fts_index(db_path=full_db_path, verbose=verbose)
-
-    # Create and store metadata
-    metadata = create_metadata(
-        documents=documents,
-        nodes=nodes if nodes else [],
-        embedding_provider=embedding_provider,
-        embed_model_name=embed_model_name
-        if embed_model_name
-        else (
-            "BAAI/bge-small-en-v1.5"
-            if embedding_provider == "huggingface"
-            else "text-embedding-3-small"
-        ),
-        embed_dim=embed_dim,
-        chunk_size=chunk_size,
-        use_markdown_chunking=use_markdown_chunking,
-        include_headers_in_chunks=include_headers_in_chunks,
-        header_weight=header_weight,
+    # Chunks are embedded and written batch by batch; files already written by
+    # an interrupted run are skipped
+    update_embeddings_incrementally(
+        db_path=full_db_path,
+        files=files,
+        embed_model=embed_model,
+        chunk_options=chunk_options,
+        expected_config=expected_config,
+        config_table=BUILD_STATE_TABLE,
+        workers=workers,
+        batch_size=batch_size,
+        verbose=verbose,
+        on_embed_error=lambda e, nodes: _report_embedding_error(e, nodes, full_db_path),
     )
 
-    # Store metadata in database
-    store_metadata_in_db(db_path=full_db_path, metadata=metadata, verbose=verbose)
-
-    # Save metadata as YAML file
-    save_metadata_yaml(db_path=full_db_path, metadata=metadata, verbose=verbose)
+    # Create full-text search index and metadata, then mark the build complete
+    metadata = _finalize_database(full_db_path, metadata_kwargs, verbose, hnsw_options)
+    finish_build(full_db_path)
 
     if verbose:
         print(f"\n{'=' * 80}")
         print("✓ Knowledge base created successfully!")
         print(f"{'=' * 80}")
-        print(f"Database: {persist_dir}/{database_name}")
-        print(f"Metadata: {database_name.replace('.duckdb', '.yaml')}")
+        print(f"Database: {full_db_path}")
+        print(f"Metadata: {full_db_path.with_suffix('.yaml').name}")
         print()
         print("Embedding Model:")
         print(f"  Provider: {metadata['embedding']['provider']}")
@@ -445,7 +496,10 @@ def prepare_embeddings(
         )
         print()
         print("Features:")
-        print("  ✓ Vector similarity search")
+        if metadata["vector_index"]["type"] == "hnsw":
+            print("  ✓ Vector similarity search (HNSW index)")
+        else:
+            print("  ✓ Vector similarity search")
         print("  ✓ Full-text search (BM25)")
         print("  ✓ Hybrid retrieval (RRF)")
         print("  ✓ Source documents stored")
@@ -453,4 +507,6 @@ def prepare_embeddings(
         print("\nYou can now use this database for RAG applications.")
         print(f"{'=' * 80}")
 
-    return knowledge_base
+    _close_embedding_cache(embed_model, verbose)
+
+    return _load_index(full_db_path, embed_model, embed_dim)
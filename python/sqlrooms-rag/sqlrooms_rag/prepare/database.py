@@ -4,8 +4,20 @@ Database operations for storing source documents and creating indexes.
 
 import json
 from pathlib import Path
+from typing import Any, Dict, Optional
 
 import duckdb
+import pyarrow as pa
+from llama_index.core.schema import MetadataMode
+
+from .hashing import file_key, hash_file, hash_text
+from .metadata import EMBED_TEXT_MODE, read_vector_index_metadata
+
+# HNSW vector index on documents.embedding (DuckDB vss extension)
+HNSW_INDEX_NAME = "documents_embedding_hnsw"
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 128
+HNSW_EF_SEARCH = 64
 
 
 def create_source_documents_table(
@@ -28,36 +40,8 @@ def create_source_documents_table(
     conn = duckdb.connect(str(db_path))
 
     try:
-        # Create table for original source documents
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS source_documents (
-                doc_id VARCHAR PRIMARY KEY,
-                file_path VARCHAR,
-                file_name VARCHAR,
-                text TEXT,
-                metadata_ JSON,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Insert source documents
-        for doc in documents:
-            # Extract metadata
-            metadata = doc.metadata if hasattr(doc, "metadata") else {}
-            doc_id = doc.doc_id if hasattr(doc, "doc_id") else str(hash(doc.text))
-            file_path = metadata.get("file_path", "")
-            file_name = metadata.get("file_name", "")
-
-            conn.execute(
-                """
-                INSERT INTO source_documents (doc_id, file_path, file_name, text, metadata_)
-                VALUES (?, ?, ?, ?, ?)
-                ON CONFLICT (doc_id) DO UPDATE SET
-                    text = EXCLUDED.text,
-                    metadata_ = EXCLUDED.metadata_
-            """,
-                [doc_id, file_path, file_name, doc.text, json.dumps(metadata)],
-            )
+        ensure_source_documents_table(conn)
+        insert_source_documents(conn, documents)
 
         if verbose:
             count = conn.execute("SELECT COUNT(*) FROM source_documents").fetchone()[0]
@@ -67,12 +51,119 @@ def create_source_documents_table(
         conn.close()
 
 
+def ensure_source_documents_table(conn: duckdb.DuckDBPyConnection) -> None:
+    """
+    Create the source_documents table if needed.
+
+    Also adds the `content_hash` column to databases created before
+    incremental updates were supported.
+
+    Args:
+        conn: Open DuckDB connection
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS source_documents (
+            doc_id VARCHAR PRIMARY KEY,
+            file_path VARCHAR,
+            file_name VARCHAR,
+            text TEXT,
+            metadata_ JSON,
+            content_hash VARCHAR,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute(
+        "ALTER TABLE source_documents ADD COLUMN IF NOT EXISTS content_hash VARCHAR"
+    )
+
+
+def insert_source_documents(
+    conn: duckdb.DuckDBPyConnection,
+    documents: list,
+    file_hashes: Optional[Dict[str, str]] = None,
+) -> None:
+    """
+    Insert (or update) source documents, recording a hash of each source file.
+
+    The `content_hash` is the SHA-256 of the source file, so incremental
+    updates can skip files that have not changed since the last run.
+
+    Args:
+        conn: Open DuckDB connection
+        documents: List of llama-index Document objects
+        file_hashes: SHA-256 of each file's bytes as they were loaded, keyed by
+            `file_key(file_path)` (see `load_and_chunk_files`). Files missing
+            from it are hashed from disk now.
+    """
+    loaded_hashes = file_hashes or {}
+    file_hashes = {}
+    rows = {}
+    for doc in documents:
+        # Extract metadata
+        metadata = doc.metadata if hasattr(doc, "metadata") else {}
+        doc_id = doc.doc_id if hasattr(doc, "doc_id") else str(hash(doc.text))
+        file_path = metadata.get("file_path", "")
+
+        # A file may be split into several documents; hash it once
+        if file_path not in file_hashes:
+            loaded_hash = loaded_hashes.get(file_key(file_path)) if file_path else None
+            if loaded_hash is not None:
+                file_hashes[file_path] = loaded_hash
+            else:
+                try:
+                    file_hashes[file_path] = hash_file(Path(file_path))
+                except OSError:
+                    file_hashes[file_path] = None
+
+        # Last one wins, like the per-row upsert; a bulk upsert may not
+        # touch the same key twice
+        rows[doc_id] = (
+            file_path,
+            metadata.get("file_name", ""),
+            doc.text,
+            json.dumps(metadata),
+            file_hashes[file_path],
+        )
+
+    if not rows:
+        return
+
+    file_paths, file_names, texts, metadata_json, content_hashes = zip(*rows.values())
+    table = pa.table(
+        {
+            "doc_id": pa.array(list(rows.keys()), type=pa.string()),
+            "file_path": pa.array(file_paths, type=pa.string()),
+            "file_name": pa.array(file_names, type=pa.string()),
+            "text": pa.array(texts, type=pa.string()),
+            "metadata_": pa.array(metadata_json, type=pa.string()),
+            "content_hash": pa.array(content_hashes, type=pa.string()),
+        }
+    )
+
+    # One bulk upsert instead of a round-trip per document
+    conn.register("new_source_documents", table)
+    try:
+        conn.execute("""
+            INSERT INTO source_documents
+                (doc_id, file_path, file_name, text, metadata_, content_hash)
+            SELECT doc_id, file_path, file_name, text, metadata_::JSON, content_hash
+            FROM new_source_documents
+            ON CONFLICT (doc_id) DO UPDATE SET
+                text = EXCLUDED.text,
+                metadata_ = EXCLUDED.metadata_,
+                content_hash = EXCLUDED.content_hash
+        """)
+    finally:
+        conn.unregister("new_source_documents")
+
+
 def add_document_references(db_path: Path, nodes: list, verbose: bool = True) -> None:
     """
     Add source document references to chunk nodes.
 
     Updates the documents table to add doc_id column linking chunks
-    to their source documents.
+    to their source documents, and a chunk_hash column (SHA-256 of the
+    text each chunk is embedded from, see `pipeline`).
 
     Args:
         db_path: Full path to the DuckDB database file
@@ -85,27 +176,41 @@ def add_document_references(db_path: Path, nodes: list, verbose: bool = True) ->
     conn = duckdb.connect(str(db_path))
 
     try:
-        # Add doc_id column if it doesn't exist
-        try:
-            conn.execute("""
-                ALTER TABLE documents 
-                ADD COLUMN doc_id VARCHAR
-            """)
-        except Exception:
-            # Column might already exist
-            pass
-
-        # Update chunks with their source document IDs
-        for node in nodes:
-            if hasattr(node, "node_id") and hasattr(node, "ref_doc_id"):
-                conn.execute(
-                    """
-                    UPDATE documents 
-                    SET doc_id = ?
-                    WHERE node_id = ?
-                """,
-                    [node.ref_doc_id, node.node_id],
-                )
+        ensure_chunk_columns(conn)
+
+        # Update chunks with their source document IDs and the hash of their
+        # embedded text (so incremental updates can reuse it) in one join
+        refs = [
+            (
+                node.node_id,
+                node.ref_doc_id,
+                hash_text(
+                    node.get_content(metadata_mode=MetadataMode(EMBED_TEXT_MODE))
+                ),
+            )
+            for node in nodes
+            if hasattr(node, "node_id") and hasattr(node, "ref_doc_id")
+        ]
+        if refs:
+            node_ids, doc_ids, chunk_hashes = zip(*refs)
+            table = pa.table(
+                {
+                    "node_id": pa.array(node_ids, type=pa.string()),
+                    "doc_id": pa.array(doc_ids, type=pa.string()),
+                    "chunk_hash": pa.array(chunk_hashes, type=pa.string()),
+                }
+            )
+            conn.register("node_refs", table)
+            try:
+                conn.execute("""
+                    UPDATE documents
+                    SET doc_id = node_refs.doc_id,
+                        chunk_hash = coalesce(documents.chunk_hash, node_refs.chunk_hash)
+                    FROM node_refs
+                    WHERE documents.node_id = node_refs.node_id
+                """)
+            finally:
+                conn.unregister("node_refs")
 
         if verbose:
             count = conn.execute(
@@ -117,6 +222,17 @@ def add_document_references(db_path: Path, nodes: list, verbose: bool = True) ->
         conn.close()
 
 
+def ensure_chunk_columns(conn: duckdb.DuckDBPyConnection) -> None:
+    """
+    Add the `doc_id` and `chunk_hash` columns to the documents table if needed.
+
+    Args:
+        conn: Open DuckDB connection
+    """
+    conn.execute("ALTER TABLE documents ADD COLUMN IF NOT EXISTS doc_id VARCHAR")
+    conn.execute("ALTER TABLE documents ADD COLUMN IF NOT EXISTS chunk_hash VARCHAR")
+
+
 def create_fts_index(db_path: Path, verbose: bool = True) -> None:
     """
     Create full-text search index on the documents table.
@@ -162,3 +278,159 @@ def create_fts_index(db_path: Path, verbose: bool = True) -> None:
             print("Hybrid search will not be available.")
     finally:
         conn.close()
+
+
+def has_hnsw_index(conn: duckdb.DuckDBPyConnection) -> bool:
+    """
+    Whether the documents table has an HNSW vector index.
+
+    Works without the vss extension loaded.
+
+    Args:
+        conn: Open DuckDB connection
+
+    Returns:
+        True if an HNSW index exists on the documents table
+    """
+    return (
+        conn.execute(
+            """
+            SELECT count(*) FROM duckdb_indexes()
+            WHERE table_name = 'documents' AND sql ILIKE '%USING HNSW%'
+            """
+        ).fetchone()[0]
+        > 0
+    )
+
+
+def load_vss_if_indexed(conn: duckdb.DuckDBPyConnection) -> bool:
+    """
+    Load the vss extension if the documents table has an HNSW index.
+
+    DuckDB refuses to modify a table with an index whose extension is not
+    loaded; with vss loaded, inserts and deletes update the index.
+
+    Args:
+        conn: Open DuckDB connection
+
+    Returns:
+        True if the table has an HNSW index (and vss was loaded)
+    """
+    if not has_hnsw_index(conn):
+        return False
+    conn.execute("INSTALL vss; LOAD vss;")
+    conn.execute("SET hnsw_enable_experimental_persistence = true")
+    return True
+
+
+def create_hnsw_index(
+    db_path: Path,
+    m: int = HNSW_M,
+    ef_construction: int = HNSW_EF_CONSTRUCTION,
+    ef_search: int = HNSW_EF_SEARCH,
+    verbose: bool = True,
+) -> Dict[str, Any]:
+    """
+    Create (or rebuild) a persistent HNSW index on documents.embedding.
+
+    The index uses the cosine metric, so vector search ordered by
+    `array_cosine_distance` is answered from the index instead of scanning
+    every chunk. Results are approximate; `ef_search` trades recall for speed
+    and can be overridden at query time.
+
+    Args:
+        db_path: Full path to the DuckDB database file
+        m: Maximum neighbors per node in the graph (higher: better recall,
+            bigger index)
+        ef_construction: Candidate list size while building (higher: better
+            graph, slower build)
+        ef_search: Default candidate list size while searching
+        verbose: Whether to print progress messages
+
+    Returns:
+        Index settings as stored in the metadata (see `create_metadata`)
+    """
+    if verbose:
+        print(
+            f"Creating HNSW vector index (M={m}, ef_construction={ef_construction})..."
+        )
+
+    conn = duckdb.connect(str(db_path))
+
+    try:
+        conn.execute("INSTALL vss; LOAD vss;")
+        # Required to store HNSW indexes in a database file
+        conn.execute("SET hnsw_enable_experimental_persistence = true")
+        conn.execute(f"DROP INDEX IF EXISTS {HNSW_INDEX_NAME}")
+        conn.execute(f"""
+            CREATE INDEX {HNSW_INDEX_NAME} ON documents
+            USING HNSW (embedding)
+            WITH (
+                metric = 'cosine',
+                M = {int(m)},
+                ef_construction = {int(ef_construction)},
+                ef_search = {int(ef_search)}
+            )
+        """)
+
+        if verbose:
+            print("✓ HNSW vector index created")
+
+    finally:
+        conn.close()
+
+    return {
+        "type": "hnsw",
+        "metric": "cosine",
+        "m": int(m),
+        "ef_construction": int(ef_construction),
+        "ef_search": int(ef_search),
+    }
+
+
+def compact_hnsw_index(db_path: Path, verbose: bool = True) -> bool:
+    """
+    Compact the HNSW index after an update, if the database has one.
+
+    Deleted chunks are only marked as deleted in the index graph; compacting
+    removes them. An index loaded from disk can keep deleted chunks even
+    after compacting, and they would take up top-k slots of every search, so
+    if the index still has more entries than the table it is rebuilt with
+    its stored settings.
+
+    Args:
+        db_path: Full path to the DuckDB database file
+        verbose: Whether to print progress messages
+
+    Returns:
+        True if the database has an HNSW index
+    """
+    conn = duckdb.connect(str(db_path))
+
+    try:
+        if not load_vss_if_indexed(conn):
+            return False
+        conn.execute(f"PRAGMA hnsw_compact_index('{HNSW_INDEX_NAME}')")
+        entries = conn.execute(
+            "SELECT count FROM pragma_hnsw_index_info() WHERE index_name = ?",
+            [HNSW_INDEX_NAME],
+        ).fetchone()
+        rows = conn.execute("SELECT count(*) FROM documents").fetchone()[0]
+        if entries is None or entries[0] == rows:
+            if verbose:
+                print("✓ HNSW vector index compacted")
+            return True
+    finally:
+        conn.close()
+
+    if verbose:
+        print("HNSW vector index still holds deleted chunks, rebuilding...")
+    settings = read_vector_index_metadata(db_path) or {}
+    create_hnsw_index(
+        db_path,
+        m=settings.get("m") or HNSW_M,
+        ef_construction=settings.get("ef_construction") or HNSW_EF_CONSTRUCTION,
+        ef_search=settings.get("ef_search") or HNSW_EF_SEARCH,
+        verbose=verbose,
+    )
+    return True
@@ -0,0 +1,222 @@
+"""
+Persistent on-disk cache of chunk embeddings.
+
+Embeddings are stored in a DuckDB file keyed by model, dimension and the
+SHA-256 of the text, so rebuilding a knowledge base (for example with a
+different chunk size or header weight) only embeds text that was never seen
+before with the same model.
+"""
+
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import duckdb
+import pyarrow as pa
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+from .hashing import hash_text
+
+
+def default_embedding_cache_path() -> Path:
+    """
+    Default location of the embedding cache.
+
+    Returns:
+        `$XDG_CACHE_HOME/sqlrooms-rag/embedding_cache.duckdb`
+        (`~/.cache/...` if XDG_CACHE_HOME is not set)
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "sqlrooms-rag" / "embedding_cache.duckdb"
+
+
+class EmbeddingCache:
+    """
+    DuckDB-backed store of embeddings keyed by (model, dimension, text hash).
+
+    The connection is opened lazily and can be closed and reopened; writes
+    are committed per batch so an interrupted run keeps what it paid for.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._conn: Optional[duckdb.DuckDBPyConnection] = None
+
+    def _connection(self) -> duckdb.DuckDBPyConnection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = duckdb.connect(str(self.path))
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model VARCHAR,
+                    dim INTEGER,
+                    text_hash VARCHAR,
+                    embedding FLOAT[],
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (model, dim, text_hash)
+                )
+            """)
+            self._conn = conn
+        return self._conn
+
+    def open(self) -> None:
+        """Open the cache file now (raises `duckdb.IOException` if it is locked)."""
+        self._connection()
+
+    def get_many(
+        self, model: str, dim: int, text_hashes: List[str]
+    ) -> Dict[str, List[float]]:
+        """
+        Look up cached embeddings.
+
+        Args:
+            model: Model key (provider and model name)
+            dim: Embedding dimension
+            text_hashes: SHA-256 hashes of the texts
+
+        Returns:
+            Dictionary of text hash to embedding for the hashes that were found
+        """
+        if not text_hashes:
+            return {}
+        rows = (
+            self._connection()
+            .execute(
+                """
+            SELECT text_hash, embedding FROM embeddings
+            WHERE model = ? AND dim = ?
+              AND text_hash IN (SELECT unnest(?::VARCHAR[]))
+        """,
+                [model, dim, text_hashes],
+            )
+            .fetchall()
+        )
+        return dict(rows)
+
+    def put_many(self, model: str, dim: int, items: Dict[str, List[float]]) -> None:
+        """
+        Store embeddings (existing entries are kept).
+
+        Args:
+            model: Model key (provider and model name)
+            dim: Embedding dimension
+            items: Dictionary of text hash to embedding
+        """
+        if not items:
+            return
+        conn = self._connection()
+        table = pa.table(
+            {
+                "text_hash": list(items.keys()),
+                "embedding": pa.array(
+                    list(items.values()), type=pa.list_(pa.float32())
+                ),
+            }
+        )
+        conn.register("new_embeddings", table)
+        try:
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO embeddings (model, dim, text_hash, embedding)
+                SELECT ?, ?, text_hash, embedding FROM new_embeddings
+            """,
+                [model, dim],
+            )
+        finally:
+            conn.unregister("new_embeddings")
+
+    def close(self) -> None:
+        """Close the connection (it is reopened on next use)."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Embedding model wrapper that serves text embeddings from an `EmbeddingCache`.
+
+    Only texts missing from the cache are passed to the wrapped model. Query
+    embeddings are not cached and go straight to the wrapped model.
+    """
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+    _cache_key: str = PrivateAttr()
+    _dim: int = PrivateAttr()
+    _hits: int = PrivateAttr(default=0)
+    _misses: int = PrivateAttr(default=0)
+
+    def __init__(
+        self, inner: BaseEmbedding, cache: EmbeddingCache, cache_key: str, dim: int
+    ):
+        super().__init__(
+            model_name=inner.model_name,
+            embed_batch_size=inner.embed_batch_size,
+        )
+        self._inner = inner
+        self._cache = cache
+        self._cache_key = cache_key
+        self._dim = dim
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def cache_stats(self) -> Dict[str, int]:
+        """Number of texts served from the cache (hits) and embedded (misses)."""
+        return {"hits": self._hits, "misses": self._misses}
+
+    def close(self) -> None:
+        self._cache.close()
+
+    def _lookup(self, texts: List[str]) -> tuple:
+        hashes = [hash_text(text) for text in texts]
+        found = self._cache.get_many(self._cache_key, self._dim, sorted(set(hashes)))
+        missing: Dict[str, str] = {}
+        for text, text_hash in zip(texts, hashes, strict=True):
+            if text_hash not in found:
+                missing.setdefault(text_hash, text)
+        self._hits += sum(1 for text_hash in hashes if text_hash in found)
+        self._misses += len(missing)
+        return hashes, found, missing
+
+    def _store(
+        self, hashes: List[str], found: Dict[str, Any], missing: Dict[str, str], vectors
+    ) -> List[List[float]]:
+        new = dict(zip(missing.keys(), vectors, strict=True))
+        self._cache.put_many(self._cache_key, self._dim, new)
+        found.update(new)
+        return [list(found[text_hash]) for text_hash in hashes]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        hashes, found, missing = self._lookup(texts)
+        vectors = (
+            self._inner.get_text_embedding_batch(list(missing.values()))
+            if missing
+            else []
+        )
+        return self._store(hashes, found, missing, vectors)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        hashes, found, missing = self._lookup(texts)
+        vectors = (
+            await self._inner.aget_text_embedding_batch(list(missing.values()))
+            if missing
+            else []
+        )
+        return self._store(hashes, found, missing, vectors)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._inner.get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return await self._inner.aget_query_embedding(query)
@@ -3,10 +3,49 @@ Embedding model initialization for different providers.
 """
 
 import os
+from pathlib import Path
 from typing import Optional, Literal, Tuple
 
+import duckdb
 from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 
+from .embedding_cache import CachedEmbedding, EmbeddingCache
+from .tokenization import get_tokenizer
+from .openai_embeddings import (
+    DEFAULT_BASE_URL,
+    ConcurrentOpenAIEmbedding,
+    OpenAIEmbeddingClient,
+)
+
+
+def _with_cache(
+    embed_model,
+    provider: str,
+    model_name: str,
+    embed_dim: int,
+    cache_path: Optional[str],
+    verbose: bool,
+):
+    """Wrap `embed_model` in a `CachedEmbedding` if a cache path is given."""
+    if cache_path is None:
+        return embed_model
+
+    cache = EmbeddingCache(Path(cache_path))
+    try:
+        # Open now so a cache locked by another process is reported up front
+        cache.open()
+    except duckdb.IOException as e:
+        if verbose:
+            print(f"Warning: Embedding cache unavailable, not caching: {e}")
+        return embed_model
+
+    if verbose:
+        print(f"Using embedding cache: {cache_path}")
+
+    return CachedEmbedding(
+        embed_model, cache, cache_key=f"{provider}:{model_name}", dim=embed_dim
+    )
+
 
 def get_embedding_model(
     provider: Literal["huggingface", "openai"] = "huggingface",
@@ -14,6 +53,10 @@ def get_embedding_model(
     api_key: Optional[str] = None,
     embed_dim: Optional[int] = None,
     verbose: bool = True,
+    cache_path: Optional[str] = None,
+    base_url: Optional[str] = None,
+    max_concurrency: int = 4,
+    tokens_per_minute: Optional[int] = None,
 ) -> Tuple:
     """
     Get an embedding model based on the provider.
@@ -27,13 +70,20 @@ def get_embedding_model(
             If not provided, will look for OPENAI_API_KEY environment variable.
         embed_dim: Expected embedding dimension. If None, will be auto-detected.
         verbose: Whether to print progress messages
+        cache_path: Optional path of a persistent embedding cache (DuckDB file).
+            Text embeddings are looked up by model, dimension and text hash, and
+            only texts not in the cache are embedded.
+        base_url: OpenAI-compatible API base URL. If not provided, will look for
+            OPENAI_BASE_URL environment variable, then use the OpenAI API.
+        max_concurrency: Maximum concurrent embedding requests (OpenAI)
+        tokens_per_minute: Tokens-per-minute budget for embedding requests
+            (OpenAI). None sends as fast as the API allows.
 
     Returns:
         Tuple of (embed_model, actual_embed_dim)
 
     Raises:
         ValueError: If API key is required but not provided
-        ImportError: If required package is not installed
     """
     if provider == "huggingface":
         # Local HuggingFace embeddings (default)
@@ -56,18 +106,14 @@ def get_embedding_model(
             if verbose:
                 print(f"Warning: Expected dimension {embed_dim}, got {actual_dim}")
 
+        embed_model = _with_cache(
+            embed_model, provider, model_name, actual_dim, cache_path, verbose
+        )
+
         return embed_model, actual_dim
 
     elif provider == "openai":
         # OpenAI API embeddings
-        try:
-            from llama_index.embeddings.openai import OpenAIEmbedding
-        except ImportError:
-            raise ImportError(
-                "OpenAI embeddings require 'llama-index-embeddings-openai'. "
-                "Install with: pip install llama-index-embeddings-openai"
-            )
-
         # Get API key
         if api_key is None:
             api_key = os.environ.get("OPENAI_API_KEY")
@@ -95,16 +141,34 @@ def get_embedding_model(
         if embed_dim is None:
             embed_dim = dimension_map.get(model_name, 1536)
 
-        embed_model = OpenAIEmbedding(
-            model=model_name,
-            api_key=api_key,
-            dimensions=embed_dim if "text-embedding-3" in model_name else None,
+        if base_url is None:
+            base_url = os.environ.get("OPENAI_BASE_URL") or DEFAULT_BASE_URL
+
+        # Concurrent requests with rate limiting instead of llama-index's
+        # one-batch-at-a-time OpenAIEmbedding
+        embed_model = ConcurrentOpenAIEmbedding(
+            OpenAIEmbeddingClient(
+                model=model_name,
+                api_key=api_key,
+                base_url=base_url,
+                dimensions=embed_dim if "text-embedding-3" in model_name else None,
+                max_concurrency=max_concurrency,
+                tokens_per_minute=tokens_per_minute,
+                verbose=verbose,
+                token_counter=get_tokenizer("openai", model_name).count,
+            )
         )
 
         if verbose:
             print(f"Embedding dimension: {embed_dim}")
+            limit = f", {tokens_per_minute} tokens/min" if tokens_per_minute else ""
+            print(f"Sending up to {max_concurrency} concurrent requests{limit}")
             print("Note: Using OpenAI API will incur costs per token")
 
+        embed_model = _with_cache(
+            embed_model, provider, model_name, embed_dim, cache_path, verbose
+        )
+
         return embed_model, embed_dim
 
     else:
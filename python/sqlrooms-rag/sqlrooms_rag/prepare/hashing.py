@@ -0,0 +1,45 @@
+"""
+Content hashes used to detect changed source files and chunks.
+"""
+
+import hashlib
+from pathlib import Path
+
+_READ_SIZE = 1024 * 1024
+
+
+def file_key(file_path: str) -> str:
+    """Normalized path used to match files on disk with stored documents."""
+    return str(Path(file_path).resolve())
+
+
+def hash_file(path: Path) -> str:
+    """
+    SHA-256 (hex) of a file's bytes.
+
+    Args:
+        path: File to hash
+
+    Returns:
+        Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(_READ_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_text(text: str) -> str:
+    """
+    SHA-256 (hex) of a chunk's UTF-8 text.
+
+    Matches DuckDB's `sha256(text)`, so hashes can also be computed in SQL.
+
+    Args:
+        text: Chunk text
+
+    Returns:
+        Hex digest of the text
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
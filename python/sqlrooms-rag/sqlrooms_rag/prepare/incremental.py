@@ -0,0 +1,324 @@
+"""
+Incremental updates and resumable builds of an embeddings database.
+
+Source files are compared with the `content_hash` stored in `source_documents`;
+only new or changed files are re-chunked, and only chunks whose embedded text
+(see `pipeline`) is not already in the `documents` table are embedded. Chunks
+of changed or deleted files are removed.
+
+A new database is built the same way, starting from empty tables: files are
+committed as they are embedded, so an interrupted build is resumed by updating
+it again. Until the build finishes its settings live in a build state table
+instead of `embedding_metadata`.
+"""
+
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import duckdb
+
+from .database import (
+    ensure_chunk_columns,
+    ensure_source_documents_table,
+    load_vss_if_indexed,
+)
+from .hashing import file_key, hash_file
+from .parallel import iter_chunked_files
+from .pipeline import (
+    BATCH_SIZE,
+    delete_documents,
+    embed_and_write,
+    ensure_documents_table,
+)
+
+# Settings that must match the existing database for its embeddings to be reused
+INCREMENTAL_CONFIG_KEYS = (
+    "embedding_provider",
+    "embedding_model",
+    "embedding_dimensions",
+    "embedding_text_mode",
+    "chunking_strategy",
+    "chunk_size",
+    "include_headers",
+    "header_weight",
+)
+
+# Databases built before the embed text mode was recorded were embedded by
+# llama-index's VectorStoreIndex, in embed mode
+LEGACY_CONFIG_DEFAULTS = {"embedding_text_mode": "embed"}
+
+# Holds the settings of a build that has not finished yet
+BUILD_STATE_TABLE = "prepare_state"
+
+
+def check_incremental_config(
+    conn: duckdb.DuckDBPyConnection,
+    expected: Dict[str, str],
+    table: str = "embedding_metadata",
+) -> None:
+    """
+    Ensure the database was built with the same model and chunking settings.
+
+    Args:
+        conn: Open DuckDB connection
+        expected: Flattened metadata values (see `flatten_metadata`)
+        table: Key-value table holding the stored settings
+
+    Raises:
+        ValueError: If the database has no metadata or any setting differs
+    """
+    try:
+        stored = dict(conn.execute(f"SELECT key, value FROM {table}").fetchall())
+    except duckdb.CatalogException as e:
+        raise ValueError(
+            f"Cannot update incrementally: the database has no {table}. "
+            "Use --overwrite to rebuild it."
+        ) from e
+
+    stored = {**LEGACY_CONFIG_DEFAULTS, **stored}
+    mismatched = [
+        f"{key} (database: {stored.get(key)}, requested: {expected[key]})"
+        for key in INCREMENTAL_CONFIG_KEYS
+        if stored.get(key) != expected[key]
+    ]
+    if mismatched:
+        raise ValueError(
+            "Cannot update incrementally, settings differ from the existing "
+            f"database: {', '.join(mismatched)}. Use --overwrite to rebuild it."
+        )
+
+
+def plan_file_changes(
+    conn: duckdb.DuckDBPyConnection, files: List[Path]
+) -> Tuple[List[Path], Dict[str, List[str]], List[str], int]:
+    """
+    Compare source files on disk with the ones stored in the database.
+
+    Args:
+        conn: Open DuckDB connection
+        files: Markdown files currently in the input directory
+
+    Returns:
+        Tuple of (new or changed files, doc_ids of the stored version of each
+        changed file keyed by `file_key`, doc_ids of deleted files, number of
+        deleted files)
+    """
+    stored: Dict[str, Dict[str, set]] = {}
+    for doc_id, file_path, content_hash in conn.execute(
+        "SELECT doc_id, file_path, content_hash FROM source_documents"
+    ).fetchall():
+        entry = stored.setdefault(
+            file_key(file_path or ""), {"doc_ids": set(), "hashes": set()}
+        )
+        entry["doc_ids"].add(doc_id)
+        entry["hashes"].add(content_hash)
+
+    changed: List[Path] = []
+    replaced_doc_ids: Dict[str, List[str]] = {}
+    for path in files:
+        key = file_key(str(path))
+        entry = stored.pop(key, None)
+        if entry is not None and entry["hashes"] == {hash_file(path)}:
+            continue
+        changed.append(path)
+        if entry is not None:
+            replaced_doc_ids[key] = sorted(entry["doc_ids"])
+
+    # Whatever is left was deleted from the input directory
+    removed_doc_ids = [
+        doc_id for entry in stored.values() for doc_id in sorted(entry["doc_ids"])
+    ]
+
+    return changed, replaced_doc_ids, removed_doc_ids, len(stored)
+
+
+def has_build_state(db_path: Path) -> bool:
+    """
+    Whether the database is a build that was interrupted before finishing.
+
+    Args:
+        db_path: Full path to the DuckDB database file
+
+    Returns:
+        True if the database still has the build state table
+    """
+    conn = duckdb.connect(str(db_path), read_only=True)
+
+    try:
+        return (
+            conn.execute(
+                "SELECT count(*) FROM information_schema.tables WHERE table_name = ?",
+                [BUILD_STATE_TABLE],
+            ).fetchone()[0]
+            > 0
+        )
+    finally:
+        conn.close()
+
+
+def start_build(db_path: Path, embed_dim: int, expected_config: Dict[str, str]) -> None:
+    """
+    Create the tables of a new database and record the build settings.
+
+    The settings are kept in the build state table until `finish_build`, so
+    an interrupted build can only be resumed with the same settings.
+
+    Args:
+        db_path: Full path to the DuckDB database file
+        embed_dim: Embedding dimension
+        expected_config: Flattened metadata of the requested settings
+    """
+    conn = duckdb.connect(str(db_path))
+
+    try:
+        ensure_documents_table(conn, embed_dim)
+        ensure_source_documents_table(conn)
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {BUILD_STATE_TABLE} (
+                key VARCHAR PRIMARY KEY,
+                value VARCHAR
+            )
+        """)
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {BUILD_STATE_TABLE} VALUES (?, ?)",
+            [[key, expected_config[key]] for key in INCREMENTAL_CONFIG_KEYS],
+        )
+    finally:
+        conn.close()
+
+
+def finish_build(db_path: Path) -> None:
+    """
+    Mark a build as complete by dropping its build state table.
+
+    Args:
+        db_path: Full path to the DuckDB database file
+    """
+    conn = duckdb.connect(str(db_path))
+
+    try:
+        conn.execute(f"DROP TABLE IF EXISTS {BUILD_STATE_TABLE}")
+    finally:
+        conn.close()
+
+
+def update_embeddings_incrementally(
+    db_path: Path,
+    files: List[Path],
+    embed_model,
+    chunk_options: Dict[str, Any],
+    expected_config: Dict[str, str],
+    config_table: str = "embedding_metadata",
+    workers: int = 1,
+    batch_size: int = BATCH_SIZE,
+    verbose: bool = True,
+    on_embed_error: Optional[Callable[[Exception, list], None]] = None,
+) -> Dict[str, int]:
+    """
+    Bring an embeddings database up to date with `files`.
+
+    Unchanged files are skipped entirely. New and changed files are loaded and
+    chunked (in `workers` processes) and streamed through `embed_and_write`:
+    chunks reuse the stored embedding of any chunk with identical embedded
+    text, the rest are embedded in batches of `batch_size`, and each batch
+    replaces the rows of its files in one transaction. Rows of deleted files
+    are removed first. Because finished files are committed as they go,
+    running this again after an interruption continues where it stopped.
+
+    This also performs full builds: a database created with `start_build`
+    has no stored files, so every file counts as new. The caller is
+    responsible for rebuilding the FTS index and metadata.
+
+    Args:
+        db_path: Full path to the DuckDB database file
+        files: Markdown files currently in the input directory
+        embed_model: llama-index embedding model
+        chunk_options: Keyword arguments for `chunk_documents` (except verbose)
+        expected_config: Flattened metadata of the requested settings
+        config_table: Table holding the settings the database was built with
+            (`embedding_metadata`, or the build state table while building)
+        workers: Number of processes that load and chunk files
+        batch_size: Chunks embedded and written per transaction
+        verbose: Whether to print progress messages
+        on_embed_error: Called with the exception and the batch's nodes if
+            embedding fails
+
+    Returns:
+        Dictionary with file and chunk counts of the update
+
+    Raises:
+        ValueError: If the database was built with different settings
+    """
+    conn = duckdb.connect(str(db_path))
+
+    try:
+        check_incremental_config(conn, expected_config, table=config_table)
+        # An HNSW index is updated along with the rows (needs vss loaded)
+        load_vss_if_indexed(conn)
+        ensure_source_documents_table(conn)
+        ensure_chunk_columns(conn)
+        # Databases built before doc IDs were stored: derive them from the rows.
+        # Their chunk hashes stay empty (the embedded text is not stored), so
+        # those embeddings are not reused.
+        conn.execute("""
+            UPDATE documents
+            SET doc_id = json_extract_string(metadata_, '$.ref_doc_id')
+            WHERE doc_id IS NULL
+        """)
+
+        changed, replaced_doc_ids, removed_doc_ids, removed = plan_file_changes(
+            conn, files
+        )
+        stats = {
+            "files_unchanged": len(files) - len(changed),
+            "files_changed": len(changed),
+            "files_removed": removed,
+            "chunks_reused": 0,
+            "chunks_embedded": 0,
+            "chunks_deleted": 0,
+        }
+        if not changed and not removed_doc_ids:
+            return stats
+
+        if verbose:
+            print(
+                f"{len(changed)} new or changed file(s), {removed} deleted file(s), "
+                f"{stats['files_unchanged']} unchanged"
+            )
+
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            stats["chunks_deleted"] = delete_documents(conn, removed_doc_ids)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if changed:
+            if verbose:
+                print(
+                    f"Embedding {len(changed)} file(s) in batches of {batch_size} "
+                    f"chunks ({workers} worker process(es))..."
+                )
+            written = embed_and_write(
+                conn,
+                iter_chunked_files(changed, chunk_options, workers=workers),
+                embed_model,
+                replaced_doc_ids=replaced_doc_ids,
+                batch_size=batch_size,
+                verbose=verbose,
+                on_embed_error=on_embed_error,
+            )
+            stats["chunks_reused"] = written["chunks_reused"]
+            stats["chunks_embedded"] = written["chunks_embedded"]
+            stats["chunks_deleted"] += written["chunks_deleted"]
+
+        if verbose:
+            print(
+                f"✓ Embedded {stats['chunks_embedded']} chunk(s), reused "
+                f"{stats['chunks_reused']}, removed {stats['chunks_deleted']}"
+            )
+        return stats
+
+    finally:
+        conn.close()
@@ -5,10 +5,14 @@ Metadata creation and storage for embedding databases.
 import yaml
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any
+from typing import Any, Dict, Optional, Tuple
 
 import duckdb
 
+# llama-index metadata mode of the text chunks are embedded from: the chunk
+# text plus its embed metadata, as VectorStoreIndex embeds it
+EMBED_TEXT_MODE = "embed"
+
 
 def calculate_chunk_stats(nodes: list) -> Dict[str, Any]:
     """
@@ -44,6 +48,95 @@ def calculate_chunk_stats(nodes: list) -> Dict[str, Any]:
     }
 
 
+def calculate_source_stats(documents: list) -> Dict[str, Any]:
+    """
+    Calculate statistics about the source documents.
+
+    Args:
+        documents: List of source documents
+
+    Returns:
+        Dictionary with source document statistics
+    """
+    # Count unique source files
+    unique_files = set()
+    for doc in documents:
+        if hasattr(doc, "metadata") and doc.metadata:
+            file_path = doc.metadata.get("file_path", "")
+            if file_path:
+                unique_files.add(file_path)
+
+    return {
+        "total_documents": len(documents),
+        "unique_files": len(unique_files),
+        "total_characters": sum(
+            len(doc.text) for doc in documents if hasattr(doc, "text")
+        ),
+    }
+
+
+def calculate_db_stats(db_path: Path) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Calculate source document and chunk statistics in the database.
+
+    Same values as `calculate_source_stats` and `calculate_chunk_stats`, but
+    computed by DuckDB so the texts never have to be loaded into memory.
+
+    Args:
+        db_path: Full path to the DuckDB database file
+
+    Returns:
+        Tuple of (source document statistics, chunk statistics)
+    """
+    conn = duckdb.connect(str(db_path), read_only=True)
+
+    try:
+        total_documents, unique_files, source_characters = conn.execute("""
+            SELECT
+                count(*),
+                count(DISTINCT nullif(file_path, '')),
+                coalesce(sum(length(text)), 0)
+            FROM source_documents
+        """).fetchone()
+
+        total_chunks, min_size, max_size, total_characters = conn.execute("""
+            SELECT
+                count(*),
+                coalesce(min(length(text)), 0),
+                coalesce(max(length(text)), 0),
+                coalesce(sum(length(text)), 0)
+            FROM documents
+        """).fetchone()
+
+        # Upper median, as in calculate_chunk_stats
+        median_size = 0
+        if total_chunks:
+            median_size = conn.execute(
+                """
+                SELECT coalesce(length(text), 0) AS size FROM documents
+                ORDER BY size LIMIT 1 OFFSET ?
+            """,
+                [total_chunks // 2],
+            ).fetchone()[0]
+    finally:
+        conn.close()
+
+    source_stats = {
+        "total_documents": total_documents,
+        "unique_files": unique_files,
+        "total_characters": int(source_characters),
+    }
+    chunk_stats = {
+        "total_chunks": total_chunks,
+        "min_chunk_size": min_size,
+        "max_chunk_size": max_size,
+        "median_chunk_size": median_size,
+        "mean_chunk_size": int(total_characters) // total_chunks if total_chunks else 0,
+        "total_characters": int(total_characters),
+    }
+    return source_stats, chunk_stats
+
+
 def create_metadata(
     documents: list,
     nodes: list,
@@ -54,6 +147,9 @@ def create_metadata(
     use_markdown_chunking: bool,
     include_headers_in_chunks: bool,
     header_weight: int,
+    source_stats: Optional[Dict[str, Any]] = None,
+    chunk_stats: Optional[Dict[str, Any]] = None,
+    vector_index: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     """
     Create comprehensive metadata about the embedding preparation.
@@ -74,19 +170,19 @@ def create_metadata(
         use_markdown_chunking: Whether markdown-aware chunking was used
         include_headers_in_chunks: Whether headers were included
         header_weight: Header repetition weight
+        source_stats: Precomputed source document statistics (e.g. from
+            `calculate_db_stats`), used instead of `documents`
+        chunk_stats: Precomputed chunk statistics, used instead of `nodes`
+        vector_index: Settings of the HNSW vector index (see
+            `create_hnsw_index`), or None if vector search is an exact scan
 
     Returns:
         Dictionary with comprehensive metadata
     """
-    chunk_stats = calculate_chunk_stats(nodes)
-
-    # Count unique source files
-    unique_files = set()
-    for doc in documents:
-        if hasattr(doc, "metadata") and doc.metadata:
-            file_path = doc.metadata.get("file_path", "")
-            if file_path:
-                unique_files.add(file_path)
+    if chunk_stats is None:
+        chunk_stats = calculate_chunk_stats(nodes)
+    if source_stats is None:
+        source_stats = calculate_source_stats(documents)
 
     metadata = {
         "version": "1.0",
@@ -95,6 +191,7 @@ def create_metadata(
             "provider": embedding_provider,
             "model": embed_model_name,
             "dimensions": embed_dim,
+            "text_mode": EMBED_TEXT_MODE,
         },
         "chunking": {
             "strategy": "markdown-aware" if use_markdown_chunking else "size-based",
@@ -102,14 +199,9 @@ def create_metadata(
             "include_headers": include_headers_in_chunks,
             "header_weight": header_weight if include_headers_in_chunks else 0,
         },
-        "source_documents": {
-            "total_documents": len(documents),
-            "unique_files": len(unique_files),
-            "total_characters": sum(
-                len(doc.text) for doc in documents if hasattr(doc, "text")
-            ),
-        },
+        "source_documents": source_stats,
         "chunks": chunk_stats,
+        "vector_index": vector_index or {"type": "none"},
         "capabilities": {
             "hybrid_search": True,
             "fts_enabled": True,
@@ -120,6 +212,96 @@ def create_metadata(
     return metadata
 
 
+def flatten_metadata(metadata: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Flatten metadata into the string key-value pairs stored in the database.
+
+    Args:
+        metadata: Metadata dictionary
+
+    Returns:
+        Dictionary of metadata keys to string values
+    """
+    return {
+        "version": metadata["version"],
+        "created_at": metadata["created_at"],
+        # Embedding info
+        "embedding_provider": metadata["embedding"]["provider"],
+        "embedding_model": metadata["embedding"]["model"],
+        "embedding_dimensions": str(metadata["embedding"]["dimensions"]),
+        "embedding_text_mode": metadata["embedding"]["text_mode"],
+        # Chunking info
+        "chunking_strategy": metadata["chunking"]["strategy"],
+        "chunk_size": str(metadata["chunking"]["chunk_size"]),
+        "include_headers": str(metadata["chunking"]["include_headers"]),
+        "header_weight": str(metadata["chunking"]["header_weight"]),
+        # Document stats
+        "total_source_documents": str(metadata["source_documents"]["total_documents"]),
+        "unique_files": str(metadata["source_documents"]["unique_files"]),
+        "source_total_characters": str(
+            metadata["source_documents"]["total_characters"]
+        ),
+        # Chunk stats
+        "total_chunks": str(metadata["chunks"]["total_chunks"]),
+        "min_chunk_size": str(metadata["chunks"]["min_chunk_size"]),
+        "max_chunk_size": str(metadata["chunks"]["max_chunk_size"]),
+        "median_chunk_size": str(metadata["chunks"]["median_chunk_size"]),
+        "mean_chunk_size": str(metadata["chunks"]["mean_chunk_size"]),
+        "chunks_total_characters": str(metadata["chunks"]["total_characters"]),
+        # Vector index
+        "vector_index": metadata["vector_index"]["type"],
+        **{
+            f"hnsw_{key}": str(value)
+            for key, value in metadata["vector_index"].items()
+            if metadata["vector_index"]["type"] == "hnsw" and key != "type"
+        },
+        # Capabilities
+        "hybrid_search_enabled": str(metadata["capabilities"]["hybrid_search"]),
+        "fts_enabled": str(metadata["capabilities"]["fts_enabled"]),
+        "source_documents_stored": str(
+            metadata["capabilities"]["source_documents_stored"]
+        ),
+    }
+
+
+def read_vector_index_metadata(db_path: Path) -> Optional[Dict[str, Any]]:
+    """
+    Read the stored HNSW index settings of a database.
+
+    Args:
+        db_path: Full path to the DuckDB database file
+
+    Returns:
+        Index settings (see `create_hnsw_index`), or None if the stored
+        metadata records no HNSW index
+    """
+    conn = duckdb.connect(str(db_path), read_only=True)
+
+    try:
+        stored = dict(
+            conn.execute(
+                """
+                SELECT key, value FROM embedding_metadata
+                WHERE key = 'vector_index' OR key LIKE 'hnsw_%'
+                """
+            ).fetchall()
+        )
+    except duckdb.CatalogException:
+        return None
+    finally:
+        conn.close()
+
+    if stored.get("vector_index") != "hnsw":
+        return None
+    return {
+        "type": "hnsw",
+        "metric": stored.get("hnsw_metric", "cosine"),
+        "m": int(stored.get("hnsw_m", "0")),
+        "ef_construction": int(stored.get("hnsw_ef_construction", "0")),
+        "ef_search": int(stored.get("hnsw_ef_search", "0")),
+    }
+
+
 def store_metadata_in_db(
     db_path: Path, metadata: Dict[str, Any], verbose: bool = True
 ) -> None:
@@ -149,41 +331,7 @@ def store_metadata_in_db(
             )
         """)
 
-        # Flatten metadata for storage
-        flat_metadata = {
-            "version": metadata["version"],
-            "created_at": metadata["created_at"],
-            # Embedding info
-            "embedding_provider": metadata["embedding"]["provider"],
-            "embedding_model": metadata["embedding"]["model"],
-            "embedding_dimensions": str(metadata["embedding"]["dimensions"]),
-            # Chunking info
-            "chunking_strategy": metadata["chunking"]["strategy"],
-            "chunk_size": str(metadata["chunking"]["chunk_size"]),
-            "include_headers": str(metadata["chunking"]["include_headers"]),
-            "header_weight": str(metadata["chunking"]["header_weight"]),
-            # Document stats
-            "total_source_documents": str(
-                metadata["source_documents"]["total_documents"]
-            ),
-            "unique_files": str(metadata["source_documents"]["unique_files"]),
-            "source_total_characters": str(
-                metadata["source_documents"]["total_characters"]
-            ),
-            # Chunk stats
-            "total_chunks": str(metadata["chunks"]["total_chunks"]),
-            "min_chunk_size": str(metadata["chunks"]["min_chunk_size"]),
-            "max_chunk_size": str(metadata["chunks"]["max_chunk_size"]),
-            "median_chunk_size": str(metadata["chunks"]["median_chunk_size"]),
-            "mean_chunk_size": str(metadata["chunks"]["mean_chunk_size"]),
-            "chunks_total_characters": str(metadata["chunks"]["total_characters"]),
-            # Capabilities
-            "hybrid_search_enabled": str(metadata["capabilities"]["hybrid_search"]),
-            "fts_enabled": str(metadata["capabilities"]["fts_enabled"]),
-            "source_documents_stored": str(
-                metadata["capabilities"]["source_documents_stored"]
-            ),
-        }
+        flat_metadata = flatten_metadata(metadata)
 
         # Insert/update metadata
         for key, value in flat_metadata.items():
@@ -0,0 +1,370 @@
+"""
+Concurrent, rate-limit-aware OpenAI embedding requests.
+
+llama-index's OpenAIEmbedding sends one batch at a time. `OpenAIEmbeddingClient`
+keeps several requests in flight, paces them to a tokens-per-minute budget,
+retries rate-limited and transient failures with exponential backoff, and
+halves the request batch size when the API pushes back (growing it again after
+a run of successes). `ConcurrentOpenAIEmbedding` exposes it as a llama-index
+embedding model.
+
+Any server implementing the OpenAI `/embeddings` endpoint can be used via
+`base_url`, e.g. `scripts/mock_openai_embeddings_server.py` for local testing.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Coroutine, Deque, Dict, List, Optional, Tuple
+
+import aiohttp
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+from .tokenization import Tokenizer
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+# API limits per request
+MAX_INPUTS_PER_REQUEST = 2048
+MAX_TOKENS_PER_REQUEST = 300_000
+
+# Consecutive successful requests before the batch size is doubled again
+GROW_AFTER_SUCCESSES = 8
+# 429s from concurrent requests within this many seconds shrink the batch once
+SHRINK_INTERVAL = 1.0
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _run_sync(coro: Coroutine) -> Any:
+    """Run a coroutine from sync code, even if an event loop is already running."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    result: Dict[str, Any] = {}
+
+    def target():
+        try:
+            result["value"] = asyncio.run(coro)
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+class TokenBudget:
+    """
+    Sliding one-minute window limiting the tokens sent per minute.
+
+    A request larger than the whole budget is let through once the window is
+    empty, so it cannot block forever. Checking and recording happen without
+    an await in between, so concurrent tasks on one event loop need no lock.
+    """
+
+    def __init__(
+        self,
+        tokens_per_minute: Optional[int],
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.tokens_per_minute = tokens_per_minute
+        self._clock = clock
+        self._sent: Deque[Tuple[float, int]] = deque()
+        self._used = 0
+
+    def _expire(self, now: float) -> None:
+        while self._sent and now - self._sent[0][0] >= 60.0:
+            self._used -= self._sent.popleft()[1]
+
+    async def acquire(self, tokens: int) -> None:
+        """
+        Wait until `tokens` fit into the budget, then record them as sent.
+
+        Args:
+            tokens: Tokens about to be sent
+        """
+        if not self.tokens_per_minute:
+            return
+        while True:
+            now = self._clock()
+            self._expire(now)
+            if not self._sent or self._used + tokens <= self.tokens_per_minute:
+                self._sent.append((now, tokens))
+                self._used += tokens
+                return
+            await asyncio.sleep(60.0 - (now - self._sent[0][0]))
+
+
+class EmbeddingRequestError(RuntimeError):
+    """An embeddings request failed and was not (or no longer) retried."""
+
+    def __init__(self, status: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(
+            f"OpenAI embeddings request failed with status {status}: {message}"
+        )
+        self.status = status
+        self.retry_after = retry_after
+
+
+class OpenAIEmbeddingClient:
+    """
+    Async client for the OpenAI embeddings endpoint.
+
+    Texts passed to `embed` are split into request batches of at most
+    `batch_size` inputs (and `MAX_TOKENS_PER_REQUEST` tokens) which are sent by
+    up to `max_concurrency` concurrent workers.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        api_key: str,
+        base_url: str = DEFAULT_BASE_URL,
+        dimensions: Optional[int] = None,
+        max_concurrency: int = 4,
+        tokens_per_minute: Optional[int] = None,
+        batch_size: int = 256,
+        max_retries: int = 8,
+        max_backoff: float = 60.0,
+        timeout: float = 120.0,
+        verbose: bool = False,
+        token_counter: Optional[Callable[[List[str]], List[int]]] = None,
+    ):
+        self.model = model
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.dimensions = dimensions
+        self.max_concurrency = max(1, max_concurrency)
+        self.tokens_per_minute = tokens_per_minute
+        self.max_batch_size = max(1, min(batch_size, MAX_INPUTS_PER_REQUEST))
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.verbose = verbose
+        # Batched counter for the token budget and per-request token limit
+        self.token_counter = token_counter or Tokenizer().count
+
+        self.batch_size = self.max_batch_size
+        self._successes = 0
+        self._last_shrink = float("-inf")
+        # Shared by all calls so the budget holds across pipeline batches
+        self._budget = TokenBudget(tokens_per_minute)
+        self.stats = {"requests": 0, "retries": 0, "rate_limited": 0, "tokens": 0}
+
+    def _take_batch(self, pending: Deque[int], token_counts: List[int]) -> List[int]:
+        """Pop the next request batch (at least one text) from `pending`."""
+        batch = [pending.popleft()]
+        tokens = token_counts[batch[0]]
+        while (
+            pending
+            and len(batch) < self.batch_size
+            and tokens + token_counts[pending[0]] <= MAX_TOKENS_PER_REQUEST
+        ):
+            index = pending.popleft()
+            batch.append(index)
+            tokens += token_counts[index]
+        return batch
+
+    def _on_success(self) -> None:
+        self._successes += 1
+        if (
+            self._successes >= GROW_AFTER_SUCCESSES
+            and self.batch_size < self.max_batch_size
+        ):
+            self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+            self._successes = 0
+
+    def _on_rate_limited(self) -> None:
+        self._successes = 0
+        self.stats["rate_limited"] += 1
+        now = time.monotonic()
+        if self.batch_size > 1 and now - self._last_shrink >= SHRINK_INTERVAL:
+            self._last_shrink = now
+            self.batch_size = max(1, self.batch_size // 2)
+            if self.verbose:
+                print(f"Rate limited, reducing batch size to {self.batch_size}")
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        delay = min(self.max_backoff, 2.0**attempt) * (0.5 + random.random() / 2)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    @staticmethod
+    def _retry_after(headers) -> Optional[float]:
+        for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+            value = headers.get(header)
+            if value is not None:
+                try:
+                    return float(value) * scale
+                except ValueError:
+                    pass
+        return None
+
+    async def _post(
+        self, session: aiohttp.ClientSession, texts: List[str]
+    ) -> List[List[float]]:
+        payload: Dict[str, Any] = {
+            "model": self.model,
+            "input": texts,
+            "encoding_format": "float",
+        }
+        if self.dimensions is not None:
+            payload["dimensions"] = self.dimensions
+
+        async with session.post(f"{self.base_url}/embeddings", json=payload) as resp:
+            if resp.status != 200:
+                message = await resp.text()
+                try:
+                    message = (await resp.json())["error"]["message"]
+                except Exception:
+                    pass
+                raise EmbeddingRequestError(
+                    resp.status, message, self._retry_after(resp.headers)
+                )
+            data = (await resp.json())["data"]
+        return [item["embedding"] for item in sorted(data, key=lambda d: d["index"])]
+
+    async def _worker(
+        self,
+        session: aiohttp.ClientSession,
+        budget: TokenBudget,
+        texts: List[str],
+        token_counts: List[int],
+        pending: Deque[int],
+        results: List[Optional[List[float]]],
+    ) -> None:
+        while pending:
+            batch = self._take_batch(pending, token_counts)
+            attempt = 0
+            while True:
+                tokens = sum(token_counts[i] for i in batch)
+                await budget.acquire(tokens)
+                self.stats["requests"] += 1
+                try:
+                    vectors = await self._post(session, [texts[i] for i in batch])
+                except (
+                    EmbeddingRequestError,
+                    aiohttp.ClientConnectionError,
+                    asyncio.TimeoutError,
+                ) as e:
+                    status = getattr(e, "status", None)
+                    if status is not None and status not in RETRY_STATUSES:
+                        raise
+                    if attempt >= self.max_retries:
+                        raise
+                    if status == 429:
+                        self._on_rate_limited()
+                        # Give back what no longer fits the smaller batch size
+                        while len(batch) > self.batch_size:
+                            pending.appendleft(batch.pop())
+                    self.stats["retries"] += 1
+                    await asyncio.sleep(
+                        self._backoff(attempt, getattr(e, "retry_after", None))
+                    )
+                    attempt += 1
+                    continue
+
+                for index, vector in zip(batch, vectors, strict=True):
+                    results[index] = vector
+                self.stats["tokens"] += tokens
+                self._on_success()
+                break
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts with concurrent, rate-limited requests.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One embedding per text, in input order
+
+        Raises:
+            EmbeddingRequestError: If a request fails with a non-retryable
+                status or still fails after `max_retries` retries
+        """
+        if not texts:
+            return []
+        token_counts = self.token_counter(texts)
+        pending: Deque[int] = deque(range(len(texts)))
+        results: List[Optional[List[float]]] = [None] * len(texts)
+
+        async with aiohttp.ClientSession(
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        ) as session:
+            workers = [
+                asyncio.create_task(
+                    self._worker(
+                        session, self._budget, texts, token_counts, pending, results
+                    )
+                )
+                for _ in range(min(self.max_concurrency, len(texts)))
+            ]
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+        return results
+
+    def embed_sync(self, texts: List[str]) -> List[List[float]]:
+        """Synchronous version of `embed`."""
+        return _run_sync(self.embed(texts))
+
+
+class ConcurrentOpenAIEmbedding(BaseEmbedding):
+    """
+    llama-index embedding model backed by `OpenAIEmbeddingClient`.
+
+    llama-index hands it up to `embed_batch_size` texts per call; those are
+    fanned out into concurrent API requests.
+    """
+
+    _client: OpenAIEmbeddingClient = PrivateAttr()
+
+    def __init__(self, client: OpenAIEmbeddingClient):
+        super().__init__(
+            model_name=client.model, embed_batch_size=MAX_INPUTS_PER_REQUEST
+        )
+        self._client = client
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ConcurrentOpenAIEmbedding"
+
+    @property
+    def request_stats(self) -> Dict[str, int]:
+        """Requests sent, retries, rate-limited responses and tokens embedded."""
+        return dict(self._client.stats)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._client.embed_sync(texts)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return await self._client.embed(texts)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._get_text_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return await self._aget_text_embedding(query)
@@ -0,0 +1,122 @@
+"""
+Multi-process document loading and chunking.
+"""
+
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from llama_index.core import SimpleDirectoryReader
+
+from .chunking import chunk_documents
+from .hashing import file_key, hash_file
+
+# Tasks queued per worker; bounds how many parsed files wait in memory
+TASKS_PER_WORKER = 2
+MAX_FILES_PER_TASK = 32
+
+
+def visible_files(files: List[Path], input_path: Path) -> List[Path]:
+    """
+    Drop files in hidden directories or with hidden names.
+
+    SimpleDirectoryReader skips them when given a directory; this keeps
+    explicit file lists consistent with that.
+
+    Args:
+        files: Files found under `input_path`
+        input_path: Input directory
+
+    Returns:
+        Files without hidden path components (relative to `input_path`)
+    """
+    return [
+        path
+        for path in files
+        if not any(part.startswith(".") for part in path.relative_to(input_path).parts)
+    ]
+
+
+def load_and_chunk_files(
+    paths: List[str], chunk_options: Dict[str, Any]
+) -> Tuple[list, list, Dict[str, str]]:
+    """
+    Load the given markdown files and split them into chunk nodes.
+
+    Runs in worker processes, so it only takes picklable arguments. Files are
+    hashed before they are parsed: if one changes in between, the stored hash
+    is stale and the next incremental run picks the file up again.
+
+    Args:
+        paths: File paths to load
+        chunk_options: Keyword arguments for `chunk_documents` (except verbose)
+
+    Returns:
+        Tuple of (documents, nodes, SHA-256 of each file keyed by `file_key`)
+    """
+    file_hashes = {file_key(path): hash_file(Path(path)) for path in paths}
+    documents = SimpleDirectoryReader(input_files=paths).load_data()
+    nodes = chunk_documents(documents, verbose=False, **chunk_options)
+    return documents, nodes, file_hashes
+
+
+def iter_chunked_files(
+    files: List[Path],
+    chunk_options: Dict[str, Any],
+    workers: int = 1,
+    files_per_task: Optional[int] = None,
+) -> Iterator[Tuple[list, list, Dict[str, str]]]:
+    """
+    Load and chunk files in groups, yielding (documents, nodes, file_hashes)
+    per group (see `load_and_chunk_files`).
+
+    With `workers > 1` groups are parsed in a process pool while the caller
+    consumes earlier results (e.g. embeds them), and only a few groups per
+    worker are in flight at a time so memory stays bounded. Results are
+    yielded in file order.
+
+    Args:
+        files: Markdown files to process
+        chunk_options: Keyword arguments for `chunk_documents` (except verbose)
+        workers: Number of worker processes (1 = parse in this process)
+        files_per_task: Files per group. Defaults to a size that gives each
+            worker several groups.
+
+    Returns:
+        Iterator of (documents, nodes, file_hashes) tuples
+    """
+    if files_per_task is None:
+        files_per_task = max(
+            1, min(MAX_FILES_PER_TASK, len(files) // (max(1, workers) * 4))
+        )
+    groups = [
+        [str(path) for path in files[i : i + files_per_task]]
+        for i in range(0, len(files), files_per_task)
+    ]
+
+    if workers <= 1:
+        for group in groups:
+            yield load_and_chunk_files(group, chunk_options)
+        return
+
+    # "spawn" so workers don't inherit the embedding model or its threads
+    pool = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    )
+    try:
+        remaining = iter(groups)
+        pending = deque()
+        for group in remaining:
+            pending.append(pool.submit(load_and_chunk_files, group, chunk_options))
+            if len(pending) >= workers * TASKS_PER_WORKER:
+                break
+        while pending:
+            result = pending.popleft().result()
+            group = next(remaining, None)
+            if group is not None:
+                pending.append(pool.submit(load_and_chunk_files, group, chunk_options))
+            yield result
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
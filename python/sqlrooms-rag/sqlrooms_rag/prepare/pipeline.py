@@ -0,0 +1,284 @@
+"""
+Streaming embed-and-write pipeline.
+
+Chunks arrive in groups of files (see `iter_chunked_files`), are embedded in
+fixed-size batches and appended to the `documents` table as each batch
+completes. A file's `source_documents` rows, including its content hash, are
+committed in the same transaction as its chunks, so they double as the
+checkpoint: an interrupted run resumes by skipping files whose hash is
+already stored.
+
+Chunks are embedded with their embed metadata (e.g. file path and headers),
+as llama-index's `VectorStoreIndex` does, and `chunk_hash` is the hash of
+that embedded text, so a stored embedding is only reused for identical input.
+"""
+
+import json
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import duckdb
+import pyarrow as pa
+from llama_index.core.schema import MetadataMode
+from llama_index.core.vector_stores.utils import node_to_metadata_dict
+
+from .database import ensure_chunk_columns, insert_source_documents
+from .hashing import file_key, hash_text
+from .metadata import EMBED_TEXT_MODE
+
+# Chunks embedded and written per transaction
+BATCH_SIZE = 2048
+
+# Text each chunk is embedded from (recorded in the database metadata)
+EMBED_METADATA_MODE = MetadataMode(EMBED_TEXT_MODE)
+
+
+def ensure_documents_table(conn: duckdb.DuckDBPyConnection, embed_dim: int) -> None:
+    """
+    Create the chunks table if needed.
+
+    Uses the layout of llama-index's DuckDBVectorStore (so the database can be
+    opened with `DuckDBVectorStore.from_local`) plus `doc_id` and `chunk_hash`.
+
+    Args:
+        conn: Open DuckDB connection
+        embed_dim: Embedding dimension
+    """
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS documents (
+            node_id VARCHAR,
+            text TEXT,
+            embedding FLOAT[{int(embed_dim)}],
+            metadata_ JSON
+        )
+    """)
+    ensure_chunk_columns(conn)
+
+
+def stored_embeddings(
+    conn: duckdb.DuckDBPyConnection, chunk_hashes: List[str]
+) -> Dict[str, list]:
+    """
+    Embeddings already stored for the given chunk hashes.
+
+    Args:
+        conn: Open DuckDB connection
+        chunk_hashes: SHA-256 hashes of chunk texts
+
+    Returns:
+        Dictionary of chunk hash to embedding for the hashes that were found
+    """
+    if not chunk_hashes:
+        return {}
+    rows = conn.execute(
+        """
+        SELECT chunk_hash, any_value(embedding)
+        FROM documents
+        WHERE chunk_hash IN (SELECT unnest(?::VARCHAR[]))
+        GROUP BY chunk_hash
+    """,
+        [chunk_hashes],
+    ).fetchall()
+    return dict(rows)
+
+
+def insert_chunks(
+    conn: duckdb.DuckDBPyConnection,
+    nodes: list,
+    texts: List[str],
+    hashes: List[str],
+    vectors: list,
+) -> None:
+    """
+    Append chunk rows (one bulk insert through an Arrow table).
+
+    Args:
+        conn: Open DuckDB connection
+        nodes: llama-index nodes
+        texts: Text of each node (without metadata)
+        hashes: SHA-256 of the text each node was embedded from
+        vectors: Embedding of each node
+    """
+    embedding_type = conn.execute("""
+        SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'documents' AND column_name = 'embedding'
+    """).fetchone()[0]
+
+    table = pa.table(
+        {
+            "node_id": pa.array([node.node_id for node in nodes], type=pa.string()),
+            "text": pa.array(texts, type=pa.string()),
+            "embedding": pa.array(vectors, type=pa.list_(pa.float32())),
+            "metadata_": pa.array(
+                [
+                    json.dumps(
+                        node_to_metadata_dict(
+                            node, remove_text=True, flat_metadata=False
+                        )
+                    )
+                    for node in nodes
+                ],
+                type=pa.string(),
+            ),
+            "doc_id": pa.array([node.ref_doc_id for node in nodes], type=pa.string()),
+            "chunk_hash": pa.array(hashes, type=pa.string()),
+        }
+    )
+    conn.register("new_chunks", table)
+    try:
+        conn.execute(f"""
+            INSERT INTO documents
+                (node_id, text, embedding, metadata_, doc_id, chunk_hash)
+            SELECT node_id, text, embedding::{embedding_type}, metadata_::JSON,
+                   doc_id, chunk_hash
+            FROM new_chunks
+        """)
+    finally:
+        conn.unregister("new_chunks")
+
+
+def delete_documents(conn: duckdb.DuckDBPyConnection, doc_ids: List[str]) -> int:
+    """
+    Delete source documents and their chunks.
+
+    Args:
+        conn: Open DuckDB connection
+        doc_ids: Source document IDs
+
+    Returns:
+        Number of chunks deleted
+    """
+    if not doc_ids:
+        return 0
+    deleted = conn.execute(
+        "SELECT count(*) FROM documents WHERE doc_id IN (SELECT unnest(?::VARCHAR[]))",
+        [doc_ids],
+    ).fetchone()[0]
+    for table in ("documents", "source_documents"):
+        conn.execute(
+            f"DELETE FROM {table} WHERE doc_id IN (SELECT unnest(?::VARCHAR[]))",
+            [doc_ids],
+        )
+    return deleted
+
+
+def embed_and_write(
+    conn: duckdb.DuckDBPyConnection,
+    groups: Iterable[Tuple[list, list, Dict[str, str]]],
+    embed_model,
+    replaced_doc_ids: Optional[Dict[str, List[str]]] = None,
+    batch_size: int = BATCH_SIZE,
+    verbose: bool = True,
+    on_embed_error: Optional[Callable[[Exception, list], None]] = None,
+) -> Dict[str, int]:
+    """
+    Embed chunks in batches and append them to the database as they complete.
+
+    Each batch covers whole files: their chunks, their `source_documents` rows
+    and the removal of the rows they replace are committed in one transaction.
+    Chunks whose embedded text is already stored reuse that embedding instead
+    of being embedded again. Only about one batch is held in memory at a time.
+
+    Args:
+        conn: Open DuckDB connection (tables must exist)
+        groups: Iterable of (documents, nodes, file_hashes), e.g. from
+            `iter_chunked_files`
+        embed_model: llama-index embedding model
+        replaced_doc_ids: Doc IDs to delete when a file is written, keyed by
+            `file_key(file_path)` (previous version of a changed file)
+        batch_size: Chunks per batch
+        verbose: Whether to print progress messages
+        on_embed_error: Called with the exception and the batch's nodes if
+            embedding fails (the exception is re-raised afterwards)
+
+    Returns:
+        Dictionary with chunk and file counts
+    """
+    replaced_doc_ids = replaced_doc_ids or {}
+    stats = {
+        "files_written": 0,
+        "chunks_embedded": 0,
+        "chunks_reused": 0,
+        "chunks_deleted": 0,
+    }
+    pending_documents: list = []
+    pending_nodes: list = []
+    pending_file_hashes: Dict[str, str] = {}
+
+    def flush():
+        if not pending_documents:
+            return
+        texts = [
+            node.get_content(metadata_mode=MetadataMode.NONE) for node in pending_nodes
+        ]
+        embed_texts = [
+            node.get_content(metadata_mode=EMBED_METADATA_MODE)
+            for node in pending_nodes
+        ]
+        hashes = [hash_text(text) for text in embed_texts]
+        embeddings = stored_embeddings(conn, sorted(set(hashes)))
+        reused = sum(1 for chunk_hash in hashes if chunk_hash in embeddings)
+
+        # Embed each distinct new text once
+        missing: Dict[str, str] = {}
+        for text, chunk_hash in zip(embed_texts, hashes, strict=True):
+            if chunk_hash not in embeddings:
+                missing.setdefault(chunk_hash, text)
+        try:
+            vectors = (
+                embed_model.get_text_embedding_batch(list(missing.values()))
+                if missing
+                else []
+            )
+        except Exception as e:
+            if on_embed_error is not None:
+                on_embed_error(e, pending_nodes)
+            raise
+        embeddings.update(zip(missing.keys(), vectors, strict=True))
+
+        file_keys = {
+            file_key(doc.metadata.get("file_path", "")) for doc in pending_documents
+        }
+        stale = [
+            doc_id for key in file_keys for doc_id in replaced_doc_ids.get(key, [])
+        ]
+
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            stats["chunks_deleted"] += delete_documents(conn, stale)
+            insert_source_documents(conn, pending_documents, pending_file_hashes)
+            if pending_nodes:
+                insert_chunks(
+                    conn,
+                    pending_nodes,
+                    texts,
+                    hashes,
+                    [embeddings[chunk_hash] for chunk_hash in hashes],
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        stats["files_written"] += len(file_keys)
+        stats["chunks_embedded"] += len(missing)
+        stats["chunks_reused"] += reused
+        if verbose:
+            print(
+                f"✓ Wrote {stats['chunks_embedded'] + stats['chunks_reused']} chunks "
+                f"from {stats['files_written']} file(s) "
+                f"({stats['chunks_embedded']} embedded, "
+                f"{stats['chunks_reused']} reused)"
+            )
+        pending_documents.clear()
+        pending_nodes.clear()
+        pending_file_hashes.clear()
+
+    for documents, nodes, file_hashes in groups:
+        pending_documents.extend(documents)
+        pending_nodes.extend(nodes)
+        pending_file_hashes.update(file_hashes)
+        if len(pending_nodes) >= batch_size:
+            flush()
+    flush()
+
+    return stats
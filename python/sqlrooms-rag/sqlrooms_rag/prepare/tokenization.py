@@ -0,0 +1,230 @@
+"""
+Token counting and token-accurate text splitting.
+
+Chunk limits are expressed in tokens of the embedding model, so they are best
+measured with that model's tokenizer: the HuggingFace tokenizer for local
+models, tiktoken encodings for OpenAI. `Tokenizer` itself is the fallback
+estimate (about 3 characters per token) used when neither is available.
+"""
+
+import warnings
+from functools import lru_cache
+from typing import List, Optional
+
+
+class Tokenizer:
+    """
+    Conservative estimate of about 3 characters per token.
+
+    Subclasses count with a real tokenizer and set `exact = True`. Counting
+    takes a list of texts so implementations can tokenize in one batch.
+    """
+
+    name = "estimate (3 chars/token)"
+    exact = False
+
+    def count(self, texts: List[str]) -> List[int]:
+        """
+        Count tokens of each text.
+
+        Args:
+            texts: Texts to count
+
+        Returns:
+            Token count per text
+        """
+        return [len(text) // 3 for text in texts]
+
+    def token_starts(self, text: str) -> List[int]:
+        """
+        Character offset at which each token of `text` starts.
+
+        Args:
+            text: Text to tokenize
+
+        Returns:
+            One start offset per token, in increasing order
+        """
+        return list(range(0, len(text), 3))
+
+    def encode(self, text: str) -> list:
+        """Token IDs of `text` (for llama-index's `tokenizer` arguments)."""
+        return self.token_starts(text)
+
+
+class HuggingFaceTokenizer(Tokenizer):
+    """Tokenizer of a HuggingFace embedding model (fast tokenizers only)."""
+
+    exact = True
+
+    def __init__(self, model_name: str):
+        from transformers import AutoTokenizer
+
+        self.name = model_name
+        self._tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+        if not self._tokenizer.is_fast:
+            raise ValueError(f"No fast tokenizer available for {model_name}")
+        # We only count; don't warn about texts longer than the model accepts
+        self._tokenizer.model_max_length = 1 << 62
+
+    def count(self, texts: List[str]) -> List[int]:
+        if not texts:
+            return []
+        encoded = self._tokenizer(
+            texts,
+            add_special_tokens=False,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+        )
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def token_starts(self, text: str) -> List[int]:
+        encoded = self._tokenizer(
+            text,
+            add_special_tokens=False,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            return_offsets_mapping=True,
+        )
+        return [start for start, _ in encoded["offset_mapping"]]
+
+    def encode(self, text: str) -> list:
+        return self._tokenizer.encode(text, add_special_tokens=False)
+
+
+class TiktokenTokenizer(Tokenizer):
+    """tiktoken encoding used by an OpenAI embedding model."""
+
+    exact = True
+
+    def __init__(self, model_name: str):
+        import tiktoken
+
+        try:
+            self._encoding = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            # Unknown model name: all current OpenAI embedding models use cl100k
+            self._encoding = tiktoken.get_encoding("cl100k_base")
+        self.name = self._encoding.name
+
+    def count(self, texts: List[str]) -> List[int]:
+        if not texts:
+            return []
+        return [len(ids) for ids in self._encoding.encode_ordinary_batch(texts)]
+
+    def token_starts(self, text: str) -> List[int]:
+        _, starts = self._encoding.decode_with_offsets(
+            self._encoding.encode_ordinary(text)
+        )
+        return starts
+
+    def encode(self, text: str) -> list:
+        return self._encoding.encode_ordinary(text)
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(provider: str, model_name: Optional[str] = None) -> Tokenizer:
+    """
+    Tokenizer matching an embedding model (loaded once per process).
+
+    Falls back to the 3 chars/token estimate, with a warning, if the model's
+    tokenizer cannot be loaded.
+
+    Args:
+        provider: "huggingface" or "openai"
+        model_name: Embedding model name (provider default if None)
+
+    Returns:
+        Tokenizer instance
+    """
+    if model_name is None:
+        model_name = (
+            "BAAI/bge-small-en-v1.5"
+            if provider == "huggingface"
+            else "text-embedding-3-small"
+        )
+    try:
+        if provider == "huggingface":
+            return HuggingFaceTokenizer(model_name)
+        if provider == "openai":
+            return TiktokenTokenizer(model_name)
+    except Exception as e:
+        warnings.warn(
+            f"Could not load tokenizer for {model_name}, estimating 3 characters "
+            f"per token instead: {e}",
+            stacklevel=2,
+        )
+    return Tokenizer()
+
+
+def split_at_tokens(text: str, max_tokens: int, tokenizer: Tokenizer) -> List[str]:
+    """
+    Cut text into consecutive pieces of at most `max_tokens` tokens.
+
+    Args:
+        text: Text to split
+        max_tokens: Maximum tokens per piece
+        tokenizer: Tokenizer to measure with
+
+    Returns:
+        Pieces that concatenate back to `text`
+    """
+    starts = tokenizer.token_starts(text)
+    cuts = [starts[i] for i in range(max_tokens, len(starts), max_tokens)]
+    bounds = [0, *cuts, len(text)]
+    return [
+        text[start:end]
+        for start, end in zip(bounds[:-1], bounds[1:], strict=True)
+        if start < end
+    ]
+
+
+def split_text(text: str, max_tokens: int, tokenizer: Tokenizer) -> List[str]:
+    """
+    Split text into pieces of at most `max_tokens` tokens, packed greedily.
+
+    Sentences are kept together and packed into pieces as close to the limit
+    as possible; a sentence that alone exceeds the limit is cut at token
+    boundaries. All sentences are counted in one batch.
+
+    Args:
+        text: Text to split
+        max_tokens: Maximum tokens per piece
+        tokenizer: Tokenizer to measure with
+
+    Returns:
+        Non-empty pieces, stripped of surrounding whitespace
+    """
+    parts = text.split(". ")
+    sentences = [part + ". " for part in parts[:-1]] + [parts[-1]]
+    counts = tokenizer.count(sentences)
+
+    pieces: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for sentence, tokens in zip(sentences, counts, strict=True):
+        if tokens > max_tokens:
+            if current:
+                pieces.append("".join(current))
+                current, current_tokens = [], 0
+            pieces.extend(split_at_tokens(sentence, max_tokens, tokenizer))
+            continue
+        if current and current_tokens + tokens > max_tokens:
+            pieces.append("".join(current))
+            current, current_tokens = [], 0
+        current.append(sentence)
+        current_tokens += tokens
+    if current:
+        pieces.append("".join(current))
+
+    pieces = [piece.strip() for piece in pieces]
+    pieces = [piece for piece in pieces if piece]
+
+    # Tokens can merge across sentence boundaries; re-check the packed pieces
+    result: List[str] = []
+    for piece, tokens in zip(pieces, tokenizer.count(pieces), strict=True):
+        if tokens > max_tokens:
+            result.extend(split_at_tokens(piece, max_tokens, tokenizer))
+        else:
+            result.append(piece)
+    return result
@@ -4,9 +4,25 @@ Query functionality for hybrid retrieval combining vector similarity and full-te
 
 import duckdb
 import json
-from typing import List, Dict, Any, Optional, Tuple
+import threading
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+import numpy as np
+import pyarrow as pa
 from sentence_transformers import SentenceTransformer
 
+from .prepare.database import has_hnsw_index
+
+# Name under which a batch of queries is registered on a cursor
+QUERY_BATCH_VIEW = "query_batch"
+
+# BM25 parameters and stemmer of the FTS index (match_bm25 defaults, see
+# prepare.database.create_fts_index)
+BM25_K = 1.2
+BM25_B = 0.75
+FTS_STEMMER = "porter"
+
 
 def get_embedding_metadata(
     db_path: str = "generated-embeddings/sqlrooms_docs.duckdb",
@@ -19,6 +35,7 @@ def get_embedding_metadata(
     - Embedding dimensions
     - Chunking strategy and parameters
     - Document and chunk statistics
+    - Vector index (HNSW settings, if built)
     - Available capabilities (hybrid search, FTS, etc.)
 
     Args:
@@ -35,7 +52,7 @@ def get_embedding_metadata(
     try:
         # Check if metadata table exists
         tables = conn.execute(
-            "SELECT name FROM information_schema.tables WHERE table_name = 'embedding_metadata'"
+            "SELECT table_name FROM information_schema.tables WHERE table_name = 'embedding_metadata'"
         ).fetchall()
 
         if not tables:
@@ -86,6 +103,12 @@ def get_embedding_metadata(
                     flat_metadata.get("chunks_total_characters", "0")
                 ),
             },
+            "vector_index": {
+                "type": flat_metadata.get("vector_index", "none"),
+                "m": int(flat_metadata.get("hnsw_m", "0")),
+                "ef_construction": int(flat_metadata.get("hnsw_ef_construction", "0")),
+                "ef_search": int(flat_metadata.get("hnsw_ef_search", "0")),
+            },
             "capabilities": {
                 "hybrid_search": flat_metadata.get(
                     "hybrid_search_enabled", "false"
@@ -150,6 +173,26 @@ def validate_embedding_model(
     return True
 
 
+def _source_document(
+    doc_id: str, file_path: str, file_name: str, text: str, metadata: Any
+) -> Dict[str, Any]:
+    """Format a source_documents row as a dictionary."""
+    # Parse JSON metadata
+    if isinstance(metadata, str):
+        try:
+            metadata = json.loads(metadata)
+        except (json.JSONDecodeError, ValueError):
+            metadata = {}
+
+    return {
+        "doc_id": doc_id,
+        "file_path": file_path,
+        "file_name": file_name,
+        "text": text,
+        "metadata": metadata,
+    }
+
+
 def get_source_documents(
     chunk_ids: List[str], db_path: str = "generated-embeddings/sqlrooms_docs.duckdb"
 ) -> List[Dict[str, Any]]:
@@ -195,27 +238,7 @@ def get_source_documents(
         """
         results = conn.execute(query, doc_ids).fetchall()
 
-        # Format results
-        documents = []
-        for doc_id, file_path, file_name, text, metadata in results:
-            # Parse JSON metadata
-            if isinstance(metadata, str):
-                try:
-                    metadata = json.loads(metadata)
-                except (json.JSONDecodeError, ValueError):
-                    metadata = {}
-
-            documents.append(
-                {
-                    "doc_id": doc_id,
-                    "file_path": file_path,
-                    "file_name": file_name,
-                    "text": text,
-                    "metadata": metadata,
-                }
-            )
-
-        return documents
+        return [_source_document(*row) for row in results]
 
     finally:
         conn.close()
@@ -249,255 +272,794 @@ def reciprocal_rank_fusion(
     return sorted(rrf_scores.items(), key=lambda x: x[1], reverse=True)
 
 
-def hybrid_query(
-    query_text: str,
-    db_path: str = "generated-embeddings/sqlrooms_docs.duckdb",
-    model_name: str = "BAAI/bge-small-en-v1.5",
-    top_k: int = 5,
-    vector_weight: float = 0.5,
-    use_rrf: bool = True,
-    vector_top_k: Optional[int] = None,
-    fts_top_k: Optional[int] = None,
-    include_source_docs: bool = False,
-    verbose: bool = False,
+def _fuse_rrf(
+    vector_results: List[Tuple], fts_results: List[Tuple], top_k: int
 ) -> List[Dict[str, Any]]:
-    """
-    Query using hybrid retrieval: combines vector similarity and full-text search.
+    """Combine (node_id, text, metadata, score) rows by Reciprocal Rank Fusion."""
+    vector_ranking = [r[0] for r in vector_results]  # node_ids in order
+    fts_ranking = [r[0] for r in fts_results]
+
+    rrf_scores = reciprocal_rank_fusion([vector_ranking, fts_ranking])
+
+    # Map node_id -> (text, metadata) for the top results
+    result_map = {}
+    for node_id, text, metadata, _ in vector_results + fts_results:
+        if node_id not in result_map:
+            result_map[node_id] = (text, metadata)
+
+    return [
+        {
+            "node_id": node_id,
+            "text": result_map[node_id][0],
+            "metadata": result_map[node_id][1],
+            "score": rrf_score,
+            "score_type": "rrf",
+        }
+        for node_id, rrf_score in rrf_scores[:top_k]
+    ]
 
-    This approach leverages both:
-    - Semantic similarity (vector search) for conceptual matches
-    - Keyword matching (FTS) for exact terms, acronyms, code snippets
 
-    Args:
-        query_text: The search query
-        db_path: Path to the DuckDB database
-        model_name: Embedding model name (must match preparation model)
-        top_k: Number of final results to return
-        vector_weight: Weight for vector scores vs FTS (only used if use_rrf=False)
-        use_rrf: Use Reciprocal Rank Fusion instead of weighted score combination
-        vector_top_k: Number of results from vector search (default: 2*top_k)
-        fts_top_k: Number of results from FTS search (default: 2*top_k)
-        include_source_docs: If True, fetch and include full source documents
-        verbose: Print detailed progress information
+def _fuse_weighted(
+    vector_results: List[Tuple],
+    fts_results: List[Tuple],
+    top_k: int,
+    vector_weight: float,
+) -> List[Dict[str, Any]]:
+    """Combine (node_id, text, metadata, score) rows by weighted normalized scores."""
 
-    Returns:
-        List of result dictionaries with keys: node_id, text, metadata, score
-        If include_source_docs=True, also includes: source_doc (full document dict)
+    # Normalize scores to 0-1 range for each system
+    def normalize_scores(results):
+        if not results:
+            return []
+        scores = [r[3] for r in results]
+        min_score = min(scores)
+        max_score = max(scores)
+        score_range = max_score - min_score
+        if score_range == 0:
+            return [(r[0], r[1], r[2], 1.0) for r in results]
+        return [(r[0], r[1], r[2], (r[3] - min_score) / score_range) for r in results]
+
+    # Combine scores
+    combined = {}
+    for node_id, text, metadata, score in normalize_scores(vector_results):
+        combined[node_id] = {
+            "text": text,
+            "metadata": metadata,
+            "score": score * vector_weight,
+        }
 
-    Raises:
-        RuntimeError: If FTS index doesn't exist (created automatically during prepare_embeddings)
-    """
-    # Default to fetching more results from each system than final top_k
-    if vector_top_k is None:
-        vector_top_k = max(top_k * 2, 10)
-    if fts_top_k is None:
-        fts_top_k = max(top_k * 2, 10)
+    for node_id, text, metadata, score in normalize_scores(fts_results):
+        if node_id in combined:
+            combined[node_id]["score"] += score * (1 - vector_weight)
+        else:
+            combined[node_id] = {
+                "text": text,
+                "metadata": metadata,
+                "score": score * (1 - vector_weight),
+            }
+
+    # Sort by combined score and take top_k
+    sorted_results = sorted(
+        combined.items(), key=lambda x: x[1]["score"], reverse=True
+    )[:top_k]
+
+    return [
+        {
+            "node_id": node_id,
+            "text": data["text"],
+            "metadata": data["metadata"],
+            "score": data["score"],
+            "score_type": "weighted",
+        }
+        for node_id, data in sorted_results
+    ]
 
-    # Load embedding model
-    if verbose:
-        print(f"Loading embedding model: {model_name}...")
-    model = SentenceTransformer(model_name)
 
-    # Generate query embedding
-    if verbose:
-        print(f"Generating embedding for query: '{query_text}'")
-    query_embedding = model.encode(query_text).tolist()
+class HybridRetriever:
+    """
+    Long-lived hybrid retriever over one embeddings database.
 
-    # Connect to database
-    conn = duckdb.connect(db_path, read_only=True)
+    Loads the embedding model and opens a read-only DuckDB connection (with the
+    FTS extension loaded) once, and parses the search statements once, so each
+    query only pays for encoding the question and running the searches. Use
+    one instance for many queries, e.g. in a server or an evaluation loop.
 
-    try:
-        # Load FTS extension
-        conn.execute("INSTALL fts; LOAD fts;")
+    Queries may be issued concurrently from several threads: each thread gets
+    its own cursor on the shared connection.
 
-        # 1. Vector similarity search
-        if verbose:
-            print(f"Running vector similarity search (top {vector_top_k})...")
+    If the database has an HNSW index (`prepare_embeddings(hnsw_index=True)`),
+    vector search is answered from it (approximate) instead of scanning every
+    chunk; pass `use_vector_index=False` for exact search.
 
-        vector_query = """
-            SELECT 
-                node_id,
-                text,
-                metadata_,
-                array_cosine_similarity(embedding, ?::FLOAT[384]) as score
-            FROM documents
-            ORDER BY score DESC
-            LIMIT ?
-        """
-        vector_results = conn.execute(
-            vector_query, [query_embedding, vector_top_k]
-        ).fetchall()
+    Example:
+        with HybridRetriever("generated-embeddings/docs.duckdb") as retriever:
+            results = retriever.query("How do I use DuckDB arrays?")
+    """
 
-        if verbose:
-            print(f"  Found {len(vector_results)} vector results")
+    def __init__(
+        self,
+        db_path: str = "generated-embeddings/sqlrooms_docs.duckdb",
+        model_name: str = "BAAI/bge-small-en-v1.5",
+        model: Optional[SentenceTransformer] = None,
+        use_vector_index: bool = True,
+        ef_search: Optional[int] = None,
+        verbose: bool = False,
+    ):
+        """
+        Args:
+            db_path: Path to the DuckDB database
+            model_name: Embedding model name (must match preparation model)
+            model: Already loaded model to use instead of loading `model_name`
+            use_vector_index: Use the database's HNSW index if it has one
+            ef_search: HNSW candidate list size while searching (default: the
+                value the index was built with); higher means better recall
+            verbose: Print detailed progress information
+        """
+        self.db_path = db_path
+        self.model_name = model_name
+        self.ef_search = ef_search
+        self.verbose = verbose
 
-        # 2. Full-text search
-        if verbose:
-            print(f"Running FTS keyword search (top {fts_top_k})...")
+        if model is None:
+            if verbose:
+                print(f"Loading embedding model: {model_name}...")
+            model = SentenceTransformer(model_name)
+        self.model = model
 
+        self._conn = duckdb.connect(db_path, read_only=True)
         try:
-            # DuckDB FTS query using match_bm25 function
-            fts_query = """
-                SELECT 
+            # Load FTS extension
+            self._conn.execute("INSTALL fts; LOAD fts;")
+            self.uses_vector_index = use_vector_index and has_hnsw_index(self._conn)
+            if self.uses_vector_index:
+                if verbose:
+                    print("Using HNSW vector index")
+                self._conn.execute("INSTALL vss; LOAD vss;")
+            self._prepare_statements()
+        except Exception:
+            self._conn.close()
+            raise
+
+        self._local = threading.local()
+        self._cursors: List[duckdb.DuckDBPyConnection] = []
+        self._cursors_lock = threading.Lock()
+
+    def _prepare_statements(self) -> None:
+        """Parse the search statements once for the database's embedding type."""
+        row = self._conn.execute(
+            """
+            SELECT data_type FROM information_schema.columns
+            WHERE table_name = 'documents' AND column_name = 'embedding'
+            """
+        ).fetchone()
+        if row is None:
+            raise RuntimeError(f"No documents table with embeddings in {self.db_path}")
+        self.embedding_type = row[0]
+
+        def parse(sql: str):
+            return self._conn.extract_statements(sql)[0]
+
+        if self.uses_vector_index:
+            # The HNSW index (cosine metric) answers top-k queries ordered by
+            # array_cosine_distance; similarity is 1 - distance
+            self._vector_statement = parse(
+                f"""
+                SELECT node_id, text, metadata_, 1 - distance as score
+                FROM (
+                    SELECT
+                        node_id,
+                        text,
+                        metadata_,
+                        array_cosine_distance(
+                            embedding, ?::{self.embedding_type}
+                        ) as distance
+                    FROM documents
+                    ORDER BY distance
+                    LIMIT ?
+                )
+                """
+            )
+        else:
+            self._vector_statement = parse(
+                f"""
+                SELECT
                     node_id,
                     text,
                     metadata_,
-                    fts_main_documents.match_bm25(node_id, ?) as score
+                    array_cosine_similarity(embedding, ?::{self.embedding_type}) as score
                 FROM documents
-                WHERE fts_main_documents.match_bm25(node_id, ?) IS NOT NULL
                 ORDER BY score DESC
                 LIMIT ?
+                """
+            )
+        # Subquery so match_bm25 is evaluated once per row
+        self._fts_statement = parse(
+            """
+            SELECT node_id, text, metadata_, score
+            FROM (
+                SELECT
+                    node_id,
+                    text,
+                    metadata_,
+                    fts_main_documents.match_bm25(node_id, ?) as score
+                FROM documents
+            )
+            WHERE score IS NOT NULL
+            ORDER BY score DESC
+            LIMIT ?
+            """
+        )
+        # Top-k per query with the top-N aggregate max_by(..., k), which keeps
+        # a small heap per query; a row_number() window over the cross join
+        # would sort queries x chunks rows
+        self._vector_batch_statement = parse(
+            f"""
+            WITH top AS (
+                SELECT
+                    q.query_idx,
+                    unnest(
+                        max_by(
+                            d.node_id,
+                            array_cosine_similarity(d.embedding, q.embedding),
+                            ?
+                        )
+                    ) AS node_id
+                FROM {QUERY_BATCH_VIEW} q
+                CROSS JOIN documents d
+                GROUP BY q.query_idx
+            )
+            SELECT
+                top.query_idx,
+                d.node_id,
+                d.text,
+                d.metadata_,
+                array_cosine_similarity(d.embedding, q.embedding) as score
+            FROM top
+            JOIN documents d ON d.node_id = top.node_id
+            JOIN {QUERY_BATCH_VIEW} q ON q.query_idx = top.query_idx
+            ORDER BY top.query_idx, score DESC, d.node_id
+            """
+        )
+        # BM25 of all queries at once, computed from the FTS index tables the
+        # same way as match_bm25 (which would be evaluated per query and row)
+        self._fts_batch_statement = parse(
+            f"""
+            WITH tokens AS (
+                SELECT DISTINCT
+                    query_idx,
+                    stem(
+                        unnest(fts_main_documents.tokenize(query_text)),
+                        '{FTS_STEMMER}'
+                    ) AS term
+                FROM {QUERY_BATCH_VIEW}
+            ),
+            query_terms AS (
+                SELECT tokens.query_idx, dict.termid, dict.df
+                FROM tokens
+                JOIN fts_main_documents.dict AS dict ON dict.term = tokens.term
+            ),
+            term_tf AS (
+                SELECT termid, docid, count(*) AS tf
+                FROM fts_main_documents.terms
+                WHERE termid IN (SELECT termid FROM query_terms)
+                GROUP BY termid, docid
+            ),
+            scores AS (
+                SELECT
+                    qt.query_idx,
+                    tt.docid,
+                    sum(
+                        log((stats.num_docs - qt.df + 0.5) / (qt.df + 0.5) + 1)
+                        * (tt.tf * ({BM25_K} + 1))
+                        / (
+                            tt.tf
+                            + {BM25_K}
+                            * (1 - {BM25_B} + {BM25_B} * (docs.len / stats.avgdl))
+                        )
+                    ) AS score
+                FROM query_terms AS qt
+                JOIN term_tf AS tt ON tt.termid = qt.termid
+                JOIN fts_main_documents.docs AS docs ON docs.docid = tt.docid
+                CROSS JOIN fts_main_documents.stats AS stats
+                GROUP BY qt.query_idx, tt.docid
+            )
+            SELECT s.query_idx, d.node_id, d.text, d.metadata_, s.score
+            FROM scores AS s
+            JOIN fts_main_documents.docs AS docs ON docs.docid = s.docid
+            JOIN documents AS d ON d.node_id = docs.name
+            QUALIFY row_number() OVER (
+                PARTITION BY s.query_idx ORDER BY s.score DESC, d.node_id
+            ) <= ?
+            ORDER BY s.query_idx, s.score DESC, d.node_id
             """
-            fts_results = conn.execute(
-                fts_query, [query_text, query_text, fts_top_k]
-            ).fetchall()
+        )
+        self._source_docs_statement = parse(
+            """
+            SELECT d.node_id, s.doc_id, s.file_path, s.file_name, s.text, s.metadata_
+            FROM documents d
+            JOIN source_documents s ON s.doc_id = d.doc_id
+            WHERE d.node_id IN (SELECT unnest(?::VARCHAR[]))
+            """
+        )
+
+    def _cursor(self) -> duckdb.DuckDBPyConnection:
+        """Cursor for the calling thread (DuckDB connections are not thread-safe)."""
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None:
+            cursor = self._conn.cursor()
+            if self.uses_vector_index and self.ef_search is not None:
+                cursor.execute(f"SET hnsw_ef_search = {int(self.ef_search)}")
+            with self._cursors_lock:
+                self._cursors.append(cursor)
+            self._local.cursor = cursor
+        return cursor
+
+    def close(self) -> None:
+        """Close all cursors and the database connection."""
+        with self._cursors_lock:
+            for cursor in self._cursors:
+                cursor.close()
+            self._cursors.clear()
+        self._conn.close()
+
+    def __enter__(self) -> "HybridRetriever":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def encode(self, query_text: str) -> List[float]:
+        """
+        Embed a query with the retriever's model.
 
-            if verbose:
-                print(f"  Found {len(fts_results)} FTS results")
+        Args:
+            query_text: The search query
+
+        Returns:
+            Query embedding
+        """
+        return self.model.encode(query_text).tolist()
+
+    def vector_search(self, query_embedding: List[float], top_k: int) -> List[Tuple]:
+        """
+        Cosine-similarity search (HNSW index if used, else exact over all chunks).
+
+        Args:
+            query_embedding: Query embedding (from `encode`)
+            top_k: Number of results
+
+        Returns:
+            (node_id, text, metadata, score) rows, best first
+        """
+        return (
+            self._cursor()
+            .execute(self._vector_statement, [query_embedding, top_k])
+            .fetchall()
+        )
+
+    def fts_search(self, query_text: str, top_k: int) -> List[Tuple]:
+        """
+        BM25 keyword search.
+
+        Args:
+            query_text: The search query
+            top_k: Number of results
+
+        Returns:
+            (node_id, text, metadata, score) rows, best first
 
+        Raises:
+            RuntimeError: If the FTS index doesn't exist
+        """
+        try:
+            return (
+                self._cursor()
+                .execute(self._fts_statement, [query_text, top_k])
+                .fetchall()
+            )
         except Exception as e:
-            error_msg = str(e).lower()
-            if (
-                "fts_main_documents" in error_msg
-                or "match_bm25" in error_msg
-                or "catalog" in error_msg
-            ):
-                raise RuntimeError(
-                    "FTS index not found. Run create_fts_index(db_path) first."
-                )
+            _raise_if_missing_fts(e)
+            raise
+
+    def _run_batch(self, statement, batch: pa.Table, params: list) -> List[List[Tuple]]:
+        """Run a batch statement against `batch` registered as QUERY_BATCH_VIEW."""
+        cursor = self._cursor()
+        cursor.register(QUERY_BATCH_VIEW, batch)
+        try:
+            rows = cursor.execute(statement, params).fetchall()
+        finally:
+            cursor.unregister(QUERY_BATCH_VIEW)
+
+        results: List[List[Tuple]] = [[] for _ in range(batch.num_rows)]
+        for query_idx, *row in rows:
+            results[query_idx].append(tuple(row))
+        return results
+
+    def encode_batch(self, query_texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed several queries in batched forward passes.
+
+        Args:
+            query_texts: The search queries
+
+        Returns:
+            float32 array of shape (len(query_texts), dimensions)
+        """
+        return np.asarray(
+            self.model.encode(list(query_texts), convert_to_numpy=True),
+            dtype=np.float32,
+        )
+
+    def vector_search_batch(
+        self, query_embeddings: np.ndarray, top_k: int
+    ) -> List[List[Tuple]]:
+        """
+        Cosine-similarity search for several queries.
+
+        Exact search runs as one statement for all queries. With an HNSW index
+        each query is an index lookup instead, which the batched statement
+        could not use.
+
+        Args:
+            query_embeddings: Array of shape (queries, dimensions)
+            top_k: Number of results per query
+
+        Returns:
+            Per query, (node_id, text, metadata, score) rows, best first
+        """
+        embeddings = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+        if self.uses_vector_index:
+            return [
+                self.vector_search(embedding.tolist(), top_k)
+                for embedding in embeddings
+            ]
+        batch = pa.table(
+            {
+                "query_idx": pa.array(range(len(embeddings)), pa.int32()),
+                "embedding": pa.FixedSizeListArray.from_arrays(
+                    pa.array(embeddings.ravel()), embeddings.shape[1]
+                ),
+            }
+        )
+        return self._run_batch(self._vector_batch_statement, batch, [top_k])
+
+    def fts_search_batch(
+        self, query_texts: Sequence[str], top_k: int
+    ) -> List[List[Tuple]]:
+        """
+        BM25 keyword search for several queries in one statement.
+
+        Scores are the same as `fts_search` (match_bm25 with default
+        parameters).
+
+        Args:
+            query_texts: The search queries
+            top_k: Number of results per query
+
+        Returns:
+            Per query, (node_id, text, metadata, score) rows, best first
+
+        Raises:
+            RuntimeError: If the FTS index doesn't exist
+        """
+        batch = pa.table(
+            {
+                "query_idx": pa.array(range(len(query_texts)), pa.int32()),
+                "query_text": pa.array(list(query_texts), pa.string()),
+            }
+        )
+        try:
+            return self._run_batch(self._fts_batch_statement, batch, [top_k])
+        except Exception as e:
+            _raise_if_missing_fts(e)
             raise
 
+    def source_documents(self, chunk_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Full source documents of the given chunks, in one query.
+
+        Args:
+            chunk_ids: List of node_id values from search results
+
+        Returns:
+            Mapping of node_id to source document dictionary (keys: doc_id,
+            file_path, file_name, text, metadata); chunks without a stored
+            source document are omitted
+        """
+        if not chunk_ids:
+            return {}
+        rows = (
+            self._cursor()
+            .execute(self._source_docs_statement, [list(chunk_ids)])
+            .fetchall()
+        )
+        return {
+            node_id: _source_document(doc_id, file_path, file_name, text, metadata)
+            for node_id, doc_id, file_path, file_name, text, metadata in rows
+        }
+
+    def query(
+        self,
+        query_text: str,
+        top_k: int = 5,
+        vector_weight: float = 0.5,
+        use_rrf: bool = True,
+        vector_top_k: Optional[int] = None,
+        fts_top_k: Optional[int] = None,
+        include_source_docs: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Query using hybrid retrieval (see `hybrid_query` for the parameters).
+
+        Returns:
+            List of result dictionaries with keys: node_id, text, metadata, score
+            If include_source_docs=True, also includes: source_doc (full document dict)
+        """
+        verbose = self.verbose
+
+        # Default to fetching more results from each system than final top_k
+        if vector_top_k is None:
+            vector_top_k = max(top_k * 2, 10)
+        if fts_top_k is None:
+            fts_top_k = max(top_k * 2, 10)
+
+        # Generate query embedding
+        if verbose:
+            print(f"Generating embedding for query: '{query_text}'")
+        query_embedding = self.encode(query_text)
+
+        # 1. Vector similarity search
+        if verbose:
+            print(f"Running vector similarity search (top {vector_top_k})...")
+        vector_results = self.vector_search(query_embedding, vector_top_k)
+        if verbose:
+            print(f"  Found {len(vector_results)} vector results")
+
+        # 2. Full-text search
+        if verbose:
+            print(f"Running FTS keyword search (top {fts_top_k})...")
+        fts_results = self.fts_search(query_text, fts_top_k)
+        if verbose:
+            print(f"  Found {len(fts_results)} FTS results")
+
         # 3. Combine results
+        return self._fuse(
+            [vector_results],
+            [fts_results],
+            top_k,
+            vector_weight,
+            use_rrf,
+            include_source_docs,
+        )[0]
+
+    def query_batch(
+        self,
+        query_texts: Sequence[str],
+        top_k: int = 5,
+        vector_weight: float = 0.5,
+        use_rrf: bool = True,
+        vector_top_k: Optional[int] = None,
+        fts_top_k: Optional[int] = None,
+        include_source_docs: bool = False,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Hybrid retrieval for many queries at once.
+
+        All queries are embedded in batched forward passes, vector search runs
+        as one statement over the chunks, and BM25 scores for all queries come
+        from one statement over the FTS index. Results match calling `query`
+        for each query (up to the order of equal scores).
+
+        Args:
+            query_texts: The search queries
+            (other arguments as for `hybrid_query`)
+
+        Returns:
+            One result list per query, in input order (see `query`)
+        """
+        verbose = self.verbose
+        query_texts = list(query_texts)
+        if not query_texts:
+            return []
+
+        # Default to fetching more results from each system than final top_k
+        if vector_top_k is None:
+            vector_top_k = max(top_k * 2, 10)
+        if fts_top_k is None:
+            fts_top_k = max(top_k * 2, 10)
+
+        if verbose:
+            print(f"Generating embeddings for {len(query_texts)} queries...")
+        query_embeddings = self.encode_batch(query_texts)
+
+        if verbose:
+            print(f"Running batched vector similarity search (top {vector_top_k})...")
+        vector_results = self.vector_search_batch(query_embeddings, vector_top_k)
+
+        if verbose:
+            print(f"Running batched FTS keyword search (top {fts_top_k})...")
+        fts_results = self.fts_search_batch(query_texts, fts_top_k)
+
+        return self._fuse(
+            vector_results,
+            fts_results,
+            top_k,
+            vector_weight,
+            use_rrf,
+            include_source_docs,
+        )
+
+    def _fuse(
+        self,
+        vector_results: List[List[Tuple]],
+        fts_results: List[List[Tuple]],
+        top_k: int,
+        vector_weight: float,
+        use_rrf: bool,
+        include_source_docs: bool,
+    ) -> List[List[Dict[str, Any]]]:
+        """Combine per-query search results and optionally attach source docs."""
+        verbose = self.verbose
+
         if use_rrf:
-            # Reciprocal Rank Fusion
             if verbose:
                 print("Combining results using Reciprocal Rank Fusion...")
-
-            vector_ranking = [r[0] for r in vector_results]  # node_ids in order
-            fts_ranking = [r[0] for r in fts_results]
-
-            rrf_scores = reciprocal_rank_fusion([vector_ranking, fts_ranking])
-
-            # Get top_k by RRF score
-            [node_id for node_id, _ in rrf_scores[:top_k]]
-
-            # Fetch full details for top results
-            # Create a map of node_id -> result data
-            result_map = {}
-            for node_id, text, metadata, score in vector_results + fts_results:
-                if node_id not in result_map:
-                    result_map[node_id] = (text, metadata)
-
-            # Build final results with RRF scores
-            final_results = []
-            for node_id, rrf_score in rrf_scores[:top_k]:
-                if node_id in result_map:
-                    text, metadata = result_map[node_id]
-                    final_results.append(
-                        {
-                            "node_id": node_id,
-                            "text": text,
-                            "metadata": metadata,
-                            "score": rrf_score,
-                            "score_type": "rrf",
-                        }
-                    )
+            final_results = [
+                _fuse_rrf(vector, fts, top_k)
+                for vector, fts in zip(vector_results, fts_results)
+            ]
         else:
-            # Weighted score combination
             if verbose:
                 print(
                     f"Combining results with weights (vector: {vector_weight}, fts: {1 - vector_weight})..."
                 )
-
-            # Normalize scores to 0-1 range for each system
-            def normalize_scores(results):
-                if not results:
-                    return []
-                scores = [r[3] for r in results]
-                min_score = min(scores)
-                max_score = max(scores)
-                score_range = max_score - min_score
-                if score_range == 0:
-                    return [(r[0], r[1], r[2], 1.0) for r in results]
-                return [
-                    (r[0], r[1], r[2], (r[3] - min_score) / score_range)
-                    for r in results
-                ]
-
-            vector_normalized = normalize_scores(vector_results)
-            fts_normalized = normalize_scores(fts_results)
-
-            # Combine scores
-            combined = {}
-            for node_id, text, metadata, score in vector_normalized:
-                combined[node_id] = {
-                    "text": text,
-                    "metadata": metadata,
-                    "score": score * vector_weight,
-                }
-
-            for node_id, text, metadata, score in fts_normalized:
-                if node_id in combined:
-                    combined[node_id]["score"] += score * (1 - vector_weight)
-                else:
-                    combined[node_id] = {
-                        "text": text,
-                        "metadata": metadata,
-                        "score": score * (1 - vector_weight),
-                    }
-
-            # Sort by combined score and take top_k
-            sorted_results = sorted(
-                combined.items(), key=lambda x: x[1]["score"], reverse=True
-            )[:top_k]
-
             final_results = [
-                {
-                    "node_id": node_id,
-                    "text": data["text"],
-                    "metadata": data["metadata"],
-                    "score": data["score"],
-                    "score_type": "weighted",
-                }
-                for node_id, data in sorted_results
+                _fuse_weighted(vector, fts, top_k, vector_weight)
+                for vector, fts in zip(vector_results, fts_results)
             ]
 
         # Optionally fetch full source documents
-        if include_source_docs and final_results:
+        results = [result for query in final_results for result in query]
+        if include_source_docs and results:
             if verbose:
                 print("Fetching full source documents...")
 
-            chunk_ids = [r["node_id"] for r in final_results]
-            source_docs = get_source_documents(chunk_ids, db_path)
-
-            # Create mapping of doc_id -> source_doc
-            doc_map = {doc["doc_id"]: doc for doc in source_docs}
-
-            # Add source docs to results
-            for result in final_results:
-                # Get doc_id from chunk
-                doc_id_query = """
-                    SELECT doc_id FROM documents WHERE node_id = ?
-                """
-                doc_id_result = conn.execute(
-                    doc_id_query, [result["node_id"]]
-                ).fetchone()
-
-                if doc_id_result and doc_id_result[0] in doc_map:
-                    result["source_doc"] = doc_map[doc_id_result[0]]
-                else:
-                    result["source_doc"] = None
+            doc_map = self.source_documents(
+                list(dict.fromkeys(r["node_id"] for r in results))
+            )
+            for result in results:
+                result["source_doc"] = doc_map.get(result["node_id"])
 
             if verbose:
-                docs_found = sum(1 for r in final_results if r.get("source_doc"))
+                docs_found = sum(1 for r in results if r.get("source_doc"))
                 print(
-                    f"  Linked {docs_found}/{len(final_results)} chunks to source documents"
+                    f"  Linked {docs_found}/{len(results)} chunks to source documents"
                 )
 
         return final_results
 
-    finally:
-        conn.close()
+
+def _raise_if_missing_fts(error: Exception) -> None:
+    """Raise a helpful RuntimeError if `error` comes from a missing FTS index."""
+    error_msg = str(error).lower()
+    if (
+        "fts_main_documents" in error_msg
+        or "match_bm25" in error_msg
+        or "catalog" in error_msg
+    ):
+        raise RuntimeError("FTS index not found. Run create_fts_index(db_path) first.")
+
+
+@lru_cache(maxsize=4)
+def _load_model(model_name: str) -> SentenceTransformer:
+    """Load an embedding model once per process for `hybrid_query`."""
+    return SentenceTransformer(model_name)
+
+
+def hybrid_query(
+    query_text: str,
+    db_path: str = "generated-embeddings/sqlrooms_docs.duckdb",
+    model_name: str = "BAAI/bge-small-en-v1.5",
+    top_k: int = 5,
+    vector_weight: float = 0.5,
+    use_rrf: bool = True,
+    vector_top_k: Optional[int] = None,
+    fts_top_k: Optional[int] = None,
+    include_source_docs: bool = False,
+    verbose: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Query using hybrid retrieval: combines vector similarity and full-text search.
+
+    This approach leverages both:
+    - Semantic similarity (vector search) for conceptual matches
+    - Keyword matching (FTS) for exact terms, acronyms, code snippets
+
+    The embedding model is loaded once per process and reused across calls;
+    the database is opened for the duration of the call. For many queries
+    against the same database, keep a `HybridRetriever` open instead.
+
+    Args:
+        query_text: The search query
+        db_path: Path to the DuckDB database
+        model_name: Embedding model name (must match preparation model)
+        top_k: Number of final results to return
+        vector_weight: Weight for vector scores vs FTS (only used if use_rrf=False)
+        use_rrf: Use Reciprocal Rank Fusion instead of weighted score combination
+        vector_top_k: Number of results from vector search (default: 2*top_k)
+        fts_top_k: Number of results from FTS search (default: 2*top_k)
+        include_source_docs: If True, fetch and include full source documents
+        verbose: Print detailed progress information
+
+    Returns:
+        List of result dictionaries with keys: node_id, text, metadata, score
+        If include_source_docs=True, also includes: source_doc (full document dict)
+
+    Raises:
+        RuntimeError: If FTS index doesn't exist (created automatically during prepare_embeddings)
+    """
+    if verbose:
+        print(f"Loading embedding model: {model_name}...")
+    model = _load_model(model_name)
+
+    with HybridRetriever(
+        db_path, model_name=model_name, model=model, verbose=verbose
+    ) as retriever:
+        return retriever.query(
+            query_text,
+            top_k=top_k,
+            vector_weight=vector_weight,
+            use_rrf=use_rrf,
+            vector_top_k=vector_top_k,
+            fts_top_k=fts_top_k,
+            include_source_docs=include_source_docs,
+        )
+
+
+def hybrid_query_batch(
+    query_texts: Sequence[str],
+    db_path: str = "generated-embeddings/sqlrooms_docs.duckdb",
+    model_name: str = "BAAI/bge-small-en-v1.5",
+    top_k: int = 5,
+    vector_weight: float = 0.5,
+    use_rrf: bool = True,
+    vector_top_k: Optional[int] = None,
+    fts_top_k: Optional[int] = None,
+    include_source_docs: bool = False,
+    verbose: bool = False,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Hybrid retrieval for many queries at once (evaluation runs, agent tools).
+
+    Encodes all queries in batched forward passes and runs one vector search
+    and one FTS statement for the whole batch instead of one per query.
+
+    Args:
+        query_texts: The search queries
+        (other arguments as for `hybrid_query`)
+
+    Returns:
+        One result list per query, in input order (see `hybrid_query`)
+
+    Raises:
+        RuntimeError: If FTS index doesn't exist (created automatically during prepare_embeddings)
+    """
+    if verbose:
+        print(f"Loading embedding model: {model_name}...")
+    model = _load_model(model_name)
+
+    with HybridRetriever(
+        db_path, model_name=model_name, model=model, verbose=verbose
+    ) as retriever:
+        return retriever.query_batch(
+            query_texts,
+            top_k=top_k,
+            vector_weight=vector_weight,
+            use_rrf=use_rrf,
+            vector_top_k=vector_top_k,
+            fts_top_k=fts_top_k,
+            include_source_docs=include_source_docs,
+        )
 
 
 def print_results(results: List[Dict[str, Any]], query_text: str) -> None:
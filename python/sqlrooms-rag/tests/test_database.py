@@ -0,0 +1,115 @@
+"""Tests for writing source documents and chunk references."""
+
+import duckdb
+from llama_index.core import Document
+from llama_index.core.schema import (
+    MetadataMode,
+    NodeRelationship,
+    RelatedNodeInfo,
+    TextNode,
+)
+
+from sqlrooms_rag.prepare.database import (
+    add_document_references,
+    ensure_source_documents_table,
+    insert_source_documents,
+)
+from sqlrooms_rag.prepare.hashing import file_key, hash_text
+
+
+def _document(doc_id, text, file_name):
+    return Document(
+        id_=doc_id,
+        text=text,
+        metadata={"file_path": f"/docs/{file_name}", "file_name": file_name},
+    )
+
+
+def _rows(conn):
+    return conn.execute("""
+        SELECT doc_id, file_name, text, content_hash
+        FROM source_documents ORDER BY doc_id
+    """).fetchall()
+
+
+def test_insert_source_documents_keeps_the_last_duplicate_and_upserts():
+    conn = duckdb.connect()
+    ensure_source_documents_table(conn)
+    hashes = {
+        file_key("/docs/a.md"): "hash-a",
+        file_key("/docs/b.md"): "hash-b",
+    }
+
+    insert_source_documents(
+        conn,
+        [
+            _document("doc-a", "first a", "a.md"),
+            _document("doc-b", "only b", "b.md"),
+            _document("doc-a", "second a", "a.md"),
+        ],
+        hashes,
+    )
+
+    assert _rows(conn) == [
+        ("doc-a", "a.md", "second a", "hash-a"),
+        ("doc-b", "b.md", "only b", "hash-b"),
+    ]
+
+    insert_source_documents(
+        conn,
+        [_document("doc-b", "new b", "b.md")],
+        {file_key("/docs/b.md"): "hash-b2"},
+    )
+
+    assert _rows(conn) == [
+        ("doc-a", "a.md", "second a", "hash-a"),
+        ("doc-b", "b.md", "new b", "hash-b2"),
+    ]
+    conn.close()
+
+
+def _node(node_id, text, doc_id):
+    return TextNode(
+        id_=node_id,
+        text=text,
+        metadata={"file_path": f"/docs/{doc_id}.md"},
+        relationships={NodeRelationship.SOURCE: RelatedNodeInfo(node_id=doc_id)},
+    )
+
+
+def test_add_document_references_updates_the_matching_chunks(tmp_path):
+    db_path = tmp_path / "kb.duckdb"
+    conn = duckdb.connect(str(db_path))
+    conn.execute("CREATE TABLE documents (node_id VARCHAR, text TEXT)")
+    conn.executemany(
+        "INSERT INTO documents VALUES (?, ?)",
+        [("n1", "one"), ("n2", "two"), ("n3", "three"), ("unrelated", "x")],
+    )
+    # A chunk already hashed by an earlier run keeps its hash
+    conn.execute("ALTER TABLE documents ADD COLUMN chunk_hash VARCHAR")
+    conn.execute("UPDATE documents SET chunk_hash = 'kept' WHERE node_id = 'n3'")
+    conn.close()
+    nodes = [
+        _node("n2", "two", "doc-b"),
+        _node("n1", "one", "doc-a"),
+        _node("n3", "three", "doc-b"),
+        _node("missing", "gone", "doc-c"),
+    ]
+
+    add_document_references(db_path, nodes, verbose=False)
+
+    conn = duckdb.connect(str(db_path), read_only=True)
+    rows = conn.execute(
+        "SELECT node_id, doc_id, chunk_hash FROM documents ORDER BY node_id"
+    ).fetchall()
+    conn.close()
+    embed_hash = {
+        node.node_id: hash_text(node.get_content(metadata_mode=MetadataMode.EMBED))
+        for node in nodes
+    }
+    assert rows == [
+        ("n1", "doc-a", embed_hash["n1"]),
+        ("n2", "doc-b", embed_hash["n2"]),
+        ("n3", "doc-b", "kept"),
+        ("unrelated", None, None),
+    ]
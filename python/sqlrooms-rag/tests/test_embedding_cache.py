@@ -0,0 +1,148 @@
+"""Tests for the persistent embedding cache and the model wrapper using it."""
+
+import hashlib
+import subprocess
+import sys
+from typing import List
+
+import pytest
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+from sqlrooms_rag.prepare.embedding_cache import CachedEmbedding, EmbeddingCache
+from sqlrooms_rag.prepare.embeddings import _with_cache
+
+DIM = 4
+
+
+def _vector(text, dim=DIM):
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [byte / 255 for byte in digest[:dim]]
+
+
+class RecordingEmbedding(BaseEmbedding):
+    """Deterministic embeddings; records every text it is asked to embed."""
+
+    _dim: int = PrivateAttr()
+    _texts: List[str] = PrivateAttr()
+
+    def __init__(self, dim=DIM):
+        super().__init__(model_name="fake-model", embed_batch_size=100)
+        self._dim = dim
+        self._texts = []
+
+    @property
+    def texts(self):
+        return self._texts
+
+    def _get_text_embeddings(self, texts):
+        self._texts.extend(texts)
+        return [_vector(text, self._dim) for text in texts]
+
+    def _get_text_embedding(self, text):
+        return self._get_text_embeddings([text])[0]
+
+    def _get_query_embedding(self, query):
+        return _vector(query, self._dim)
+
+    async def _aget_query_embedding(self, query):
+        return self._get_query_embedding(query)
+
+
+def _approx(vector):
+    # Stored as FLOAT[], so cached vectors come back at float32 precision
+    return pytest.approx(vector, rel=1e-6)
+
+
+def _cached(path, inner, cache_key="huggingface:fake-model", dim=DIM):
+    return CachedEmbedding(inner, EmbeddingCache(path), cache_key=cache_key, dim=dim)
+
+
+def test_second_run_only_embeds_new_texts(tmp_path):
+    path = tmp_path / "cache.duckdb"
+    first_inner = RecordingEmbedding()
+    first = _cached(path, first_inner)
+    vectors = first.get_text_embedding_batch(["alpha", "beta"])
+    first.close()
+
+    inner = RecordingEmbedding()
+    second = _cached(path, inner)
+    try:
+        again = second.get_text_embedding_batch(["beta", "gamma", "alpha"])
+    finally:
+        second.close()
+
+    assert first_inner.texts == ["alpha", "beta"]
+    assert inner.texts == ["gamma"]
+    assert again[0] == _approx(vectors[1])
+    assert again[2] == _approx(vectors[0])
+    assert again[1] == _approx(_vector("gamma"))
+    assert second.cache_stats == {"hits": 2, "misses": 1}
+
+
+def test_entries_are_separate_per_model_and_dimension(tmp_path):
+    path = tmp_path / "cache.duckdb"
+    base = _cached(path, RecordingEmbedding())
+    base.get_text_embedding_batch(["alpha"])
+    base.close()
+
+    other_model = RecordingEmbedding()
+    other_dim = RecordingEmbedding(dim=2)
+    same = RecordingEmbedding()
+    for model, options in (
+        (other_model, {"cache_key": "huggingface:other-model"}),
+        (other_dim, {"dim": 2}),
+        (same, {}),
+    ):
+        cached = _cached(path, model, **options)
+        try:
+            cached.get_text_embedding_batch(["alpha"])
+        finally:
+            cached.close()
+
+    assert other_model.texts == ["alpha"]
+    assert other_dim.texts == ["alpha"]
+    assert same.texts == []
+
+
+def test_duplicate_texts_in_a_batch_are_embedded_once(tmp_path):
+    inner = RecordingEmbedding()
+    cached = _cached(tmp_path / "cache.duckdb", inner)
+    try:
+        vectors = cached.get_text_embedding_batch(["alpha", "beta", "alpha", "alpha"])
+        assert inner.texts == ["alpha", "beta"]
+        # Misses count distinct texts embedded, hits every text served from cache
+        assert cached.cache_stats == {"hits": 0, "misses": 2}
+        assert vectors[0] == vectors[2] == vectors[3] == _approx(_vector("alpha"))
+
+        cached.get_text_embedding_batch(["beta", "beta", "delta"])
+        assert inner.texts == ["alpha", "beta", "delta"]
+        assert cached.cache_stats == {"hits": 2, "misses": 3}
+    finally:
+        cached.close()
+
+
+def test_locked_cache_file_is_skipped_with_a_warning(tmp_path, capsys):
+    path = tmp_path / "cache.duckdb"
+    holder = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "import duckdb, sys; conn = duckdb.connect(sys.argv[1]); "
+            "print('ready', flush=True); sys.stdin.read()",
+            str(path),
+        ],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        assert holder.stdout.readline().strip() == "ready"
+        inner = RecordingEmbedding()
+
+        model = _with_cache(inner, "huggingface", "fake-model", DIM, str(path), True)
+
+        assert model is inner
+        assert "Warning: Embedding cache unavailable" in capsys.readouterr().out
+    finally:
+        holder.communicate("")
@@ -0,0 +1,280 @@
+"""Tests for resumable builds and incremental updates of an embeddings database."""
+
+import hashlib
+
+import duckdb
+import pytest
+
+from sqlrooms_rag.prepare import chunking, database
+from sqlrooms_rag.prepare.hashing import hash_file, hash_text
+from sqlrooms_rag.prepare.incremental import (
+    BUILD_STATE_TABLE,
+    finish_build,
+    has_build_state,
+    start_build,
+    update_embeddings_incrementally,
+)
+from sqlrooms_rag.prepare.metadata import (
+    create_metadata,
+    flatten_metadata,
+    store_metadata_in_db,
+)
+from sqlrooms_rag.prepare.tokenization import Tokenizer
+
+DIM = 4
+SETTINGS = {
+    "embedding_provider": "huggingface",
+    "embed_model_name": "fake-model",
+    "embed_dim": DIM,
+    "chunk_size": 512,
+    "use_markdown_chunking": True,
+    "include_headers_in_chunks": True,
+    "header_weight": 1,
+}
+CHUNK_OPTIONS = {
+    "chunk_size": 512,
+    "embedding_provider": "huggingface",
+    "embed_model_name": "fake-model",
+    "use_markdown_chunking": True,
+    "include_headers_in_chunks": True,
+    "header_weight": 1,
+}
+
+
+def _vector(text):
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [byte / 255 for byte in digest[:DIM]]
+
+
+class FakeEmbedding:
+    """Deterministic embeddings; records every text it is asked to embed."""
+
+    def __init__(self, fail_after_calls=None):
+        self.texts = []
+        self.calls = 0
+        self.fail_after_calls = fail_after_calls
+
+    def get_text_embedding_batch(self, texts, **kwargs):
+        if self.fail_after_calls is not None and self.calls >= self.fail_after_calls:
+            raise RuntimeError("embedding service unavailable")
+        self.calls += 1
+        self.texts.extend(texts)
+        return [_vector(text) for text in texts]
+
+
+@pytest.fixture(autouse=True)
+def estimate_tokens(monkeypatch):
+    # Chunking must not download a tokenizer
+    monkeypatch.setattr(chunking, "get_tokenizer", lambda *args, **kwargs: Tokenizer())
+
+
+@pytest.fixture
+def docs_dir(tmp_path):
+    path = tmp_path / "docs"
+    path.mkdir()
+    (path / "a.md").write_text("# Alpha\n\nAlpha text.\n\n## Beta\n\nBeta text.\n")
+    (path / "b.md").write_text("# Gamma\n\nGamma text.\n")
+    (path / "c.md").write_text("# Delta\n\nDelta text.\n")
+    return path
+
+
+def _config(**overrides):
+    return flatten_metadata(
+        create_metadata(documents=[], nodes=[], **{**SETTINGS, **overrides})
+    )
+
+
+def _update(db_path, docs_dir, embed_model, **kwargs):
+    return update_embeddings_incrementally(
+        db_path=db_path,
+        files=sorted(docs_dir.glob("*.md")),
+        embed_model=embed_model,
+        chunk_options=CHUNK_OPTIONS,
+        expected_config=kwargs.pop("expected_config", _config()),
+        verbose=False,
+        **kwargs,
+    )
+
+
+def _build(db_path, docs_dir, embed_model, **kwargs):
+    if not db_path.exists():
+        start_build(db_path, DIM, _config())
+    stats = _update(
+        db_path, docs_dir, embed_model, config_table=BUILD_STATE_TABLE, **kwargs
+    )
+    store_metadata_in_db(
+        db_path=db_path,
+        metadata=create_metadata(documents=[], nodes=[], **SETTINGS),
+        verbose=False,
+    )
+    finish_build(db_path)
+    return stats
+
+
+def _query(db_path, sql):
+    conn = duckdb.connect(str(db_path), read_only=True)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def _chunks_by_file(db_path):
+    rows = _query(
+        db_path,
+        """
+        SELECT s.file_name, d.chunk_hash, d.embedding
+        FROM documents d JOIN source_documents s USING (doc_id)
+        ORDER BY s.file_name, d.chunk_hash
+    """,
+    )
+    chunks = {}
+    for file_name, chunk_hash, embedding in rows:
+        chunks.setdefault(file_name, []).append((chunk_hash, embedding))
+    return chunks
+
+
+def test_full_build_embeds_chunks_with_their_embed_metadata(
+    tmp_path, docs_dir, monkeypatch
+):
+    # File hashes are taken when files are loaded, not re-read on insert
+    def _no_rehash(path):
+        raise AssertionError(f"{path} was hashed again at insert time")
+
+    monkeypatch.setattr(database, "hash_file", _no_rehash)
+    db_path = tmp_path / "kb.duckdb"
+    model = FakeEmbedding()
+
+    stats = _build(db_path, docs_dir, model)
+
+    assert not has_build_state(db_path)
+    assert stats["files_changed"] == 3 and stats["chunks_reused"] == 0
+    assert stats["chunks_embedded"] == len(model.texts) == 4
+    # Embedded like VectorStoreIndex: chunk text plus embed metadata
+    assert all("file_path: " in text for text in model.texts)
+    embedded = {hash_text(text): text for text in model.texts}
+    chunks = _chunks_by_file(db_path)
+    assert {name: len(rows) for name, rows in chunks.items()} == {
+        "a.md": 2,
+        "b.md": 1,
+        "c.md": 1,
+    }
+    for rows in chunks.values():
+        for chunk_hash, embedding in rows:
+            assert embedding == pytest.approx(_vector(embedded[chunk_hash]))
+    assert dict(
+        _query(db_path, "SELECT file_name, content_hash FROM source_documents")
+    ) == {name: hash_file(docs_dir / name) for name in ("a.md", "b.md", "c.md")}
+    metadata = dict(_query(db_path, "SELECT key, value FROM embedding_metadata"))
+    assert metadata["embedding_text_mode"] == "embed"
+
+
+def test_interrupted_build_resumes_where_it_stopped(tmp_path, docs_dir):
+    db_path = tmp_path / "kb.duckdb"
+    start_build(db_path, DIM, _config())
+
+    # One file per batch; embedding fails on the second batch
+    with pytest.raises(RuntimeError, match="unavailable"):
+        _update(
+            db_path,
+            docs_dir,
+            FakeEmbedding(fail_after_calls=1),
+            config_table=BUILD_STATE_TABLE,
+            batch_size=1,
+        )
+    assert has_build_state(db_path)
+    assert _query(db_path, "SELECT file_name FROM source_documents") == [("a.md",)]
+
+    model = FakeEmbedding()
+    stats = _build(db_path, docs_dir, model, batch_size=1)
+
+    assert stats["files_unchanged"] == 1 and stats["files_changed"] == 2
+    assert not any("a.md" in text for text in model.texts)
+    assert {name: len(rows) for name, rows in _chunks_by_file(db_path).items()} == {
+        "a.md": 2,
+        "b.md": 1,
+        "c.md": 1,
+    }
+
+
+def test_update_replaces_changed_and_removes_deleted_files(tmp_path, docs_dir):
+    db_path = tmp_path / "kb.duckdb"
+    _build(db_path, docs_dir, FakeEmbedding())
+    before = _chunks_by_file(db_path)
+
+    (docs_dir / "b.md").write_text("# Gamma\n\nGamma text, revised.\n")
+    (docs_dir / "c.md").unlink()
+    model = FakeEmbedding()
+    stats = _update(db_path, docs_dir, model)
+
+    assert stats["files_changed"] == 1
+    assert stats["files_removed"] == 1
+    assert stats["files_unchanged"] == 1
+    assert stats["chunks_embedded"] == 1 and stats["chunks_deleted"] == 2
+    assert len(model.texts) == 1 and "revised" in model.texts[0]
+    after = _chunks_by_file(db_path)
+    assert sorted(after) == ["a.md", "b.md"]
+    assert after["a.md"] == before["a.md"]
+    assert after["b.md"] != before["b.md"]
+    assert dict(
+        _query(db_path, "SELECT file_name, content_hash FROM source_documents")
+    ) == {name: hash_file(docs_dir / name) for name in ("a.md", "b.md")}
+
+    assert _update(db_path, docs_dir, FakeEmbedding())["files_changed"] == 0
+
+
+def test_unchanged_chunks_reuse_stored_embeddings(tmp_path, docs_dir):
+    db_path = tmp_path / "kb.duckdb"
+    _build(db_path, docs_dir, FakeEmbedding())
+
+    # Existing sections of a.md keep their embedded text; the copy of b.md
+    # has the same chunk text but another file path in its embed metadata
+    with open(docs_dir / "a.md", "a") as f:
+        f.write("\n## Epsilon\n\nEpsilon text.\n")
+    (docs_dir / "copy.md").write_text((docs_dir / "b.md").read_text())
+    model = FakeEmbedding()
+    stats = _update(db_path, docs_dir, model)
+
+    assert stats["files_changed"] == 2
+    assert stats["chunks_reused"] == 2 and stats["chunks_embedded"] == 2
+    assert sorted(
+        "Epsilon" if "Epsilon" in text else "copy" for text in model.texts
+    ) == ["Epsilon", "copy"]
+    assert all("copy.md" in text for text in model.texts if "Gamma" in text)
+    assert len(_chunks_by_file(db_path)["a.md"]) == 3
+
+
+def test_update_refuses_different_settings(tmp_path, docs_dir):
+    db_path = tmp_path / "kb.duckdb"
+    _build(db_path, docs_dir, FakeEmbedding())
+
+    with pytest.raises(ValueError, match="chunk_size"):
+        _update(
+            db_path, docs_dir, FakeEmbedding(), expected_config=_config(chunk_size=256)
+        )
+    with pytest.raises(ValueError, match="embedding_model"):
+        _update(
+            db_path,
+            docs_dir,
+            FakeEmbedding(),
+            expected_config=_config(embed_model_name="other-model"),
+        )
+
+    conn = duckdb.connect(str(db_path))
+    try:
+        conn.execute(
+            "UPDATE embedding_metadata SET value = 'none' "
+            "WHERE key = 'embedding_text_mode'"
+        )
+    finally:
+        conn.close()
+    with pytest.raises(ValueError, match="embedding_text_mode"):
+        _update(db_path, docs_dir, FakeEmbedding())
+
+    # Built before the mode was recorded: VectorStoreIndex embedded in embed mode
+    conn = duckdb.connect(str(db_path))
+    try:
+        conn.execute("DELETE FROM embedding_metadata WHERE key = 'embedding_text_mode'")
+    finally:
+        conn.close()
+    assert _update(db_path, docs_dir, FakeEmbedding())["files_changed"] == 0
@@ -0,0 +1,130 @@
+"""Tests for the concurrent OpenAI embeddings client against the mock server."""
+
+import asyncio
+import importlib.util
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from aiohttp.test_utils import TestServer
+
+from sqlrooms_rag.prepare import openai_embeddings
+from sqlrooms_rag.prepare.openai_embeddings import (
+    EmbeddingRequestError,
+    OpenAIEmbeddingClient,
+    TokenBudget,
+)
+
+DIM = 8
+MOCK_SERVER = (
+    Path(__file__).resolve().parents[1] / "scripts" / "mock_openai_embeddings_server.py"
+)
+
+
+@pytest.fixture(scope="module")
+def mock_server():
+    spec = importlib.util.spec_from_file_location("mock_openai_server", MOCK_SERVER)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _embed(app, texts, **client_options):
+    """Embed `texts` with a client talking to `app` served in-process."""
+
+    async def run():
+        async with TestServer(app) as server:
+            client = OpenAIEmbeddingClient(
+                model="text-embedding-3-small",
+                api_key="test",
+                base_url=str(server.make_url("/v1")),
+                max_backoff=0.01,
+                **client_options,
+            )
+            try:
+                return client, await client.embed(texts)
+            except EmbeddingRequestError as e:
+                return client, e
+
+    return asyncio.run(run())
+
+
+def test_rate_limited_requests_are_retried_with_smaller_batches(
+    mock_server, monkeypatch
+):
+    # The first request gets a spurious 429, every later one succeeds
+    draws = iter([0.0])
+    monkeypatch.setattr(
+        mock_server, "random", SimpleNamespace(random=lambda: next(draws, 1.0))
+    )
+    app = mock_server.create_app(dim=DIM, latency=0, rate_limit_probability=0.5)
+    texts = [f"text {i}" for i in range(20)]
+
+    client, vectors = _embed(app, texts, max_concurrency=1, batch_size=8)
+
+    assert vectors == [mock_server.fake_embedding(text, DIM) for text in texts]
+    assert client.batch_size == 4
+    assert client.stats["rate_limited"] == 1 and client.stats["retries"] == 1
+    # One rejected request of 8, then 20 texts in batches of 4
+    assert app["stats"]["rate_limited"] == 1
+    assert app["stats"]["requests"] == 6
+    assert app["stats"]["inputs"] == 20
+
+
+def test_results_keep_input_order_across_concurrent_workers(mock_server):
+    app = mock_server.create_app(dim=DIM, latency=0.02)
+    texts = [f"text {i}" for i in range(40)]
+
+    client, vectors = _embed(app, texts, max_concurrency=4, batch_size=3)
+
+    assert vectors == [mock_server.fake_embedding(text, DIM) for text in texts]
+    assert app["stats"]["max_in_flight"] == 4
+    assert client.stats["requests"] == app["stats"]["requests"] == 14
+
+
+def test_non_retryable_error_is_raised(mock_server):
+    app = mock_server.create_app(dim=DIM, latency=0)
+    too_long = "x" * (mock_server.MAX_INPUT_TOKENS + 1) * 4
+
+    client, error = _embed(app, ["short", too_long], max_concurrency=1)
+
+    assert isinstance(error, EmbeddingRequestError)
+    assert error.status == 400 and "maximum context length" in str(error)
+    assert client.stats["retries"] == 0
+    assert app["stats"]["requests"] == 1
+
+
+def test_token_budget_paces_requests_to_the_window(monkeypatch):
+    now = [0.0]
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr(openai_embeddings.asyncio, "sleep", fake_sleep)
+    budget = TokenBudget(100, clock=lambda: now[0])
+
+    async def run():
+        await budget.acquire(60)
+        now[0] = 10.0
+        await budget.acquire(30)
+        assert sleeps == []
+        # Fits once the first request leaves the window at t=60
+        await budget.acquire(20)
+        assert sleeps == [50.0] and now[0] == 60.0
+        # Larger than the whole budget: waits for an empty window
+        await budget.acquire(500)
+        assert sleeps == [50.0, 10.0, 50.0] and now[0] == 120.0
+
+    asyncio.run(run())
+
+
+def test_token_budget_without_limit_never_waits(monkeypatch):
+    async def fail_sleep(seconds):
+        raise AssertionError("slept without a budget")
+
+    monkeypatch.setattr(openai_embeddings.asyncio, "sleep", fail_sleep)
+    budget = TokenBudget(None, clock=lambda: 0.0)
+
+    asyncio.run(budget.acquire(10**9))
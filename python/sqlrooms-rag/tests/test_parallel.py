@@ -0,0 +1,73 @@
+"""Tests that multi-process chunking matches chunking in this process."""
+
+import pytest
+
+from sqlrooms_rag.prepare import chunking
+from sqlrooms_rag.prepare.parallel import iter_chunked_files, visible_files
+from sqlrooms_rag.prepare.tokenization import Tokenizer
+
+CHUNK_OPTIONS = {
+    "chunk_size": 512,
+    "embedding_provider": "huggingface",
+    "embed_model_name": "fake-model",
+    "use_markdown_chunking": True,
+    "include_headers_in_chunks": True,
+    "header_weight": 2,
+}
+
+
+@pytest.fixture(autouse=True)
+def estimate_tokens(monkeypatch):
+    # Chunking must not download a tokenizer, here or in the spawned workers
+    monkeypatch.setattr(chunking, "get_tokenizer", lambda *args, **kwargs: Tokenizer())
+    monkeypatch.setenv("HF_HUB_OFFLINE", "1")
+
+
+@pytest.fixture
+def docs_dir(tmp_path):
+    path = tmp_path / "docs"
+    for i in range(7):
+        section = path / f"section-{i % 3}"
+        section.mkdir(parents=True, exist_ok=True)
+        (section / f"page-{i}.md").write_text(
+            f"# Page {i}\n\nIntro {i}.\n\n## Details\n\nDetails of page {i}.\n"
+        )
+    (path / ".drafts").mkdir()
+    (path / ".drafts" / "draft.md").write_text("# Draft\n\nNot published.\n")
+    (path / "section-0" / ".notes.md").write_text("# Notes\n\nPrivate.\n")
+    return path
+
+
+def _chunks(files, workers):
+    results = list(
+        iter_chunked_files(files, CHUNK_OPTIONS, workers=workers, files_per_task=2)
+    )
+    chunks = [
+        (node.metadata["file_name"], node.text)
+        for _, nodes, _ in results
+        for node in nodes
+    ]
+    file_hashes = {}
+    for _, _, hashes in results:
+        file_hashes.update(hashes)
+    return chunks, file_hashes
+
+
+def test_workers_produce_the_same_chunks_in_the_same_order(docs_dir):
+    files = visible_files(sorted(docs_dir.rglob("*.md")), docs_dir)
+
+    assert [path.name for path in files] == [
+        f"page-{i}.md" for i in (0, 3, 6, 1, 4, 2, 5)
+    ]
+
+    serial, serial_hashes = _chunks(files, workers=1)
+    parallel, parallel_hashes = _chunks(files, workers=2)
+
+    assert parallel == serial
+    assert parallel_hashes == serial_hashes
+    assert len(serial_hashes) == len(files)
+    # Files are yielded in input order, each with its two sections
+    assert [name for name, _ in serial] == [
+        name for path in files for name in [path.name] * 2
+    ]
+    assert not any("Draft" in text or "Private" in text for _, text in parallel)
@@ -0,0 +1,164 @@
+"""Tests that batched, one-shot and threaded retrieval match per-query searches."""
+
+import threading
+
+import duckdb
+import numpy as np
+import pytest
+
+from sqlrooms_rag import query as query_module
+from sqlrooms_rag.prepare.database import create_fts_index
+from sqlrooms_rag.query import HybridRetriever, hybrid_query
+
+DIM = 8
+WORDS = [
+    "duckdb",
+    "arrays",
+    "array",
+    "running",
+    "runs",
+    "join",
+    "joins",
+    "parquet",
+    "vector",
+    "search",
+    "index",
+    "tables",
+    "query",
+    "window",
+    "functions",
+]
+QUERIES = [
+    "duckdb arrays",
+    "run a join",
+    "parquet parquet tables",
+    "window functions over arrays",
+    "nothing matches here",
+]
+
+
+class FakeModel:
+    """Deterministic stand-in for a SentenceTransformer."""
+
+    def encode(self, texts, convert_to_numpy=True):
+        if isinstance(texts, str):
+            return self._vector(texts)
+        return np.stack([self._vector(text) for text in texts])
+
+    @staticmethod
+    def _vector(text):
+        seed = sum(ord(char) * (i + 1) for i, char in enumerate(text))
+        return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+
+
+@pytest.fixture(scope="module")
+def db_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("retrieval") / "kb.duckdb"
+    conn = duckdb.connect(str(path))
+    try:
+        try:
+            conn.execute("INSTALL fts; LOAD fts;")
+        except duckdb.Error as e:
+            pytest.skip(f"DuckDB fts extension unavailable: {e}")
+        rng = np.random.default_rng(7)
+        rows = [
+            (
+                f"node-{i:02d}",
+                " ".join(rng.choice(WORDS, size=rng.integers(3, 12))),
+                rng.standard_normal(DIM).astype(np.float32).tolist(),
+            )
+            for i in range(40)
+        ]
+        conn.execute(f"""
+            CREATE TABLE documents (
+                node_id VARCHAR,
+                text TEXT,
+                embedding FLOAT[{DIM}],
+                metadata_ JSON
+            )
+        """)
+        conn.executemany(
+            "INSERT INTO documents VALUES (?, ?, ?, '{}')",
+            rows,
+        )
+    finally:
+        conn.close()
+    create_fts_index(db_path=path, verbose=False)
+    return path
+
+
+@pytest.fixture
+def retriever(db_path):
+    with HybridRetriever(str(db_path), model=FakeModel()) as retriever:
+        yield retriever
+
+
+def _scores(rows):
+    return [pytest.approx(row[3], rel=1e-5) for row in rows]
+
+
+@pytest.mark.parametrize("top_k", [1, 5, 100])
+def test_vector_search_batch_matches_per_query(retriever, top_k):
+    embeddings = retriever.encode_batch(QUERIES)
+
+    batched = retriever.vector_search_batch(embeddings, top_k)
+
+    assert len(batched) == len(QUERIES)
+    for embedding, rows in zip(embeddings, batched, strict=True):
+        expected = retriever.vector_search(embedding.tolist(), top_k)
+        assert [row[0] for row in rows] == [row[0] for row in expected]
+        assert [row[3] for row in rows] == _scores(expected)
+
+
+@pytest.mark.parametrize("top_k", [1, 3, 100])
+def test_fts_search_batch_matches_per_query(retriever, top_k):
+    batched = retriever.fts_search_batch(QUERIES, top_k)
+
+    assert len(batched) == len(QUERIES)
+    assert batched[-1] == []
+    for query, rows in zip(QUERIES, batched, strict=True):
+        expected = retriever.fts_search(query, top_k)
+        # Equal scores may be cut at top_k in a different order
+        assert [row[3] for row in rows] == _scores(expected)
+        if top_k >= 100:
+            assert {row[0]: row[3] for row in rows} == {
+                row[0]: pytest.approx(row[3], rel=1e-5) for row in expected
+            }
+
+
+@pytest.mark.parametrize("use_rrf", [True, False])
+def test_hybrid_query_matches_the_retriever(db_path, retriever, monkeypatch, use_rrf):
+    model = FakeModel()
+    monkeypatch.setattr(query_module, "_load_model", lambda model_name: model)
+
+    for query in QUERIES:
+        assert hybrid_query(
+            query, db_path=str(db_path), top_k=4, use_rrf=use_rrf
+        ) == retriever.query(query, top_k=4, use_rrf=use_rrf)
+
+
+def test_queries_from_several_threads_match_serial_queries(retriever):
+    expected = {query: retriever.query(query, top_k=4) for query in QUERIES}
+    threads = 4
+    # All threads query at the same time, each on its own cursor
+    start = threading.Barrier(threads)
+    results = [None] * threads
+    errors = []
+
+    def worker(index):
+        try:
+            start.wait(5)
+            results[index] = [retriever.query(query, top_k=4) for query in QUERIES * 3]
+        except Exception as e:  # reported by the assertion below
+            errors.append(e)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join(30)
+
+    assert errors == []
+    assert all(result == [expected[q] for q in QUERIES * 3] for result in results)
+    # The main thread's cursor plus one per worker
+    assert len(retriever._cursors) == threads + 1
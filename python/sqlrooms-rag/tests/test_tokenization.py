@@ -0,0 +1,91 @@
+"""Tests for token-limited splitting with the fallback token estimate."""
+
+import pytest
+from llama_index.core.schema import TextNode
+
+from sqlrooms_rag.prepare.chunking import validate_and_split_chunks
+from sqlrooms_rag.prepare.tokenization import Tokenizer, split_at_tokens, split_text
+
+TOKENIZER = Tokenizer()
+LONG_SENTENCE = "word " * 200
+TEXT = (
+    "Short one. Another short sentence here. "
+    + LONG_SENTENCE
+    + ". Then a medium sized sentence that fits. End"
+)
+
+
+def _count(text):
+    return TOKENIZER.count([text])[0]
+
+
+def _letters(text):
+    return "".join(text.split())
+
+
+@pytest.mark.parametrize("max_tokens", [1, 5, 20, 64])
+def test_split_at_tokens_pieces_fit_and_join_back(max_tokens):
+    pieces = split_at_tokens(TEXT, max_tokens, TOKENIZER)
+
+    assert "".join(pieces) == TEXT
+    assert all(pieces)
+    assert all(_count(piece) <= max_tokens for piece in pieces)
+    # Every cut is at a token start, as full as the limit allows
+    assert all(
+        len(TOKENIZER.token_starts(piece)) == max_tokens for piece in pieces[:-1]
+    )
+
+
+@pytest.mark.parametrize("max_tokens", [1, 8, 30, 1000])
+def test_split_text_pieces_fit_and_keep_all_text(max_tokens):
+    pieces = split_text(TEXT, max_tokens, TOKENIZER)
+
+    assert all(piece and piece == piece.strip() for piece in pieces)
+    assert all(_count(piece) <= max_tokens for piece in pieces)
+    assert _letters("".join(pieces)) == _letters(TEXT)
+    if max_tokens >= _count(TEXT):
+        assert pieces == [TEXT.strip()]
+
+
+def test_split_text_keeps_sentences_together_when_they_fit():
+    pieces = split_text("Alpha beta. Gamma delta. Epsilon zeta.", 8, TOKENIZER)
+
+    assert pieces == ["Alpha beta. Gamma delta.", "Epsilon zeta."]
+
+
+def test_validate_and_split_chunks_respects_reserved_tokens():
+    small = TextNode(text="Fits easily.", metadata={"file_path": "a.md"})
+    large = TextNode(text=TEXT, metadata={"file_path": "b.md"})
+    max_tokens = 40
+    reserved = [0, 15]
+
+    nodes = validate_and_split_chunks(
+        [small, large],
+        max_tokens=max_tokens,
+        verbose=False,
+        tokenizer=TOKENIZER,
+        reserved_tokens=reserved,
+    )
+
+    assert nodes[0] is small
+    pieces = nodes[1:]
+    assert len(pieces) > 1
+    # The reserved prefix still fits on top of every piece
+    assert all(_count(node.text) + reserved[1] <= max_tokens for node in pieces)
+    assert _letters("".join(node.text for node in pieces)) == _letters(TEXT)
+    assert all(node.metadata == {"file_path": "b.md"} for node in pieces)
+    assert len({node.node_id for node in pieces} | {large.node_id}) == len(pieces) + 1
+
+
+def test_validate_and_split_chunks_leaves_fitting_nodes_alone():
+    nodes = [TextNode(text="a" * 30), TextNode(text="b" * 29)]
+
+    kept = validate_and_split_chunks(
+        nodes, max_tokens=10, verbose=False, tokenizer=TOKENIZER
+    )
+    assert kept == nodes
+    # Reserving one token pushes the first node over its limit
+    split = validate_and_split_chunks(
+        nodes, max_tokens=10, verbose=False, tokenizer=TOKENIZER, reserved_tokens=[1, 0]
+    )
+    assert [node.text for node in split] == ["a" * 27, "aaa", "b" * 29]
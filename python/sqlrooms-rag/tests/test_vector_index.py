@@ -0,0 +1,144 @@
+"""Tests for the optional HNSW vector index."""
+
+import duckdb
+import numpy as np
+import pytest
+
+from sqlrooms_rag.prepare.database import (
+    compact_hnsw_index,
+    create_hnsw_index,
+    load_vss_if_indexed,
+)
+from sqlrooms_rag.query import HybridRetriever
+
+DIM = 8
+DOCS = 200
+QUERIES = ["duckdb arrays", "run a join", "parquet tables", "window functions"]
+
+
+class FakeModel:
+    """Deterministic stand-in for a SentenceTransformer."""
+
+    def encode(self, texts, convert_to_numpy=True):
+        if isinstance(texts, str):
+            return self._vector(texts)
+        return np.stack([self._vector(text) for text in texts])
+
+    @staticmethod
+    def _vector(text):
+        seed = sum(ord(char) * (i + 1) for i, char in enumerate(text))
+        return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "kb.duckdb"
+    conn = duckdb.connect(str(path))
+    try:
+        try:
+            conn.execute("INSTALL vss; LOAD vss; INSTALL fts; LOAD fts;")
+        except duckdb.Error as e:
+            pytest.skip(f"DuckDB vss or fts extension unavailable: {e}")
+        rng = np.random.default_rng(11)
+        conn.execute(f"""
+            CREATE TABLE documents (
+                node_id VARCHAR,
+                text TEXT,
+                embedding FLOAT[{DIM}],
+                metadata_ JSON
+            )
+        """)
+        conn.executemany(
+            "INSERT INTO documents VALUES (?, ?, ?, '{}')",
+            [
+                (
+                    f"node-{i:03d}",
+                    f"chunk {i}",
+                    rng.standard_normal(DIM).astype(np.float32).tolist(),
+                )
+                for i in range(DOCS)
+            ],
+        )
+    finally:
+        conn.close()
+    return path
+
+
+def _plan(retriever, embedding, top_k):
+    rows = (
+        retriever._cursor()
+        .execute("EXPLAIN " + retriever._vector_statement.query, [embedding, top_k])
+        .fetchall()
+    )
+    return "\n".join(row[1] for row in rows)
+
+
+def _ids(rows):
+    return [row[0] for row in rows]
+
+
+def test_vector_search_uses_the_index_and_matches_exact_search(db_path):
+    settings = create_hnsw_index(db_path, ef_search=32, verbose=False)
+    assert settings["type"] == "hnsw" and settings["ef_search"] == 32
+
+    model = FakeModel()
+    with (
+        HybridRetriever(str(db_path), model=model, ef_search=DOCS) as indexed,
+        HybridRetriever(str(db_path), model=model, use_vector_index=False) as exact,
+    ):
+        assert indexed.uses_vector_index and not exact.uses_vector_index
+        embedding = indexed.encode(QUERIES[0])
+        assert "HNSW_INDEX_SCAN" in _plan(indexed, embedding, 10)
+        assert "HNSW_INDEX_SCAN" not in _plan(exact, embedding, 10)
+        assert indexed._cursor().execute(
+            "SELECT current_setting('hnsw_ef_search')"
+        ).fetchone() == (DOCS,)
+
+        for query in QUERIES:
+            embedding = indexed.encode(query)
+            approximate = indexed.vector_search(embedding, 10)
+            expected = exact.vector_search(embedding, 10)
+            # ef_search covers every chunk, so the index finds the exact top-k
+            assert _ids(approximate) == _ids(expected)
+            assert [row[3] for row in approximate] == [
+                pytest.approx(row[3], abs=1e-5) for row in expected
+            ]
+
+        batched = indexed.vector_search_batch(indexed.encode_batch(QUERIES), 5)
+        assert [_ids(rows) for rows in batched] == [
+            _ids(exact.vector_search(indexed.encode(query), 5)) for query in QUERIES
+        ]
+
+
+def test_compact_removes_deleted_chunks_from_the_index(db_path):
+    conn = duckdb.connect(str(db_path))
+    try:
+        assert not load_vss_if_indexed(conn)
+    finally:
+        conn.close()
+    assert compact_hnsw_index(db_path, verbose=False) is False
+
+    create_hnsw_index(db_path, verbose=False)
+    conn = duckdb.connect(str(db_path))
+    try:
+        assert load_vss_if_indexed(conn)
+        conn.execute("DELETE FROM documents WHERE node_id < 'node-100'")
+    finally:
+        conn.close()
+
+    assert compact_hnsw_index(db_path, verbose=False) is True
+
+    # Deleted chunks no longer take up top-k slots in the index
+    conn = duckdb.connect(str(db_path), read_only=True)
+    try:
+        conn.execute("LOAD vss")
+        assert conn.execute(
+            "SELECT count FROM pragma_hnsw_index_info()"
+        ).fetchall() == [(DOCS // 2,)]
+    finally:
+        conn.close()
+    with HybridRetriever(str(db_path), model=FakeModel(), ef_search=DOCS) as retriever:
+        assert retriever.uses_vector_index
+        for query in QUERIES:
+            ids = _ids(retriever.vector_search(retriever.encode(query), 20))
+            assert len(ids) == 20 and all(node_id >= "node-100" for node_id in ids)
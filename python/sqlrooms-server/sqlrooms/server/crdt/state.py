@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 import asyncio
+import concurrent.futures
 import logging
-from typing import Dict, Optional
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
 
 from loro import ExportMode, LoroDoc  # type: ignore
 
@@ -10,43 +13,102 @@ from .. import db_async
 
 logger = logging.getLogger(__name__)
 
+# Bounded pool shared by all rooms; rooms are never unloaded, so a thread per room
+# would grow without limit on long-running servers.
+LORO_MAX_WORKERS = min(8, (os.cpu_count() or 1) + 2)
+
+_loro_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_loro_executor_lock = threading.Lock()
+
+
+def _get_loro_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _loro_executor
+    with _loro_executor_lock:
+        if _loro_executor is None:
+            _loro_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=LORO_MAX_WORKERS, thread_name_prefix="crdt-loro"
+            )
+        return _loro_executor
+
 
 class RoomDoc:
-    def __init__(self, doc: Optional[LoroDoc] = None):
+    """
+    A room's LoroDoc plus its per-room lock.
+
+    Heavy Loro work (import/export) runs on a worker pool shared by all rooms, so large
+    documents never stall the asyncio loop. Callers still hold `lock` around each
+    operation; `run` additionally serializes the room's doc access, so at most one
+    pool thread touches a given doc at a time.
+    """
+
+    def __init__(self, doc: Optional[LoroDoc] = None, *, room_id: str = ""):
         self.doc = doc or LoroDoc()
         self.lock = asyncio.Lock()
         self.loaded = False
         self.dirty = False
         self.save_task: Optional[asyncio.Task] = None
+        self.room_id = room_id
+        self._run_lock = asyncio.Lock()
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run a synchronous Loro operation on the shared pool, one at a time per room."""
+        loop = asyncio.get_running_loop()
+        async with self._run_lock:
+            return await loop.run_in_executor(_get_loro_executor(), fn, *args)
+
+    async def import_(self, payload: bytes) -> None:
+        await self.run(self.doc.import_, payload)
+
+    async def export_snapshot(self) -> bytes:
+        return await self.run(self.doc.export, ExportMode.Snapshot())
+
+    def is_empty(self) -> bool:
+        """Cheap emptiness test (no export): true if the doc has no ops."""
+        return self.doc.len_ops == 0
 
 
 class CrdtState:
-    """Manages per-room LoroDoc with lazy load/save to DuckDB (via db_async helpers)."""
+    """Manages per-room LoroDoc with lazy load/save to DuckDB (via db_async helpers).
+
+    Snapshot saves go through a group-commit writer, so rooms that become due within
+    `save_batch_window_ms` of each other are upserted in a single transaction.
+    """
 
-    def __init__(self):
+    def __init__(self, *, save_batch_window_ms: int = 20):
         self._rooms: Dict[str, RoomDoc] = {}
+        self._writer = db_async.CrdtSnapshotWriter(window_ms=save_batch_window_ms)
 
     def _ensure(self, room_id: str) -> RoomDoc:
         if room_id not in self._rooms:
-            self._rooms[room_id] = RoomDoc()
+            self._rooms[room_id] = RoomDoc(room_id=room_id)
         return self._rooms[room_id]
 
     async def ensure_loaded(self, room_id: str) -> RoomDoc:
         room = self._ensure(room_id)
         if room.loaded:
             return room
-        snapshot = await db_async.load_crdt_snapshot(room_id)
-        if snapshot:
-            try:
-                room.doc.import_(snapshot)
-            except Exception:
-                logger.exception("Failed to import snapshot for room %s", room_id)
-        room.loaded = True
+        async with room.lock:
+            # Re-check under lock; a concurrent caller may have loaded it meanwhile.
+            if room.loaded:
+                return room
+            snapshot = await db_async.load_crdt_snapshot(room_id)
+            if snapshot:
+                try:
+                    await room.import_(snapshot)
+                except Exception:
+                    logger.exception("Failed to import snapshot for room %s", room_id)
+            room.loaded = True
         return room
 
-    async def save_snapshot(self, room_id: str, doc: LoroDoc) -> None:
-        snapshot = doc.export(ExportMode.Snapshot())
-        await db_async.save_crdt_snapshot(room_id, snapshot)
+    async def _take_dirty_snapshot(self, room: RoomDoc) -> Optional[bytes]:
+        """Export a snapshot and mark the room clean, or return None if not dirty."""
+        async with room.lock:
+            # Re-check dirty under lock
+            if not room.dirty:
+                return None
+            snapshot = await room.export_snapshot()
+            room.dirty = False
+            return snapshot
 
     async def schedule_save(self, room_id: str, delay_ms: int = 500) -> None:
         """Schedule a debounced snapshot save."""
@@ -69,23 +131,41 @@ class CrdtState:
     async def flush_room(self, room_id: str) -> None:
         """Immediately persist a room if dirty."""
         room = self._rooms.get(room_id)
-        if room and room.dirty:
-            async with room.lock:
-                # Re-check dirty under lock
-                if room.dirty:
-                    await self.save_snapshot(room_id, room.doc)
-                    room.dirty = False
+        if not room or not room.dirty:
+            return
+        snapshot = await self._take_dirty_snapshot(room)
+        if snapshot is None:
+            return
+        try:
+            await self._writer.submit(room_id, snapshot)
+        except Exception:
+            room.dirty = True
+            raise
 
     async def flush_all(self) -> None:
-        """Flush all dirty rooms (call on shutdown)."""
+        """Flush all dirty rooms in one batch (call on shutdown)."""
         dirty_room_ids = [rid for rid, r in self._rooms.items() if r.dirty]
-        if not dirty_room_ids:
-            return
-
-        logger.info("Flushing %d dirty CRDT rooms", len(dirty_room_ids))
-        await asyncio.gather(
-            *(self.flush_room(rid) for rid in dirty_room_ids), return_exceptions=True
-        )
+        if dirty_room_ids:
+            logger.info("Flushing %d dirty CRDT rooms", len(dirty_room_ids))
+        enqueued = []
+        for rid in dirty_room_ids:
+            room = self._rooms[rid]
+            try:
+                snapshot = await self._take_dirty_snapshot(room)
+            except Exception:
+                logger.exception("Failed to export snapshot for room %s", rid)
+                continue
+            if snapshot is not None:
+                self._writer.enqueue(rid, snapshot)
+                enqueued.append(room)
+        # Also drains snapshots still waiting for a debounced batch window.
+        try:
+            await self._writer.flush()
+        except Exception:
+            # Keep the rooms dirty so a later flush retries them.
+            for room in enqueued:
+                room.dirty = True
+            raise
 
     def export_update(self, doc: LoroDoc, from_version=None) -> bytes:
         """
@@ -6,8 +6,6 @@ from typing import Any, Dict, Optional
 
 from socketify import OpCode
 
-from loro import ExportMode  # type: ignore
-
 from .state import CrdtState
 
 
@@ -18,7 +16,9 @@ class CrdtWs:
     Notes:
     - Do not depend on Python `ws` object identity being stable across callbacks.
       Use socketify user_data (conn_id) as the stable identifier for a connection.
-    - Guard all Loro access (export/import) with the per-room lock.
+    - Guard all Loro access (export/import) with the per-room lock, and run it through
+      `RoomDoc.run`, which hands it to the bounded Loro pool shared by all rooms (one
+      operation per room at a time) so large docs never block the event loop.
     """
 
     def __init__(
@@ -27,14 +27,12 @@ class CrdtWs:
         app: Any,
         state: CrdtState,
         allow_client_snapshots: bool,
-        empty_snapshot_len: Optional[int],
         save_debounce_ms: int = 500,
         logger: Optional[logging.Logger] = None,
     ):
         self._app = app
         self._state = state
         self._allow_client_snapshots = allow_client_snapshots
-        self._empty_snapshot_len = empty_snapshot_len
         self._save_debounce_ms = save_debounce_ms
         self._log = logger or logging.getLogger(__name__)
         self._conn_state: Dict[int, Dict[str, Optional[str]]] = {}
@@ -72,7 +70,7 @@ class CrdtWs:
 
         # Export snapshot under lock to avoid races with concurrent imports/exports.
         async with room.lock:
-            snapshot = room.doc.export(ExportMode.Snapshot())
+            snapshot = await room.export_snapshot()
         self._log.debug(f"sending snapshot to {room_id}: {len(snapshot)} bytes")
         ws.send(
             {
@@ -97,7 +95,7 @@ class CrdtWs:
 
         room = await self._state.ensure_loaded(room_id)
         async with room.lock:
-            room.doc.import_(payload)
+            await room.import_(payload)
             update = payload
             await self._state.schedule_save(room_id, delay_ms=self._save_debounce_ms)
         self._log.debug(f"scheduled snapshot save for {room_id}")
@@ -123,13 +121,9 @@ class CrdtWs:
 
         room = await self._state.ensure_loaded(room_id)
 
-        # Guard: only allow seeding when the room is still empty (best-effort).
+        # Guard: only allow seeding when the room is still empty.
         async with room.lock:
-            if self._empty_snapshot_len is None:
-                ws.send({"type": "error", "error": "snapshot rejected"}, OpCode.TEXT)
-                return
-            current = room.doc.export(ExportMode.Snapshot())
-            if len(current) > self._empty_snapshot_len + 64:
+            if not room.is_empty():
                 ws.send(
                     {
                         "type": "error",
@@ -138,7 +132,7 @@ class CrdtWs:
                     OpCode.TEXT,
                 )
                 return
-            room.doc.import_(payload)
+            await room.import_(payload)
             await self._state.schedule_save(room_id, delay_ms=self._save_debounce_ms)
             update = payload
 
@@ -325,18 +325,144 @@ async def load_crdt_snapshot(room_id: str) -> Optional[bytes]:
 
 async def save_crdt_snapshot(room_id: str, snapshot: bytes) -> None:
     """Persist a CRDT snapshot blob for a room into the configured CRDT namespace."""
+    await save_crdt_snapshots({room_id: snapshot})
+
+
+async def save_crdt_snapshots(snapshots: Dict[str, bytes]) -> None:
+    """Upsert many CRDT snapshots (room_id -> blob) in a single statement/transaction.
+
+    The batch is registered as an Arrow table and merged with one
+    INSERT ... SELECT ... ON CONFLICT, instead of one upsert per room.
+    """
     if GLOBAL_CON is None:
         raise RuntimeError("Global DuckDB connection not initialized")
+    if not snapshots:
+        return
     rooms_ref = _sync_rooms_table_ref()
+    tmp_rel = "__sqlrooms_crdt_batch_" + uuid.uuid4().hex
 
     def _save(cur):
-        cur.execute(
-            f"""
-            INSERT INTO {rooms_ref}(room_id, snapshot, updated_at)
-            VALUES (?, ?, now())
-            ON CONFLICT(room_id) DO UPDATE SET snapshot = excluded.snapshot, updated_at = excluded.updated_at
-            """,
-            [room_id, snapshot],
+        import pyarrow as pa
+
+        batch = pa.table(
+            {
+                "room_id": pa.array(list(snapshots.keys()), type=pa.string()),
+                "snapshot": pa.array(list(snapshots.values()), type=pa.binary()),
+            }
         )
+        cur.register(tmp_rel, batch)
+        try:
+            cur.execute(
+                f"""
+                INSERT INTO {rooms_ref}(room_id, snapshot, updated_at)
+                SELECT room_id, snapshot, now() FROM {_quote_ident(tmp_rel)}
+                ON CONFLICT(room_id) DO UPDATE SET snapshot = excluded.snapshot, updated_at = excluded.updated_at
+                """
+            )
+        finally:
+            try:
+                cur.unregister(tmp_rel)
+            except Exception:
+                pass
 
     await run_db_task(_save)
+
+
+def _resolve_waiters(
+    waiters: List[asyncio.Future], exc: Optional[BaseException] = None
+) -> None:
+    """Resolve futures that may belong to another event loop (thread-safe)."""
+    for waiter in waiters:
+
+        def _set(w: asyncio.Future = waiter) -> None:
+            if w.done():
+                return
+            if exc is None:
+                w.set_result(None)
+            else:
+                w.set_exception(exc)
+
+        try:
+            waiter.get_loop().call_soon_threadsafe(_set)
+        except RuntimeError:
+            # Owning loop already closed; nobody is waiting anymore.
+            pass
+
+
+async def _acquire_thread_lock(lock: threading.Lock) -> None:
+    """Acquire a threading lock without blocking the event loop."""
+    if lock.acquire(blocking=False):
+        return
+    acquired = asyncio.get_running_loop().run_in_executor(None, lock.acquire)
+    try:
+        await asyncio.shield(acquired)
+    except asyncio.CancelledError:
+        # The worker still takes the lock; hand it back once it does.
+        acquired.add_done_callback(lambda _: lock.release())
+        raise
+
+
+class CrdtSnapshotWriter:
+    """Group-commit writer for CRDT snapshots.
+
+    Snapshots submitted within `window_ms` of each other are collected (latest snapshot
+    per room wins) and written with a single `save_crdt_snapshots` call, so many dirty
+    rooms cost one cursor and one transaction instead of one per room.
+    """
+
+    def __init__(self, window_ms: int = 20):
+        self.window_ms = window_ms
+        self._lock = threading.Lock()
+        # Threading (not asyncio) lock: the shutdown flush runs on its own event loop.
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[str, bytes] = {}
+        self._waiters: List[asyncio.Future] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def enqueue(self, room_id: str, snapshot: bytes) -> None:
+        """Queue a snapshot for the next batch without waiting for it."""
+        with self._lock:
+            self._pending[room_id] = snapshot
+
+    async def submit(self, room_id: str, snapshot: bytes) -> None:
+        """Queue a snapshot and wait until the batch containing it is committed."""
+        waiter = asyncio.get_running_loop().create_future()
+        with self._lock:
+            self._pending[room_id] = snapshot
+            self._waiters.append(waiter)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        await waiter
+
+    async def flush(self) -> None:
+        """Write everything pending now (also used on shutdown).
+
+        Flushes are serialized, and each drains the queue only once it holds the
+        flush lock, so batches commit in the order they were taken and an older
+        snapshot of a room can never overwrite a newer one.
+        """
+        await _acquire_thread_lock(self._flush_lock)
+        try:
+            while True:
+                with self._lock:
+                    pending, waiters = self._pending, self._waiters
+                    self._pending, self._waiters = {}, []
+                if not pending:
+                    _resolve_waiters(waiters)
+                    return
+                try:
+                    await save_crdt_snapshots(pending)
+                except Exception as exc:
+                    _resolve_waiters(waiters, exc)
+                    raise
+                _resolve_waiters(waiters)
+        finally:
+            self._flush_lock.release()
+
+    async def _run(self) -> None:
+        await asyncio.sleep(self.window_ms / 1000)
+        try:
+            await self.flush()
+        except Exception:
+            # Already surfaced to the submitters waiting on this batch.
+            pass
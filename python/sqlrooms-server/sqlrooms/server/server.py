@@ -109,7 +109,13 @@ def _is_loopback_remote(addr) -> bool:
         if ":" in text and text.count(":") > 1:
             # IPv6, possibly with port suffix not bracketed.
             pass
-        return ipaddress.ip_address(text).is_loopback
+        ip = ipaddress.ip_address(text)
+        # Some socketify builds report IPv4 peers as fully expanded IPv4-mapped IPv6
+        # (e.g. 0000:...:ffff:7f00:0001), which is not `is_loopback` by itself.
+        mapped = getattr(ip, "ipv4_mapped", None)
+        if mapped is not None:
+            return mapped.is_loopback
+        return ip.is_loopback
     except Exception:
         return False
 
@@ -241,23 +247,16 @@ def server(
 
     crdt_enabled = bool(sync_enabled)
     crdt_ws: CrdtWs | None = None
-    empty_snapshot_len: int | None = None
     if crdt_enabled:
         try:
             from .crdt.state import CrdtState
-            from loro import ExportMode, LoroDoc  # type: ignore
 
             crdt_state = CrdtState()
             db_async.register_shutdown_cleanup(crdt_state.flush_all)
-            try:
-                empty_snapshot_len = len(LoroDoc().export(ExportMode.Snapshot()))
-            except Exception:
-                empty_snapshot_len = None
             crdt_ws = CrdtWs(
                 app=app,
                 state=crdt_state,
                 allow_client_snapshots=allow_client_snapshots,
-                empty_snapshot_len=empty_snapshot_len,
                 save_debounce_ms=save_debounce_ms,
                 logger=logger,
             )
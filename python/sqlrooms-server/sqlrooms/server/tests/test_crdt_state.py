@@ -0,0 +1,185 @@
+import asyncio
+import threading
+
+import pytest
+from loro import ExportMode, LoroDoc  # type: ignore
+
+from .. import db_async
+from ..crdt import state as crdt_state
+from ..crdt.state import CrdtState, RoomDoc
+
+
+def _make_update(text: str) -> bytes:
+    doc = LoroDoc()
+    doc.get_text("t").insert(0, text)
+    doc.commit()
+    return doc.export(ExportMode.Snapshot())
+
+
+def test_room_doc_runs_loro_work_off_loop_thread():
+    room = RoomDoc(room_id="r1")
+
+    async def _run():
+        loop_thread = threading.get_ident()
+        worker_threads = {
+            await room.run(threading.get_ident),
+            await room.run(threading.get_ident),
+        }
+        return loop_thread, worker_threads
+
+    loop_thread, worker_threads = asyncio.run(_run())
+    assert loop_thread not in worker_threads
+
+
+def test_rooms_share_bounded_pool_and_serialize_per_room():
+    rooms = [
+        RoomDoc(room_id=f"r{index}") for index in range(3 * crdt_state.LORO_MAX_WORKERS)
+    ]
+    active = {}
+    overlaps = []
+    guard = threading.Lock()
+
+    def _work(room_id):
+        with guard:
+            active[room_id] = active.get(room_id, 0) + 1
+            if active[room_id] > 1:
+                overlaps.append(room_id)
+        threading.Event().wait(0.005)
+        with guard:
+            active[room_id] -= 1
+        return threading.get_ident()
+
+    async def _run():
+        return await asyncio.gather(
+            *(room.run(_work, room.room_id) for room in rooms for _ in range(3))
+        )
+
+    threads = set(asyncio.run(_run()))
+    assert not overlaps
+    assert len(threads) <= crdt_state.LORO_MAX_WORKERS
+
+
+def test_room_doc_is_empty_without_export():
+    room = RoomDoc()
+    assert room.is_empty()
+    asyncio.run(room.import_(_make_update("hello")))
+    assert not room.is_empty()
+
+
+def test_crdt_state_roundtrip_through_meta_storage(tmp_path):
+    db_async.init_global_connection(str(tmp_path / "main.db"), extensions=[])
+    try:
+        db_async.init_meta_storage(namespace="__sqlrooms", attached_db_path=None)
+
+        async def _save():
+            state = CrdtState()
+            room = await state.ensure_loaded("room1")
+            async with room.lock:
+                await room.import_(_make_update("hello"))
+            await state.schedule_save("room1", delay_ms=0)
+            await state.flush_all()
+
+        async def _load():
+            state = CrdtState()
+            room = await state.ensure_loaded("room1")
+            return room.doc.get_text("t").to_string()
+
+        asyncio.run(_save())
+        assert asyncio.run(_load()) == "hello"
+    finally:
+        db_async.force_checkpoint_and_close()
+
+
+def test_snapshot_writer_groups_rooms_into_one_batch(tmp_path, monkeypatch):
+    db_async.init_global_connection(str(tmp_path / "main.db"), extensions=[])
+    try:
+        db_async.init_meta_storage(namespace="__sqlrooms", attached_db_path=None)
+        batches = []
+        save_batch = db_async.save_crdt_snapshots
+
+        async def _recording_save(snapshots):
+            batches.append(dict(snapshots))
+            await save_batch(snapshots)
+
+        monkeypatch.setattr(db_async, "save_crdt_snapshots", _recording_save)
+
+        async def _run():
+            state = CrdtState(save_batch_window_ms=50)
+            for index in range(5):
+                room = await state.ensure_loaded(f"room{index}")
+                async with room.lock:
+                    await room.import_(_make_update(f"text {index}"))
+                await state.schedule_save(f"room{index}", delay_ms=0)
+            await asyncio.sleep(0.2)
+            await state.flush_all()
+
+        asyncio.run(_run())
+        assert len(batches) == 1
+        assert sorted(batches[0]) == [f"room{index}" for index in range(5)]
+        assert asyncio.run(db_async.load_crdt_snapshot("room3"))
+    finally:
+        db_async.force_checkpoint_and_close()
+
+
+def test_snapshot_writer_serializes_concurrent_flushes(tmp_path, monkeypatch):
+    db_async.init_global_connection(str(tmp_path / "main.db"), extensions=[])
+    try:
+        db_async.init_meta_storage(namespace="__sqlrooms", attached_db_path=None)
+        batches = []
+        in_flight = []
+        save_batch = db_async.save_crdt_snapshots
+
+        async def _slow_save(snapshots):
+            in_flight.append(1)
+            assert len(in_flight) == 1, "flushes overlapped"
+            batches.append(dict(snapshots))
+            await asyncio.sleep(0.05)
+            await save_batch(snapshots)
+            in_flight.pop()
+
+        monkeypatch.setattr(db_async, "save_crdt_snapshots", _slow_save)
+
+        async def _run():
+            writer = db_async.CrdtSnapshotWriter(window_ms=0)
+            writer.enqueue("room1", b"old")
+            first = asyncio.create_task(writer.flush())
+            await asyncio.sleep(0.01)
+            writer.enqueue("room1", b"new")
+            await asyncio.gather(first, writer.flush())
+
+        asyncio.run(_run())
+        assert batches == [{"room1": b"old"}, {"room1": b"new"}]
+        assert asyncio.run(db_async.load_crdt_snapshot("room1")) == b"new"
+    finally:
+        db_async.force_checkpoint_and_close()
+
+
+def test_flush_all_keeps_rooms_dirty_when_write_fails(tmp_path, monkeypatch):
+    db_async.init_global_connection(str(tmp_path / "main.db"), extensions=[])
+    try:
+        db_async.init_meta_storage(namespace="__sqlrooms", attached_db_path=None)
+        save_batch = db_async.save_crdt_snapshots
+
+        async def _failing_save(snapshots):
+            raise RuntimeError("disk full")
+
+        async def _run():
+            state = CrdtState()
+            room = await state.ensure_loaded("room1")
+            async with room.lock:
+                await room.import_(_make_update("hello"))
+            room.dirty = True
+
+            monkeypatch.setattr(db_async, "save_crdt_snapshots", _failing_save)
+            with pytest.raises(RuntimeError):
+                await state.flush_all()
+            assert room.dirty
+
+            monkeypatch.setattr(db_async, "save_crdt_snapshots", save_batch)
+            await state.flush_all()
+            assert not room.dirty
+
+        asyncio.run(_run())
+        assert asyncio.run(db_async.load_crdt_snapshot("room1"))
+    finally:
+        db_async.force_checkpoint_and_close()
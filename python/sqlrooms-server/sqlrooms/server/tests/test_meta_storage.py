@@ -73,3 +73,19 @@ def test_meta_storage_attached_db(tmp_path):
         assert row2 is not None and row2[0] == b"\xaa\xbb"
     finally:
         db_async.force_checkpoint_and_close()
+
+
+def test_save_crdt_snapshots_upserts_batch(tmp_path):
+    db_async.init_global_connection(str(tmp_path / "main.db"), extensions=[])
+    try:
+        db_async.init_meta_storage(namespace="__sqlrooms", attached_db_path=None)
+
+        asyncio.run(db_async.save_crdt_snapshot("a", b"old"))
+        asyncio.run(db_async.save_crdt_snapshots({"a": b"new", "b": b"\x00\x01"}))
+
+        assert asyncio.run(db_async.load_crdt_snapshot("a")) == b"new"
+        assert asyncio.run(db_async.load_crdt_snapshot("b")) == b"\x00\x01"
+        row = _query_one_sync("SELECT count(*) FROM __sqlrooms.sync_rooms")
+        assert row == (2,)
+    finally:
+        db_async.force_checkpoint_and_close()
@@ -1,6 +1,6 @@
 import pytest
 
-from sqlrooms.server.server import _normalize_target_relation
+from sqlrooms.server.server import _is_loopback_remote, _normalize_target_relation
 
 
 @pytest.mark.parametrize(
@@ -29,3 +29,19 @@ def test_normalize_target_relation_accepts_safe_identifiers(raw: str, expected:
 def test_normalize_target_relation_rejects_unsafe_input(raw: str):
     with pytest.raises(ValueError):
         _normalize_target_relation(raw)
+
+
+@pytest.mark.parametrize(
+    ("addr", "expected"),
+    [
+        ("127.0.0.1", True),
+        ("::1", True),
+        ("::ffff:127.0.0.1", True),
+        ("0000:0000:0000:0000:0000:ffff:7f00:0001", True),
+        ("0000:0000:0000:0000:0000:ffff:c0a8:0001", False),
+        ("192.168.0.1", False),
+        (None, False),
+    ],
+)
+def test_is_loopback_remote(addr, expected: bool):
+    assert _is_loopback_remote(addr) is expected
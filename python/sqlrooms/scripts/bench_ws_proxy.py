@@ -0,0 +1,99 @@
+"""Benchmark the launcher's `/ws/duckdb` proxy (throughput and latency percentiles).
+
+Starts the DuckDB websocket backend and the launcher app in-process, then drives N
+concurrent clients that each issue sequential queries through `/ws/duckdb`.
+
+    python scripts/bench_ws_proxy.py --mode in-process  # no upstream socket
+    python scripts/bench_ws_proxy.py --mode pooled      # multiplexed upstream pool
+    python scripts/bench_ws_proxy.py --mode dedicated   # one upstream per client
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import uvicorn
+import websockets
+
+from sqlrooms.web.launcher import SqlroomsHttpServer, _pick_free_port
+
+
+async def _client(url: str, sql: str, queries: int, latencies: list[float]) -> None:
+    async with websockets.connect(url, max_size=None) as ws:
+        for index in range(queries):
+            query_id = f"{id(ws)}-{index}"
+            started = time.perf_counter()
+            await ws.send(
+                json.dumps({"type": "arrow", "sql": sql, "queryId": query_id})
+            )
+            while True:
+                message = await ws.recv()
+                if isinstance(message, bytes) or query_id in message:
+                    break
+            latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def _run(args: argparse.Namespace) -> None:
+    port = _pick_free_port("127.0.0.1")
+    server = SqlroomsHttpServer(
+        db_path=":memory:",
+        host="127.0.0.1",
+        port=port,
+        ws_port=None,
+        open_browser=False,
+        serve_ui=False,
+        ws_proxy_pool_size=0 if args.mode == "dedicated" else args.pool_size,
+        ws_proxy_in_process=args.mode == "in-process",
+    )
+    server._start_duckdb_backend()
+    uvicorn_server = uvicorn.Server(
+        uvicorn.Config(
+            server._build_app(), host="127.0.0.1", port=port, log_level="warning"
+        )
+    )
+    serve_task = asyncio.create_task(uvicorn_server.serve())
+    while not uvicorn_server.started:
+        await asyncio.sleep(0.05)
+
+    url = f"ws://127.0.0.1:{port}/ws/duckdb?token={server.session_token}"
+    # Warm up the backend and upstream connections.
+    await _client(url, args.sql, 5, [])
+
+    latencies: list[float] = []
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(_client(url, args.sql, args.queries, latencies) for _ in range(args.clients))
+    )
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"mode={args.mode} clients={args.clients} queries={len(latencies)} "
+        f"throughput={len(latencies) / elapsed:.0f} q/s "
+        f"p50={statistics.median(latencies):.2f} ms p99={p99:.2f} ms"
+    )
+
+    uvicorn_server.should_exit = True
+    await serve_task
+    await server.duckdb_proxy.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--mode", choices=("in-process", "pooled", "dedicated"), default="in-process"
+    )
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--sql", default="SELECT range AS x FROM range(1000)")
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,8 @@ import typer
 
 from .web.db_bridge import (
     SUPPORTED_ENGINES,
+    BridgePoolSettings,
+    BridgeResultCacheSettings,
     PostgresConnectorSettings,
     SnowflakeConnectorSettings,
 )
@@ -191,6 +193,69 @@ def _require_config_string(
     )
 
 
+def _load_pool_config(item: dict[str, Any], *, connector_id: str) -> BridgePoolSettings:
+    pool = item.get("pool")
+    if pool is None:
+        return BridgePoolSettings()
+    if not isinstance(pool, dict):
+        raise RuntimeError(f"Connector '{connector_id}' 'pool' must be a table.")
+    defaults = BridgePoolSettings()
+    values: dict[str, Any] = {}
+    for key, value in pool.items():
+        default = getattr(defaults, key, None)
+        if default is None:
+            raise RuntimeError(
+                f"Connector '{connector_id}' has unknown pool setting: {key!r}"
+            )
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise RuntimeError(
+                f"Connector '{connector_id}' pool setting '{key}' must be a number."
+            )
+        values[key] = int(value) if isinstance(default, int) else float(value)
+    try:
+        return BridgePoolSettings(**values)
+    except ValueError as exc:
+        raise RuntimeError(f"Connector '{connector_id}': {exc}") from exc
+
+
+def _load_result_cache_config(path: Path | None) -> BridgeResultCacheSettings | None:
+    """Read the opt-in `[db.result_cache]` table; None when caching is off."""
+    if path is None:
+        return None
+    db = _read_toml(path).get("db")
+    if not isinstance(db, dict) or "result_cache" not in db:
+        return None
+    cache = db["result_cache"]
+    if not isinstance(cache, dict):
+        raise RuntimeError("'db.result_cache' must be a table in SQLRooms config.")
+    enabled = cache.get("enabled", True)
+    if not isinstance(enabled, bool):
+        raise RuntimeError("'db.result_cache.enabled' must be a boolean.")
+    if not enabled:
+        return None
+    defaults = BridgeResultCacheSettings()
+    values: dict[str, Any] = {}
+    for key, value in cache.items():
+        if key == "enabled":
+            continue
+        if key == "directory":
+            directory = _normalize_config_string(value)
+            if directory is None:
+                raise RuntimeError("'db.result_cache.directory' must be a string.")
+            values[key] = str(Path(directory).expanduser())
+            continue
+        if key not in ("ttl_s", "max_bytes"):
+            raise RuntimeError(f"Unknown db.result_cache setting: {key!r}")
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise RuntimeError(f"'db.result_cache.{key}' must be a number.")
+        default = getattr(defaults, key)
+        values[key] = int(value) if isinstance(default, int) else float(value)
+    try:
+        return BridgeResultCacheSettings(**values)
+    except ValueError as exc:
+        raise RuntimeError(f"db.result_cache: {exc}") from exc
+
+
 def _load_connector_config(
     path: Path | None,
 ) -> list[PostgresConnectorSettings | SnowflakeConnectorSettings]:
@@ -222,6 +287,7 @@ def _load_connector_config(
         seen_ids.add(connection_id)
 
         title = _normalize_config_string(item.get("title")) or connection_id
+        pool = _load_pool_config(item, connector_id=connection_id)
         if engine == "postgres":
             out.append(
                 PostgresConnectorSettings(
@@ -232,6 +298,7 @@ def _load_connector_config(
                     password=_normalize_config_string(item.get("password")),
                     connection_id=connection_id,
                     title=title,
+                    pool=pool,
                 )
             )
             continue
@@ -248,6 +315,7 @@ def _load_connector_config(
                 authenticator=_normalize_config_string(item.get("authenticator")),
                 connection_id=connection_id,
                 title=title,
+                pool=pool,
             )
         )
     logger.debug("Loaded SQLRooms connector config from %s", path)
@@ -604,6 +672,17 @@ def main(
         envvar="SQLROOMS_EXTERNAL_WS_URL",
         help="Public DuckDB websocket URL to expose in runtime config, e.g. wss://my-sprite.sprites.dev:4000.",
     ),
+    attach_postgres: bool = typer.Option(
+        False,
+        "--attach-postgres",
+        help="ATTACH configured Postgres connectors into DuckDB (read-only, via the postgres extension) so local tables can be joined with remote ones.",
+    ),
+    extension_dir: str | None = typer.Option(
+        None,
+        "--extension-dir",
+        envvar="SQLROOMS_EXTENSION_DIR",
+        help="DuckDB extension directory to load the postgres extension from, for offline use.",
+    ),
 ):
     """
     Launch a local SQLRooms project for adding data and building worksheets with Mosaic charts and dashboards.
@@ -636,6 +715,7 @@ def main(
             experimental=experimental,
         )
         connector_settings = _load_connector_config(config_path)
+        bridge_result_cache = _load_result_cache_config(config_path)
         (
             llm_provider,
             llm_model,
@@ -700,6 +780,9 @@ def main(
         ai_custom_models=ai_custom_models,
         ai_model_parameters=ai_model_parameters,
         connector_settings=connector_settings,
+        bridge_result_cache=bridge_result_cache,
+        attach_postgres=attach_postgres,
+        extension_dir=str(Path(extension_dir).expanduser()) if extension_dir else None,
         open_browser=not no_open_browser,
         ui_dir=ui,
         serve_ui=not no_ui,
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from contextlib import aclosing
+from typing import Any, AsyncIterator
+
+from sqlrooms.server import db_async
+from sqlrooms.server.server import _normalize_target_relation, _quote_ident
+
+logger = logging.getLogger(__name__)
+
+# Batches fetched ahead of the DuckDB writer; bounds memory per materialization.
+PREFETCH_BATCHES = 2
+
+
+async def materialize_arrow_batches(
+    batches: AsyncIterator[bytes],
+    *,
+    table_name: str,
+    query_id: str,
+) -> AsyncIterator[dict[str, Any]]:
+    """Stream Arrow IPC `batches` (e.g. a bridge query) into a DuckDB table on
+    `db_async.GLOBAL_CON`.
+
+    Batches are pulled from the source while the previous batch is being
+    inserted, and written into a staging table next to the target. The staging table
+    replaces `table_name` in one transaction once the stream completes, so readers
+    never see a partial extract; on error or cancellation it is dropped and the
+    source is closed (which cancels a bridge query).
+
+    Yields a progress dict (`rows`, `batches`) after every inserted batch. A source
+    that produces no batches at all has no schema to create a table from: nothing is
+    yielded and `table_name` is left as it was.
+    Raises ValueError for an invalid `table_name`.
+    """
+    target_rel = _normalize_target_relation(table_name)
+    parts = table_name.strip().split(".")
+    staging_name = f"__sqlrooms_materialize_{os.urandom(8).hex()}"
+    staging_rel = ".".join(_quote_ident(p) for p in [*parts[:-1], staging_name])
+    batch_rel = f"{staging_name}_batch"
+
+    def _insert(cur, payload: bytes, create: bool) -> int:
+        import pyarrow as pa
+
+        table = pa.ipc.open_stream(payload).read_all()
+        cur.register(batch_rel, table)
+        try:
+            if create:
+                cur.execute(
+                    f"CREATE TABLE {staging_rel} AS SELECT * FROM {_quote_ident(batch_rel)}"
+                )
+            else:
+                cur.execute(
+                    f"INSERT INTO {staging_rel} SELECT * FROM {_quote_ident(batch_rel)}"
+                )
+        finally:
+            try:
+                cur.unregister(batch_rel)
+            except Exception:
+                pass
+        return table.num_rows
+
+    def _swap(cur) -> None:
+        cur.execute("BEGIN TRANSACTION")
+        try:
+            cur.execute(f"DROP TABLE IF EXISTS {target_rel}")
+            cur.execute(
+                f"ALTER TABLE {staging_rel} RENAME TO {_quote_ident(parts[-1])}"
+            )
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+
+    queue: asyncio.Queue[bytes | BaseException | None] = asyncio.Queue(
+        maxsize=PREFETCH_BATCHES
+    )
+
+    async def _produce() -> None:
+        try:
+            async with aclosing(batches) as source:
+                async for batch in source:
+                    await queue.put(batch)
+        except Exception as exc:
+            await queue.put(exc)
+            return
+        await queue.put(None)
+
+    producer = asyncio.create_task(_produce())
+    created = False
+    swapped = False
+    rows = 0
+    inserted = 0
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            rows += await db_async.run_db_task(
+                lambda cur, payload=item, create=not created: _insert(
+                    cur, payload, create
+                ),
+                query_id=query_id,
+            )
+            created = True
+            inserted += 1
+            yield {"rows": rows, "batches": inserted}
+        if created:
+            await db_async.run_db_task(_swap, query_id=query_id)
+            swapped = True
+    finally:
+        if not producer.done():
+            producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+        if created and not swapped:
+            try:
+                await db_async.run_db_task(
+                    lambda cur: cur.execute(f"DROP TABLE IF EXISTS {staging_rel}")
+                )
+            except Exception as exc:
+                logger.warning("Failed to drop staging table %s: %s", staging_rel, exc)
@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+# Unfinished uploads older than this are discarded.
+SESSION_TTL_S = 24 * 3600.0
+HASH_READ_SIZE = 1024 * 1024
+STATE_DIR_NAME = ".chunked"
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+_UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ChunkedUploadError(ValueError):
+    """Raised for invalid chunked-upload requests (bad ids, sizes or checksums)."""
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(HASH_READ_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_json(path: Path, payload: Any) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(payload), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class ChunkedUploadManager:
+    """Resumable, content-addressed uploads into `upload_dir`.
+
+    A client calls `init` with the file name, size and (optionally) its SHA-256.
+    If a file with that hash was uploaded before, its path is returned right away.
+    Otherwise chunks are sent in any order with `put_chunk`, each verified against
+    its own SHA-256, and `complete` hashes the assembled file, deduplicates it
+    against earlier uploads and moves it into place.
+
+    Session state lives under `upload_dir/.chunked` so an interrupted upload (or
+    a restarted server) resumes from the chunks already received.
+
+    Chunk writes and `complete` exclude each other per upload: `complete` is
+    refused while chunks are still being written, and once it has started, further
+    chunks, a second `complete` and `abort` are refused.
+    """
+
+    def __init__(self, upload_dir: Path):
+        self.upload_dir = Path(upload_dir)
+        self.state_dir = self.upload_dir / STATE_DIR_NAME
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self._index_path = self.state_dir / "index.json"
+        self._lock = threading.Lock()
+        self._sessions: dict[str, dict[str, Any]] = {}
+        # Uploads being completed, and the number of chunk writes in flight per
+        # upload (runtime only; a restart drops both).
+        self._completing: set[str] = set()
+        self._writing: dict[str, int] = {}
+        # sha256 -> {"name", "size", "mtimeNs"} of a completed upload.
+        self._index: dict[str, dict[str, Any]] = {}
+        self._load()
+
+    def init(
+        self,
+        *,
+        filename: str,
+        size: int,
+        sha256: str | None = None,
+        chunk_size: int | None = None,
+    ) -> dict[str, Any]:
+        if size < 0:
+            raise ChunkedUploadError("size must be >= 0")
+        chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+            raise ChunkedUploadError(
+                f"chunkSize must be between 1 and {MAX_CHUNK_SIZE}"
+            )
+        if sha256 is not None:
+            sha256 = sha256.lower()
+            if not _SHA256_RE.match(sha256):
+                raise ChunkedUploadError("sha256 must be a hex SHA-256 digest")
+        with self._lock:
+            self._expire_sessions_locked()
+            if sha256 is not None:
+                existing = self._lookup_locked(sha256, size)
+                if existing is not None:
+                    return {
+                        "complete": True,
+                        "deduplicated": True,
+                        "path": str(existing),
+                        "sha256": sha256,
+                    }
+                for upload_id, session in self._sessions.items():
+                    if (
+                        session["sha256"] == sha256
+                        and session["size"] == size
+                        and session["chunkSize"] == chunk_size
+                    ):
+                        # Resume: the client only re-sends what is missing.
+                        return self._status_locked(upload_id)
+            upload_id = os.urandom(16).hex()
+            session = {
+                "filename": filename,
+                "size": size,
+                "sha256": sha256,
+                "chunkSize": chunk_size,
+                "chunkCount": max(1, math.ceil(size / chunk_size)),
+                "received": [],
+                "updatedAt": time.time(),
+            }
+            with open(self._part_path(upload_id), "wb") as f:
+                f.truncate(size)
+            self._sessions[upload_id] = session
+            self._save_session_locked(upload_id)
+            return self._status_locked(upload_id)
+
+    def status(self, upload_id: str) -> dict[str, Any]:
+        with self._lock:
+            self._session_locked(upload_id)
+            return self._status_locked(upload_id)
+
+    def put_chunk(
+        self, upload_id: str, index: int, data: bytes, sha256: str
+    ) -> dict[str, Any]:
+        with self._lock:
+            session = self._session_locked(upload_id)
+            chunk_size = session["chunkSize"]
+            size = session["size"]
+            count = session["chunkCount"]
+        if not 0 <= index < count:
+            raise ChunkedUploadError(f"chunk index must be between 0 and {count - 1}")
+        expected = min(chunk_size, size - index * chunk_size)
+        if len(data) != expected:
+            raise ChunkedUploadError(
+                f"chunk {index} must be {expected} bytes, got {len(data)}"
+            )
+        if hashlib.sha256(data).hexdigest() != (sha256 or "").lower():
+            raise ChunkedUploadError(f"chunk {index} checksum mismatch")
+        with self._lock:
+            self._session_locked(upload_id)
+            self._check_not_completing_locked(upload_id)
+            self._writing[upload_id] = self._writing.get(upload_id, 0) + 1
+        try:
+            # Chunks land at fixed offsets, so they may arrive in parallel/any order.
+            with open(self._part_path(upload_id), "r+b") as f:
+                f.seek(index * chunk_size)
+                f.write(data)
+        except FileNotFoundError:
+            # Aborted, expired or otherwise removed while this chunk was in flight.
+            raise ChunkedUploadError(f"Unknown upload: {upload_id}") from None
+        finally:
+            with self._lock:
+                self._writing[upload_id] -= 1
+                if not self._writing[upload_id]:
+                    del self._writing[upload_id]
+        with self._lock:
+            session = self._session_locked(upload_id)
+            if index not in session["received"]:
+                session["received"].append(index)
+                session["received"].sort()
+            session["updatedAt"] = time.time()
+            self._save_session_locked(upload_id)
+            return self._status_locked(upload_id)
+
+    def complete(self, upload_id: str) -> dict[str, Any]:
+        """Verify and move the assembled file into `upload_dir` (blocking: hashes
+        the whole file)."""
+        with self._lock:
+            session = dict(self._session_locked(upload_id))
+            self._check_not_completing_locked(upload_id)
+            missing = sorted(
+                set(range(session["chunkCount"])) - set(session["received"])
+            )
+            if missing and session["size"] > 0:
+                raise ChunkedUploadError(f"missing chunks: {missing[:20]}")
+            if self._writing.get(upload_id):
+                raise ChunkedUploadError(f"Upload {upload_id} has chunks in flight")
+            self._completing.add(upload_id)
+        try:
+            return self._complete(upload_id, session)
+        finally:
+            with self._lock:
+                self._completing.discard(upload_id)
+
+    def _complete(self, upload_id: str, session: dict[str, Any]) -> dict[str, Any]:
+        part = self._part_path(upload_id)
+        try:
+            digest = _sha256_file(part)
+        except FileNotFoundError:
+            raise ChunkedUploadError(f"Unknown upload: {upload_id}") from None
+        if session["sha256"] is not None and digest != session["sha256"]:
+            raise ChunkedUploadError("file checksum mismatch")
+        with self._lock:
+            self._drop_session_locked(upload_id, keep_part=True)
+            existing = self._lookup_locked(digest, session["size"])
+            if existing is not None:
+                part.unlink(missing_ok=True)
+                return {
+                    "complete": True,
+                    "deduplicated": True,
+                    "path": str(existing),
+                    "sha256": digest,
+                }
+            target = self._target_path(session["filename"], digest)
+            try:
+                os.replace(part, target)
+            except FileNotFoundError:
+                raise ChunkedUploadError(f"Unknown upload: {upload_id}") from None
+            stat = target.stat()
+            self._index[digest] = {
+                "name": target.name,
+                "size": stat.st_size,
+                "mtimeNs": stat.st_mtime_ns,
+            }
+            _write_json(self._index_path, self._index)
+        return {
+            "complete": True,
+            "deduplicated": False,
+            "path": str(target),
+            "sha256": digest,
+        }
+
+    def abort(self, upload_id: str) -> None:
+        with self._lock:
+            self._session_locked(upload_id)
+            self._check_not_completing_locked(upload_id)
+            self._drop_session_locked(upload_id)
+
+    def _part_path(self, upload_id: str) -> Path:
+        return self.state_dir / f"{upload_id}.part"
+
+    def _session_path(self, upload_id: str) -> Path:
+        return self.state_dir / f"{upload_id}.json"
+
+    def _target_path(self, filename: str, digest: str) -> Path:
+        target = self.upload_dir / filename
+        if not target.exists():
+            return target
+        # Never overwrite a different file that is already in use.
+        return self.upload_dir / f"{target.stem}-{digest[:12]}{target.suffix}"
+
+    def _session_locked(self, upload_id: str) -> dict[str, Any]:
+        session = (
+            self._sessions.get(upload_id) if _UPLOAD_ID_RE.match(upload_id) else None
+        )
+        if session is None:
+            raise ChunkedUploadError(f"Unknown upload: {upload_id}")
+        return session
+
+    def _check_not_completing_locked(self, upload_id: str) -> None:
+        if upload_id in self._completing:
+            raise ChunkedUploadError(f"Upload {upload_id} is being completed")
+
+    def _status_locked(self, upload_id: str) -> dict[str, Any]:
+        session = self._sessions[upload_id]
+        return {
+            "complete": False,
+            "uploadId": upload_id,
+            "chunkSize": session["chunkSize"],
+            "chunkCount": session["chunkCount"],
+            "receivedChunks": list(session["received"]),
+        }
+
+    def _lookup_locked(self, digest: str, size: int) -> Path | None:
+        entry = self._index.get(digest)
+        if entry is None:
+            return None
+        path = self.upload_dir / entry["name"]
+        try:
+            stat = path.stat()
+        except OSError:
+            stat = None
+        # Cheap staleness check: a plain /api/upload may have replaced it. Only
+        # then is the entry dropped; a client declaring another size for the same
+        # digest gets no match but must not evict the valid entry.
+        if stat is None or (stat.st_size, stat.st_mtime_ns) != (
+            entry["size"],
+            entry["mtimeNs"],
+        ):
+            del self._index[digest]
+            _write_json(self._index_path, self._index)
+            return None
+        return path if size == entry["size"] else None
+
+    def _save_session_locked(self, upload_id: str) -> None:
+        _write_json(self._session_path(upload_id), self._sessions[upload_id])
+
+    def _drop_session_locked(self, upload_id: str, *, keep_part: bool = False) -> None:
+        self._sessions.pop(upload_id, None)
+        self._session_path(upload_id).unlink(missing_ok=True)
+        if not keep_part:
+            self._part_path(upload_id).unlink(missing_ok=True)
+
+    def _expire_sessions_locked(self) -> None:
+        cutoff = time.time() - SESSION_TTL_S
+        for upload_id in [
+            upload_id
+            for upload_id, session in self._sessions.items()
+            if session["updatedAt"] < cutoff
+            and upload_id not in self._completing
+            and not self._writing.get(upload_id)
+        ]:
+            self._drop_session_locked(upload_id)
+
+    def _load(self) -> None:
+        try:
+            index = json.loads(self._index_path.read_text(encoding="utf-8"))
+            if isinstance(index, dict):
+                self._index = {
+                    str(k): v
+                    for k, v in index.items()
+                    if isinstance(v, dict) and {"name", "size", "mtimeNs"} <= set(v)
+                }
+        except FileNotFoundError:
+            pass
+        except Exception as exc:
+            logger.warning("Ignoring unreadable upload index: %s", exc)
+        for path in self.state_dir.glob("*.json"):
+            upload_id = path.stem
+            if not _UPLOAD_ID_RE.match(upload_id):
+                continue
+            try:
+                session = json.loads(path.read_text(encoding="utf-8"))
+            except Exception:
+                continue
+            if self._part_path(upload_id).exists():
+                self._sessions[upload_id] = session
+        with self._lock:
+            self._expire_sessions_locked()
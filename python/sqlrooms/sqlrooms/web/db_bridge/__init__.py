@@ -1,4 +1,6 @@
+from .attach import attach_postgres_connectors
 from .connectors import (
+    BridgeQueryCancelledError,
     PostgresBridgeConnector,
     PostgresConnectorSettings,
     SnowflakeBridgeConnector,
@@ -10,10 +12,24 @@ from .factory import (
     build_cli_db_bridge_registry,
     build_ephemeral_connector,
 )
+from .partition import DEFAULT_PARTITIONS
+from .pool import (
+    BridgeConnectionPool,
+    BridgePoolExhaustedError,
+    BridgePoolSettings,
+)
 from .registry import DbBridgeRegistry, UnknownBridgeConnectionError
+from .result_cache import BridgeResultCache, BridgeResultCacheSettings
 from .types import DbBridgeConnector
 
 __all__ = [
+    "BridgeConnectionPool",
+    "BridgePoolExhaustedError",
+    "BridgePoolSettings",
+    "BridgeQueryCancelledError",
+    "BridgeResultCache",
+    "BridgeResultCacheSettings",
+    "DEFAULT_PARTITIONS",
     "DbBridgeConnector",
     "DbBridgeRegistry",
     "ENGINE_CONFIG_FIELDS",
@@ -23,6 +39,7 @@ __all__ = [
     "PostgresConnectorSettings",
     "SnowflakeBridgeConnector",
     "SnowflakeConnectorSettings",
+    "attach_postgres_connectors",
     "build_cli_db_bridge_registry",
     "build_ephemeral_connector",
 ]
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import logging
+from typing import Any, Iterable
+
+from .connectors import PostgresConnectorSettings
+from .utils import quoted_ident
+
+logger = logging.getLogger(__name__)
+
+POSTGRES_EXTENSION = "postgres"
+
+
+def _sql_string(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def load_postgres_extension(con: Any, *, extension_dir: str | None = None) -> None:
+    """Load DuckDB's postgres scanner, preferring a local extension directory.
+
+    With `extension_dir` the extension is loaded from that directory (laid out like
+    `~/.duckdb/extensions`, e.g. populated once with `INSTALL postgres` while
+    online), so startup works offline; it is only downloaded if missing there. The
+    connection's own `extension_directory` is restored afterwards, so other
+    extensions keep installing to and loading from their usual place.
+    """
+    if not extension_dir:
+        _install_and_load(con, POSTGRES_EXTENSION)
+        return
+    setting = con.execute("SELECT current_setting('extension_directory')")
+    previous = setting.fetchone()[0]
+    con.execute(f"SET extension_directory = {_sql_string(extension_dir)}")
+    try:
+        _install_and_load(con, POSTGRES_EXTENSION)
+    finally:
+        if previous:
+            con.execute(f"SET extension_directory = {_sql_string(previous)}")
+        else:
+            con.execute("RESET extension_directory")
+
+
+def _install_and_load(con: Any, extension: str) -> None:
+    try:
+        con.execute(f"LOAD {extension}")
+    except Exception:
+        con.execute(f"INSTALL {extension}")
+        con.execute(f"LOAD {extension}")
+
+
+def postgres_attach_statements(
+    settings: PostgresConnectorSettings, *, secret_name: str
+) -> list[str]:
+    """SQL that ATTACHes one Postgres connector read-only under its connection id.
+
+    Credentials go into a temporary secret rather than the ATTACH string, which
+    `duckdb_databases()` would otherwise expose to every client of the session.
+    """
+    options = [
+        f"HOST {_sql_string(settings.host)}",
+        f"PORT {int(settings.port or 5432)}",
+        f"DATABASE {_sql_string(settings.database)}",
+        f"USER {_sql_string(settings.user)}",
+    ]
+    if settings.password:
+        options.append(f"PASSWORD {_sql_string(settings.password)}")
+    secret = quoted_ident(secret_name)
+    alias = quoted_ident(settings.connection_id)
+    return [
+        f"CREATE OR REPLACE TEMPORARY SECRET {secret} "
+        f"(TYPE postgres, {', '.join(options)})",
+        f"ATTACH IF NOT EXISTS '' AS {alias} "
+        f"(TYPE postgres, SECRET {secret}, READ_ONLY)",
+    ]
+
+
+def attach_postgres_connectors(
+    con: Any,
+    connector_settings: Iterable[Any],
+    *,
+    extension_dir: str | None = None,
+) -> list[str]:
+    """ATTACH every Postgres connector into `con` so DuckDB queries can join
+    remote tables directly (`SELECT ... FROM "<connection id>".public.orders`).
+
+    The postgres scanner pushes projections and filters down to Postgres, so only
+    the needed rows and columns are transferred. Failures are logged and skipped;
+    returns the catalog names that were attached.
+    """
+    postgres = [
+        s for s in connector_settings if isinstance(s, PostgresConnectorSettings)
+    ]
+    if not postgres:
+        return []
+    try:
+        load_postgres_extension(con, extension_dir=extension_dir)
+    except Exception as exc:
+        logger.warning("Failed to load the DuckDB postgres extension: %s", exc)
+        return []
+    try:
+        con.execute("SET pg_experimental_filter_pushdown = true")
+    except Exception as exc:
+        # Older/newer extension versions may not expose the setting.
+        logger.debug("Could not enable postgres filter pushdown: %s", exc)
+
+    attached: list[str] = []
+    for index, settings in enumerate(postgres):
+        try:
+            for sql in postgres_attach_statements(
+                settings, secret_name=f"sqlrooms_pg_{index}"
+            ):
+                con.execute(sql)
+        except Exception as exc:
+            logger.warning(
+                "Failed to attach Postgres connector %s to DuckDB: %s",
+                settings.connection_id,
+                exc,
+            )
+            continue
+        attached.append(settings.connection_id)
+        logger.info("Attached Postgres connector %s to DuckDB", settings.connection_id)
+    return attached
@@ -1,7 +1,9 @@
+from .base import BridgeQueryCancelledError
 from .postgres import PostgresBridgeConnector, PostgresConnectorSettings
 from .snowflake import SnowflakeBridgeConnector, SnowflakeConnectorSettings
 
 __all__ = [
+    "BridgeQueryCancelledError",
     "PostgresBridgeConnector",
     "PostgresConnectorSettings",
     "SnowflakeBridgeConnector",
@@ -1,8 +1,53 @@
 from __future__ import annotations
 
-from typing import Any, Iterable
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator
 
-from ..utils import cursor_columns, rows_to_arrow_bytes, rows_to_json_rows
+import pyarrow as pa
+
+from ..partition import (
+    DEFAULT_PARTITIONS,
+    qualified_table,
+    range_predicates,
+    split_bounds,
+)
+from ..pool import BridgeConnectionPool
+from ..utils import (
+    ValueConverter,
+    cursor_columns,
+    quoted_ident,
+    rows_to_arrow_bytes,
+    rows_to_json_rows,
+)
+
+
+class BridgeQueryCancelledError(RuntimeError):
+    """Raised when a bridge query is cancelled through `cancel_query`."""
+
+
+class _RunningQuery:
+    __slots__ = ("conn", "cancelled")
+
+    def __init__(self, conn: Any):
+        self.conn = conn
+        self.cancelled = False
+
+
+class ExportedSnapshot:
+    """A transaction snapshot that other connections can read from.
+
+    Held open (with its exporting transaction) until `close` is called.
+    """
+
+    __slots__ = ("snapshot_id", "_close")
+
+    def __init__(self, snapshot_id: str, close: Callable[[], Any]):
+        self.snapshot_id = snapshot_id
+        self._close = close
+
+    def close(self) -> None:
+        self._close()
 
 
 class BaseSqlBridgeConnector:
@@ -10,50 +55,194 @@ class BaseSqlBridgeConnector:
     Shared SQL execution helpers for bridge connectors.
 
     Subclasses provide `_connect()` and any engine-specific catalog/diagnostics logic.
+    Connections are taken from `_connection()`, which reuses a pooled connection once
+    `enable_pool()` has been called (the registry does this on `register`).
+
+    Queries started with a `query_id` are tracked until they finish, so
+    `cancel_query` (called from another thread) can interrupt them on the server
+    through `_cancel_running`.
     """
 
+    _pool: BridgeConnectionPool | None = None
+    _running: dict[str, _RunningQuery]
+    _running_lock: threading.Lock
+
+    def __post_init__(self) -> None:
+        # Connectors are frozen dataclasses; running queries are runtime state.
+        object.__setattr__(self, "_running", {})
+        object.__setattr__(self, "_running_lock", threading.Lock())
+
     def _connect(self):
         raise NotImplementedError
 
-    def test_connection(self) -> bool:
+    def enable_pool(self) -> BridgeConnectionPool | None:
+        """Attach a connection pool built from `settings.pool`, if pooling is on."""
+        if self._pool is not None:
+            return self._pool
+        pool_settings = getattr(getattr(self, "settings", None), "pool", None)
+        if pool_settings is None or pool_settings.max_size <= 0:
+            return None
+        pool = BridgeConnectionPool(
+            self._connect, pool_settings, name=getattr(self, "connection_id", "")
+        )
+        # Connectors are frozen dataclasses; the pool is runtime state, not config.
+        object.__setattr__(self, "_pool", pool)
+        return pool
+
+    @contextmanager
+    def _connection(self) -> Iterator[Any]:
+        if self._pool is not None:
+            with self._pool.connection() as conn:
+                yield conn
+            return
         with self._connect() as conn:
+            yield conn
+
+    @contextmanager
+    def _track_query(self, query_id: str | None, conn: Any) -> Iterator[_RunningQuery]:
+        running = _RunningQuery(conn)
+        if query_id:
+            with self._running_lock:
+                self._running[query_id] = running
+        try:
+            yield running
+        finally:
+            if query_id:
+                with self._running_lock:
+                    if self._running.get(query_id) is running:
+                        del self._running[query_id]
+
+    def _execute(self, cur: Any, sql: str, running: _RunningQuery) -> None:
+        if running.cancelled:
+            raise BridgeQueryCancelledError("Query was cancelled")
+        cur.execute(sql)
+        if running.cancelled:
+            raise BridgeQueryCancelledError("Query was cancelled")
+
+    def _cancel_running(self, running: _RunningQuery) -> None:
+        """Interrupt `running` on the server. Called from a thread other than the
+        one executing the query; the default only stops streaming between batches."""
+        _ = running
+
+    def _arrow_column_types(
+        self, cur: Any
+    ) -> tuple[list[pa.DataType | None] | None, list[ValueConverter | None] | None]:
+        """Arrow type and value converter per result column (None: infer)."""
+        _ = cur
+        return None, None
+
+    def test_connection(self) -> bool:
+        with self._connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("SELECT 1")
                 cur.fetchone()
         return True
 
-    def execute_query(self, sql: str, query_type: str) -> dict[str, Any]:
-        with self._connect() as conn:
+    def execute_query(
+        self, sql: str, query_type: str, query_id: str | None = None
+    ) -> dict[str, Any]:
+        with self._connection() as conn, self._track_query(query_id, conn) as running:
             with conn.cursor() as cur:
-                cur.execute(sql)
+                self._execute(cur, sql, running)
                 if query_type == "exec":
                     return {"ok": True}
                 rows = cur.fetchall()
                 columns = cursor_columns(cur)
                 return {"jsonData": rows_to_json_rows(rows, columns)}
 
-    def fetch_arrow_bytes(self, sql: str) -> bytes:
-        with self._connect() as conn:
+    def fetch_arrow_bytes(self, sql: str, query_id: str | None = None) -> bytes:
+        with self._connection() as conn, self._track_query(query_id, conn) as running:
             with conn.cursor() as cur:
-                cur.execute(sql)
+                self._execute(cur, sql, running)
                 rows = cur.fetchall()
                 columns = cursor_columns(cur)
-                return rows_to_arrow_bytes(rows, columns)
+                types, converters = self._arrow_column_types(cur)
+                return rows_to_arrow_bytes(rows, columns, types, converters)
 
     def stream_arrow_batches(
-        self, sql: str, chunk_rows: int = 5000, query_id: str | None = None
+        self,
+        sql: str,
+        chunk_rows: int = 5000,
+        query_id: str | None = None,
+        *,
+        snapshot_id: str | None = None,
     ) -> Iterable[bytes]:
-        _ = query_id
-        with self._connect() as conn:
+        with self._connection() as conn, self._track_query(query_id, conn) as running:
             with conn.cursor() as cur:
-                cur.execute(sql)
+                if snapshot_id is not None:
+                    self._import_snapshot(conn, cur, snapshot_id)
+                self._execute(cur, sql, running)
                 columns = cursor_columns(cur)
-                while True:
+                types, converters = self._arrow_column_types(cur)
+                emitted = False
+                while not running.cancelled:
                     rows = cur.fetchmany(max(1, int(chunk_rows)))
                     if not rows:
                         break
-                    yield rows_to_arrow_bytes(rows, columns)
+                    emitted = True
+                    yield rows_to_arrow_bytes(rows, columns, types, converters)
+                if running.cancelled:
+                    raise BridgeQueryCancelledError("Query was cancelled")
+                if not emitted and types is not None:
+                    # Still hand the client the schema of an empty result.
+                    yield rows_to_arrow_bytes([], columns, types, converters)
+
+    def partition_queries(
+        self,
+        table: str,
+        *,
+        column: str | None = None,
+        partitions: int = DEFAULT_PARTITIONS,
+    ) -> list[str]:
+        """Split `SELECT * FROM table` into range queries that can run concurrently.
+
+        Ranges come from MIN/MAX of the numeric, date or timestamp `column`.
+        Connectors may support `column=None` (e.g. Postgres ctid ranges).
+        """
+        table_sql = qualified_table(table, self._partition_ident)
+        select_all = f"SELECT * FROM {table_sql}"
+        if partitions < 2:
+            return [select_all]
+        if column is None:
+            predicates = self._default_partition_predicates(table_sql, partitions)
+        else:
+            column_sql = self._partition_ident(column)
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        f"SELECT MIN({column_sql}), MAX({column_sql}) FROM {table_sql}"
+                    )
+                    low, high = cur.fetchone()
+            predicates = range_predicates(
+                column_sql, split_bounds(low, high, partitions)
+            )
+        return [f"{select_all} WHERE {p}" for p in predicates] or [select_all]
+
+    def _partition_ident(self, ident: str) -> str:
+        """Quote a table or column name passed to `partition_queries`."""
+        return quoted_ident(ident)
+
+    def _default_partition_predicates(
+        self, table_sql: str, partitions: int
+    ) -> list[str]:
+        _ = table_sql, partitions
+        raise ValueError("Partitioned extraction requires a partition column")
+
+    def open_snapshot(self) -> ExportedSnapshot | None:
+        """Export a snapshot for the partitions of one extraction to share, so they
+        all read the same committed state. None if the engine cannot share one."""
+        return None
+
+    def _import_snapshot(self, conn: Any, cur: Any, snapshot_id: str) -> None:
+        """Start the transaction on `conn` from an `open_snapshot` snapshot."""
+        _ = conn, cur, snapshot_id
+        raise NotImplementedError
 
     def cancel_query(self, query_id: str) -> bool:
-        _ = query_id
-        return False
+        with self._running_lock:
+            running = self._running.get(query_id)
+        if running is None:
+            return False
+        running.cancelled = True
+        self._cancel_running(running)
+        return True
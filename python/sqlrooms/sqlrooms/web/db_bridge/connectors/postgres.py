@@ -1,11 +1,86 @@
 from __future__ import annotations
 
 import importlib.util
-from dataclasses import dataclass
+import json
+import logging
+import math
+from contextlib import ExitStack
+from dataclasses import dataclass, field
 from typing import Any
 from urllib.parse import quote
 
-from .base import BaseSqlBridgeConnector
+import pyarrow as pa
+
+from ..pool import BridgePoolSettings
+from ..utils import ValueConverter
+from .base import BaseSqlBridgeConnector, ExportedSnapshot, _RunningQuery
+
+logger = logging.getLogger(__name__)
+
+# Arrow types for common Postgres type OIDs (see pg_type.dat). Values arrive
+# already decoded by psycopg; anything not listed is inferred from the values.
+# Rows still come back as Python tuples and are transposed into typed columns,
+# so this is cheaper than building dicts (about 3x) but is not Arrow-native
+# decoding; for bulk reads, --attach-postgres lets DuckDB scan Postgres directly.
+_PG_ARROW_TYPES: dict[int, pa.DataType] = {
+    16: pa.bool_(),
+    17: pa.binary(),
+    18: pa.string(),  # "char"
+    19: pa.string(),  # name
+    20: pa.int64(),
+    21: pa.int16(),
+    23: pa.int32(),
+    25: pa.string(),
+    26: pa.int64(),  # oid
+    700: pa.float32(),
+    701: pa.float64(),
+    1042: pa.string(),  # bpchar
+    1043: pa.string(),  # varchar
+    1082: pa.date32(),
+    1083: pa.time64("us"),
+    1114: pa.timestamp("us"),
+    1184: pa.timestamp("us", tz="UTC"),
+    1186: pa.duration("us"),
+    1000: pa.list_(pa.bool_()),
+    1005: pa.list_(pa.int16()),
+    1007: pa.list_(pa.int32()),
+    1016: pa.list_(pa.int64()),
+    1021: pa.list_(pa.float32()),
+    1022: pa.list_(pa.float64()),
+    1009: pa.list_(pa.string()),
+    1015: pa.list_(pa.string()),
+}
+# Types psycopg loads into Python objects Arrow cannot take as-is; sent as text.
+_PG_TEXT_CONVERTERS: dict[int, ValueConverter] = {
+    114: json.dumps,  # json
+    3802: json.dumps,  # jsonb
+    2950: str,  # uuid
+    650: str,  # cidr
+    869: str,  # inet
+    790: str,  # money
+    1266: str,  # timetz
+}
+_PG_NUMERIC_OID = 1700
+# Significant digits that survive a round trip through float64.
+_FLOAT64_EXACT_DIGITS = 15
+# server_version_num of the first release with TID range scans (ctid >= / <).
+_TID_RANGE_SCAN_VERSION = 140000
+
+
+def _pg_column_type(column: Any) -> tuple[pa.DataType | None, ValueConverter | None]:
+    oid = getattr(column, "type_code", None)
+    if oid in _PG_TEXT_CONVERTERS:
+        return pa.string(), _PG_TEXT_CONVERTERS[oid]
+    if oid == _PG_NUMERIC_OID:
+        # Any NUMERIC may hold 'NaN' (and, since Postgres 14, +/-Infinity), which
+        # Arrow decimals cannot. The type is fixed here, not per batch, so every
+        # batch of a result has the same schema.
+        precision = getattr(column, "precision", None)
+        if precision and precision <= _FLOAT64_EXACT_DIGITS:
+            return pa.float64(), float
+        # Wider or unconstrained NUMERIC: keep exact digits as text.
+        return pa.string(), str
+    return _PG_ARROW_TYPES.get(oid), None  # type: ignore[arg-type]
 
 
 @dataclass(frozen=True)
@@ -17,6 +92,7 @@ class PostgresConnectorSettings:
     database: str = ""
     user: str = ""
     password: str | None = None
+    pool: BridgePoolSettings = field(default_factory=BridgePoolSettings)
 
     def resolve_dsn(self) -> str:
         pw = f":{quote(self.password, safe='')}" if self.password else ""
@@ -54,6 +130,69 @@ class PostgresBridgeConnector(BaseSqlBridgeConnector):
             ) from exc
         return psycopg.connect(self.settings.resolve_dsn())
 
+    def _cancel_running(self, running: _RunningQuery) -> None:
+        # cancel_safe (psycopg >= 3.2) does not block on a misbehaving server.
+        cancel = getattr(running.conn, "cancel_safe", None) or running.conn.cancel
+        cancel()
+
+    def _default_partition_predicates(
+        self, table_sql: str, partitions: int
+    ) -> list[str]:
+        # Without a partition column, split the heap into ctid (page) ranges.
+        # Only Postgres 14+ serves these with TID range scans; older servers would
+        # scan the whole table once per partition, so read it in one query there.
+        with self._connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT current_setting('server_version_num')::int, "
+                    "(SELECT relpages FROM pg_class WHERE oid = %s::regclass)",
+                    (table_sql,),
+                )
+                version, relpages = cur.fetchone()
+        if version < _TID_RANGE_SCAN_VERSION:
+            logger.info(
+                "Postgres %s has no TID range scans; reading %s unpartitioned "
+                "(pass a partition column to split it)",
+                version,
+                table_sql,
+            )
+            return []
+        pages = int(relpages or 0)
+        if pages < partitions:
+            return []
+        step = math.ceil(pages / partitions)
+        bounds = [f"'({step * i},0)'::tid" for i in range(1, partitions)]
+        predicates = [f"ctid < {bounds[0]}"]
+        for lower, upper in zip(bounds, bounds[1:]):
+            predicates.append(f"ctid >= {lower} AND ctid < {upper}")
+        # relpages is an estimate: leave the last range open-ended.
+        predicates.append(f"ctid >= {bounds[-1]}")
+        return predicates
+
+    def open_snapshot(self) -> ExportedSnapshot:
+        # A dedicated connection, not a pooled one: it stays checked out for the
+        # whole extraction and must not take a slot the partitions need.
+        with ExitStack() as stack:
+            conn = stack.enter_context(self._connect())
+            with conn.cursor() as cur:
+                cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                cur.execute("SELECT pg_export_snapshot()")
+                snapshot_id = cur.fetchone()[0]
+            return ExportedSnapshot(snapshot_id, stack.pop_all().close)
+
+    def _import_snapshot(self, conn: Any, cur: Any, snapshot_id: str) -> None:
+        # SET TRANSACTION must open the transaction; a pooled connection may still
+        # be inside the one its health check started.
+        conn.rollback()
+        cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        cur.execute("SET TRANSACTION SNAPSHOT '" + snapshot_id.replace("'", "''") + "'")
+
+    def _arrow_column_types(
+        self, cur: Any
+    ) -> tuple[list[pa.DataType | None], list[ValueConverter | None]]:
+        specs = [_pg_column_type(column) for column in cur.description or []]
+        return [t for t, _ in specs], [c for _, c in specs]
+
     def dependency_diagnostics(self) -> dict[str, Any]:
         available = importlib.util.find_spec("psycopg") is not None
         if available:
@@ -75,7 +214,7 @@ class PostgresBridgeConnector(BaseSqlBridgeConnector):
         }
 
     def list_catalog(self) -> dict[str, list[dict[str, Any]]]:
-        with self._connect() as conn:
+        with self._connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("SELECT current_database()")
                 result = cur.fetchone()
@@ -116,3 +255,33 @@ class PostgresBridgeConnector(BaseSqlBridgeConnector):
             "schemas": schemas,
             "tables": tables,
         }
+
+    def list_columns(
+        self, *, schema: str, table: str, database: str | None = None
+    ) -> list[dict[str, Any]]:
+        with self._connection() as conn:
+            with conn.cursor() as cur:
+                if not database:
+                    cur.execute("SELECT current_database()")
+                    row = cur.fetchone()
+                    database = row[0] if row else ""
+                cur.execute(
+                    """
+                    SELECT column_name, data_type, is_nullable
+                    FROM information_schema.columns
+                    WHERE table_schema = %s AND table_name = %s
+                    ORDER BY ordinal_position
+                    """,
+                    (schema, table),
+                )
+                return [
+                    {
+                        "database": database,
+                        "schema": schema,
+                        "table": table,
+                        "column": row[0],
+                        "type": row[1],
+                        "nullable": str(row[2]).upper() == "YES",
+                    }
+                    for row in cur.fetchall()
+                ]
@@ -1,11 +1,24 @@
 from __future__ import annotations
 
 import importlib.util
-from dataclasses import dataclass
-from typing import Any
+import re
+from dataclasses import dataclass, field
+from typing import Any, Iterable
 
-from ..utils import cursor_columns, quoted_ident, rows_to_json_rows
-from .base import BaseSqlBridgeConnector
+import pyarrow as pa
+
+from ..pool import BridgePoolSettings
+from ..utils import (
+    cursor_columns,
+    quoted_ident,
+    rows_to_arrow_bytes,
+    rows_to_json_rows,
+    table_to_arrow_bytes,
+)
+from .base import BaseSqlBridgeConnector, BridgeQueryCancelledError, _RunningQuery
+
+# Names Snowflake accepts unquoted; it resolves them upper-cased.
+_UNQUOTED_IDENT = re.compile(r"[A-Za-z_][A-Za-z0-9_$]*")
 
 SNOWFLAKE_INSTALL_COMMANDS = {
     "uvProject": "uv sync --extra snowflake",
@@ -17,6 +30,14 @@ SNOWFLAKE_INSTALL_COMMANDS = {
 }
 
 
+def _arrow_not_supported_error() -> type[Exception] | tuple[()]:
+    try:
+        from snowflake.connector.errors import NotSupportedError  # type: ignore
+    except ImportError:
+        return ()
+    return NotSupportedError
+
+
 @dataclass(frozen=True)
 class SnowflakeConnectorSettings:
     account: str | None = None
@@ -29,6 +50,7 @@ class SnowflakeConnectorSettings:
     authenticator: str | None = None
     connection_id: str = "snowflake-default"
     title: str = "Snowflake"
+    pool: BridgePoolSettings = field(default_factory=BridgePoolSettings)
 
     def is_enabled(self) -> bool:
         return bool(self.account and self.user)
@@ -82,6 +104,65 @@ class SnowflakeBridgeConnector(BaseSqlBridgeConnector):
             )
         return snowflake.connector.connect(**kwargs)
 
+    def _cancel_running(self, running: _RunningQuery) -> None:
+        # The Snowflake query id is only known once `execute` returns, but a
+        # checked-out connection runs one query at a time, so cancelling its
+        # session's queries cancels exactly this one.
+        session_id = getattr(running.conn, "session_id", None)
+        if session_id is None:
+            return
+        with running.conn.cursor() as cur:
+            cur.execute("SELECT SYSTEM$CANCEL_ALL_QUERIES(%s)", (session_id,))
+
+    def _partition_ident(self, ident: str) -> str:
+        # Resolve names the way Snowflake resolves them unquoted (`events` is
+        # EVENTS); quoting them as given would make them case-sensitive. Upper-case
+        # quoting keeps reserved words like `order` valid. Already-quoted names are
+        # used verbatim.
+        if len(ident) > 1 and ident[0] == ident[-1] == '"':
+            return ident
+        if _UNQUOTED_IDENT.fullmatch(ident):
+            return quoted_ident(ident.upper())
+        return quoted_ident(ident)
+
+    def fetch_arrow_bytes(self, sql: str, query_id: str | None = None) -> bytes:
+        # Snowflake already returns results as Arrow chunks; pass them through
+        # instead of materializing Python rows.
+        with self._connection() as conn, self._track_query(query_id, conn) as running:
+            with conn.cursor() as cur:
+                self._execute(cur, sql, running)
+                try:
+                    table = cur.fetch_arrow_all(force_return_table=True)
+                except _arrow_not_supported_error():
+                    # Non-Arrow result format (e.g. some SHOW/DESCRIBE output).
+                    return rows_to_arrow_bytes(cur.fetchall(), cursor_columns(cur))
+                return table_to_arrow_bytes(table)
+
+    def stream_arrow_batches(
+        self, sql: str, chunk_rows: int = 5000, query_id: str | None = None
+    ) -> Iterable[bytes]:
+        chunk_rows = max(1, int(chunk_rows))
+        with self._connection() as conn, self._track_query(query_id, conn) as running:
+            with conn.cursor() as cur:
+                self._execute(cur, sql, running)
+                try:
+                    tables = cur.fetch_arrow_batches()
+                except _arrow_not_supported_error():
+                    tables = None
+                if tables is None:
+                    columns = cursor_columns(cur)
+                    while not running.cancelled and (rows := cur.fetchmany(chunk_rows)):
+                        yield rows_to_arrow_bytes(rows, columns)
+                else:
+                    for table in tables:
+                        # Server chunk sizes vary; re-slice (zero-copy) to chunk_rows.
+                        for batch in table.to_batches(max_chunksize=chunk_rows):
+                            yield table_to_arrow_bytes(pa.Table.from_batches([batch]))
+                        if running.cancelled:
+                            break
+                if running.cancelled:
+                    raise BridgeQueryCancelledError("Query was cancelled")
+
     def dependency_diagnostics(self) -> dict[str, Any]:
         try:
             available = importlib.util.find_spec("snowflake.connector") is not None
@@ -106,7 +187,7 @@ class SnowflakeBridgeConnector(BaseSqlBridgeConnector):
         }
 
     def list_catalog(self) -> dict[str, list[dict[str, Any]]]:
-        with self._connect() as conn:
+        with self._connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("SHOW DATABASES")
                 db_rows = cur.fetchall()
@@ -159,3 +240,38 @@ class SnowflakeBridgeConnector(BaseSqlBridgeConnector):
                     ]
 
         return {"databases": databases, "schemas": schemas, "tables": tables}
+
+    def list_columns(
+        self, *, schema: str, table: str, database: str | None = None
+    ) -> list[dict[str, Any]]:
+        with self._connection() as conn:
+            with conn.cursor() as cur:
+                database = database or self.settings.database
+                if not database:
+                    cur.execute("SELECT CURRENT_DATABASE()")
+                    row = cur.fetchone()
+                    database = str(row[0]) if row and row[0] else None
+                if not database:
+                    raise RuntimeError(
+                        "Snowflake bridge could not resolve a database for columns."
+                    )
+                cur.execute(
+                    f"""
+                    SELECT COLUMN_NAME, DATA_TYPE, IS_NULLABLE
+                    FROM {quoted_ident(database)}.INFORMATION_SCHEMA.COLUMNS
+                    WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
+                    ORDER BY ORDINAL_POSITION
+                    """,
+                    (schema, table),
+                )
+                return [
+                    {
+                        "database": database,
+                        "schema": schema,
+                        "table": table,
+                        "column": row[0],
+                        "type": row[1],
+                        "nullable": str(row[2]).upper() == "YES",
+                    }
+                    for row in cur.fetchall()
+                ]
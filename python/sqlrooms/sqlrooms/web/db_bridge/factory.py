@@ -10,6 +10,7 @@ from .connectors import (
 )
 from .connectors.base import BaseSqlBridgeConnector
 from .registry import DbBridgeRegistry
+from .result_cache import BridgeResultCache, BridgeResultCacheSettings
 
 SUPPORTED_ENGINES: list[str] = ["postgres", "snowflake"]
 
@@ -49,8 +50,16 @@ def build_cli_db_bridge_registry(
     bridge_id: str,
     connector_settings: list[PostgresConnectorSettings | SnowflakeConnectorSettings]
     | None = None,
+    result_cache_settings: BridgeResultCacheSettings | None = None,
 ) -> DbBridgeRegistry:
-    registry = DbBridgeRegistry(bridge_id=bridge_id)
+    registry = DbBridgeRegistry(
+        bridge_id=bridge_id,
+        result_cache=(
+            BridgeResultCache(result_cache_settings)
+            if result_cache_settings is not None
+            else None
+        ),
+    )
     for settings in connector_settings or []:
         if isinstance(settings, PostgresConnectorSettings):
             registry.register(PostgresBridgeConnector(settings=settings))
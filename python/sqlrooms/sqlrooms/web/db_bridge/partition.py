@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import datetime
+import math
+from decimal import Decimal
+from typing import Any, Callable
+
+from .utils import quoted_ident
+
+DEFAULT_PARTITIONS = 4
+
+
+def qualified_table(table: str, quote: Callable[[str], str] = quoted_ident) -> str:
+    """Quote `table`, `schema.table` or `database.schema.table` for a range query."""
+    parts = [part.strip() for part in (table or "").split(".")]
+    if not 1 <= len(parts) <= 3 or not all(parts):
+        raise ValueError("table must be table, schema.table or database.schema.table")
+    return ".".join(quote(part) for part in parts)
+
+
+def sql_literal(value: Any) -> str:
+    if isinstance(value, bool):
+        raise ValueError("Cannot partition on a boolean column")
+    if isinstance(value, (int, Decimal)):
+        return str(value)
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, datetime.datetime):
+        return "'" + value.isoformat(sep=" ") + "'"
+    if isinstance(value, datetime.date):
+        return "'" + value.isoformat() + "'"
+    raise ValueError(
+        f"Cannot partition on values of type {type(value).__name__}; "
+        "use a numeric, date or timestamp column"
+    )
+
+
+def split_bounds(low: Any, high: Any, partitions: int) -> list[Any]:
+    """Return up to `partitions - 1` increasing boundaries inside [low, high]."""
+    if partitions < 2 or low is None or high is None or not high > low:
+        return []
+    if isinstance(low, (datetime.date, datetime.datetime)):
+        span = high - low
+        bounds = [low + span * i / partitions for i in range(1, partitions)]
+        if type(low) is datetime.date:
+            # date - date is whole days; date + timedelta truncates to days.
+            bounds = [low + datetime.timedelta(days=(b - low).days) for b in bounds]
+    elif isinstance(low, int) and isinstance(high, int):
+        step = math.ceil((high - low + 1) / partitions)
+        bounds = [low + step * i for i in range(1, partitions)]
+    else:
+        bounds = [low + (high - low) * i / partitions for i in range(1, partitions)]
+    unique: list[Any] = []
+    for bound in bounds:
+        if low < bound <= high and (not unique or bound > unique[-1]):
+            unique.append(bound)
+    return unique
+
+
+def range_predicates(column_sql: str, bounds: list[Any]) -> list[str]:
+    """Half-open predicates covering every row, including NULLs and out-of-range
+    values added after the bounds were read (first/last ranges are open-ended)."""
+    if not bounds:
+        return []
+    literals = [sql_literal(bound) for bound in bounds]
+    predicates = [f"({column_sql} < {literals[0]} OR {column_sql} IS NULL)"]
+    for lower, upper in zip(literals, literals[1:]):
+        predicates.append(f"({column_sql} >= {lower} AND {column_sql} < {upper})")
+    predicates.append(f"{column_sql} >= {literals[-1]}")
+    return predicates
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BridgePoolSettings:
+    """Connection pool limits for one bridge connector.
+
+    `max_size=0` disables pooling: every call opens and closes its own connection.
+    Up to `max_overflow` extra connections may be opened under load; they are closed
+    when returned instead of being kept idle.
+    """
+
+    max_size: int = 4
+    max_overflow: int = 4
+    idle_timeout_s: float = 300.0
+    max_lifetime_s: float = 1800.0
+    # Idle connections older than this are pinged before being handed out.
+    health_check_after_s: float = 30.0
+    acquire_timeout_s: float = 30.0
+
+    def __post_init__(self) -> None:
+        if self.max_size < 0 or self.max_overflow < 0:
+            raise ValueError("pool max_size and max_overflow must be >= 0")
+        for key in (
+            "idle_timeout_s",
+            "max_lifetime_s",
+            "health_check_after_s",
+            "acquire_timeout_s",
+        ):
+            if getattr(self, key) < 0:
+                raise ValueError(f"pool {key} must be >= 0")
+
+
+class BridgePoolExhaustedError(RuntimeError):
+    """Raised when no pooled connection frees up within `acquire_timeout_s`."""
+
+
+class _PooledConnection:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn: Any):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+def _is_closed(conn: Any) -> bool:
+    # psycopg exposes `closed`, snowflake-connector exposes `is_closed()`.
+    is_closed = getattr(conn, "is_closed", None)
+    if callable(is_closed):
+        try:
+            return bool(is_closed())
+        except Exception:
+            return True
+    return bool(getattr(conn, "closed", False))
+
+
+def _close_quietly(conn: Any) -> None:
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+class BridgeConnectionPool:
+    """Bounded, thread-safe pool of DB-API connections for a bridge connector.
+
+    Connections are reused most-recently-used first, retired once they exceed
+    `idle_timeout_s` or `max_lifetime_s`, and pinged with `SELECT 1` when they have
+    been idle longer than `health_check_after_s`. A checkout is committed on success
+    and rolled back on error before it returns to the pool, mirroring what
+    `with connect() as conn:` does for an unpooled connection.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        settings: BridgePoolSettings | None = None,
+        *,
+        name: str = "",
+    ):
+        self.settings = settings or BridgePoolSettings()
+        self.name = name
+        self._connect = connect
+        self._idle: list[_PooledConnection] = []
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        pooled = self._acquire()
+        ok = False
+        try:
+            yield pooled.conn
+            ok = True
+        finally:
+            self._release(pooled, ok)
+
+    @property
+    def capacity(self) -> int:
+        """Most connections that can be checked out at once, overflow included."""
+        return self.settings.max_size + self.settings.max_overflow
+
+    def stats(self) -> dict[str, int]:
+        with self._cond:
+            return {"idle": len(self._idle), "inUse": self._in_use}
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for pooled in idle:
+            _close_quietly(pooled.conn)
+
+    def _expired(self, pooled: _PooledConnection, now: float) -> bool:
+        s = self.settings
+        if s.max_lifetime_s and now - pooled.created_at > s.max_lifetime_s:
+            return True
+        if s.idle_timeout_s and now - pooled.last_used > s.idle_timeout_s:
+            return True
+        return _is_closed(pooled.conn)
+
+    def _healthy(self, pooled: _PooledConnection, now: float) -> bool:
+        if now - pooled.last_used <= self.settings.health_check_after_s:
+            return True
+        try:
+            cur = pooled.conn.cursor()
+            try:
+                cur.execute("SELECT 1")
+                cur.fetchone()
+            finally:
+                cur.close()
+            return True
+        except Exception as exc:
+            logger.debug("Dropping unhealthy %s bridge connection: %s", self.name, exc)
+            return False
+
+    def _reap_locked(self, now: float) -> list[_PooledConnection]:
+        stale = [p for p in self._idle if self._expired(p, now)]
+        if stale:
+            self._idle = [p for p in self._idle if p not in stale]
+        return stale
+
+    def _acquire(self) -> _PooledConnection:
+        deadline = time.monotonic() + self.settings.acquire_timeout_s
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError(
+                        f"Bridge connection pool {self.name!r} is closed"
+                    )
+                stale = self._reap_locked(time.monotonic())
+                candidate = self._idle.pop() if self._idle else None
+                limit = self.capacity
+                if candidate is None:
+                    if self._in_use >= limit:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise BridgePoolExhaustedError(
+                                f"No connection available in bridge pool "
+                                f"{self.name!r} ({limit} connections in use)"
+                            )
+                        self._cond.wait(remaining)
+                        continue
+                self._in_use += 1
+            for pooled in stale:
+                _close_quietly(pooled.conn)
+
+            if candidate is not None:
+                if self._healthy(candidate, time.monotonic()):
+                    return candidate
+                _close_quietly(candidate.conn)
+            try:
+                # Connect outside the lock: this can take seconds (TLS, auth).
+                return _PooledConnection(self._connect())
+            except BaseException:
+                with self._cond:
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+
+    def _release(self, pooled: _PooledConnection, ok: bool) -> None:
+        keep = not _is_closed(pooled.conn)
+        if keep:
+            try:
+                if ok:
+                    pooled.conn.commit()
+                else:
+                    pooled.conn.rollback()
+            except Exception:
+                keep = False
+        now = time.monotonic()
+        pooled.last_used = now
+        with self._cond:
+            self._in_use -= 1
+            retained = len(self._idle) + self._in_use
+            if (
+                keep
+                and not self._closed
+                and retained < self.settings.max_size
+                and not self._expired(pooled, now)
+            ):
+                self._idle.append(pooled)
+                pooled = None  # type: ignore[assignment]
+            self._cond.notify()
+        if pooled is not None:
+            _close_quietly(pooled.conn)
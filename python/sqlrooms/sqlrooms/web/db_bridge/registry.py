@@ -1,9 +1,25 @@
 from __future__ import annotations
 
-from typing import Any
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Callable, Iterator, TypeVar
 
+from .partition import DEFAULT_PARTITIONS
+from .pool import BridgeConnectionPool
+from .result_cache import BridgeResultCache
 from .types import DbBridgeConnector
 
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+DEFAULT_BRIDGE_WORKERS = 8
+DEFAULT_CATALOG_TTL_S = 300.0
+_END_OF_STREAM = object()
+
 _SECRET_KEYS: frozenset[str] | None = None
 
 
@@ -26,9 +42,45 @@ class UnknownBridgeConnectionError(KeyError):
 
 
 class DbBridgeRegistry:
-    def __init__(self, *, bridge_id: str):
+    """Registered bridge connectors plus the thread pool their blocking I/O runs on.
+
+    The synchronous methods run on the calling thread. The async `run` and
+    `astream_arrow_batches` helpers move connector work onto a dedicated executor
+    so remote queries never block the event loop.
+
+    `alist_catalog` / `alist_columns` cache metadata per connection for
+    `catalog_ttl_s`; an expired entry is still served while a background task
+    refreshes it.
+
+    With a `result_cache`, `fetch_arrow_bytes` and `astream_arrow_batches` serve
+    repeated queries from disk instead of the remote database; pass
+    `use_cache=False` to bypass it.
+    """
+
+    def __init__(
+        self,
+        *,
+        bridge_id: str,
+        max_workers: int = DEFAULT_BRIDGE_WORKERS,
+        catalog_ttl_s: float = DEFAULT_CATALOG_TTL_S,
+        result_cache: BridgeResultCache | None = None,
+    ):
         self.bridge_id = bridge_id
+        self.catalog_ttl_s = catalog_ttl_s
+        self.result_cache = result_cache
+        self._max_workers = max_workers
+        # (connection_id, kind, *args) -> (value, fetched_at monotonic)
+        self._metadata: dict[tuple[Any, ...], tuple[Any, float]] = {}
+        self._metadata_loads: dict[tuple[Any, ...], asyncio.Task[Any]] = {}
+        # Bumped by invalidate_catalog so in-flight loads do not store stale data.
+        self._metadata_generation = 0
         self._connectors: dict[str, DbBridgeConnector] = {}
+        self._pools: dict[str, BridgeConnectionPool] = {}
+        # queryId of a partitioned extraction -> queryIds of its partitions.
+        self._query_groups: dict[str, list[str]] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="sqlrooms-db-bridge"
+        )
 
     def register(self, connector: DbBridgeConnector) -> None:
         if connector.connection_id in self._connectors:
@@ -36,6 +88,25 @@ class DbBridgeRegistry:
                 f"Duplicate DB bridge connection id: {connector.connection_id}"
             )
         self._connectors[connector.connection_id] = connector
+        enable_pool = getattr(connector, "enable_pool", None)
+        if callable(enable_pool):
+            pool = enable_pool()
+            if pool is not None:
+                self._pools[connector.connection_id] = pool
+
+    def close(self) -> None:
+        """Stop the bridge executor and close pooled connections."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for connection_id, pool in self._pools.items():
+            try:
+                pool.close()
+            except Exception as exc:
+                logger.warning(
+                    "Failed to close DB bridge pool for %s: %s", connection_id, exc
+                )
+        self._pools.clear()
+        if self.result_cache is not None:
+            self.result_cache.close()
 
     def has_connections(self) -> bool:
         return bool(self._connectors)
@@ -78,16 +149,119 @@ class DbBridgeRegistry:
     def list_catalog(self, connection_id: str) -> dict[str, list[dict[str, Any]]]:
         return self._get_connector(connection_id).list_catalog()
 
+    async def alist_catalog(
+        self, connection_id: str, *, refresh: bool = False
+    ) -> dict[str, list[dict[str, Any]]]:
+        connector = self._get_connector(connection_id)
+        return await self._cached_metadata(
+            (connection_id, "catalog"), connector.list_catalog, refresh=refresh
+        )
+
+    async def alist_columns(
+        self,
+        connection_id: str,
+        *,
+        schema: str,
+        table: str,
+        database: str | None = None,
+        refresh: bool = False,
+    ) -> list[dict[str, Any]]:
+        """Column metadata for one table, fetched on demand and cached like catalogs."""
+        connector = self._get_connector(connection_id)
+        return await self._cached_metadata(
+            (connection_id, "columns", database, schema, table),
+            functools.partial(
+                connector.list_columns, schema=schema, table=table, database=database
+            ),
+            refresh=refresh,
+        )
+
+    def invalidate_catalog(self, connection_id: str | None = None) -> None:
+        """Drop cached catalog/column metadata for one connection (or all)."""
+        self._metadata_generation += 1
+        for key in list(self._metadata):
+            if connection_id is None or key[0] == connection_id:
+                del self._metadata[key]
+
+    async def _cached_metadata(
+        self, key: tuple[Any, ...], load: Callable[[], T], *, refresh: bool
+    ) -> T:
+        entry = self._metadata.get(key)
+        if entry is not None and not refresh:
+            value, fetched_at = entry
+            if time.monotonic() - fetched_at >= self.catalog_ttl_s:
+                self._load_metadata(key, load)
+            return value
+        # Shield: one caller going away must not cancel a load others await.
+        return await asyncio.shield(self._load_metadata(key, load))
+
+    def _load_metadata(
+        self, key: tuple[Any, ...], load: Callable[[], T]
+    ) -> asyncio.Task[T]:
+        task = self._metadata_loads.get(key)
+        if task is not None:
+            return task
+        generation = self._metadata_generation
+
+        async def _load() -> T:
+            value = await self.run(load)
+            if generation == self._metadata_generation:
+                self._metadata[key] = (value, time.monotonic())
+            return value
+
+        def _done(done: asyncio.Task[T]) -> None:
+            if self._metadata_loads.get(key) is done:
+                del self._metadata_loads[key]
+            if not done.cancelled() and done.exception() is not None:
+                logger.warning(
+                    "DB bridge metadata refresh failed for %s: %s",
+                    key[0],
+                    done.exception(),
+                )
+
+        task = asyncio.create_task(_load())
+        self._metadata_loads[key] = task
+        task.add_done_callback(_done)
+        return task
+
     def execute_query(
         self,
         connection_id: str,
         sql: str,
         query_type: str,
+        query_id: str | None = None,
     ) -> dict[str, Any]:
-        return self._get_connector(connection_id).execute_query(sql, query_type)
+        return self._get_connector(connection_id).execute_query(
+            sql, query_type, query_id=query_id
+        )
+
+    def fetch_arrow_bytes(
+        self,
+        connection_id: str,
+        sql: str,
+        query_id: str | None = None,
+        *,
+        use_cache: bool = True,
+    ) -> bytes:
+        connector = self._get_connector(connection_id)
+        cache = self.result_cache if use_cache else None
+        if cache is None:
+            return connector.fetch_arrow_bytes(sql, query_id=query_id)
+        key = cache.key(connection_id, sql)
+        # Prevent concurrent identical misses from each hitting the warehouse.
+        with cache.lock(key):
+            cached = cache.get(key)
+            if cached is not None:
+                logger.debug("DB bridge result cache hit for %s", connection_id)
+                return cached
+            payload = connector.fetch_arrow_bytes(sql, query_id=query_id)
+            cache.put(key, connection_id, payload)
+            return payload
 
-    def fetch_arrow_bytes(self, connection_id: str, sql: str) -> bytes:
-        return self._get_connector(connection_id).fetch_arrow_bytes(sql)
+    def invalidate_results(self, connection_id: str | None = None) -> None:
+        """Drop cached query results for one connection (or all)."""
+        if self.result_cache is not None:
+            self.result_cache.invalidate(connection_id)
 
     def stream_arrow_batches(
         self,
@@ -101,8 +275,87 @@ class DbBridgeRegistry:
             sql, chunk_rows=chunk_rows, query_id=query_id
         )
 
-    def cancel_query(self, connection_id: str, query_id: str) -> bool:
-        return self._get_connector(connection_id).cancel_query(query_id)
+    def cancel_query(self, connection_id: str | None, query_id: str) -> bool:
+        """Cancel a running query; without `connection_id`, ask every connector."""
+        group = self._query_groups.get(query_id)
+        if group is not None:
+            results = [self.cancel_query(connection_id, sub_id) for sub_id in group]
+            return any(results)
+        if connection_id is not None:
+            return self._get_connector(connection_id).cancel_query(query_id)
+        return any(
+            conn.cancel_query(query_id) for conn in list(self._connectors.values())
+        )
+
+    async def run(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        """Run blocking bridge work (e.g. `self.execute_query`) on the bridge pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(fn, *args, **kwargs)
+        )
+
+    async def astream_arrow_batches(
+        self,
+        connection_id: str,
+        sql: str,
+        *,
+        chunk_rows: int = 5000,
+        query_id: str | None = None,
+        use_cache: bool = True,
+        snapshot_id: str | None = None,
+    ) -> AsyncIterator[bytes]:
+        """Async view of `stream_arrow_batches`; each batch is fetched on the pool.
+
+        Closing the iterator early (client disconnect) cancels the query on the
+        server before the connection is released. With a result cache, a hit is
+        replayed from disk and a fully consumed miss is stored. `snapshot_id` (from
+        the connector's `open_snapshot`) makes the query read that snapshot; such
+        reads bypass the cache, whose entries may come from another snapshot.
+        """
+        connector = self._get_connector(connection_id)
+        cache = self.result_cache if use_cache and not snapshot_id else None
+        snapshot_kwargs = {"snapshot_id": snapshot_id} if snapshot_id else {}
+        batches: Iterator[bytes] | None = None
+        if cache is not None:
+            key = cache.key(connection_id, sql)
+            batches = cache.iter_batches(key, chunk_rows=chunk_rows)
+            if batches is None:
+                batches = cache.tee(
+                    key,
+                    connection_id,
+                    connector.stream_arrow_batches(
+                        sql, chunk_rows=chunk_rows, query_id=query_id, **snapshot_kwargs
+                    ),
+                )
+        if batches is None:
+            batches = iter(
+                connector.stream_arrow_batches(
+                    sql, chunk_rows=chunk_rows, query_id=query_id, **snapshot_kwargs
+                )
+            )
+        loop = asyncio.get_running_loop()
+        pending: asyncio.Future[Any] | None = None
+        try:
+            while True:
+                pending = loop.run_in_executor(
+                    self._executor, next, batches, _END_OF_STREAM
+                )
+                batch = await pending
+                pending = None
+                if batch is _END_OF_STREAM:
+                    return
+                yield batch
+        finally:
+            if pending is not None:
+                # Abandoned mid-fetch: interrupt the remote query, then wait for
+                # the worker to let go of the generator before closing it.
+                if query_id:
+                    # Not on the bridge pool, which may be saturated by queries.
+                    await asyncio.to_thread(connector.cancel_query, query_id)
+                await asyncio.gather(pending, return_exceptions=True)
+            close = getattr(batches, "close", None)
+            if close is not None:
+                await loop.run_in_executor(self._executor, close)
 
     def _get_connector(self, connection_id: str) -> DbBridgeConnector:
         connector = self._connectors.get(connection_id)
@@ -111,3 +364,90 @@ class DbBridgeRegistry:
                 f"Unknown DB bridge connection: {connection_id}"
             )
         return connector
+
+    async def astream_partitioned_arrow_batches(
+        self,
+        connection_id: str,
+        table: str,
+        *,
+        partition_column: str | None = None,
+        partitions: int = DEFAULT_PARTITIONS,
+        chunk_rows: int = 5000,
+        query_id: str | None = None,
+        use_cache: bool = True,
+    ) -> AsyncIterator[bytes]:
+        """Extract `table` as concurrent range queries, merged in arrival order.
+
+        Each partition streams over its own pooled connection and bridge worker, so
+        `partitions` is capped at the pool capacity (size plus overflow) and the
+        number of workers; more would block workers waiting for a connection
+        until the pool times out. If the connector can export
+        a snapshot (`open_snapshot`), all partitions read from it, so concurrent
+        writes cannot make rows appear twice or go missing between partitions.
+        Cancelling `query_id` cancels every partition.
+        """
+        connector = self._get_connector(connection_id)
+        limit = self._max_workers
+        pool = self._pools.get(connection_id)
+        if pool is not None:
+            limit = min(limit, pool.capacity)
+        queries = await self.run(
+            connector.partition_queries,
+            table,
+            column=partition_column,
+            partitions=max(1, min(partitions, limit)),
+        )
+        open_snapshot = getattr(connector, "open_snapshot", None)
+        snapshot = None
+        if open_snapshot is not None and len(queries) > 1:
+            snapshot = await self.run(open_snapshot)
+        snapshot_id = snapshot.snapshot_id if snapshot is not None else None
+        sub_ids = [f"{query_id}:{i}" if query_id else None for i in range(len(queries))]
+        if query_id:
+            self._query_groups[query_id] = [s for s in sub_ids if s]
+        merged: asyncio.Queue[Any] = asyncio.Queue(maxsize=len(queries))
+
+        async def _pump(sql: str, sub_id: str | None) -> None:
+            try:
+                async with aclosing(
+                    self.astream_arrow_batches(
+                        connection_id,
+                        sql,
+                        chunk_rows=chunk_rows,
+                        query_id=sub_id,
+                        use_cache=use_cache,
+                        snapshot_id=snapshot_id,
+                    )
+                ) as batches:
+                    async for batch in batches:
+                        await merged.put(batch)
+            except Exception as exc:
+                await merged.put(exc)
+            else:
+                await merged.put(_END_OF_STREAM)
+
+        pumps = [
+            asyncio.create_task(_pump(sql, sub_id))
+            for sql, sub_id in zip(queries, sub_ids)
+        ]
+        try:
+            remaining = len(pumps)
+            while remaining:
+                item = await merged.get()
+                if item is _END_OF_STREAM:
+                    remaining -= 1
+                elif isinstance(item, BaseException):
+                    raise item
+                else:
+                    yield item
+        finally:
+            # Stops (and remotely cancels) partitions that are still running.
+            for pump in pumps:
+                pump.cancel()
+            await asyncio.gather(*pumps, return_exceptions=True)
+            if query_id:
+                self._query_groups.pop(query_id, None)
+            if snapshot is not None:
+                # Only now: partitions import it at their start, which requires the
+                # exporting transaction to still be open.
+                await self.run(snapshot.close)
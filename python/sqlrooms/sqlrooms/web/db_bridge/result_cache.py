@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESULT_CACHE_TTL_S = 300.0
+DEFAULT_RESULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_STRIPE_COUNT = 64
+
+
+@dataclass(frozen=True)
+class BridgeResultCacheSettings:
+    """Limits for the on-disk bridge result cache.
+
+    `directory` defaults to a new private (0700) `<tempdir>/sqlrooms-bridge-cache-*`
+    directory per process. Entries older than `ttl_s` are treated as misses; least
+    recently used entries are evicted once the cache grows beyond `max_bytes`.
+    """
+
+    directory: str | None = None
+    ttl_s: float = DEFAULT_RESULT_CACHE_TTL_S
+    max_bytes: int = DEFAULT_RESULT_CACHE_MAX_BYTES
+
+    def __post_init__(self) -> None:
+        if self.ttl_s <= 0:
+            raise ValueError("result cache ttl_s must be > 0")
+        if self.max_bytes <= 0:
+            raise ValueError("result cache max_bytes must be > 0")
+
+
+class _Entry:
+    __slots__ = ("connection_id", "size", "created_at")
+
+    def __init__(self, connection_id: str, size: int, created_at: float):
+        self.connection_id = connection_id
+        self.size = size
+        self.created_at = created_at
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _stream_bytes(batch: Any) -> bytes:
+    import pyarrow as pa
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+class BridgeResultCache:
+    """Process-local cache of bridge query results, stored as Arrow IPC files.
+
+    Works like the DuckDB websocket `QueryCache`: entries are keyed by a SHA-256 of
+    the connection id and SQL, kept in LRU order under a size budget, and
+    `lock(key)` serialises concurrent misses for the same query so a warehouse
+    query runs once. Payloads live on disk rather than in memory. Warehouse results
+    may be sensitive, so the default directory is private to this process and removed
+    on `close`; in a configured `directory`, `close` only deletes the entries this
+    instance wrote, since other processes may share it.
+    """
+
+    def __init__(
+        self,
+        settings: BridgeResultCacheSettings | None = None,
+        *,
+        stripe_count: int = DEFAULT_STRIPE_COUNT,
+    ) -> None:
+        if stripe_count < 1:
+            raise ValueError("stripe_count must be at least 1")
+        self.settings = settings or BridgeResultCacheSettings()
+        if self.settings.directory:
+            self.directory = self.settings.directory
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            self._owns_directory = False
+        else:
+            # mkdtemp creates the directory with mode 0700.
+            self.directory = tempfile.mkdtemp(prefix="sqlrooms-bridge-cache-")
+            self._owns_directory = True
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._total_bytes = 0
+        self._lock_stripes = tuple(threading.RLock() for _ in range(stripe_count))
+        self._guard = threading.RLock()
+
+    @staticmethod
+    def key(connection_id: str, sql: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(connection_id.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(sql.strip().encode("utf-8"))
+        return digest.hexdigest()
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        lock = self._lock_stripes[hash(key) % len(self._lock_stripes)]
+        with lock:
+            yield
+
+    def stats(self) -> dict[str, int]:
+        with self._guard:
+            return {"entries": len(self._entries), "bytes": self._total_bytes}
+
+    def get(self, key: str) -> bytes | None:
+        """The cached Arrow IPC stream for `key`, or None on a miss."""
+        path = self._checkout(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            self._discard(key)
+            return None
+
+    def iter_batches(self, key: str, *, chunk_rows: int) -> Iterator[bytes] | None:
+        """Replay a cached result as IPC stream chunks of at most `chunk_rows`
+        rows, like `stream_arrow_batches`; None on a miss."""
+        path = self._checkout(key)
+        if path is None:
+            return None
+        try:
+            f = open(path, "rb")
+        except OSError:
+            self._discard(key)
+            return None
+
+        def _replay() -> Iterator[bytes]:
+            import pyarrow as pa
+
+            with f:
+                reader = pa.ipc.open_stream(f)
+                for batch in reader:
+                    for chunk in pa.Table.from_batches([batch]).to_batches(
+                        max_chunksize=chunk_rows
+                    ):
+                        yield _stream_bytes(chunk)
+
+        return _replay()
+
+    def put(self, key: str, connection_id: str, payload: bytes) -> None:
+        """Store a complete Arrow IPC stream (as returned by `fetch_arrow_bytes`)."""
+        if len(payload) > self.settings.max_bytes:
+            return
+        tmp_path = self._tmp_path(key)
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+        except OSError as exc:
+            logger.warning("Failed to write bridge result cache entry: %s", exc)
+            _remove_quietly(tmp_path)
+            return
+        self._commit(key, connection_id, tmp_path, len(payload))
+
+    def tee(
+        self, key: str, connection_id: str, batches: Iterable[bytes]
+    ) -> Iterator[bytes]:
+        """Pass `batches` (IPC stream chunks) through while writing them to the
+        cache. The entry is only stored if the stream is consumed to the end;
+        closing the iterator early also closes `batches`."""
+        writer = _EntryWriter(self._tmp_path(key), self.settings.max_bytes)
+        source = iter(batches)
+        complete = False
+        try:
+            for batch in source:
+                writer.write(batch)
+                yield batch
+            complete = True
+        finally:
+            size = writer.finish()
+            if complete and size is not None:
+                self._commit(key, connection_id, writer.path, size)
+            else:
+                _remove_quietly(writer.path)
+            close = getattr(source, "close", None)
+            if close is not None:
+                close()
+
+    def invalidate(self, connection_id: str | None = None) -> None:
+        """Drop cached results for one connection (or all)."""
+        with self._guard:
+            keys = [
+                key
+                for key, entry in self._entries.items()
+                if connection_id is None or entry.connection_id == connection_id
+            ]
+        for key in keys:
+            self._discard(key)
+
+    def close(self) -> None:
+        with self._guard:
+            keys = list(self._entries)
+            self._entries.clear()
+            self._total_bytes = 0
+        if self._owns_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            return
+        for key in keys:
+            _remove_quietly(self._path(key))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.arrow")
+
+    def _tmp_path(self, key: str) -> str:
+        # Unique per writer: concurrent misses for one key must not share a file.
+        return f"{self._path(key)}.{os.urandom(4).hex()}.tmp"
+
+    def _checkout(self, key: str) -> str | None:
+        with self._guard:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry.created_at >= self.settings.ttl_s:
+                expired = True
+            else:
+                expired = False
+                self._entries.move_to_end(key)
+        if expired:
+            self._discard(key)
+            return None
+        return self._path(key)
+
+    def _commit(self, key: str, connection_id: str, tmp_path: str, size: int) -> None:
+        evicted: list[str] = []
+        with self._guard:
+            try:
+                os.replace(tmp_path, self._path(key))
+            except OSError as exc:
+                logger.warning("Failed to store bridge result cache entry: %s", exc)
+                _remove_quietly(tmp_path)
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous.size
+            self._entries[key] = _Entry(connection_id, size, time.monotonic())
+            self._total_bytes += size
+            while self._total_bytes > self.settings.max_bytes and self._entries:
+                old_key, old = self._entries.popitem(last=False)
+                self._total_bytes -= old.size
+                evicted.append(old_key)
+        for old_key in evicted:
+            # Readers that already opened the file keep their handle on POSIX.
+            _remove_quietly(self._path(old_key))
+
+    def _discard(self, key: str) -> None:
+        with self._guard:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return
+            self._total_bytes -= entry.size
+            _remove_quietly(self._path(key))
+
+
+class _EntryWriter:
+    """Re-encodes a sequence of IPC stream chunks into one IPC stream file.
+
+    Gives up (without failing the caller's stream) once the entry would exceed
+    `max_bytes` or a chunk does not match the first chunk's schema.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._file: Any = None
+        self._writer: Any = None
+        self._failed = False
+
+    def write(self, payload: bytes) -> None:
+        if self._failed:
+            return
+        try:
+            import pyarrow as pa
+
+            reader = pa.ipc.open_stream(payload)
+            if self._writer is None:
+                self._file = pa.OSFile(self.path, "wb")
+                self._writer = pa.ipc.new_stream(self._file, reader.schema)
+            for batch in reader:
+                self._writer.write_batch(batch)
+            if self._file.tell() > self.max_bytes:
+                self._fail()
+        except Exception as exc:
+            logger.debug("Not caching bridge result: %s", exc)
+            self._fail()
+
+    def finish(self) -> int | None:
+        """Close the file; returns its size, or None if nothing cacheable was
+        written."""
+        if self._failed or self._writer is None:
+            self._close()
+            return None
+        try:
+            self._writer.close()
+            size = self._file.tell()
+            self._file.close()
+        except Exception as exc:
+            logger.debug("Not caching bridge result: %s", exc)
+            self._close()
+            return None
+        return size
+
+    def _fail(self) -> None:
+        self._failed = True
+        self._close()
+
+    def _close(self) -> None:
+        for handle in (self._writer, self._file):
+            if handle is None:
+                continue
+            try:
+                handle.close()
+            except Exception:
+                pass
+        self._writer = None
+        self._file = None
@@ -16,14 +16,24 @@ class DbBridgeConnector(Protocol):
 
     def list_catalog(self) -> dict[str, list[dict[str, Any]]]: ...
 
-    def execute_query(self, sql: str, query_type: str) -> dict[str, Any]: ...
+    def list_columns(
+        self, *, schema: str, table: str, database: str | None = None
+    ) -> list[dict[str, Any]]: ...
 
-    def fetch_arrow_bytes(self, sql: str) -> bytes: ...
+    def execute_query(
+        self, sql: str, query_type: str, query_id: str | None = None
+    ) -> dict[str, Any]: ...
+
+    def fetch_arrow_bytes(self, sql: str, query_id: str | None = None) -> bytes: ...
 
     def stream_arrow_batches(
         self, sql: str, chunk_rows: int = 5000, query_id: str | None = None
     ) -> Iterable[bytes]: ...
 
+    def partition_queries(
+        self, table: str, *, column: str | None = None, partitions: int = 4
+    ) -> list[str]: ...
+
     def cancel_query(self, query_id: str) -> bool: ...
 
     def dependency_diagnostics(self) -> dict[str, Any]: ...
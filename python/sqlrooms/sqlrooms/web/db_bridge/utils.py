@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-from typing import Any, Iterable
+from typing import Any, Callable, Iterable, Sequence
 
 import pyarrow as pa
 
+ValueConverter = Callable[[Any], Any]
+
 
 def cursor_columns(cursor: Any) -> list[str]:
     description = getattr(cursor, "description", None) or []
@@ -23,23 +25,70 @@ def rows_to_json_rows(
     return [dict(zip(columns, row)) for row in rows]
 
 
-def rows_to_arrow_bytes(
-    rows: Iterable[Iterable[Any]],
+def _column_array(
+    name: str,
+    values: Sequence[Any],
+    arrow_type: pa.DataType | None,
+    convert: ValueConverter | None,
+) -> pa.Array:
+    if convert is not None:
+        values = [None if v is None else convert(v) for v in values]
+    if arrow_type is None:
+        return pa.array(values) if values else pa.array([], type=pa.null())
+    try:
+        return pa.array(values, type=arrow_type)
+    except (pa.ArrowException, TypeError, ValueError, OverflowError) as e:
+        # No per-batch fallback type: batches of one stream must share a schema.
+        raise ValueError(
+            f"Column {name!r}: value does not fit Arrow type {arrow_type}: {e}"
+        ) from e
+
+
+def rows_to_arrow_table(
+    rows: Iterable[Sequence[Any]],
     columns: list[str],
-) -> bytes:
-    json_rows = rows_to_json_rows(rows, columns)
-    if json_rows:
-        table = pa.Table.from_pylist(json_rows)
-    elif columns:
-        table = pa.table({column: pa.array([], type=pa.null()) for column in columns})
-    else:
-        table = pa.table({})
+    types: Sequence[pa.DataType | None] | None = None,
+    converters: Sequence[ValueConverter | None] | None = None,
+) -> pa.Table:
+    """Build a table column-wise from DB-API rows.
+
+    `types` pins the Arrow type per column (None infers it from the values), so an
+    empty result still carries the real schema and every batch of a stream the
+    same one; a value that does not fit raises ValueError. `converters` map
+    non-None values before conversion (e.g. UUID -> str).
+    """
+    rows = list(rows)
+    column_values: list[Sequence[Any]] = (
+        list(zip(*rows)) if rows else [() for _ in columns]
+    )
+    types = types if types is not None else [None] * len(columns)
+    converters = converters if converters is not None else [None] * len(columns)
+    arrays = [
+        _column_array(name, values, arrow_type, convert)
+        for name, values, arrow_type, convert in zip(
+            columns, column_values, types, converters
+        )
+    ]
+    return pa.Table.from_arrays(arrays, names=columns)
 
+
+def table_to_arrow_bytes(table: pa.Table) -> bytes:
     sink = pa.BufferOutputStream()
     with pa.ipc.new_stream(sink, table.schema) as writer:
         writer.write_table(table)
     return sink.getvalue().to_pybytes()
 
 
+def rows_to_arrow_bytes(
+    rows: Iterable[Sequence[Any]],
+    columns: list[str],
+    types: Sequence[pa.DataType | None] | None = None,
+    converters: Sequence[ValueConverter | None] | None = None,
+) -> bytes:
+    return table_to_arrow_bytes(
+        rows_to_arrow_table(rows, columns, types=types, converters=converters)
+    )
+
+
 def quoted_ident(ident: str) -> str:
     return '"' + ident.replace('"', '""') + '"'
@@ -0,0 +1,376 @@
+from __future__ import annotations
+
+import asyncio
+import errno
+import json
+import logging
+from typing import Any, Coroutine, Union
+
+from fastapi import WebSocket
+
+from sqlrooms.server import db_async
+from sqlrooms.server.cache import QueryCache
+from sqlrooms.server.server import (
+    _parse_framed_binary,
+    handle_query_ws,
+    handle_upload_arrow_ws,
+)
+
+logger = logging.getLogger(__name__)
+
+# Keep in sync with the query message types accepted by sqlrooms.server.server.
+QUERY_MESSAGE_TYPES = ("arrow", "json", "exec")
+# Replies that complete a query on the socketify backend.
+FINAL_REPLY_TYPES = ("arrow", "json", "ok", "error")
+DEFAULT_POOL_SIZE = 4
+
+Message = Union[str, bytes]
+
+
+def _frame_query_id(message: bytes) -> str | None:
+    """Read the queryId from a framed binary reply (4-byte length + JSON header)."""
+    if len(message) < 4:
+        return None
+    header_len = int.from_bytes(message[:4], byteorder="big")
+    if header_len <= 0 or 4 + header_len > len(message):
+        return None
+    try:
+        header = json.loads(message[4 : 4 + header_len].decode("utf-8"))
+    except Exception:
+        return None
+    query_id = header.get("queryId") if isinstance(header, dict) else None
+    return query_id if isinstance(query_id, str) else None
+
+
+def _reply_query_id(message: Message) -> tuple[str | None, bool]:
+    """Return (queryId, is_final) for a reply received on a pooled upstream."""
+    if isinstance(message, bytes):
+        return _frame_query_id(message), True
+    try:
+        payload = json.loads(message)
+    except Exception:
+        return None, False
+    if not isinstance(payload, dict):
+        return None, False
+    query_id = payload.get("queryId")
+    if not isinstance(query_id, str):
+        return None, False
+    return query_id, payload.get("type") in FINAL_REPLY_TYPES
+
+
+def _ensure_query_id(payload: dict[str, Any]) -> str:
+    """Return the message's queryId, assigning a fresh one if it has none."""
+    query_id = payload.get("queryId")
+    if not isinstance(query_id, str) or not query_id:
+        query_id = db_async.generate_query_id()
+        payload["queryId"] = query_id
+    return query_id
+
+
+class _Upstream:
+    def __init__(self, ws: Any):
+        self.ws = ws
+        self.query_ids: set[str] = set()
+        self.reader: asyncio.Task[None] | None = None
+
+
+class _ClientSession:
+    def __init__(self, client_ws: WebSocket):
+        self.client_ws = client_ws
+        # None is the close sentinel for the writer task.
+        self.outbox: asyncio.Queue[Message | None] = asyncio.Queue()
+        self.query_ids: set[str] = set()
+        self.dedicated: Any = None
+        self.dedicated_reader: asyncio.Task[None] | None = None
+        # In-process handler tasks, by the queryId they run.
+        self.tasks: dict[asyncio.Task[None], str] = {}
+
+    def deliver(self, message: Message | None) -> None:
+        self.outbox.put_nowait(message)
+
+    def send(self, payload: Any, _opcode: Any = None) -> bool:
+        """`ws.send`-compatible sink for the in-process socketify handlers."""
+        if isinstance(payload, bytes):
+            self.deliver(payload)
+        elif isinstance(payload, bytearray):
+            self.deliver(bytes(payload))
+        elif isinstance(payload, str):
+            self.deliver(payload)
+        else:
+            self.deliver(json.dumps(payload))
+        return True
+
+    def spawn(self, query_id: str, coro: Coroutine[Any, Any, None]) -> None:
+        task = asyncio.create_task(coro)
+        # Keep a reference until done; results are delivered through the outbox.
+        self.tasks[task] = query_id
+        task.add_done_callback(lambda done: self.tasks.pop(done, None))
+
+
+class DuckDbWsProxy:
+    """Proxies browser websockets to the socketify DuckDB backend.
+
+    Query messages (`arrow`/`json`/`exec`) from all clients are multiplexed over a
+    small pool of shared upstream connections and routed back by `queryId`, so a
+    new browser tab does not cost a new upstream socket. Connection-scoped traffic
+    (CRDT, subscribe/notify, binary uploads) still uses a per-client upstream that is
+    opened lazily on first use. Cancellation is handled in-process through
+    `db_async.cancel_query`, since the backend shares this process; queries still
+    running when their client disconnects are cancelled the same way.
+
+    With `pool_size=0` every message goes through the per-client upstream.
+
+    With `in_process=True` query and `uploadArrow` messages skip the upstream
+    entirely: they are dispatched straight into the backend handlers
+    (`handle_query_ws` / `handle_upload_arrow_ws`) on this event loop, sharing
+    `db_async.GLOBAL_CON` and `cache` with the socketify server.
+    """
+
+    def __init__(
+        self,
+        upstream_url: str,
+        *,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        in_process: bool = False,
+        cache: QueryCache | None = None,
+    ):
+        if pool_size < 0:
+            raise ValueError("pool_size must be >= 0")
+        self.upstream_url = upstream_url
+        self.pool_size = pool_size
+        self.in_process = in_process
+        self.cache = cache
+        self._pool: list[_Upstream] = []
+        self._routes: dict[str, tuple[_Upstream, _ClientSession]] = {}
+        self._pool_lock = asyncio.Lock()
+
+    async def _connect(self) -> Any:
+        import websockets
+
+        return await websockets.connect(self.upstream_url, max_size=None)
+
+    async def serve(self, client_ws: WebSocket) -> None:
+        """Pump one authenticated client until it (or its upstream) disconnects.
+
+        Raises OSError if the backend cannot be reached when the session starts.
+        """
+        session = _ClientSession(client_ws)
+        if self.in_process:
+            if db_async.GLOBAL_CON is None:
+                raise ConnectionRefusedError(
+                    errno.ECONNREFUSED, "DuckDB connection is not initialized"
+                )
+        elif self.pool_size > 0:
+            await self._checkout()
+        else:
+            await self._ensure_dedicated(session)
+        writer = asyncio.create_task(self._drain_outbox(session))
+        reader = asyncio.create_task(self._pump_client(session))
+        try:
+            done, pending = await asyncio.wait(
+                {writer, reader}, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in pending:
+                task.cancel()
+            for task in done:
+                task.result()
+        finally:
+            await self._close_session(session)
+
+    async def _pump_client(self, session: _ClientSession) -> None:
+        while True:
+            message = await session.client_ws.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            data = message.get("bytes")
+            text = message.get("text")
+            if data is not None:
+                await self._route_bytes(session, data)
+            elif text is not None:
+                await self._route_text(session, text)
+
+    async def _route_bytes(self, session: _ClientSession, data: bytes) -> None:
+        if self.in_process:
+            parsed = _parse_framed_binary(data)
+            if (
+                parsed is not None
+                and isinstance(parsed[0], dict)
+                and parsed[0].get("type") == "uploadArrow"
+            ):
+                query_id = _ensure_query_id(parsed[0])
+                session.spawn(
+                    query_id, handle_upload_arrow_ws(session, parsed[0], parsed[1])
+                )
+                return
+        await self._send_dedicated(session, data)
+
+    async def _route_text(self, session: _ClientSession, text: str) -> None:
+        try:
+            payload = json.loads(text)
+        except Exception:
+            payload = None
+        if isinstance(payload, dict):
+            message_type = payload.get("type")
+            if message_type == "cancel":
+                query_id = payload.get("queryId")
+                cancelled = bool(query_id) and db_async.cancel_query(query_id)
+                session.deliver(
+                    json.dumps(
+                        {
+                            "type": "cancelAck",
+                            "queryId": query_id,
+                            "cancelled": cancelled,
+                        }
+                    )
+                )
+                return
+            is_query = message_type in QUERY_MESSAGE_TYPES and isinstance(
+                payload.get("sql"), str
+            )
+            if self.in_process:
+                if is_query:
+                    query_id = _ensure_query_id(payload)
+                    session.spawn(
+                        query_id, handle_query_ws(session.send, self.cache, payload)
+                    )
+                    return
+                if message_type == "auth":
+                    # Already authenticated by the launcher.
+                    session.deliver(json.dumps({"type": "authAck"}))
+                    return
+            elif self.pool_size > 0 and is_query:
+                original_id = payload.get("queryId")
+                query_id = _ensure_query_id(payload)
+                if query_id != original_id:
+                    text = json.dumps(payload)
+                if query_id not in self._routes:
+                    await self._send_pooled(session, query_id, text)
+                    return
+        await self._send_dedicated(session, text)
+
+    async def _send_pooled(
+        self, session: _ClientSession, query_id: str, text: str
+    ) -> None:
+        upstream = await self._checkout()
+        upstream.query_ids.add(query_id)
+        session.query_ids.add(query_id)
+        self._routes[query_id] = (upstream, session)
+        try:
+            await upstream.ws.send(text)
+        except Exception:
+            self._drop_route(query_id)
+            raise
+
+    async def _checkout(self) -> _Upstream:
+        """Pick the least-loaded pooled upstream, growing the pool up to pool_size."""
+        async with self._pool_lock:
+            idle = min(self._pool, key=lambda u: len(u.query_ids), default=None)
+            if idle is not None and (
+                not idle.query_ids or len(self._pool) >= self.pool_size
+            ):
+                return idle
+            upstream = _Upstream(await self._connect())
+            upstream.reader = asyncio.create_task(self._read_pooled(upstream))
+            self._pool.append(upstream)
+            return upstream
+
+    async def _read_pooled(self, upstream: _Upstream) -> None:
+        try:
+            async for message in upstream.ws:
+                query_id, final = _reply_query_id(message)
+                route = self._routes.get(query_id) if query_id else None
+                if route is None:
+                    logger.debug(
+                        "Dropping unroutable DuckDB reply (queryId=%s)", query_id
+                    )
+                    continue
+                route[1].deliver(message)
+                if final:
+                    self._drop_route(query_id)
+        except Exception as exc:
+            logger.warning("Pooled DuckDB websocket upstream failed: %s", exc)
+        finally:
+            if upstream in self._pool:
+                self._pool.remove(upstream)
+            for query_id in list(upstream.query_ids):
+                route = self._routes.get(query_id)
+                if route is not None:
+                    route[1].deliver(
+                        json.dumps(
+                            {
+                                "type": "error",
+                                "queryId": query_id,
+                                "error": "DuckDB backend connection lost",
+                            }
+                        )
+                    )
+                self._drop_route(query_id)
+
+    def _drop_route(self, query_id: str) -> None:
+        route = self._routes.pop(query_id, None)
+        if route is None:
+            return
+        upstream, session = route
+        upstream.query_ids.discard(query_id)
+        session.query_ids.discard(query_id)
+
+    async def _ensure_dedicated(self, session: _ClientSession) -> Any:
+        if session.dedicated is None:
+            session.dedicated = await self._connect()
+            session.dedicated_reader = asyncio.create_task(
+                self._read_dedicated(session)
+            )
+        return session.dedicated
+
+    async def _send_dedicated(self, session: _ClientSession, message: Message) -> None:
+        upstream = await self._ensure_dedicated(session)
+        await upstream.send(message)
+
+    async def _read_dedicated(self, session: _ClientSession) -> None:
+        try:
+            async for message in session.dedicated:
+                session.deliver(message)
+        finally:
+            # Upstream went away: close the client like a plain proxy would.
+            session.deliver(None)
+
+    async def _drain_outbox(self, session: _ClientSession) -> None:
+        while True:
+            message = await session.outbox.get()
+            if message is None:
+                return
+            if isinstance(message, bytes):
+                await session.client_ws.send_bytes(message)
+            else:
+                await session.client_ws.send_text(message)
+
+    async def _close_session(self, session: _ClientSession) -> None:
+        # Nobody is left to read the results: stop the client's running queries.
+        for query_id in list(session.query_ids):
+            self._drop_route(query_id)
+            db_async.cancel_query(query_id)
+        tasks = list(session.tasks.items())
+        for task, query_id in tasks:
+            db_async.cancel_query(query_id)
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*(task for task, _ in tasks), return_exceptions=True)
+        if session.dedicated_reader is not None:
+            session.dedicated_reader.cancel()
+        if session.dedicated is not None:
+            try:
+                await session.dedicated.close()
+            except Exception:
+                pass
+
+    async def close(self) -> None:
+        """Close all pooled upstream connections."""
+        async with self._pool_lock:
+            pool, self._pool = self._pool, []
+        for upstream in pool:
+            try:
+                await upstream.ws.close()
+            except Exception:
+                pass
+            if upstream.reader is not None:
+                await asyncio.gather(upstream.reader, return_exceptions=True)
@@ -12,8 +12,9 @@ import socket
 import tempfile
 import threading
 import webbrowser
+from contextlib import aclosing
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Dict
 from urllib.parse import urlsplit, urlunsplit
 
 import uvicorn
@@ -27,20 +28,36 @@ from fastapi.responses import (
     Response,
     StreamingResponse,
 )
+from starlette.requests import ClientDisconnect
 
 from sqlrooms.server import db_async
 from sqlrooms.server.cache import QueryCache
-from sqlrooms.server.server import server as duckdb_ws_server
+from sqlrooms.server.server import (
+    _normalize_target_relation,
+    server as duckdb_ws_server,
+)
 
 from .db_bridge import (
+    DEFAULT_PARTITIONS,
     ENGINE_CONFIG_FIELDS,
     SUPPORTED_ENGINES,
+    BridgeResultCacheSettings,
     PostgresConnectorSettings,
     SnowflakeConnectorSettings,
     UnknownBridgeConnectionError,
+    attach_postgres_connectors,
     build_cli_db_bridge_registry,
     build_ephemeral_connector,
 )
+from .bridge_materialize import materialize_arrow_batches
+from .chunked_upload import ChunkedUploadError, ChunkedUploadManager
+from .upload_ingest import (
+    UPLOAD_FORMATS,
+    detect_upload_format,
+    ingest_file,
+    write_request_stream,
+)
+from .duckdb_proxy import DEFAULT_POOL_SIZE, DuckDbWsProxy
 from .mcp import SqlroomsMcpService
 from .mcp_bridge import McpBridgeBroker
 from .ui import BuiltinUiProvider, DirectoryUiProvider, UiProvider
@@ -418,11 +435,13 @@ def _encode_stream_frame(
     query_id: str,
     payload: bytes = b"",
     error: str | None = None,
+    **fields: Any,
 ) -> bytes:
     header = {
         "type": frame_type,
         "queryId": query_id,
         "payloadLength": len(payload),
+        **fields,
     }
     if error:
         header["error"] = error
@@ -430,6 +449,18 @@ def _encode_stream_frame(
     return len(header_bytes).to_bytes(4, byteorder="big") + header_bytes + payload
 
 
+def _optional_query_id(payload: Dict[str, Any]) -> str | None:
+    query_id = payload.get("queryId")
+    if isinstance(query_id, str) and query_id.strip():
+        return query_id
+    return None
+
+
+def _use_result_cache(payload: Dict[str, Any]) -> bool:
+    """Bridge requests use the result cache (when configured) unless `cache: false`."""
+    return payload.get("cache") is not False
+
+
 def _derive_ws_proxy_url(external_url: str) -> str:
     parsed = urlsplit(external_url.rstrip("/"))
     scheme = {"http": "ws", "https": "wss"}.get(parsed.scheme, parsed.scheme)
@@ -456,6 +487,9 @@ class SqlroomsHttpServer:
         ai_model_parameters: dict[str, Any] | None = None,
         connector_settings: list[PostgresConnectorSettings | SnowflakeConnectorSettings]
         | None = None,
+        bridge_result_cache: BridgeResultCacheSettings | None = None,
+        attach_postgres: bool = False,
+        extension_dir: str | None = None,
         open_browser: bool = True,
         ui_dir: str | None = None,
         serve_ui: bool = True,
@@ -467,6 +501,8 @@ class SqlroomsHttpServer:
         ai_devtools: bool = False,
         mcp_enabled: bool = False,
         mcp_port: int | None = None,
+        ws_proxy_pool_size: int = DEFAULT_POOL_SIZE,
+        ws_proxy_in_process: bool = True,
         debug: bool = False,
     ):
         db_path_str = str(db_path)
@@ -531,9 +567,14 @@ class SqlroomsHttpServer:
         self.db_bridge_registry = build_cli_db_bridge_registry(
             bridge_id=DB_BRIDGE_ID,
             connector_settings=connector_settings,
+            result_cache_settings=bridge_result_cache,
         )
         self.config_path = config_path
         self.connector_settings = connector_settings or []
+        # ATTACH Postgres connectors into the DuckDB session (postgres scanner).
+        self.attach_postgres = bool(attach_postgres)
+        self.extension_dir = extension_dir
+        self.attached_catalogs: list[str] = []
         self.external_url = external_url.rstrip("/") if external_url else None
         self.external_ws_url = external_ws_url if external_ws_url else None
         self.mcp_port = mcp_port or _pick_free_port(
@@ -547,7 +588,16 @@ class SqlroomsHttpServer:
         self.index_html = self.ui_provider.index_html()
         self.upload_dir = base_dir / "sqlrooms_uploads"
         self.upload_dir.mkdir(parents=True, exist_ok=True)
+        self.chunked_uploads = ChunkedUploadManager(self.upload_dir)
         self._duckdb_thread: threading.Thread | None = None
+        # Shared by the socketify backend and the in-process /ws/duckdb path.
+        self.query_cache = QueryCache()
+        self.duckdb_proxy = DuckDbWsProxy(
+            f"ws://127.0.0.1:{self.ws_port}",
+            pool_size=ws_proxy_pool_size,
+            in_process=ws_proxy_in_process,
+            cache=self.query_cache,
+        )
         self._duckdb_ready = threading.Event()
         self._duckdb_start_error: BaseException | None = None
         self.mcp_broker = McpBridgeBroker(self.session_token)
@@ -597,6 +647,8 @@ class SqlroomsHttpServer:
         try:
             await server.serve()
         finally:
+            await self.duckdb_proxy.close()
+            self.db_bridge_registry.close()
             await self._stop_mcp()
             await self.mcp_broker.close()
 
@@ -903,6 +955,7 @@ class SqlroomsHttpServer:
                 "diagnostics": self.db_bridge_registry.runtime_diagnostics(),
                 "supportedEngines": SUPPORTED_ENGINES,
                 "engineConfigFields": ENGINE_CONFIG_FIELDS,
+                "attachedCatalogs": list(self.attached_catalogs),
             },
         }
 
@@ -936,6 +989,44 @@ class SqlroomsHttpServer:
             return None
         return JSONResponse({"error": "unauthorized"}, status_code=401)
 
+    def _bridge_arrow_batches(
+        self,
+        payload: Dict[str, Any],
+        *,
+        connection_id: str,
+        query_id: str,
+        chunk_rows: int,
+    ) -> AsyncIterator[bytes] | JSONResponse:
+        """Arrow batches for a bridge request: `sql`, or a partitioned extraction
+        of `table` (optional `partitionColumn`, `partitions`)."""
+        table = payload.get("table")
+        if isinstance(table, str) and table.strip():
+            partition_column = payload.get("partitionColumn")
+            if not isinstance(partition_column, str) or not partition_column.strip():
+                partition_column = None
+            partitions = payload.get("partitions")
+            if not isinstance(partitions, int) or partitions <= 0:
+                partitions = DEFAULT_PARTITIONS
+            return self.db_bridge_registry.astream_partitioned_arrow_batches(
+                connection_id,
+                table,
+                partition_column=partition_column,
+                partitions=partitions,
+                chunk_rows=chunk_rows,
+                query_id=query_id,
+                use_cache=_use_result_cache(payload),
+            )
+        sql = payload.get("sql", "")
+        if not isinstance(sql, str) or not sql.strip():
+            return JSONResponse({"error": "sql is required"}, status_code=400)
+        return self.db_bridge_registry.astream_arrow_batches(
+            connection_id,
+            sql,
+            chunk_rows=chunk_rows,
+            query_id=query_id,
+            use_cache=_use_result_cache(payload),
+        )
+
     async def _authenticate_duckdb_proxy_websocket(self, client_ws: WebSocket) -> bool:
         await client_ws.accept()
 
@@ -999,48 +1090,9 @@ class SqlroomsHttpServer:
             if not await self._authenticate_duckdb_proxy_websocket(client_ws):
                 return
 
+            upstream_url = self.duckdb_proxy.upstream_url
             try:
-                import websockets
-            except ImportError:
-                await client_ws.close(code=1011, reason="websockets package missing")
-                return
-
-            upstream_url = f"ws://127.0.0.1:{self.ws_port}"
-            try:
-                async with websockets.connect(
-                    upstream_url,
-                    max_size=None,
-                ) as upstream_ws:
-
-                    async def client_to_upstream() -> None:
-                        while True:
-                            message = await client_ws.receive()
-                            if message["type"] == "websocket.disconnect":
-                                await upstream_ws.close()
-                                return
-                            if message.get("bytes") is not None:
-                                await upstream_ws.send(message["bytes"])
-                            elif message.get("text") is not None:
-                                await upstream_ws.send(message["text"])
-
-                    async def upstream_to_client() -> None:
-                        async for message in upstream_ws:
-                            if isinstance(message, bytes):
-                                await client_ws.send_bytes(message)
-                            else:
-                                await client_ws.send_text(message)
-
-                    done, pending = await asyncio.wait(
-                        {
-                            asyncio.create_task(client_to_upstream()),
-                            asyncio.create_task(upstream_to_client()),
-                        },
-                        return_when=asyncio.FIRST_COMPLETED,
-                    )
-                    for task in pending:
-                        task.cancel()
-                    for task in done:
-                        task.result()
+                await self.duckdb_proxy.serve(client_ws)
             except WebSocketDisconnect:
                 return
             except OSError as exc:
@@ -1194,6 +1246,170 @@ class SqlroomsHttpServer:
             await _write_upload_to_path(file, target)
             return {"path": str(target)}
 
+        @app.post("/api/upload/chunked/init")
+        async def chunked_upload_init(payload: Dict[str, Any], request: Request):
+            """Start (or resume) a chunked upload: `filename`, `size`, optional
+            `sha256` of the whole file and `chunkSize`. Returns the existing path
+            immediately when a file with the same content was uploaded before."""
+            unauthorized = self._require_api_auth(request)
+            if unauthorized is not None:
+                return unauthorized
+            filename = payload.get("filename")
+            size = payload.get("size")
+            sha256 = payload.get("sha256")
+            chunk_size = payload.get("chunkSize")
+            if not isinstance(filename, str) or not filename.strip():
+                return JSONResponse({"error": "filename is required"}, status_code=400)
+            if isinstance(size, bool) or not isinstance(size, int):
+                return JSONResponse({"error": "size is required"}, status_code=400)
+            if sha256 is not None and not isinstance(sha256, str):
+                return JSONResponse(
+                    {"error": "sha256 must be a string"}, status_code=400
+                )
+            if chunk_size is not None and (
+                isinstance(chunk_size, bool) or not isinstance(chunk_size, int)
+            ):
+                return JSONResponse(
+                    {"error": "chunkSize must be an integer"}, status_code=400
+                )
+            try:
+                return await asyncio.to_thread(
+                    self.chunked_uploads.init,
+                    filename=_sanitize_filename(filename),
+                    size=size,
+                    sha256=sha256,
+                    chunk_size=chunk_size,
+                )
+            except ChunkedUploadError as exc:
+                return JSONResponse({"error": str(exc)}, status_code=400)
+
+        @app.get("/api/upload/chunked/{upload_id}")
+        async def chunked_upload_status(upload_id: str, request: Request):
+            unauthorized = self._require_api_auth(request)
+            if unauthorized is not None:
+                return unauthorized
+            try:
+                return self.chunked_uploads.status(upload_id)
+            except ChunkedUploadError as exc:
+                return JSONResponse({"error": str(exc)}, status_code=404)
+
+        @app.put("/api/upload/chunked/{upload_id}/{index}")
+        async def chunked_upload_put(upload_id: str, index: int, request: Request):
+            """Store chunk `index` (raw body) after checking `X-Chunk-Sha256`."""
+            unauthorized = self._require_api_auth(request)
+            if unauthorized is not None:
+                return unauthorized
+            checksum = (request.headers.get("x-chunk-sha256") or "").strip()
+            if not checksum:
+                return JSONResponse(
+                    {"error": "X-Chunk-Sha256 header is required"}, status_code=400
+                )
+            data = await request.body()
+            try:
+                return await asyncio.to_thread(
+                    self.chunked_uploads.put_chunk, upload_id, index, data, checksum
+                )
+            except ChunkedUploadError as exc:
+                return JSONResponse({"error": str(exc)}, status_code=400)
+
+        @app.post("/api/upload/chunked/{upload_id}/complete")
+        async def chunked_upload_complete(upload_id: str, request: Request):
+            unauthorized = self._require_api_auth(request)
+            if unauthorized is not None:
+                return unauthorized
+            try:
+                return await asyncio.to_thread(self.chunked_uploads.complete, upload_id)
+            except ChunkedUploadError as exc:
+                return JSONResponse({"error": str(exc)}, status_code=400)
+
+        @app.delete("/api/upload/chunked/{upload_id}")
+        async def chunked_upload_abort(upload_id: str, request: Request):
+            unauthorized = self._require_api_auth(request)
+            if unauthorized is not None:
+                return unauthorized
+            try:
+                self.chunked_uploads.abort(upload_id)
+            except ChunkedUploadError as exc:
+                return JSONResponse({"error": str(exc)}, status_code=404)
+            return {"ok": True}
+
+        @app.post("/api/upload/ingest")
+        async def upload_and_ingest(request: Request):
+            """Stream a raw request body to `upload_dir` and load it into DuckDB.
+
+            Query parameters: `tableName` (required), `filename`, `format`
+            (csv/parquet/json; detected from the name or content when omitted) and
+            `queryId` (cancellable via /api/db/cancel-query). Responds with framed
+            `progress` events and a final `end` frame carrying rows and columns.
+            """
+            unauthorized = self._require_api_auth(request)
+            if unauthorized is not None:
+                return unauthorized
+            params = request.query_params
+            table_name = (params.get("tableName") or "").strip()
+            try:
+                _normalize_target_relation(table_name)
+            except ValueError as exc:
+                return JSONResponse({"error": str(exc)}, status_code=400)
+            file_format = (params.get("format") or "").strip().lower() or None
+            if file_format is not None and file_format not in UPLOAD_FORMATS:
+                return JSONResponse(
+                    {"error": f"format must be one of: {', '.join(UPLOAD_FORMATS)}"},
+                    status_code=400,
+                )
+            query_id = (params.get("queryId") or "").strip() or (
+                f"upload_{os.urandom(8).hex()}"
+            )
+            # Unnamed uploads are named after their query so they cannot collide.
+            target = self.upload_dir / _sanitize_filename(
+                params.get("filename") or f"{query_id}.dat"
+            )
+            try:
+                size, head = await write_request_stream(request.stream(), target)
+            except ClientDisconnect:
+                return JSONResponse({"error": "upload interrupted"}, status_code=400)
+            file_format = file_format or detect_upload_format(target.name, head)
+            progress = ingest_file(
+                target,
+                table_name=table_name,
+                file_format=file_format,
+                query_id=query_id,
+            )
+            summary = {
+                "path": str(target),
+                "bytes": size,
+                "format": file_format,
+                "tableName": table_name,
+            }
+
+            async def _stream():
+                yield _encode_stream_frame(
+                    "progress", query_id=query_id, phase="uploaded", **summary
+                )
+                try:
+                    async with aclosing(progress) as updates:
+                        async for update in updates:
+                            if update["phase"] == "done":
+                                yield _encode_stream_frame(
+                                    "end",
+                                    query_id=query_id,
+                                    rows=update["rows"],
+                                    columns=update["columns"],
+                                    **summary,
+                                )
+                                return
+                            yield _encode_stream_frame(
+                                "progress", query_id=query_id, **update
+                            )
+                            if await request.is_disconnected():
+                                return
+                except Exception as exc:
+                    yield _encode_stream_frame(
+                        "error", query_id=query_id, error=str(exc)
+                    )
+
+            return StreamingResponse(_stream(), media_type="application/octet-stream")
+
         @app.post("/api/db/test-connection")
         async def test_connection(payload: Dict[str, Any], request: Request):
             unauthorized = self._require_api_auth(request)
@@ -1206,11 +1422,13 @@ class SqlroomsHttpServer:
             try:
                 if isinstance(engine, str) and isinstance(config, dict):
                     connector = build_ephemeral_connector(engine, config)
-                    ok = connector.test_connection()
+                    ok = await self.db_bridge_registry.run(connector.test_connection)
                     return {"ok": bool(ok)}
 
                 if isinstance(connection_id, str) and connection_id.strip():
-                    ok = self.db_bridge_registry.test_connection(connection_id)
+                    ok = await self.db_bridge_registry.run(
+                        self.db_bridge_registry.test_connection, connection_id
+                    )
                     return {"ok": bool(ok)}
 
                 return {
@@ -1236,12 +1454,64 @@ class SqlroomsHttpServer:
                     "error": "connectionId is required",
                 }
             try:
-                return self.db_bridge_registry.list_catalog(connection_id)
+                return await self.db_bridge_registry.alist_catalog(
+                    connection_id, refresh=payload.get("refresh") is True
+                )
             except UnknownBridgeConnectionError as exc:
                 return {"databases": [], "schemas": [], "tables": [], "error": str(exc)}
             except Exception as exc:
                 return {"databases": [], "schemas": [], "tables": [], "error": str(exc)}
 
+        @app.post("/api/db/list-columns")
+        async def list_columns(payload: Dict[str, Any], request: Request):
+            unauthorized = self._require_api_auth(request)
+            if unauthorized is not None:
+                return unauthorized
+            connection_id = payload.get("connectionId")
+            schema = payload.get("schema")
+            table = payload.get("table")
+            database = payload.get("database")
+            for key, value in (
+                ("connectionId", connection_id),
+                ("schema", schema),
+                ("table", table),
+            ):
+                if not isinstance(value, str) or not value.strip():
+                    return {"columns": [], "error": f"{key} is required"}
+            try:
+                columns = await self.db_bridge_registry.alist_columns(
+                    connection_id,
+                    schema=schema,
+                    table=table,
+                    database=database if isinstance(database, str) else None,
+                    refresh=payload.get("refresh") is True,
+                )
+                return {"columns": columns}
+            except Exception as exc:
+                return {"columns": [], "error": str(exc)}
+
+        @app.post("/api/db/invalidate-catalog")
+        async def invalidate_catalog(payload: Dict[str, Any], request: Request):
+            unauthorized = self._require_api_auth(request)
+            if unauthorized is not None:
+                return unauthorized
+            connection_id = payload.get("connectionId")
+            if not isinstance(connection_id, str) or not connection_id.strip():
+                connection_id = None
+            self.db_bridge_registry.invalidate_catalog(connection_id)
+            return {"ok": True}
+
+        @app.post("/api/db/invalidate-results")
+        async def invalidate_results(payload: Dict[str, Any], request: Request):
+            unauthorized = self._require_api_auth(request)
+            if unauthorized is not None:
+                return unauthorized
+            connection_id = payload.get("connectionId")
+            if not isinstance(connection_id, str) or not connection_id.strip():
+                connection_id = None
+            self.db_bridge_registry.invalidate_results(connection_id)
+            return {"ok": True}
+
         @app.post("/api/db/execute-query")
         async def execute_query(payload: Dict[str, Any], request: Request):
             unauthorized = self._require_api_auth(request)
@@ -1261,11 +1531,14 @@ class SqlroomsHttpServer:
                 )
             if not isinstance(sql, str) or not sql.strip():
                 return JSONResponse({"error": "sql is required"}, status_code=400)
+            query_id = _optional_query_id(payload)
             try:
-                return self.db_bridge_registry.execute_query(
+                return await self.db_bridge_registry.run(
+                    self.db_bridge_registry.execute_query,
                     connection_id=connection_id,
                     sql=sql,
                     query_type=query_type,
+                    query_id=query_id,
                 )
             except UnknownBridgeConnectionError as exc:
                 return JSONResponse({"error": str(exc)}, status_code=404)
@@ -1285,10 +1558,14 @@ class SqlroomsHttpServer:
             sql = payload.get("sql", "")
             if not isinstance(sql, str) or not sql.strip():
                 return JSONResponse({"error": "sql is required"}, status_code=400)
+            query_id = _optional_query_id(payload)
             try:
-                arrow_bytes = self.db_bridge_registry.fetch_arrow_bytes(
+                arrow_bytes = await self.db_bridge_registry.run(
+                    self.db_bridge_registry.fetch_arrow_bytes,
                     connection_id=connection_id,
                     sql=sql,
+                    query_id=query_id,
+                    use_cache=_use_result_cache(payload),
                 )
                 return Response(
                     content=arrow_bytes,
@@ -1309,29 +1586,32 @@ class SqlroomsHttpServer:
                 return JSONResponse(
                     {"error": "connectionId is required"}, status_code=400
                 )
-            sql = payload.get("sql", "")
-            if not isinstance(sql, str) or not sql.strip():
-                return JSONResponse({"error": "sql is required"}, status_code=400)
             query_id = payload.get("queryId")
             if not isinstance(query_id, str) or not query_id.strip():
                 query_id = f"bridge_{os.urandom(8).hex()}"
             chunk_rows = payload.get("chunkRows")
             if not isinstance(chunk_rows, int) or chunk_rows <= 0:
                 chunk_rows = 5000
+            source = self._bridge_arrow_batches(
+                payload,
+                connection_id=connection_id,
+                query_id=query_id,
+                chunk_rows=chunk_rows,
+            )
+            if isinstance(source, JSONResponse):
+                return source
 
             async def _stream():
                 try:
-                    for batch in self.db_bridge_registry.stream_arrow_batches(
-                        connection_id=connection_id,
-                        sql=sql,
-                        chunk_rows=chunk_rows,
-                        query_id=query_id,
-                    ):
-                        if await request.is_disconnected():
-                            break
-                        yield _encode_stream_frame(
-                            "batch", query_id=query_id, payload=batch
-                        )
+                    # aclosing: a client disconnect cancels the remote query now,
+                    # not whenever the generator is garbage collected.
+                    async with aclosing(source) as batches:
+                        async for batch in batches:
+                            if await request.is_disconnected():
+                                return
+                            yield _encode_stream_frame(
+                                "batch", query_id=query_id, payload=batch
+                            )
                     yield _encode_stream_frame("end", query_id=query_id)
                 except UnknownBridgeConnectionError as exc:
                     yield _encode_stream_frame(
@@ -1344,6 +1624,64 @@ class SqlroomsHttpServer:
 
             return StreamingResponse(_stream(), media_type="application/octet-stream")
 
+        @app.post("/api/db/materialize")
+        async def materialize(payload: Dict[str, Any], request: Request):
+            unauthorized = self._require_api_auth(request)
+            if unauthorized is not None:
+                return unauthorized
+            connection_id = payload.get("connectionId")
+            if not isinstance(connection_id, str) or not connection_id.strip():
+                return JSONResponse(
+                    {"error": "connectionId is required"}, status_code=400
+                )
+            table_name = payload.get("tableName")
+            if not isinstance(table_name, str) or not table_name.strip():
+                return JSONResponse({"error": "tableName is required"}, status_code=400)
+            query_id = _optional_query_id(payload) or f"bridge_{os.urandom(8).hex()}"
+            chunk_rows = payload.get("chunkRows")
+            if not isinstance(chunk_rows, int) or chunk_rows <= 0:
+                chunk_rows = 50000
+            source = self._bridge_arrow_batches(
+                payload,
+                connection_id=connection_id,
+                query_id=query_id,
+                chunk_rows=chunk_rows,
+            )
+            if isinstance(source, JSONResponse):
+                return source
+            progress = materialize_arrow_batches(
+                source, table_name=table_name, query_id=query_id
+            )
+
+            async def _stream():
+                rows = 0
+                created = False
+                try:
+                    async with aclosing(progress) as updates:
+                        async for update in updates:
+                            rows = update["rows"]
+                            created = True
+                            yield _encode_stream_frame(
+                                "progress", query_id=query_id, **update
+                            )
+                            if await request.is_disconnected():
+                                return
+                    # created is False when the source returned no batches; the
+                    # target table was then not replaced.
+                    yield _encode_stream_frame(
+                        "end",
+                        query_id=query_id,
+                        rows=rows,
+                        tableName=table_name,
+                        created=created,
+                    )
+                except Exception as exc:
+                    yield _encode_stream_frame(
+                        "error", query_id=query_id, error=str(exc)
+                    )
+
+            return StreamingResponse(_stream(), media_type="application/octet-stream")
+
         @app.post("/api/db/cancel-query")
         async def cancel_query(payload: Dict[str, Any], request: Request):
             unauthorized = self._require_api_auth(request)
@@ -1354,12 +1692,17 @@ class SqlroomsHttpServer:
             if not isinstance(query_id, str) or not query_id.strip():
                 return {"cancelled": False, "error": "queryId is required"}
             if not isinstance(connection_id, str) or not connection_id.strip():
-                return {"cancelled": False}
+                # The browser bridge only sends queryId; look it up everywhere.
+                connection_id = None
             try:
-                cancelled = self.db_bridge_registry.cancel_query(
+                # Not on the bridge pool: cancels must not queue behind queries.
+                cancelled = await asyncio.to_thread(
+                    self.db_bridge_registry.cancel_query,
                     connection_id=connection_id,
                     query_id=query_id,
                 )
+                # Materializations also run DuckDB writes under the same queryId.
+                cancelled = db_async.cancel_query(query_id) or cancelled
                 return {"cancelled": bool(cancelled)}
             except UnknownBridgeConnectionError:
                 return {"cancelled": False}
@@ -1464,11 +1807,16 @@ class SqlroomsHttpServer:
         signal.signal = _noop_signal  # type: ignore
         try:
             db_async.init_global_connection(self.duckdb_database, extensions=["httpfs"])
+            if self.attach_postgres and db_async.GLOBAL_CON is not None:
+                self.attached_catalogs = attach_postgres_connectors(
+                    db_async.GLOBAL_CON,
+                    self.connector_settings,
+                    extension_dir=self.extension_dir,
+                )
             self._duckdb_start_error = None
             self._duckdb_ready.set()
-            cache = QueryCache()
             duckdb_ws_server(
-                cache,
+                self.query_cache,
                 self.ws_port,
                 auth_token=None,
                 sync_enabled=self.sync_enabled,
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Any, AsyncIterator
+
+from sqlrooms.server import db_async
+from sqlrooms.server.db_async import _quote_sql_string
+from sqlrooms.server.server import _normalize_target_relation
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_FORMATS = ("csv", "parquet", "json")
+# How often ingest progress is sampled from DuckDB while the load runs.
+PROGRESS_INTERVAL_S = 0.5
+
+_READERS = {"csv": "read_csv", "parquet": "read_parquet", "json": "read_json"}
+_EXTENSION_FORMATS = {
+    ".csv": "csv",
+    ".tsv": "csv",
+    ".txt": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".json": "json",
+    ".jsonl": "json",
+    ".ndjson": "json",
+}
+
+
+def detect_upload_format(filename: str, head: bytes) -> str:
+    """Guess csv/parquet/json from the file name, falling back to its first bytes."""
+    suffixes = [s.lower() for s in Path(filename).suffixes]
+    if suffixes and suffixes[-1] in (".gz", ".zst"):
+        suffixes.pop()
+    if suffixes and suffixes[-1] in _EXTENSION_FORMATS:
+        return _EXTENSION_FORMATS[suffixes[-1]]
+    if head.startswith(b"PAR1"):
+        return "parquet"
+    if head.lstrip()[:1] in (b"{", b"["):
+        return "json"
+    return "csv"
+
+
+async def write_request_stream(
+    chunks: AsyncIterator[bytes], target: Path
+) -> tuple[int, bytes]:
+    """Write a raw request body to `target` as it arrives.
+
+    The body goes to a temporary `<target>.<random>.part`, private to this
+    request, and is renamed once complete, so a dropped upload never leaves a
+    truncated file under the final name and concurrent uploads to the same name
+    do not write into one file. Returns the size and the first bytes (for format
+    sniffing).
+    """
+    part = target.with_name(f"{target.name}.{os.urandom(8).hex()}.part")
+    bytes_written = 0
+    head = b""
+    try:
+        with open(part, "wb") as f:
+            async for chunk in chunks:
+                if len(head) < 8:
+                    head += chunk[: 8 - len(head)]
+                bytes_written += len(chunk)
+                f.write(chunk)
+        os.replace(part, target)
+    except BaseException:
+        try:
+            os.remove(part)
+        except OSError:
+            pass
+        raise
+    return bytes_written, head
+
+
+async def ingest_file(
+    path: Path,
+    *,
+    table_name: str,
+    file_format: str,
+    query_id: str,
+) -> AsyncIterator[dict[str, Any]]:
+    """Load an uploaded file into DuckDB table `table_name` on `GLOBAL_CON`.
+
+    Yields `{"phase": "ingest", "percent": ...}` while DuckDB reports progress,
+    then `{"phase": "done", "rows": ..., "columns": [{"name", "type"}]}`. The
+    table is replaced atomically (`CREATE OR REPLACE TABLE ... AS`). Raises
+    ValueError for an invalid `table_name` or unknown `file_format`.
+    """
+    target_rel = _normalize_target_relation(table_name)
+    reader = _READERS.get(file_format)
+    if reader is None:
+        raise ValueError(
+            f"Unsupported upload format {file_format!r}; "
+            f"expected one of: {', '.join(UPLOAD_FORMATS)}"
+        )
+    cursor_ref: list[Any] = []
+
+    def _load(cur) -> dict[str, Any]:
+        cur.execute("SET enable_progress_bar = true")
+        cur.execute("SET enable_progress_bar_print = false")
+        cursor_ref.append(cur)
+        cur.execute(
+            f"CREATE OR REPLACE TABLE {target_rel} AS "
+            f"SELECT * FROM {reader}({_quote_sql_string(str(path))})"
+        )
+        cursor_ref.clear()
+        rows = cur.execute(f"SELECT count(*) FROM {target_rel}").fetchone()[0]
+        columns = [
+            {"name": name, "type": column_type}
+            for name, column_type, *_ in cur.execute(
+                f"DESCRIBE {target_rel}"
+            ).fetchall()
+        ]
+        return {"rows": rows, "columns": columns}
+
+    load = asyncio.ensure_future(db_async.run_db_task(_load, query_id=query_id))
+    try:
+        last_percent = -1.0
+        while True:
+            done, _ = await asyncio.wait({load}, timeout=PROGRESS_INTERVAL_S)
+            if done:
+                break
+            cur = cursor_ref[0] if cursor_ref else None
+            try:
+                percent = float(cur.query_progress()) if cur is not None else -1.0
+            except Exception:
+                percent = -1.0
+            if percent > last_percent:
+                last_percent = percent
+                yield {"phase": "ingest", "percent": round(percent, 1)}
+        result = load.result()
+    finally:
+        if not load.done():
+            load.cancel()
+            await asyncio.gather(load, return_exceptions=True)
+    yield {"phase": "done", **result}
@@ -1,6 +1,7 @@
 from pathlib import Path
 
 import click
+import pytest
 from typer.testing import CliRunner
 from sqlrooms.cli import (
     DEFAULT_CONFIG_PATH,
@@ -8,13 +9,19 @@ from sqlrooms.cli import (
     _load_capability_profile,
     _load_ai_runtime_config,
     _load_connector_config,
+    _load_result_cache_config,
     _normalize_config_string,
     _resolve_config_path,
     _resolve_capability_profile,
     _resolve_http_port,
     app,
 )
-from sqlrooms.web.db_bridge import PostgresConnectorSettings, SnowflakeConnectorSettings
+from sqlrooms.web.db_bridge import (
+    BridgePoolSettings,
+    BridgeResultCacheSettings,
+    PostgresConnectorSettings,
+    SnowflakeConnectorSettings,
+)
 
 runner = CliRunner()
 
@@ -445,6 +452,74 @@ user = "admin"
     assert data[0].port == "6543"
 
 
+def test_load_connector_config_pool_settings(tmp_path):
+    config_path = tmp_path / "config.toml"
+    config_path.write_text(
+        """
+[[db.connectors]]
+id = "sf"
+engine = "snowflake"
+account = "acc"
+user = "u"
+
+[db.connectors.pool]
+max_size = 2
+idle_timeout_s = 60
+
+[[db.connectors]]
+id = "pg"
+engine = "postgres"
+""".strip(),
+        encoding="utf-8",
+    )
+    data = _load_connector_config(config_path)
+    assert data[0].pool == BridgePoolSettings(max_size=2, idle_timeout_s=60.0)
+    assert data[1].pool == BridgePoolSettings()
+
+
+def test_load_connector_config_rejects_unknown_pool_setting(tmp_path):
+    config_path = tmp_path / "config.toml"
+    config_path.write_text(
+        """
+[[db.connectors]]
+id = "pg"
+engine = "postgres"
+pool = { max_conns = 2 }
+""".strip(),
+        encoding="utf-8",
+    )
+    with pytest.raises(RuntimeError, match="unknown pool setting"):
+        _load_connector_config(config_path)
+
+
+def test_load_result_cache_config(tmp_path):
+    config_path = tmp_path / "config.toml"
+    config_path.write_text("[db]\n", encoding="utf-8")
+    assert _load_result_cache_config(config_path) is None
+
+    config_path.write_text(
+        """
+[db.result_cache]
+directory = "~/sqlrooms-cache"
+ttl_s = 120
+max_bytes = 1048576
+""".strip(),
+        encoding="utf-8",
+    )
+    assert _load_result_cache_config(config_path) == BridgeResultCacheSettings(
+        directory=str(Path("~/sqlrooms-cache").expanduser()),
+        ttl_s=120.0,
+        max_bytes=1048576,
+    )
+
+    config_path.write_text("[db.result_cache]\nenabled = false\n", encoding="utf-8")
+    assert _load_result_cache_config(config_path) is None
+
+    config_path.write_text("[db.result_cache]\nttl = 5\n", encoding="utf-8")
+    with pytest.raises(RuntimeError, match="Unknown db.result_cache setting"):
+        _load_result_cache_config(config_path)
+
+
 # Since the main function in cli.py starts an asyncio loop and a server,
 # unit testing it without mocks is hard. We'll skip deep integration tests
 # of the full server startup here.
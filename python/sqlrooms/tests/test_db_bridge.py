@@ -1,12 +1,30 @@
+import asyncio
+import datetime
+import math
+import os
+import threading
+import uuid
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pyarrow as pa
 import pytest
 
+from sqlrooms.web.db_bridge.partition import range_predicates, split_bounds
+from sqlrooms.web.db_bridge.utils import rows_to_arrow_table
 from sqlrooms.web.db_bridge import (
+    BridgeConnectionPool,
+    BridgePoolExhaustedError,
+    BridgePoolSettings,
+    BridgeResultCache,
+    BridgeResultCacheSettings,
     DbBridgeRegistry,
     PostgresBridgeConnector,
     SnowflakeBridgeConnector,
     PostgresConnectorSettings,
     SnowflakeConnectorSettings,
     UnknownBridgeConnectionError,
+    attach_postgres_connectors,
     build_cli_db_bridge_registry,
     build_ephemeral_connector,
 )
@@ -23,10 +41,10 @@ class _FakeConnector:
     def list_catalog(self):
         return {"databases": [{"database": "db"}], "schemas": [], "tables": []}
 
-    def execute_query(self, sql: str, query_type: str):
+    def execute_query(self, sql: str, query_type: str, query_id=None):
         return {"jsonData": [{"sql": sql, "queryType": query_type}]}
 
-    def fetch_arrow_bytes(self, sql: str) -> bytes:
+    def fetch_arrow_bytes(self, sql: str, query_id=None) -> bytes:
         return f"arrow:{sql}".encode("utf-8")
 
     def stream_arrow_batches(self, sql: str, chunk_rows: int = 5000, query_id=None):
@@ -190,3 +208,994 @@ def test_build_ephemeral_connector_snowflake():
 def test_build_ephemeral_connector_unsupported():
     with pytest.raises(ValueError, match="Unsupported engine"):
         build_ephemeral_connector("mysql", {})
+
+
+class _PoolConn:
+    def __init__(self):
+        self.closed = False
+        self.commits = 0
+        self.rollbacks = 0
+        self.fail_ping = False
+
+    def cursor(self):
+        conn = self
+
+        class _Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, exc_type, exc, tb):
+                return False
+
+            def execute(self, sql):
+                if conn.fail_ping:
+                    raise RuntimeError("server closed the connection")
+
+            def fetchone(self):
+                return (1,)
+
+            def close(self):
+                pass
+
+        return _Cursor()
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+def _counting_factory():
+    created = []
+
+    def _connect():
+        conn = _PoolConn()
+        created.append(conn)
+        return conn
+
+    return created, _connect
+
+
+def test_pool_reuses_connections_and_commits_or_rolls_back():
+    created, connect = _counting_factory()
+    pool = BridgeConnectionPool(connect, BridgePoolSettings(max_size=2))
+
+    with pool.connection() as first:
+        pass
+    with pytest.raises(ValueError):
+        with pool.connection() as second:
+            raise ValueError("boom")
+
+    assert first is second
+    assert len(created) == 1
+    assert (first.commits, first.rollbacks) == (1, 1)
+    assert pool.stats() == {"idle": 1, "inUse": 0}
+    pool.close()
+    assert first.closed
+
+
+def test_pool_replaces_unhealthy_and_expired_connections(monkeypatch):
+    created, connect = _counting_factory()
+    pool = BridgeConnectionPool(
+        connect,
+        BridgePoolSettings(max_size=1, health_check_after_s=0, max_lifetime_s=60),
+    )
+    with pool.connection() as conn:
+        pass
+    conn.fail_ping = True
+    with pool.connection() as replacement:
+        pass
+    assert conn.closed and replacement is not conn
+
+    clock = [0.0]
+    monkeypatch.setattr("sqlrooms.web.db_bridge.pool.time.monotonic", lambda: clock[0])
+    pool = BridgeConnectionPool(connect, BridgePoolSettings(max_lifetime_s=60))
+    with pool.connection() as old:
+        pass
+    clock[0] = 61.0
+    with pool.connection() as fresh:
+        pass
+    assert old.closed and fresh is not old
+
+
+def test_pool_is_bounded_and_closes_overflow_connections():
+    created, connect = _counting_factory()
+    pool = BridgeConnectionPool(
+        connect,
+        BridgePoolSettings(max_size=1, max_overflow=1, acquire_timeout_s=0),
+    )
+    with pool.connection() as first:
+        with pool.connection() as overflow:
+            with pytest.raises(BridgePoolExhaustedError):
+                with pool.connection():
+                    pass
+    assert overflow.closed and not first.closed
+    assert pool.stats() == {"idle": 1, "inUse": 0}
+
+
+def test_registry_pools_registered_sql_connectors(monkeypatch):
+    created, connect = _counting_factory()
+    monkeypatch.setattr(PostgresBridgeConnector, "_connect", lambda self: connect())
+    registry = build_cli_db_bridge_registry(
+        bridge_id="bridge-id",
+        connector_settings=[
+            PostgresConnectorSettings(connection_id="pooled"),
+            PostgresConnectorSettings(
+                connection_id="unpooled", pool=BridgePoolSettings(max_size=0)
+            ),
+        ],
+    )
+    for _ in range(3):
+        assert registry.test_connection("pooled") is True
+    assert len(created) == 1
+
+    registry.close()
+    assert created[0].closed
+
+
+def _pg_column(name, oid, precision=None, scale=None):
+    return SimpleNamespace(name=name, type_code=oid, precision=precision, scale=scale)
+
+
+class _PgResultCursor:
+    def __init__(self, description, rows):
+        self.description = description
+        self._rows = list(rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def execute(self, sql):
+        _ = sql
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchmany(self, size):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+
+def _postgres_connector_returning(monkeypatch, description, rows):
+    class _Conn:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
+        def cursor(self):
+            return _PgResultCursor(description, rows)
+
+    monkeypatch.setattr(PostgresBridgeConnector, "_connect", lambda self: _Conn())
+    return PostgresBridgeConnector(settings=PostgresConnectorSettings())
+
+
+def test_postgres_fetch_arrow_uses_column_oids(monkeypatch):
+    description = [
+        _pg_column("id", 20),
+        _pg_column("price", 1700, precision=10, scale=2),
+        _pg_column("created", 1184),
+        _pg_column("key", 2950),
+        _pg_column("meta", 3802),
+    ]
+    key = uuid.uuid4()
+    created = datetime.datetime(2024, 1, 2, tzinfo=datetime.timezone.utc)
+    connector = _postgres_connector_returning(
+        monkeypatch,
+        description,
+        [(1, Decimal("9.99"), created, key, {"a": 1}), (2, None, None, None, None)],
+    )
+
+    table = pa.ipc.open_stream(connector.fetch_arrow_bytes("SELECT")).read_all()
+    assert table.schema == pa.schema(
+        [
+            ("id", pa.int64()),
+            ("price", pa.float64()),
+            ("created", pa.timestamp("us", tz="UTC")),
+            ("key", pa.string()),
+            ("meta", pa.string()),
+        ]
+    )
+    assert table.column("key").to_pylist() == [str(key), None]
+    assert table.column("meta").to_pylist() == ['{"a": 1}', None]
+
+
+def test_postgres_numeric_schema_is_the_same_in_every_batch(monkeypatch):
+    description = [
+        _pg_column("price", 1700, precision=10, scale=2),
+        _pg_column("total", 1700, precision=30, scale=4),
+        _pg_column("ratio", 1700),
+    ]
+    rows = [(Decimal("1.25"), Decimal("10.0000"), Decimal("0.5"))] * 3
+    # 'NaN' only shows up in the second batch
+    rows.append((Decimal("NaN"), Decimal("NaN"), Decimal("Infinity")))
+    connector = _postgres_connector_returning(monkeypatch, description, rows)
+
+    batches = list(connector.stream_arrow_batches("SELECT", chunk_rows=2))
+    tables = [pa.ipc.open_stream(batch).read_all() for batch in batches]
+
+    assert len(tables) == 2
+    expected = pa.schema(
+        [("price", pa.float64()), ("total", pa.string()), ("ratio", pa.string())]
+    )
+    assert all(table.schema == expected for table in tables)
+    price = pa.concat_tables(tables).column("price").to_pylist()
+    assert price[:3] == [1.25] * 3 and math.isnan(price[3])
+    assert tables[1].column("total").to_pylist() == ["10.0000", "NaN"]
+    assert tables[1].column("ratio").to_pylist() == ["0.5", "Infinity"]
+
+
+def test_rows_to_arrow_table_rejects_values_that_do_not_fit_the_pinned_type():
+    with pytest.raises(ValueError, match="'xs'"):
+        rows_to_arrow_table([([[1, 2]],)], ["xs"], types=[pa.list_(pa.int32())])
+
+
+def test_postgres_empty_result_keeps_schema(monkeypatch):
+    description = [_pg_column("id", 23), _pg_column("name", 1043)]
+    connector = _postgres_connector_returning(monkeypatch, description, [])
+
+    expected = pa.schema([("id", pa.int32()), ("name", pa.string())])
+    table = pa.ipc.open_stream(connector.fetch_arrow_bytes("SELECT")).read_all()
+    assert table.num_rows == 0 and table.schema == expected
+    batches = list(connector.stream_arrow_batches("SELECT"))
+    assert len(batches) == 1
+    assert pa.ipc.open_stream(batches[0]).read_all().schema == expected
+
+
+def test_snowflake_passes_arrow_chunks_through(monkeypatch):
+    chunks = [pa.table({"x": list(range(5))}), pa.table({"x": [5, 6]})]
+
+    class _Cursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
+        def execute(self, sql):
+            _ = sql
+
+        def fetch_arrow_all(self, force_return_table=False):
+            assert force_return_table
+            return pa.concat_tables(chunks)
+
+        def fetch_arrow_batches(self):
+            return iter(chunks)
+
+        def fetchall(self):
+            raise AssertionError("rows should not be materialized")
+
+        fetchmany = fetchall
+
+    class _Conn:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
+        def cursor(self):
+            return _Cursor()
+
+    monkeypatch.setattr(SnowflakeBridgeConnector, "_connect", lambda self: _Conn())
+    connector = SnowflakeBridgeConnector(
+        settings=SnowflakeConnectorSettings(account="a", user="u")
+    )
+
+    table = pa.ipc.open_stream(connector.fetch_arrow_bytes("SELECT")).read_all()
+    assert table.column("x").to_pylist() == list(range(7))
+    batches = [
+        pa.ipc.open_stream(payload).read_all().column("x").to_pylist()
+        for payload in connector.stream_arrow_batches("SELECT", chunk_rows=3)
+    ]
+    assert batches == [[0, 1, 2], [3, 4], [5, 6]]
+
+
+class _BlockingPgConn:
+    """Postgres connection whose query runs until `cancel_safe` is called."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self._cancelled = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def cancel_safe(self):
+        self._cancelled.set()
+
+    def cursor(self):
+        conn = self
+
+        class _Cursor:
+            description = [_pg_column("x", 23)]
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, exc_type, exc, tb):
+                return False
+
+            def execute(self, sql):
+                conn.started.set()
+                assert conn._cancelled.wait(5)
+                raise RuntimeError("canceling statement due to user request")
+
+        return _Cursor()
+
+
+def test_registry_cancels_running_query_by_query_id(monkeypatch):
+    conn = _BlockingPgConn()
+    monkeypatch.setattr(PostgresBridgeConnector, "_connect", lambda self: conn)
+    registry = build_cli_db_bridge_registry(
+        bridge_id="bridge-id",
+        connector_settings=[PostgresConnectorSettings(connection_id="pg")],
+    )
+
+    async def _run():
+        task = asyncio.ensure_future(
+            registry.run(registry.fetch_arrow_bytes, "pg", "SELECT", query_id="q1")
+        )
+        await asyncio.to_thread(conn.started.wait, 5)
+        assert registry.cancel_query(None, "missing") is False
+        assert registry.cancel_query(None, "q1") is True
+        with pytest.raises(RuntimeError, match="canceling statement"):
+            await task
+
+    try:
+        asyncio.run(_run())
+        assert registry.cancel_query("pg", "q1") is False
+    finally:
+        registry.close()
+
+
+def test_registry_async_stream_runs_off_loop_and_cancels_on_close():
+    class _StreamingConnector(_FakeConnector):
+        def __init__(self):
+            self.threads = set()
+            self.cancelled = []
+            self.release = threading.Event()
+
+        def stream_arrow_batches(self, sql, chunk_rows=5000, query_id=None):
+            self.threads.add(threading.get_ident())
+            yield b"first"
+            self.threads.add(threading.get_ident())
+            self.release.wait(5)
+            yield b"second"
+
+        def cancel_query(self, query_id):
+            self.cancelled.append(query_id)
+            self.release.set()
+            return True
+
+    connector = _StreamingConnector()
+    registry = DbBridgeRegistry(bridge_id="bridge-id")
+    registry.register(connector)
+
+    async def _run():
+        batches = registry.astream_arrow_batches("fake-conn", "SELECT", query_id="q")
+        assert await batches.__anext__() == b"first"
+        pending = asyncio.ensure_future(batches.__anext__())
+        await asyncio.sleep(0.05)
+        pending.cancel()
+        await asyncio.gather(pending, return_exceptions=True)
+        await batches.aclose()
+
+    try:
+        asyncio.run(_run())
+    finally:
+        registry.close()
+    assert threading.get_ident() not in connector.threads
+    assert connector.cancelled == ["q"]
+
+
+def test_split_bounds_and_range_predicates_cover_all_rows():
+    assert split_bounds(1, 100, 4) == [26, 51, 76]
+    assert split_bounds(1, 2, 4) == [2]
+    assert split_bounds(None, None, 4) == []
+    assert split_bounds(datetime.date(2024, 1, 1), datetime.date(2024, 1, 5), 2) == [
+        datetime.date(2024, 1, 3)
+    ]
+    assert range_predicates('"id"', [10, 20]) == [
+        '("id" < 10 OR "id" IS NULL)',
+        '("id" >= 10 AND "id" < 20)',
+        '"id" >= 20',
+    ]
+    assert range_predicates('"ts"', [datetime.datetime(2024, 1, 1, 12)]) == [
+        '("ts" < \'2024-01-01 12:00:00\' OR "ts" IS NULL)',
+        "\"ts\" >= '2024-01-01 12:00:00'",
+    ]
+
+
+def _postgres_connector_with_results(monkeypatch, results):
+    executed = []
+
+    class _Cursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
+        def execute(self, sql, params=None):
+            executed.append((sql, params))
+
+        def fetchone(self):
+            return results.pop(0)
+
+    class _Conn:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
+        def cursor(self):
+            return _Cursor()
+
+        def rollback(self):
+            executed.append(("ROLLBACK", None))
+
+    monkeypatch.setattr(PostgresBridgeConnector, "_connect", lambda self: _Conn())
+    return PostgresBridgeConnector(settings=PostgresConnectorSettings()), executed
+
+
+def test_postgres_partition_queries_by_column_and_ctid(monkeypatch):
+    connector, executed = _postgres_connector_with_results(
+        monkeypatch, [(0, 99), (140005, 10)]
+    )
+
+    by_column = connector.partition_queries("public.events", column="id", partitions=2)
+    assert executed[0][0] == 'SELECT MIN("id"), MAX("id") FROM "public"."events"'
+    assert by_column == [
+        'SELECT * FROM "public"."events" WHERE ("id" < 50 OR "id" IS NULL)',
+        'SELECT * FROM "public"."events" WHERE "id" >= 50',
+    ]
+
+    by_ctid = connector.partition_queries("public.events", partitions=2)
+    assert executed[1][1] == ('"public"."events"',)
+    assert by_ctid == [
+        'SELECT * FROM "public"."events" WHERE ctid < \'(5,0)\'::tid',
+        'SELECT * FROM "public"."events" WHERE ctid >= \'(5,0)\'::tid',
+    ]
+
+
+def test_postgres_ctid_partitions_need_tid_range_scans(monkeypatch):
+    connector, _ = _postgres_connector_with_results(monkeypatch, [(130012, 1000)])
+
+    # Before Postgres 14 every ctid range would be a full sequential scan.
+    assert connector.partition_queries("events", partitions=4) == [
+        'SELECT * FROM "events"'
+    ]
+
+
+def test_postgres_partitions_share_an_exported_snapshot(monkeypatch):
+    connector, executed = _postgres_connector_with_results(
+        monkeypatch, [("00000003-0000001B-1",)]
+    )
+
+    snapshot = connector.open_snapshot()
+    assert snapshot.snapshot_id == "00000003-0000001B-1"
+    assert [sql for sql, _ in executed] == [
+        "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ",
+        "SELECT pg_export_snapshot()",
+    ]
+    executed.clear()
+
+    conn = PostgresBridgeConnector._connect(connector)
+    with conn.cursor() as cur:
+        connector._import_snapshot(conn, cur, snapshot.snapshot_id)
+    assert [sql for sql, _ in executed] == [
+        "ROLLBACK",
+        "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ",
+        "SET TRANSACTION SNAPSHOT '00000003-0000001B-1'",
+    ]
+    snapshot.close()
+
+
+def test_snowflake_partition_names_resolve_like_unquoted_names(monkeypatch):
+    class _Cursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
+        def execute(self, sql, params=None):
+            self.sql = sql
+
+        def fetchone(self):
+            return (0, 99)
+
+    class _Conn:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
+        def cursor(self):
+            return _Cursor()
+
+    monkeypatch.setattr(SnowflakeBridgeConnector, "_connect", lambda self: _Conn())
+    connector = SnowflakeBridgeConnector(
+        settings=SnowflakeConnectorSettings(account="a", user="u")
+    )
+
+    queries = connector.partition_queries(
+        'analytics.public."MixedCase"', column="order", partitions=2
+    )
+    assert queries[-1] == (
+        'SELECT * FROM "ANALYTICS"."PUBLIC"."MixedCase" WHERE "ORDER" >= 50'
+    )
+
+
+def test_registry_merges_partition_streams_and_cancels_as_group():
+    class _PartitionedConnector(_FakeConnector):
+        def __init__(self):
+            self.query_ids = []
+
+        def partition_queries(self, table, *, column=None, partitions=4):
+            return [f"{table}:{i}" for i in range(partitions)]
+
+        def stream_arrow_batches(self, sql, chunk_rows=5000, query_id=None):
+            self.query_ids.append(query_id)
+            yield f"{sql}/a".encode()
+            yield f"{sql}/b".encode()
+
+    connector = _PartitionedConnector()
+    registry = DbBridgeRegistry(bridge_id="bridge-id")
+    registry.register(connector)
+
+    async def _run():
+        batches = registry.astream_partitioned_arrow_batches(
+            "fake-conn", "t", partitions=3, query_id="q"
+        )
+        return [batch async for batch in batches]
+
+    try:
+        received = asyncio.run(_run())
+    finally:
+        registry.close()
+    assert sorted(received) == sorted(
+        f"t:{i}/{part}".encode() for i in range(3) for part in "ab"
+    )
+    assert sorted(connector.query_ids) == ["q:0", "q:1", "q:2"]
+    assert registry._query_groups == {}
+
+
+def test_registry_partitions_read_one_snapshot_closed_at_the_end():
+    events = []
+
+    class _Snapshot:
+        snapshot_id = "snap-1"
+
+        def close(self):
+            events.append("close")
+
+    class _SnapshotConnector(_FakeConnector):
+        def partition_queries(self, table, *, column=None, partitions=4):
+            return [f"{table}:{i}" for i in range(partitions)]
+
+        def open_snapshot(self):
+            events.append("open")
+            return _Snapshot()
+
+        def stream_arrow_batches(
+            self, sql, chunk_rows=5000, query_id=None, *, snapshot_id=None
+        ):
+            events.append(snapshot_id)
+            yield sql.encode()
+
+    registry = DbBridgeRegistry(bridge_id="bridge-id")
+    registry.register(_SnapshotConnector())
+
+    async def _run():
+        batches = registry.astream_partitioned_arrow_batches(
+            "fake-conn", "t", partitions=3
+        )
+        return [batch async for batch in batches]
+
+    try:
+        assert len(asyncio.run(_run())) == 3
+    finally:
+        registry.close()
+    assert events == ["open", "snap-1", "snap-1", "snap-1", "close"]
+
+
+def test_registry_caps_partitions_at_pool_capacity_and_workers():
+    class _PooledPartitionConnector(_FakeConnector):
+        def __init__(self, pooled):
+            self.pooled = pooled
+            self.requested = []
+            self.pool = None
+
+        def enable_pool(self):
+            if self.pooled:
+                self.pool = BridgeConnectionPool(
+                    object,
+                    BridgePoolSettings(max_size=1, max_overflow=1, acquire_timeout_s=1),
+                )
+            return self.pool
+
+        def partition_queries(self, table, *, column=None, partitions=4):
+            self.requested.append(partitions)
+            return [f"{table}:{i}" for i in range(partitions)]
+
+        def stream_arrow_batches(self, sql, chunk_rows=5000, query_id=None):
+            if self.pool is None:
+                yield sql.encode()
+                return
+            # Holds its connection between batches, like a server-side cursor
+            with self.pool.connection():
+                yield f"{sql}/a".encode()
+                yield f"{sql}/b".encode()
+
+    async def _run(registry):
+        batches = registry.astream_partitioned_arrow_batches(
+            "fake-conn", "t", partitions=20
+        )
+        return [batch async for batch in batches]
+
+    # 20 partitions on two workers and two connections would leave both
+    # workers waiting in acquire while the connection holders need one
+    connector = _PooledPartitionConnector(pooled=True)
+    registry = DbBridgeRegistry(bridge_id="bridge-id", max_workers=2)
+    registry.register(connector)
+    try:
+        assert len(asyncio.run(_run(registry))) == 4
+    finally:
+        registry.close()
+    assert connector.requested == [2]
+
+    connector = _PooledPartitionConnector(pooled=False)
+    registry = DbBridgeRegistry(bridge_id="bridge-id", max_workers=3)
+    registry.register(connector)
+    try:
+        assert len(asyncio.run(_run(registry))) == 3
+    finally:
+        registry.close()
+    assert connector.requested == [3]
+
+
+def test_registry_caches_catalog_and_refreshes_in_background(monkeypatch):
+    class _CatalogConnector(_FakeConnector):
+        def __init__(self):
+            self.calls = 0
+            self.column_calls = []
+
+        def list_catalog(self):
+            self.calls += 1
+            return {"databases": [{"database": f"v{self.calls}"}]}
+
+        def list_columns(self, *, schema, table, database=None):
+            self.column_calls.append((database, schema, table))
+            return [{"schema": schema, "table": table, "column": "id"}]
+
+    clock = [0.0]
+    monkeypatch.setattr(
+        "sqlrooms.web.db_bridge.registry.time.monotonic", lambda: clock[0]
+    )
+    connector = _CatalogConnector()
+    registry = DbBridgeRegistry(bridge_id="bridge-id", catalog_ttl_s=10)
+    registry.register(connector)
+
+    async def _run():
+        first, second = await asyncio.gather(
+            registry.alist_catalog("fake-conn"), registry.alist_catalog("fake-conn")
+        )
+        assert first == second == {"databases": [{"database": "v1"}]}
+        assert connector.calls == 1
+
+        clock[0] = 11.0
+        # Expired: the stale value is served while a refresh runs.
+        assert (await registry.alist_catalog("fake-conn"))["databases"] == [
+            {"database": "v1"}
+        ]
+        await asyncio.gather(*registry._metadata_loads.values())
+        assert (await registry.alist_catalog("fake-conn"))["databases"] == [
+            {"database": "v2"}
+        ]
+
+        registry.invalidate_catalog("fake-conn")
+        assert (await registry.alist_catalog("fake-conn"))["databases"] == [
+            {"database": "v3"}
+        ]
+
+        for _ in range(2):
+            columns = await registry.alist_columns(
+                "fake-conn", schema="public", table="t"
+            )
+        assert columns == [{"schema": "public", "table": "t", "column": "id"}]
+        assert connector.column_calls == [(None, "public", "t")]
+
+    try:
+        asyncio.run(_run())
+    finally:
+        registry.close()
+
+
+def _arrow_stream(table):
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+class _ArrowCountingConnector(_FakeConnector):
+    def __init__(self, rows=10):
+        self.calls = []
+        self.table = pa.table({"x": list(range(rows))})
+
+    def fetch_arrow_bytes(self, sql: str, query_id=None) -> bytes:
+        self.calls.append(("fetch", sql))
+        return _arrow_stream(self.table)
+
+    def stream_arrow_batches(self, sql: str, chunk_rows: int = 5000, query_id=None):
+        self.calls.append(("stream", sql))
+        for batch in self.table.to_batches(max_chunksize=chunk_rows):
+            yield _arrow_stream(pa.Table.from_batches([batch]))
+
+
+def _read_streams(chunks):
+    tables = [pa.ipc.open_stream(chunk).read_all() for chunk in chunks]
+    return pa.concat_tables(tables).column("x").to_pylist()
+
+
+def test_registry_result_cache_serves_repeated_queries(tmp_path, monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(
+        "sqlrooms.web.db_bridge.result_cache.time.monotonic", lambda: clock[0]
+    )
+    cache = BridgeResultCache(
+        BridgeResultCacheSettings(directory=str(tmp_path), ttl_s=60)
+    )
+    connector = _ArrowCountingConnector()
+    registry = DbBridgeRegistry(bridge_id="bridge-id", result_cache=cache)
+    registry.register(connector)
+
+    async def _stream(sql, **kwargs):
+        return [
+            chunk
+            async for chunk in registry.astream_arrow_batches(
+                "fake-conn", sql, chunk_rows=4, **kwargs
+            )
+        ]
+
+    try:
+        first = registry.fetch_arrow_bytes("fake-conn", "select x")
+        assert registry.fetch_arrow_bytes("fake-conn", " select x ") == first
+        # The streaming path reads the same entry, re-chunked.
+        chunks = asyncio.run(_stream("select x"))
+        assert len(chunks) == 3 and _read_streams(chunks) == list(range(10))
+        assert connector.calls == [("fetch", "select x")]
+
+        asyncio.run(_stream("select y"))
+        assert registry.fetch_arrow_bytes("fake-conn", "select y")
+        asyncio.run(_stream("select y", use_cache=False))
+        assert [c for c in connector.calls if c[1] == "select y"] == [
+            ("stream", "select y"),
+            ("stream", "select y"),
+        ]
+
+        clock[0] = 61.0
+        registry.fetch_arrow_bytes("fake-conn", "select x")
+        assert connector.calls[-1] == ("fetch", "select x")
+
+        registry.invalidate_results("fake-conn")
+        assert cache.stats() == {"entries": 0, "bytes": 0}
+        assert not list(tmp_path.iterdir())
+    finally:
+        registry.close()
+
+
+def test_registry_snapshot_reads_bypass_the_result_cache(tmp_path):
+    class _Snapshot:
+        snapshot_id = "snap-1"
+
+        def close(self):
+            pass
+
+    class _SnapshotCountingConnector(_ArrowCountingConnector):
+        def partition_queries(self, table, *, column=None, partitions=4):
+            return [f"select {i} from {table}" for i in range(partitions)]
+
+        def open_snapshot(self):
+            return _Snapshot()
+
+        def stream_arrow_batches(
+            self, sql, chunk_rows=5000, query_id=None, *, snapshot_id=None
+        ):
+            return super().stream_arrow_batches(sql, chunk_rows, query_id)
+
+    cache = BridgeResultCache(BridgeResultCacheSettings(directory=str(tmp_path)))
+    connector = _SnapshotCountingConnector()
+    registry = DbBridgeRegistry(bridge_id="bridge-id", result_cache=cache)
+    registry.register(connector)
+
+    async def _run():
+        batches = registry.astream_partitioned_arrow_batches(
+            "fake-conn", "t", partitions=2
+        )
+        return [batch async for batch in batches]
+
+    try:
+        # A cached plain read of a partition query is not replayed either
+        registry.fetch_arrow_bytes("fake-conn", "select 0 from t")
+        assert cache.stats()["entries"] == 1
+        for _ in range(2):
+            assert sorted(_read_streams(asyncio.run(_run()))) == sorted(
+                list(range(10)) * 2
+            )
+        assert sorted(c for c in connector.calls if c[0] == "stream") == [
+            ("stream", "select 0 from t"),
+            ("stream", "select 0 from t"),
+            ("stream", "select 1 from t"),
+            ("stream", "select 1 from t"),
+        ]
+        assert cache.stats()["entries"] == 1
+    finally:
+        registry.close()
+
+
+def test_result_cache_enforces_size_budget_and_skips_partial_streams(tmp_path):
+    payload = _arrow_stream(pa.table({"x": list(range(100))}))
+    cache = BridgeResultCache(
+        BridgeResultCacheSettings(
+            directory=str(tmp_path), max_bytes=int(len(payload) * 2.5)
+        )
+    )
+    try:
+        for sql in ("a", "b", "c"):
+            cache.put(cache.key("conn", sql), "conn", payload)
+        assert cache.get(cache.key("conn", "a")) is None
+        assert cache.get(cache.key("conn", "c")) == payload
+        assert cache.stats()["entries"] == 2
+
+        source = iter([payload, payload])
+        closed = []
+
+        def _batches():
+            try:
+                yield from source
+            finally:
+                closed.append(True)
+
+        key = cache.key("conn", "partial")
+        teed = cache.tee(key, "conn", _batches())
+        next(teed)
+        teed.close()
+        assert closed == [True]
+        assert cache.get(key) is None
+        assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+            f"{cache.key('conn', sql)}.arrow" for sql in ("b", "c")
+        )
+    finally:
+        cache.close()
+
+
+def test_result_cache_uses_private_directory_and_spares_foreign_files(tmp_path):
+    payload = _arrow_stream(pa.table({"x": [1]}))
+
+    default = BridgeResultCache()
+    try:
+        assert os.path.basename(default.directory).startswith("sqlrooms-bridge-cache-")
+        assert os.stat(default.directory).st_mode & 0o777 == 0o700
+        default.put(default.key("conn", "a"), "conn", payload)
+    finally:
+        default.close()
+    assert not os.path.exists(default.directory)
+
+    # Another process's entry in a shared, configured directory.
+    foreign = tmp_path / f"{BridgeResultCache.key('other', 'b')}.arrow"
+    foreign.write_bytes(payload)
+    shared = BridgeResultCache(BridgeResultCacheSettings(directory=str(tmp_path)))
+    try:
+        assert foreign.exists()
+        shared.put(shared.key("conn", "a"), "conn", payload)
+    finally:
+        shared.close()
+    assert [p.name for p in tmp_path.iterdir()] == [foreign.name]
+
+
+def test_load_postgres_extension_restores_the_extension_directory(tmp_path):
+    import duckdb
+
+    from sqlrooms.web.db_bridge.attach import load_postgres_extension
+
+    class _OfflineCon:
+        """Real settings, but the extension cannot be installed or loaded."""
+
+        def __init__(self):
+            self.con = duckdb.connect()
+
+        def execute(self, sql):
+            if sql.endswith(" postgres"):
+                raise duckdb.IOException("offline")
+            return self.con.execute(sql)
+
+        def directory(self):
+            return self.execute(
+                "SELECT current_setting('extension_directory')"
+            ).fetchone()[0]
+
+    con = _OfflineCon()
+    try:
+        with pytest.raises(duckdb.IOException):
+            load_postgres_extension(con, extension_dir=str(tmp_path))
+        assert con.directory() == ""
+
+        con.execute("SET extension_directory = '/opt/shared-ext'")
+        with pytest.raises(duckdb.IOException):
+            load_postgres_extension(con, extension_dir=str(tmp_path))
+        assert con.directory() == "/opt/shared-ext"
+    finally:
+        con.con.close()
+
+
+def test_attach_postgres_connectors_uses_secrets_and_skips_failures():
+    class _RecordingCon:
+        def __init__(self):
+            self.sql = []
+
+        def execute(self, sql):
+            self.sql.append(sql)
+            if sql == "LOAD postgres" and "INSTALL postgres" not in self.sql:
+                raise RuntimeError("extension not installed")
+            if 'AS "broken"' in sql:
+                raise RuntimeError("connection refused")
+            return self
+
+        def fetchone(self):
+            return ("/home/app/.duckdb/extensions",)
+
+    con = _RecordingCon()
+    attached = attach_postgres_connectors(
+        con,
+        [
+            PostgresConnectorSettings(
+                connection_id="pg",
+                host="db.internal",
+                port="6543",
+                database="app",
+                user="o'brien",
+                password="s3cret",
+            ),
+            SnowflakeConnectorSettings(account="acc", user="u"),
+            PostgresConnectorSettings(connection_id="broken", database="x", user="u"),
+        ],
+        extension_dir="/opt/duckdb-ext",
+    )
+
+    assert attached == ["pg"]
+    assert con.sql[:6] == [
+        "SELECT current_setting('extension_directory')",
+        "SET extension_directory = '/opt/duckdb-ext'",
+        "LOAD postgres",
+        "INSTALL postgres",
+        "LOAD postgres",
+        "SET extension_directory = '/home/app/.duckdb/extensions'",
+    ]
+    assert (
+        'CREATE OR REPLACE TEMPORARY SECRET "sqlrooms_pg_0" (TYPE postgres, '
+        "HOST 'db.internal', PORT 6543, DATABASE 'app', USER 'o''brien', "
+        "PASSWORD 's3cret')"
+    ) in con.sql
+    attach = [sql for sql in con.sql if sql.startswith("ATTACH")]
+    assert attach[0] == (
+        "ATTACH IF NOT EXISTS '' AS \"pg\" "
+        '(TYPE postgres, SECRET "sqlrooms_pg_0", READ_ONLY)'
+    )
+    assert all("s3cret" not in sql for sql in attach)
@@ -0,0 +1,257 @@
+import asyncio
+import json
+
+import pyarrow as pa
+
+from sqlrooms.server import db_async
+from sqlrooms.server.cache import QueryCache
+from sqlrooms.web.duckdb_proxy import DuckDbWsProxy, _frame_query_id
+
+
+def _arrow_frame(query_id: str, payload: bytes = b"ARROW") -> bytes:
+    header = json.dumps({"type": "arrow", "queryId": query_id}).encode("utf-8")
+    return len(header).to_bytes(4, byteorder="big") + header + payload
+
+
+class FakeUpstream:
+    """Echoes a reply for every query, like the socketify backend would."""
+
+    def __init__(self):
+        self.sent = []
+        self._inbox = asyncio.Queue()
+
+    async def send(self, message):
+        self.sent.append(message)
+        payload = json.loads(message)
+        if payload.get("type") == "arrow":
+            self._inbox.put_nowait(_arrow_frame(payload["queryId"]))
+        else:
+            self._inbox.put_nowait(
+                json.dumps(
+                    {"type": "json", "queryId": payload["queryId"], "data": "[]"}
+                )
+            )
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        message = await self._inbox.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+    async def close(self):
+        self._inbox.put_nowait(None)
+
+
+class FakeClient:
+    def __init__(self):
+        self.received = []
+        self._inbox = asyncio.Queue()
+
+    def send(self, payload):
+        self._inbox.put_nowait(
+            {"type": "websocket.receive", "text": json.dumps(payload)}
+        )
+
+    def send_bytes_frame(self, data):
+        self._inbox.put_nowait({"type": "websocket.receive", "bytes": data})
+
+    def disconnect(self):
+        self._inbox.put_nowait({"type": "websocket.disconnect"})
+
+    async def receive(self):
+        return await self._inbox.get()
+
+    async def send_text(self, text):
+        self.received.append(json.loads(text))
+
+    async def send_bytes(self, data):
+        self.received.append(data)
+
+
+async def _wait_for(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+def _make_proxy(pool_size):
+    proxy = DuckDbWsProxy("ws://127.0.0.1:1", pool_size=pool_size)
+    upstreams = []
+
+    async def _connect():
+        upstream = FakeUpstream()
+        upstreams.append(upstream)
+        return upstream
+
+    proxy._connect = _connect
+    return proxy, upstreams
+
+
+def test_frame_query_id():
+    assert _frame_query_id(_arrow_frame("q1")) == "q1"
+    assert _frame_query_id(b"\x00\x00") is None
+
+
+def test_proxy_multiplexes_clients_over_shared_upstream():
+    async def _run():
+        proxy, upstreams = _make_proxy(pool_size=1)
+        first, second = FakeClient(), FakeClient()
+        tasks = [
+            asyncio.create_task(proxy.serve(first)),
+            asyncio.create_task(proxy.serve(second)),
+        ]
+        first.send({"type": "arrow", "sql": "select 1", "queryId": "a"})
+        second.send({"type": "json", "sql": "select 2", "queryId": "b"})
+        await _wait_for(lambda: first.received and second.received)
+        first.disconnect()
+        second.disconnect()
+        await asyncio.gather(*tasks)
+        await proxy.close()
+        return upstreams, first.received, second.received
+
+    upstreams, first_received, second_received = asyncio.run(_run())
+    assert len(upstreams) == 1
+    assert first_received == [_arrow_frame("a")]
+    assert second_received == [{"type": "json", "queryId": "b", "data": "[]"}]
+
+
+def test_proxy_assigns_query_id_and_answers_cancel_locally():
+    async def _run():
+        proxy, upstreams = _make_proxy(pool_size=2)
+        client = FakeClient()
+        task = asyncio.create_task(proxy.serve(client))
+        client.send({"type": "json", "sql": "select 1"})
+        client.send({"type": "cancel", "queryId": "missing"})
+        await _wait_for(lambda: len(client.received) == 2)
+        client.disconnect()
+        await task
+        await proxy.close()
+        return upstreams, client.received
+
+    upstreams, received = asyncio.run(_run())
+    assert {"type": "cancelAck", "queryId": "missing", "cancelled": False} in received
+    reply = next(r for r in received if r.get("type") == "json")
+    assert reply["queryId"]
+    assert [json.loads(m)["queryId"] for m in upstreams[0].sent] == [reply["queryId"]]
+
+
+def test_proxy_without_pool_uses_dedicated_upstream_per_client():
+    async def _run():
+        proxy, upstreams = _make_proxy(pool_size=0)
+        clients = [FakeClient(), FakeClient()]
+        tasks = [asyncio.create_task(proxy.serve(c)) for c in clients]
+        for index, client in enumerate(clients):
+            client.send({"type": "json", "sql": "select 1", "queryId": str(index)})
+        await _wait_for(lambda: all(c.received for c in clients))
+        for client in clients:
+            client.disconnect()
+        await asyncio.gather(*tasks)
+        return upstreams
+
+    assert len(asyncio.run(_run())) == 2
+
+
+def test_in_process_proxy_runs_queries_and_uploads_without_upstream(tmp_path):
+    db_async.init_global_connection(str(tmp_path / "main.db"), extensions=[])
+    try:
+
+        async def _run():
+            proxy, upstreams = _make_proxy(pool_size=4)
+            proxy.in_process = True
+            proxy.cache = QueryCache()
+            client = FakeClient()
+            task = asyncio.create_task(proxy.serve(client))
+
+            table = pa.table({"x": [1, 2, 3]})
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            header = json.dumps(
+                {"type": "uploadArrow", "queryId": "up", "tableName": "t"}
+            ).encode("utf-8")
+            client.send_bytes_frame(
+                len(header).to_bytes(4, byteorder="big")
+                + header
+                + sink.getvalue().to_pybytes()
+            )
+            await _wait_for(lambda: client.received, timeout=10)
+            client.send(
+                {"type": "arrow", "sql": "select sum(x) as s from t", "queryId": "q"}
+            )
+            await _wait_for(lambda: len(client.received) == 2, timeout=10)
+            client.disconnect()
+            await task
+            return upstreams, client.received
+
+        upstreams, received = asyncio.run(_run())
+    finally:
+        db_async.force_checkpoint_and_close()
+
+    assert upstreams == []
+    assert received[0] == {"type": "uploadAck", "queryId": "up"}
+    frame = received[1]
+    assert _frame_query_id(frame) == "q"
+    header_len = int.from_bytes(frame[:4], byteorder="big")
+    result = pa.ipc.open_stream(frame[4 + header_len :]).read_all()
+    assert result.column("s").to_pylist() == [6]
+
+
+def test_disconnect_cancels_the_clients_running_queries(monkeypatch):
+    cancelled_ids = []
+    started = []
+    monkeypatch.setattr(db_async, "GLOBAL_CON", object())
+    monkeypatch.setattr(db_async, "cancel_query", cancelled_ids.append)
+
+    async def _hanging_query(send, cache, query):
+        started.append(query["queryId"])
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr("sqlrooms.web.duckdb_proxy.handle_query_ws", _hanging_query)
+
+    async def _run():
+        proxy = DuckDbWsProxy("ws://127.0.0.1:1", in_process=True)
+        client = FakeClient()
+        task = asyncio.create_task(proxy.serve(client))
+        client.send({"type": "arrow", "sql": "select 1", "queryId": "slow"})
+        client.send({"type": "json", "sql": "select 2"})
+        await _wait_for(lambda: len(started) == 2)
+        client.disconnect()
+        await asyncio.wait_for(task, timeout=2)
+
+    asyncio.run(_run())
+    assert started[0] == "slow" and started[1]
+    assert sorted(cancelled_ids) == sorted(started)
+
+
+def test_disconnect_cancels_pooled_queries_still_waiting_for_a_reply(monkeypatch):
+    cancelled_ids = []
+    monkeypatch.setattr(db_async, "cancel_query", cancelled_ids.append)
+
+    class SilentUpstream(FakeUpstream):
+        async def send(self, message):
+            self.sent.append(message)
+
+    async def _run():
+        proxy = DuckDbWsProxy("ws://127.0.0.1:1", pool_size=1)
+        upstream = SilentUpstream()
+
+        async def _connect():
+            return upstream
+
+        proxy._connect = _connect
+        client = FakeClient()
+        task = asyncio.create_task(proxy.serve(client))
+        client.send({"type": "arrow", "sql": "select 1", "queryId": "pending"})
+        await _wait_for(lambda: upstream.sent)
+        client.disconnect()
+        await task
+        routes = dict(proxy._routes)
+        await proxy.close()
+        return routes
+
+    assert asyncio.run(_run()) == {}
+    assert cancelled_ids == ["pending"]
@@ -1,3 +1,5 @@
+import asyncio
+import json
 import logging
 import socket
 
@@ -1344,3 +1346,383 @@ def test_api_auth_requires_token_for_non_loopback(server):
         }
     )
     assert server._is_authorized_request(request) is False
+
+
+class _ArrowStreamConnector:
+    connection_id = "stream-conn"
+    engine_id = "fake"
+    title = "Streaming Connector"
+
+    def __init__(self, batches, fail_after=None):
+        self._batches = batches
+        self._fail_after = fail_after
+
+    def stream_arrow_batches(self, sql, chunk_rows=5000, query_id=None):
+        import pyarrow as pa
+
+        for index, values in enumerate(self._batches):
+            if index == self._fail_after:
+                raise RuntimeError("remote connection lost")
+            table = pa.table({"x": values})
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            yield sink.getvalue().to_pybytes()
+
+    def cancel_query(self, query_id):
+        return False
+
+    def config_dict(self):
+        return {}
+
+
+def _read_stream_frames(body: bytes) -> list[dict]:
+    frames = []
+    offset = 0
+    while offset < len(body):
+        header_len = int.from_bytes(body[offset : offset + 4], byteorder="big")
+        header = json.loads(body[offset + 4 : offset + 4 + header_len])
+        offset += 4 + header_len + header["payloadLength"]
+        frames.append(header)
+    return frames
+
+
+@pytest.fixture
+def materialize_server(server):
+    from sqlrooms.server import db_async
+
+    db_async.init_global_connection(str(server.db_path), extensions=[])
+    db_async.GLOBAL_CON.execute("CREATE TABLE extract AS SELECT 42 AS x")
+    yield server
+    server.db_bridge_registry.close()
+    db_async.force_checkpoint_and_close()
+
+
+def test_api_materialize_streams_bridge_rows_into_duckdb(materialize_server):
+    from sqlrooms.server import db_async
+
+    server = materialize_server
+    server.db_bridge_registry.register(_ArrowStreamConnector([[1, 2], [3]]))
+    client = TestClient(server._build_app())
+    response = client.post(
+        "/api/db/materialize",
+        json={
+            "connectionId": "stream-conn",
+            "sql": "SELECT x",
+            "tableName": "extract",
+            "queryId": "m1",
+        },
+    )
+
+    frames = _read_stream_frames(response.content)
+    assert [f["type"] for f in frames] == ["progress", "progress", "end"]
+    assert frames[-1]["rows"] == 3 and frames[-1]["tableName"] == "extract"
+    assert frames[-1]["created"] is True
+    con = db_async.GLOBAL_CON
+    assert con.execute("SELECT x FROM extract ORDER BY x").fetchall() == [
+        (1,),
+        (2,),
+        (3,),
+    ]
+
+
+def test_api_materialize_failure_keeps_existing_table(materialize_server):
+    from sqlrooms.server import db_async
+
+    server = materialize_server
+    server.db_bridge_registry.register(
+        _ArrowStreamConnector([[1, 2], [3]], fail_after=1)
+    )
+    client = TestClient(server._build_app())
+    response = client.post(
+        "/api/db/materialize",
+        json={"connectionId": "stream-conn", "sql": "SELECT x", "tableName": "extract"},
+    )
+
+    frames = _read_stream_frames(response.content)
+    assert frames[-1]["type"] == "error"
+    assert "remote connection lost" in frames[-1]["error"]
+    con = db_async.GLOBAL_CON
+    assert con.execute("SELECT x FROM extract").fetchall() == [(42,)]
+    assert con.execute(
+        "SELECT count(*) FROM duckdb_tables() WHERE table_name LIKE '__sqlrooms_materialize%'"
+    ).fetchone() == (0,)
+
+
+def test_api_materialize_without_batches_reports_not_created(materialize_server):
+    from sqlrooms.server import db_async
+
+    server = materialize_server
+    server.db_bridge_registry.register(_ArrowStreamConnector([]))
+    client = TestClient(server._build_app())
+    response = client.post(
+        "/api/db/materialize",
+        json={"connectionId": "stream-conn", "sql": "SELECT x", "tableName": "extract"},
+    )
+
+    frames = _read_stream_frames(response.content)
+    assert [f["type"] for f in frames] == ["end"]
+    assert frames[0]["rows"] == 0 and frames[0]["created"] is False
+    con = db_async.GLOBAL_CON
+    assert con.execute("SELECT x FROM extract").fetchall() == [(42,)]
+
+
+def test_api_materialize_partitioned_table_extract(materialize_server):
+    from sqlrooms.server import db_async
+
+    class _PartitionedConnector(_ArrowStreamConnector):
+        def partition_queries(self, table, *, column=None, partitions=4):
+            assert (table, column) == ("public.events", "id")
+            return [str(index) for index in range(partitions)]
+
+        def stream_arrow_batches(self, sql, chunk_rows=5000, query_id=None):
+            partition = _ArrowStreamConnector([[int(sql) * 10, int(sql) * 10 + 1]])
+            yield from partition.stream_arrow_batches(sql, chunk_rows, query_id)
+
+    server = materialize_server
+    server.db_bridge_registry.register(_PartitionedConnector([]))
+    client = TestClient(server._build_app())
+    response = client.post(
+        "/api/db/materialize",
+        json={
+            "connectionId": "stream-conn",
+            "table": "public.events",
+            "partitionColumn": "id",
+            "partitions": 3,
+            "tableName": "events",
+        },
+    )
+
+    frames = _read_stream_frames(response.content)
+    assert frames[-1] == {
+        "type": "end",
+        "queryId": frames[-1]["queryId"],
+        "payloadLength": 0,
+        "rows": 6,
+        "tableName": "events",
+        "created": True,
+    }
+    rows = db_async.GLOBAL_CON.execute("SELECT x FROM events ORDER BY x").fetchall()
+    assert rows == [(0,), (1,), (10,), (11,), (20,), (21,)]
+
+
+def test_api_upload_ingest_loads_csv_into_duckdb(materialize_server, tmp_path):
+    from sqlrooms.server import db_async
+
+    client = TestClient(materialize_server._build_app())
+    response = client.post(
+        "/api/upload/ingest?tableName=cars&filename=../cars.csv",
+        content=b"id,name\n1,a\n2,b\n3,c\n",
+    )
+
+    frames = _read_stream_frames(response.content)
+    assert frames[0]["phase"] == "uploaded" and frames[0]["format"] == "csv"
+    end = frames[-1]
+    assert end["type"] == "end"
+    assert end["rows"] == 3 and end["tableName"] == "cars"
+    assert end["columns"] == [
+        {"name": "id", "type": "BIGINT"},
+        {"name": "name", "type": "VARCHAR"},
+    ]
+    assert Path(end["path"]) == tmp_path / "sqlrooms_uploads" / "cars.csv"
+    assert db_async.GLOBAL_CON.execute("SELECT sum(id) FROM cars").fetchone() == (6,)
+
+
+def test_api_upload_ingest_sniffs_parquet_and_validates_table(materialize_server):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    from sqlrooms.server import db_async
+
+    sink = pa.BufferOutputStream()
+    pq.write_table(pa.table({"x": [1, 2]}), sink)
+    client = TestClient(materialize_server._build_app())
+
+    rejected = client.post("/api/upload/ingest?tableName=a.b.c.d", content=b"x")
+    assert rejected.status_code == 400
+
+    response = client.post(
+        "/api/upload/ingest?tableName=extract&filename=blob.bin",
+        content=sink.getvalue().to_pybytes(),
+    )
+    frames = _read_stream_frames(response.content)
+    assert frames[-1]["type"] == "end" and frames[-1]["format"] == "parquet"
+    assert db_async.GLOBAL_CON.execute("SELECT x FROM extract").fetchall() == [
+        (1,),
+        (2,),
+    ]
+
+
+def test_api_upload_ingest_names_unnamed_uploads_after_their_query(
+    materialize_server, tmp_path
+):
+    client = TestClient(materialize_server._build_app())
+
+    paths = []
+    for table, query_id in (("first", ""), ("second", ""), ("third", "q-3")):
+        response = client.post(
+            f"/api/upload/ingest?tableName={table}&queryId={query_id}",
+            content=b"x\n1\n",
+        )
+        end = _read_stream_frames(response.content)[-1]
+        assert end["type"] == "end" and end["rows"] == 1
+        paths.append(Path(end["path"]))
+
+    assert len(set(paths)) == 3
+    assert paths[2] == tmp_path / "sqlrooms_uploads" / "q-3.dat"
+
+
+def test_concurrent_upload_streams_to_one_name_do_not_mix(tmp_path):
+    from sqlrooms.web.upload_ingest import write_request_stream
+
+    target = tmp_path / "data.csv"
+    bodies = [b"a" * 4096, b"b" * 4096]
+
+    async def _chunks(body):
+        for i in range(0, len(body), 512):
+            await asyncio.sleep(0)
+            yield body[i : i + 512]
+
+    async def _run():
+        return await asyncio.gather(
+            *(write_request_stream(_chunks(body), target) for body in bodies)
+        )
+
+    results = asyncio.run(_run())
+
+    assert [size for size, _ in results] == [4096, 4096]
+    # The last rename wins, but the file is one complete upload
+    assert target.read_bytes() in bodies
+    assert [p.name for p in tmp_path.iterdir()] == ["data.csv"]
+
+
+def test_api_chunked_upload_resumes_verifies_and_deduplicates(server, tmp_path):
+    import hashlib
+
+    client = TestClient(server._build_app())
+    data = bytes(range(256)) * 40  # 10240 bytes -> 3 chunks of 4096
+    digest = hashlib.sha256(data).hexdigest()
+    chunks = [data[i : i + 4096] for i in range(0, len(data), 4096)]
+
+    def _put(upload_id, index, chunk, checksum=None):
+        return client.put(
+            f"/api/upload/chunked/{upload_id}/{index}",
+            content=chunk,
+            headers={"X-Chunk-Sha256": checksum or hashlib.sha256(chunk).hexdigest()},
+        )
+
+    init = {"filename": "../data.bin", "size": len(data), "sha256": digest}
+    started = client.post(
+        "/api/upload/chunked/init", json={**init, "chunkSize": 4096}
+    ).json()
+    upload_id = started["uploadId"]
+    assert started["chunkCount"] == 3 and started["receivedChunks"] == []
+
+    assert _put(upload_id, 2, chunks[2]).status_code == 200
+    bad = _put(upload_id, 0, chunks[0], checksum="0" * 64)
+    assert bad.status_code == 400 and "checksum" in bad.json()["error"]
+    assert client.post(f"/api/upload/chunked/{upload_id}/complete").status_code == 400
+
+    # A dropped client re-inits with the same file and only sends what is missing.
+    resumed = client.post(
+        "/api/upload/chunked/init", json={**init, "chunkSize": 4096}
+    ).json()
+    assert resumed["uploadId"] == upload_id and resumed["receivedChunks"] == [2]
+    for index in (0, 1):
+        assert _put(upload_id, index, chunks[index]).status_code == 200
+    done = client.post(f"/api/upload/chunked/{upload_id}/complete").json()
+    assert done == {
+        "complete": True,
+        "deduplicated": False,
+        "path": str(tmp_path / "sqlrooms_uploads" / "data.bin"),
+        "sha256": digest,
+    }
+    assert Path(done["path"]).read_bytes() == data
+
+    again = client.post(
+        "/api/upload/chunked/init", json={**init, "filename": "copy.bin"}
+    ).json()
+    assert again["deduplicated"] is True and again["path"] == done["path"]
+    assert not (tmp_path / "sqlrooms_uploads" / "copy.bin").exists()
+
+    # A wrong declared size is not a match, but leaves the entry in place.
+    mismatch = client.post(
+        "/api/upload/chunked/init", json={**init, "size": len(data) + 1}
+    ).json()
+    assert mismatch["complete"] is False
+    client.delete(f"/api/upload/chunked/{mismatch['uploadId']}")
+    assert client.post("/api/upload/chunked/init", json=init).json()["deduplicated"]
+
+    # Overwritten through /api/upload: the index entry is stale and ignored.
+    client.post("/api/upload", files={"file": ("data.bin", b"x" * len(data))})
+    fresh = client.post("/api/upload/chunked/init", json=init).json()
+    assert fresh["complete"] is False
+
+
+def test_chunked_upload_rejects_calls_while_completing(tmp_path, monkeypatch):
+    import hashlib
+    import threading
+
+    from sqlrooms.web import chunked_upload
+    from sqlrooms.web.chunked_upload import ChunkedUploadError, ChunkedUploadManager
+
+    manager = ChunkedUploadManager(tmp_path)
+    data = b"abcdefgh"
+    checksum = hashlib.sha256(data).hexdigest()
+    upload_id = manager.init(filename="data.bin", size=len(data), chunk_size=4)[
+        "uploadId"
+    ]
+    manager.put_chunk(upload_id, 0, data[:4], hashlib.sha256(data[:4]).hexdigest())
+    manager.put_chunk(upload_id, 1, data[4:], hashlib.sha256(data[4:]).hexdigest())
+
+    hashing, release = threading.Event(), threading.Event()
+    real_sha256_file = chunked_upload._sha256_file
+
+    def _slow_sha256_file(path):
+        hashing.set()
+        assert release.wait(5)
+        return real_sha256_file(path)
+
+    monkeypatch.setattr(chunked_upload, "_sha256_file", _slow_sha256_file)
+    results = []
+    worker = threading.Thread(
+        target=lambda: results.append(manager.complete(upload_id))
+    )
+    worker.start()
+    assert hashing.wait(5)
+    try:
+        with pytest.raises(ChunkedUploadError, match="being completed"):
+            manager.put_chunk(
+                upload_id, 0, data[:4], hashlib.sha256(data[:4]).hexdigest()
+            )
+        with pytest.raises(ChunkedUploadError, match="being completed"):
+            manager.complete(upload_id)
+        with pytest.raises(ChunkedUploadError, match="being completed"):
+            manager.abort(upload_id)
+    finally:
+        release.set()
+        worker.join(5)
+    assert results and results[0]["sha256"] == checksum
+    assert Path(results[0]["path"]).read_bytes() == data
+    with pytest.raises(ChunkedUploadError, match="Unknown upload"):
+        manager.complete(upload_id)
+
+
+def test_api_chunked_upload_missing_part_is_a_client_error(server, tmp_path):
+    import hashlib
+
+    client = TestClient(server._build_app())
+    data = b"abcd"
+    upload_id = client.post(
+        "/api/upload/chunked/init", json={"filename": "data.bin", "size": len(data)}
+    ).json()["uploadId"]
+    parts = list((tmp_path / "sqlrooms_uploads").rglob(f"{upload_id}*.part"))
+    assert len(parts) == 1
+    parts[0].unlink()
+
+    put = client.put(
+        f"/api/upload/chunked/{upload_id}/0",
+        content=data,
+        headers={"X-Chunk-Sha256": hashlib.sha256(data).hexdigest()},
+    )
+    assert put.status_code == 400 and "Unknown upload" in put.json()["error"]